@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import Usuario
+from django.utils import timezone
+from .models import CorreoSaliente, Usuario
 
 # Register your models here.
 
@@ -33,3 +34,26 @@ class UsuarioAdmin(UserAdmin):
     )
 
 admin.site.register(Usuario, UsuarioAdmin)
+
+
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    """
+    Bandeja de salida de correos; los envía el comando enviar_correos_pendientes.
+    """
+    list_display = ('asunto', 'destinatarios', 'estado', 'intentos', 'proximo_intento', 'fecha_creacion', 'fecha_envio')
+    list_filter = ('estado',)
+    search_fields = ('asunto', 'destinatarios')
+    readonly_fields = ('intentos', 'ultimo_error', 'fecha_creacion', 'fecha_envio')
+    actions = ['reintentar']
+    
+    def reintentar(self, request, queryset):
+        """
+        Vuelve a poner en cola los correos seleccionados que no se han enviado.
+        """
+        reintentados = queryset.exclude(estado=CorreoSaliente.ENVIADO).update(
+            estado=CorreoSaliente.PENDIENTE, intentos=0, proximo_intento=timezone.now()
+        )
+        self.message_user(request, _('%d correos puestos en cola nuevamente.') % reintentados)
+    reintentar.short_description = _('Reintentar envío')
+
+admin.site.register(CorreoSaliente, CorreoSalienteAdmin)
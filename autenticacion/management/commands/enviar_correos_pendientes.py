@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from autenticacion.services import CorreoService
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía los correos pendientes de la bandeja de salida por lotes, reutilizando una '
+        'conexión por lote y reprogramando los fallidos con espera exponencial'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=50,
+            help='Correos por lote; cada lote usa una sola conexión (por defecto 50)'
+        )
+        parser.add_argument(
+            '--max-intentos',
+            type=int,
+            default=CorreoService.MAX_INTENTOS,
+            help=f'Intentos antes de marcar un correo como fallido (por defecto {CorreoService.MAX_INTENTOS})'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            help='Sigue ejecutándose y revisa la bandeja cada N segundos. Por defecto, termina al vaciarla'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['max_intentos'] < 1:
+            raise CommandError('--lote y --max-intentos deben ser mayores o iguales a 1')
+
+        while True:
+            enviados, fallidos = CorreoService.enviar_pendientes(options['lote'], options['max_intentos'])
+            if enviados or fallidos or not options['intervalo']:
+                self.stdout.write(self.style.SUCCESS(f'Correos enviados: {enviados}, fallidos: {fallidos}'))
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
@@ -135,3 +135,43 @@ class Usuario(AbstractUser):
         """
         expiration_time = self.token_created_at + timezone.timedelta(hours=hours)
         return timezone.now() <= expiration_time
+
+
+class CorreoSaliente(models.Model):
+    """
+    Bandeja de salida de correos. Las vistas solo encolan el mensaje (en la misma
+    transacción que el cambio que lo origina) y el comando enviar_correos_pendientes
+    los envía por lotes reutilizando una conexión, con reintentos y espera creciente.
+    """
+    PENDIENTE = 'pendiente'
+    ENVIADO = 'enviado'
+    FALLIDO = 'fallido'
+    
+    ESTADO_CHOICES = [
+        (PENDIENTE, _('Pendiente')),
+        (ENVIADO, _('Enviado')),
+        (FALLIDO, _('Fallido')),
+    ]
+    
+    asunto = models.CharField(_('Asunto'), max_length=255)
+    remitente = models.CharField(_('Remitente'), max_length=255)
+    destinatarios = models.JSONField(_('Destinatarios'), default=list)
+    cuerpo = models.TextField(_('Cuerpo en Texto Plano'))
+    cuerpo_html = models.TextField(_('Cuerpo HTML'), blank=True)
+    estado = models.CharField(_('Estado'), max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(_('Intentos'), default=0)
+    proximo_intento = models.DateTimeField(_('Próximo Intento'), default=timezone.now)
+    ultimo_error = models.TextField(_('Último Error'), blank=True)
+    fecha_creacion = models.DateTimeField(_('Fecha de Creación'), auto_now_add=True)
+    fecha_envio = models.DateTimeField(_('Fecha de Envío'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('Correo Saliente')
+        verbose_name_plural = _('Correos Salientes')
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='correo_pendiente_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.asunto} -> {', '.join(self.destinatarios)} ({self.get_estado_display()})"
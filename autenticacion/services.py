@@ -0,0 +1,145 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+
+class CorreoService:
+    """
+    Envío asíncrono de correos a través de la bandeja de salida CorreoSaliente.
+    Funciona con cualquier EMAIL_BACKEND (SMTP, archivo o consola).
+    """
+    # Tiempo que un lote reclamado queda oculto para otros procesos; si el proceso
+    # muere sin terminarlo, los correos vuelven a quedar disponibles al vencer
+    RESERVA = timedelta(minutes=10)
+    # Espera antes del reintento n: ESPERA_BASE * 2^(n-1), como máximo ESPERA_MAXIMA
+    ESPERA_BASE = timedelta(minutes=1)
+    ESPERA_MAXIMA = timedelta(hours=6)
+    MAX_INTENTOS = 5
+
+    @staticmethod
+    def encolar(asunto, destinatarios, cuerpo, cuerpo_html='', remitente=None):
+        """Guarda el correo para que lo envíe el worker. No abre ninguna conexión."""
+        return CorreoSaliente.objects.create(
+            asunto=asunto,
+            remitente=remitente or settings.DEFAULT_FROM_EMAIL,
+            destinatarios=list(destinatarios),
+            cuerpo=cuerpo,
+            cuerpo_html=cuerpo_html
+        )
+
+    @staticmethod
+    def encolar_plantilla(asunto, plantilla, contexto, destinatarios):
+        """Renderiza una plantilla HTML y encola el correo con su versión en texto plano."""
+        cuerpo_html = render_to_string(plantilla, contexto)
+        return CorreoService.encolar(asunto, destinatarios, strip_tags(cuerpo_html), cuerpo_html)
+
+    @staticmethod
+    def espera(intentos):
+        return min(CorreoService.ESPERA_BASE * 2 ** (intentos - 1), CorreoService.ESPERA_MAXIMA)
+
+    @staticmethod
+    def reclamar(tamano_lote):
+        """
+        Toma los próximos correos vencidos y los reserva durante RESERVA para que
+        otro worker en paralelo no los envíe dos veces.
+        """
+        ahora = timezone.now()
+        with transaction.atomic():
+            correos = list(
+                CorreoSaliente.objects.select_for_update(skip_locked=True).filter(
+                    estado=CorreoSaliente.PENDIENTE, proximo_intento__lte=ahora
+                ).order_by('proximo_intento', 'id')[:tamano_lote]
+            )
+            CorreoSaliente.objects.filter(pk__in=[correo.pk for correo in correos]).update(
+                proximo_intento=ahora + CorreoService.RESERVA
+            )
+        return correos
+
+    @staticmethod
+    def mensaje(correo, conexion):
+        mensaje = EmailMultiAlternatives(
+            correo.asunto, correo.cuerpo, correo.remitente, correo.destinatarios, connection=conexion
+        )
+        if correo.cuerpo_html:
+            mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+        return mensaje
+
+    @staticmethod
+    def enviar_lote(tamano_lote=50, max_intentos=None):
+        """
+        Envía un lote de correos pendientes por una sola conexión. Los que fallan se
+        reprograman con espera exponencial y, tras `max_intentos`, quedan como
+        FALLIDO. Retorna (enviados, fallidos); (0, 0) si no había nada que enviar.
+        """
+        max_intentos = max_intentos or CorreoService.MAX_INTENTOS
+        correos = CorreoService.reclamar(tamano_lote)
+        if not correos:
+            return 0, 0
+
+        conexion = get_connection(fail_silently=False)
+        try:
+            conexion.open()
+        except Exception as e:
+            # Sin conexión no se envía nada: todo el lote se reprograma
+            for correo in correos:
+                CorreoService.registrar_fallo(correo, e, max_intentos)
+            return 0, len(correos)
+
+        enviados = fallidos = 0
+        try:
+            for correo in correos:
+                try:
+                    CorreoService.mensaje(correo, conexion).send()
+                except Exception as e:
+                    fallidos += 1
+                    CorreoService.registrar_fallo(correo, e, max_intentos)
+                    # La conexión puede haber quedado inutilizable: se abre otra
+                    conexion.close()
+                    try:
+                        conexion.open()
+                    except Exception:
+                        pass
+                else:
+                    enviados += 1
+                    CorreoSaliente.objects.filter(pk=correo.pk).update(
+                        estado=CorreoSaliente.ENVIADO,
+                        intentos=correo.intentos + 1,
+                        fecha_envio=timezone.now(),
+                        ultimo_error=''
+                    )
+        finally:
+            conexion.close()
+        return enviados, fallidos
+
+    @staticmethod
+    def registrar_fallo(correo, error, max_intentos):
+        intentos = correo.intentos + 1
+        agotado = intentos >= max_intentos
+        logger.warning(f'Error al enviar el correo {correo.pk} (intento {intentos}): {error}')
+        CorreoSaliente.objects.filter(pk=correo.pk).update(
+            estado=CorreoSaliente.FALLIDO if agotado else CorreoSaliente.PENDIENTE,
+            intentos=intentos,
+            proximo_intento=timezone.now() + CorreoService.espera(intentos),
+            ultimo_error=str(error)
+        )
+
+    @staticmethod
+    def enviar_pendientes(tamano_lote=50, max_intentos=None):
+        """Vacía la bandeja de salida lote a lote. Retorna (enviados, fallidos)."""
+        total_enviados = total_fallidos = 0
+        while True:
+            enviados, fallidos = CorreoService.enviar_lote(tamano_lote, max_intentos)
+            if not enviados and not fallidos:
+                return total_enviados, total_fallidos
+            total_enviados += enviados
+            total_fallidos += fallidos
@@ -1,3 +1,59 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .models import CorreoSaliente, Usuario
+from .services import CorreoService
+from io import StringIO
+
+
+class BackendConError(BaseEmailBackend):
+    """Backend de correo que siempre falla, para probar los reintentos."""
+    def send_messages(self, email_messages):
+        raise ConnectionError('Servidor de correo no disponible')
+
+
+class BandejaSalidaCorreosTest(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+
+    def test_la_vista_solo_encola_y_el_worker_envia(self):
+        respuesta = self.client.post(reverse('autenticacion:recuperar_password'), {'email': 'cliente@test.com'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        correo = CorreoSaliente.objects.get()
+        self.assertEqual(correo.destinatarios, ['cliente@test.com'])
+
+        call_command('enviar_correos_pendientes', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['cliente@test.com'])
+        self.assertEqual(len(mail.outbox[0].alternatives), 1)
+        correo.refresh_from_db()
+        self.assertEqual((correo.estado, correo.intentos), (CorreoSaliente.ENVIADO, 1))
+
+    @override_settings(EMAIL_BACKEND='autenticacion.tests.BackendConError')
+    def test_reintentos_con_espera_creciente(self):
+        correo = CorreoService.encolar('Asunto', ['cliente@test.com'], 'Cuerpo')
+
+        self.assertEqual(CorreoService.enviar_pendientes(max_intentos=2), (0, 1))
+        correo.refresh_from_db()
+        self.assertEqual((correo.estado, correo.intentos), (CorreoSaliente.PENDIENTE, 1))
+        self.assertGreater(correo.proximo_intento, timezone.now())
+
+        # Aún no vence la espera: no se reintenta
+        self.assertEqual(CorreoService.enviar_pendientes(max_intentos=2), (0, 0))
+
+        CorreoSaliente.objects.update(proximo_intento=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(CorreoService.enviar_pendientes(max_intentos=2), (0, 1))
+        correo.refresh_from_db()
+        self.assertEqual((correo.estado, correo.intentos), (CorreoSaliente.FALLIDO, 2))
+        self.assertIn('no disponible', correo.ultimo_error)
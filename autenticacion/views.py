@@ -18,9 +18,7 @@ from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .serializers import RegistroUsuarioSerializer, LoginSerializer, UsuarioSerializer
 from .models import Usuario
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from .services import CorreoService
 import uuid
 
 # Create your views here.
@@ -54,33 +52,16 @@ class RecuperarPasswordView(View):
             return redirect('autenticacion:recuperar_password')
     
     def enviar_correo_recuperacion(self, usuario, token):
-        """Envía un correo de recuperación de contraseña al usuario"""
+        """Encola un correo de recuperación de contraseña para el usuario"""
         subject = 'Recuperación de contraseña - Premium Car Detailing'
         reset_url = f"{settings.SITE_URL}{reverse('autenticacion:reset_password', args=[token])}"
         
-        # Contenido HTML
-        html_message = render_to_string('autenticacion/email_reset_password.html', {
+        # Encolar el correo; lo envía el comando enviar_correos_pendientes
+        CorreoService.encolar_plantilla(subject, 'autenticacion/email_reset_password.html', {
             'usuario': usuario,
             'reset_url': reset_url
-        })
-        
-        # Contenido texto plano
-        plain_message = strip_tags(html_message)
-        
-        # Enviar correo
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [usuario.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True
-        except Exception as e:
-            print(f"Error al enviar correo: {e}")
-            return False
+        }, [usuario.email])
+        return True
 
 
 class ResetPasswordView(View):
@@ -201,33 +182,16 @@ class RegistroUsuarioView(View):
             return render(request, 'autenticacion/registro.html', {'form_data': data})
     
     def enviar_correo_verificacion(self, usuario, token):
-        """Envía un correo de verificación al usuario"""
+        """Encola un correo de verificación para el usuario"""
         subject = 'Verifica tu cuenta de Premium Car Detailing'
         verification_url = f"{settings.SITE_URL}{reverse('autenticacion:verificar_email', args=[token])}"
         
-        # Contenido HTML
-        html_message = render_to_string('autenticacion/email_verificacion.html', {
+        # Encolar el correo; lo envía el comando enviar_correos_pendientes
+        CorreoService.encolar_plantilla(subject, 'autenticacion/email_verificacion.html', {
             'usuario': usuario,
             'verification_url': verification_url
-        })
-        
-        # Contenido texto plano
-        plain_message = strip_tags(html_message)
-        
-        # Enviar correo
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [usuario.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True
-        except Exception as e:
-            print(f"Error al enviar correo: {e}")
-            return False
+        }, [usuario.email])
+        return True
 
 
 class RegistroUsuarioAPIView(APIView):
@@ -257,62 +221,28 @@ class RegistroUsuarioAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
     def enviar_correo_verificacion(self, usuario, token):
-        """Envía un correo de verificación al usuario"""
+        """Encola un correo de verificación para el usuario"""
         subject = 'Verifica tu cuenta de Premium Car Detailing'
         verification_url = f"{settings.SITE_URL}{reverse('autenticacion:verificar_email', args=[token])}"
         
-        # Contenido HTML
-        html_message = render_to_string('autenticacion/email_verificacion.html', {
+        # Encolar el correo; lo envía el comando enviar_correos_pendientes
+        CorreoService.encolar_plantilla(subject, 'autenticacion/email_verificacion.html', {
             'usuario': usuario,
             'verification_url': verification_url
-        })
-        
-        # Contenido texto plano
-        plain_message = strip_tags(html_message)
-        
-        # Enviar correo
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [usuario.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True
-        except Exception as e:
-            print(f"Error al enviar correo: {e}")
-            return False
+        }, [usuario.email])
+        return True
     
     def enviar_correo_verificacion(self, usuario, token):
-        """Envía un correo de verificación al usuario"""
+        """Encola un correo de verificación para el usuario"""
         subject = 'Verifica tu cuenta de Autolavados'
         verification_url = f"{settings.FRONTEND_URL}/verificar-email/{token}/"
         
-        # Contenido HTML
-        html_message = render_to_string('autenticacion/email_verificacion.html', {
+        # Encolar el correo; lo envía el comando enviar_correos_pendientes
+        CorreoService.encolar_plantilla(subject, 'autenticacion/email_verificacion.html', {
             'usuario': usuario,
             'verification_url': verification_url
-        })
-        
-        # Contenido texto plano
-        plain_message = strip_tags(html_message)
-        
-        # Enviar correo
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [usuario.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True
-        except Exception as e:
-            print(f"Error al enviar correo: {e}")
-            return False
+        }, [usuario.email])
+        return True
 
 
 class VerificarEmailView(View):
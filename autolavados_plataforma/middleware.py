@@ -88,6 +88,7 @@ class LoginRequiredMiddleware:
             r'^/static/.*$',  # Permitir acceso a archivos estáticos
             r'^/media/.*$',  # Permitir acceso a archivos media
             r'^/reservas/obtener_horarios_disponibles/.*$',  # API para obtener horarios disponibles
+            r'^/reservas/obtener_calendario_disponibilidad/.*$',  # API para obtener el calendario de disponibilidad
             r'^/reservas/obtener_lavadores_disponibles/.*$',  # API para obtener lavadores disponibles
             r'^/reservas/obtener_bahias_disponibles/.*$',  # API para obtener bahías disponibles
             r'^/dashboard/.*$',  # Permitir acceso al dashboard público
@@ -37,6 +37,8 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1,0.0.0.0,testserv
 # Application definition
 
 INSTALLED_APPS = [
+    # Primero: reemplaza runserver por la versión ASGI, que atiende también los WebSocket
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,6 +50,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',  # Añadido para soporte de tokens de autenticación
     'corsheaders',
+    'channels',
     
     # Aplicaciones propias
     'autenticacion',
@@ -94,6 +97,15 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'autolavados_plataforma.wsgi.application'
+ASGI_APPLICATION = 'autolavados_plataforma.asgi.application'
+
+# Capa de canales para las actualizaciones en tiempo real (WebSocket).
+# En memoria: sirve para desarrollo y pruebas con un solo proceso.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
 
 
 # Database
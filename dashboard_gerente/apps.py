@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class DashboardGerenteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard_gerente'
-    verbose_name = 'Dashboard Gerente'
\ No newline at end of file
+    verbose_name = 'Dashboard Gerente'
+
+    def ready(self):
+        # Mantener el resumen diario de reservas
+        from . import signals  # noqa: F401
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+from dashboard_gerente.services import AlertasKPIService
+
+
+class Command(BaseCommand):
+    help = (
+        'Evalúa el umbral de alerta de los KPIs activos sobre el último día cerrado y avisa '
+        'a su dueño sólo cuando el incumplimiento es nuevo. Pensado para ejecutarse a diario'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            type=str,
+            help='Día a evaluar (YYYY-MM-DD). Por defecto, ayer'
+        )
+        parser.add_argument(
+            '--max-segundos',
+            type=int,
+            default=300,
+            help='Tiempo máximo de ejecución; los KPIs pendientes se evalúan en la próxima ejecución'
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        evaluados, alertas = AlertasKPIService.evaluar(fecha, options['max_segundos'])
+        self.stdout.write(self.style.SUCCESS(f'KPIs evaluados: {evaluados}. Alertas nuevas: {alertas}'))
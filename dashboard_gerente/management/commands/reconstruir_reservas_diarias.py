@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime, timedelta
+from dashboard_gerente.services import RollupEntidadesService, RollupReservasService
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye los resúmenes diarios de reservas, clientes y calificaciones '
+        '(ReservaDiaria, ClienteDiario y CalificacionDiaria). Sin opciones recorre '
+        'todo el historial; programado a diario con --dias 2 corrige los cambios hechos '
+        'con actualizaciones masivas que no disparan señales'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Fecha inicial (YYYY-MM-DD). Por defecto, la primera reserva'
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Fecha final (YYYY-MM-DD). Por defecto, la última reserva'
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            help='Reconstruir solo los últimos N días hasta hoy (ignora --desde y --hasta)'
+        )
+
+    def handle(self, *args, **options):
+        if options['dias']:
+            hasta = datetime.now().date()
+            desde = hasta - timedelta(days=options['dias'] - 1)
+        else:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else None
+                hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else None
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+            if desde and hasta and hasta < desde:
+                raise CommandError('La fecha final debe ser posterior a la inicial')
+
+        filas = RollupReservasService.reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Resumen diario reconstruido: {filas} filas generadas'))
+        filas = RollupEntidadesService.reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes de clientes y calificaciones reconstruidos: {filas} filas generadas'))
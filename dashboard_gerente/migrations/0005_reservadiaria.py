@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0013_alter_bonificacion_calificacion_minima_and_more'),
+        ('reservas', '0030_bloqueohorario'),
+        ('dashboard_gerente', '0004_alter_kpiconfiguracion_entidad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=2)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('con_precio', models.PositiveIntegerField(default=0, help_text='Reservas con precio final registrado')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('precio_maximo', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('precio_minimo', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('descuentos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('puntos', models.PositiveIntegerField(default=0)),
+                ('minutos', models.PositiveIntegerField(default=0, help_text='Suma de la duración de los servicios')),
+                ('bahia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumen_diario', to='reservas.bahia')),
+                ('lavador', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumen_diario', to='empleados.empleado')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_diario', to='reservas.servicio')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de reservas',
+                'verbose_name_plural': 'Resúmenes diarios de reservas',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['fecha', 'estado'], name='dashboard_g_fecha_b2a17c_idx')],
+            },
+        ),
+    ]
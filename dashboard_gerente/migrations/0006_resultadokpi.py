@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0030_bloqueohorario'),
+        ('dashboard_gerente', '0005_reservadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoKPI',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_by', models.CharField(max_length=10)),
+                ('estado', models.CharField(blank=True, default='', max_length=30)),
+                ('periodo', models.DateField(help_text='Primer día del periodo')),
+                ('valor', models.FloatField(default=0)),
+                ('calculado_en', models.DateTimeField(auto_now_add=True)),
+                ('kpi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados', to='dashboard_gerente.kpiconfiguracion')),
+                ('servicio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resultados_kpi', to='reservas.servicio')),
+            ],
+            options={
+                'verbose_name': 'Resultado KPI',
+                'verbose_name_plural': 'Resultados KPI',
+                'indexes': [models.Index(fields=['group_by', 'periodo'], name='dashboard_g_group_b_1fd9d4_idx')],
+                'unique_together': {('kpi', 'group_by', 'estado', 'servicio', 'periodo')},
+            },
+        ),
+    ]
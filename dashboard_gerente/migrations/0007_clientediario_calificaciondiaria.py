@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0030_bloqueohorario'),
+        ('empleados', '0013_alter_bonificacion_calificacion_minima_and_more'),
+        ('dashboard_gerente', '0006_resultadokpi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClienteDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('nuevos', models.PositiveIntegerField(default=0)),
+                ('activos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de clientes',
+                'verbose_name_plural': 'Resúmenes diarios de clientes',
+                'ordering': ['fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalificacionDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('suma', models.PositiveIntegerField(default=0, help_text='Suma de las puntuaciones')),
+                ('maxima', models.PositiveSmallIntegerField(default=0)),
+                ('minima', models.PositiveSmallIntegerField(default=0)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calificaciones_diarias', to='empleados.empleado')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calificaciones_diarias', to='reservas.servicio')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de calificaciones',
+                'verbose_name_plural': 'Resúmenes diarios de calificaciones',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='dashboard_g_fecha_ce77f2_idx')],
+            },
+        ),
+    ]
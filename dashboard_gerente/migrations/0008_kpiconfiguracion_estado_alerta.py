@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_gerente', '0007_clientediario_calificaciondiaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kpiconfiguracion',
+            name='alerta_activa',
+            field=models.BooleanField(default=False, help_text='El último valor evaluado incumple el umbral'),
+        ),
+        migrations.AddField(
+            model_name='kpiconfiguracion',
+            name='evaluado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='kpiconfiguracion',
+            name='ultimo_valor',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+def descartar_resultados(apps, schema_editor):
+    # Los periodos sin datos se guardaban como 0; se recalculan al consultarlos
+    ResultadoKPI = apps.get_model('dashboard_gerente', 'ResultadoKPI')
+    ResultadoKPI.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_gerente', '0008_kpiconfiguracion_estado_alerta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resultadokpi',
+            name='valor',
+            field=models.FloatField(blank=True, help_text='Vacío si el periodo no tuvo datos', null=True),
+        ),
+        migrations.RunPython(descartar_resultados, migrations.RunPython.noop),
+    ]
@@ -27,6 +27,10 @@ class KPIConfiguracion(models.Model):
     periodo_dias = models.PositiveIntegerField(default=30, help_text=_('Rango en días para calcular la métrica'))
     umbral_alerta = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text=_('Opcional: umbral para generar alertas'))
     activo = models.BooleanField(default=True)
+    # Último estado del evaluador de alertas (comando evaluar_alertas_kpi)
+    alerta_activa = models.BooleanField(default=False, help_text=_('El último valor evaluado incumple el umbral'))
+    ultimo_valor = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    evaluado_en = models.DateTimeField(null=True, blank=True)
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
@@ -36,4 +40,106 @@ class KPIConfiguracion(models.Model):
         ordering = ['-creado_en']
 
     def __str__(self):
-        return f"{self.nombre} ({self.entidad}/{self.metrica})"
\ No newline at end of file
+        return f"{self.nombre} ({self.entidad}/{self.metrica})"
+
+class ReservaDiaria(models.Model):
+    """
+    Resumen diario de reservas por (fecha, servicio, estado, bahía, lavador).
+    Lo mantienen las señales de Reserva (recalculando el día afectado) y el
+    comando ``reconstruir_reservas_diarias``; los dashboards lo leen en lugar
+    de agregar la tabla completa de reservas.
+    """
+    fecha = models.DateField()
+    servicio = models.ForeignKey('reservas.Servicio', on_delete=models.CASCADE, related_name='resumen_diario')
+    estado = models.CharField(max_length=2)
+    bahia = models.ForeignKey('reservas.Bahia', on_delete=models.SET_NULL, null=True, blank=True, related_name='resumen_diario')
+    lavador = models.ForeignKey('empleados.Empleado', on_delete=models.SET_NULL, null=True, blank=True, related_name='resumen_diario')
+    cantidad = models.PositiveIntegerField(default=0)
+    con_precio = models.PositiveIntegerField(default=0, help_text=_('Reservas con precio final registrado'))
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    precio_maximo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    precio_minimo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    descuentos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    puntos = models.PositiveIntegerField(default=0)
+    minutos = models.PositiveIntegerField(default=0, help_text=_('Suma de la duración de los servicios'))
+
+    class Meta:
+        verbose_name = _('Resumen diario de reservas')
+        verbose_name_plural = _('Resúmenes diarios de reservas')
+        ordering = ['fecha']
+        indexes = [
+            models.Index(fields=['fecha', 'estado']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.servicio_id}/{self.estado}: {self.cantidad}"
+
+
+class ResultadoKPI(models.Model):
+    """
+    Valor de un KPI en un periodo (día, semana o mes) ya cerrado y cubierto por
+    completo, para una combinación de agrupación, estado y servicio. Los periodos
+    cerrados no cambian salvo ediciones con fecha pasada, que los invalidan al
+    recalcular el resumen diario; el periodo abierto siempre se calcula en vivo.
+    """
+    kpi = models.ForeignKey(KPIConfiguracion, on_delete=models.CASCADE, related_name='resultados')
+    group_by = models.CharField(max_length=10)
+    estado = models.CharField(max_length=30, blank=True, default='')
+    servicio = models.ForeignKey('reservas.Servicio', on_delete=models.CASCADE, null=True, blank=True, related_name='resultados_kpi')
+    periodo = models.DateField(help_text=_('Primer día del periodo'))
+    valor = models.FloatField(null=True, blank=True, help_text=_('Vacío si el periodo no tuvo datos'))
+    calculado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Resultado KPI')
+        verbose_name_plural = _('Resultados KPI')
+        unique_together = ['kpi', 'group_by', 'estado', 'servicio', 'periodo']
+        indexes = [
+            models.Index(fields=['group_by', 'periodo']),
+        ]
+
+    def __str__(self):
+        return f"{self.kpi_id} {self.group_by} {self.periodo}: {self.valor}"
+
+
+class ClienteDiario(models.Model):
+    """
+    Clientes nuevos (por fecha de registro) y activos (con al menos una reserva no
+    cancelada ese día) por día. Lo mantienen las señales de Cliente y Reserva.
+    """
+    fecha = models.DateField(unique=True)
+    nuevos = models.PositiveIntegerField(default=0)
+    activos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Resumen diario de clientes')
+        verbose_name_plural = _('Resúmenes diarios de clientes')
+        ordering = ['fecha']
+
+    def __str__(self):
+        return f"{self.fecha}: {self.nuevos} nuevos, {self.activos} activos"
+
+
+class CalificacionDiaria(models.Model):
+    """
+    Resumen diario de calificaciones por (fecha, empleado, servicio). Lo mantienen
+    las señales de Calificacion.
+    """
+    fecha = models.DateField()
+    empleado = models.ForeignKey('empleados.Empleado', on_delete=models.CASCADE, related_name='calificaciones_diarias')
+    servicio = models.ForeignKey('reservas.Servicio', on_delete=models.CASCADE, related_name='calificaciones_diarias')
+    cantidad = models.PositiveIntegerField(default=0)
+    suma = models.PositiveIntegerField(default=0, help_text=_('Suma de las puntuaciones'))
+    maxima = models.PositiveSmallIntegerField(default=0)
+    minima = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Resumen diario de calificaciones')
+        verbose_name_plural = _('Resúmenes diarios de calificaciones')
+        ordering = ['fecha']
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.empleado_id}/{self.servicio_id}: {self.cantidad}"
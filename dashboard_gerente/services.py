@@ -0,0 +1,862 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.core.exceptions import FieldError
+from django.db.models import Avg, BooleanField, Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+
+from clientes.models import Cliente
+from empleados.models import Calificacion
+from notificaciones.models import Notificacion
+from reservas.models import Reserva
+
+from .models import CalificacionDiaria, ClienteDiario, KPIConfiguracion, ReservaDiaria, ResultadoKPI
+
+logger = logging.getLogger(__name__)
+
+
+class RollupReservasService:
+    """
+    Resumen diario de reservas (ReservaDiaria). Los días distintos de hoy se leen
+    del resumen; el día de hoy se agrega en vivo desde Reserva, así los cambios
+    hechos con ``update()`` (que no disparan señales) se ven el mismo día.
+    """
+
+    DIMENSIONES = ('fecha', 'servicio_id', 'estado', 'bahia_id', 'lavador_id')
+    SUMAS = ('cantidad', 'con_precio', 'ingresos', 'descuentos', 'puntos', 'minutos')
+    MEDIDAS = SUMAS + ('precio_maximo', 'precio_minimo')
+    DIAS_POR_LOTE = 31
+
+    # Medidas del resumen para las métricas KPI por campo: (suma, divisor del promedio, máximo, mínimo)
+    CAMPOS_KPI = {
+        'precio_final': ('ingresos', 'con_precio', 'precio_maximo', 'precio_minimo'),
+        'descuento_aplicado': ('descuentos', 'cantidad', None, None),
+        'puntos_redimidos': ('puntos', 'cantidad', None, None),
+        'duracion_minutos': ('minutos', 'cantidad', None, None),
+        'servicio__duracion_minutos': ('minutos', 'cantidad', None, None),
+    }
+
+    @staticmethod
+    def _agregado(reservas):
+        """Agrupa reservas por las dimensiones del resumen."""
+        return (
+            reservas.order_by()
+            .annotate(fecha=TruncDate('fecha_hora'))
+            .values(*RollupReservasService.DIMENSIONES)
+            .annotate(
+                cantidad=Count('id'),
+                con_precio=Count('precio_final'),
+                ingresos=Sum('precio_final'),
+                precio_maximo=Max('precio_final'),
+                precio_minimo=Min('precio_final'),
+                descuentos=Sum('descuento_aplicado'),
+                puntos=Sum('puntos_redimidos'),
+                minutos=Sum('servicio__duracion_minutos'),
+            )
+        )
+
+    @staticmethod
+    def _reservas_entre(fecha_inicio, fecha_fin):
+        inicio = datetime.combine(fecha_inicio, datetime.min.time())
+        fin = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+        return Reserva.objects.filter(fecha_hora__gte=inicio, fecha_hora__lt=fin)
+
+    @staticmethod
+    def _filas_modelo(filas):
+        return [
+            ReservaDiaria(
+                fecha=fila['fecha'],
+                servicio_id=fila['servicio_id'],
+                estado=fila['estado'],
+                bahia_id=fila['bahia_id'],
+                lavador_id=fila['lavador_id'],
+                cantidad=fila['cantidad'],
+                con_precio=fila['con_precio'],
+                ingresos=fila['ingresos'] or 0,
+                precio_maximo=fila['precio_maximo'],
+                precio_minimo=fila['precio_minimo'],
+                descuentos=fila['descuentos'] or 0,
+                puntos=fila['puntos'] or 0,
+                minutos=fila['minutos'] or 0,
+            )
+            for fila in filas
+        ]
+
+    @staticmethod
+    def recalcular(*fechas):
+        """Reemplaza el resumen de las fechas indicadas con una agrupación de sus reservas."""
+        fechas = {fecha for fecha in fechas if fecha}
+        if not fechas:
+            return
+        with transaction.atomic():
+            ReservaDiaria.objects.filter(fecha__in=fechas).delete()
+            filas = []
+            for fecha in fechas:
+                filas.extend(RollupReservasService._agregado(RollupReservasService._reservas_entre(fecha, fecha)))
+            ReservaDiaria.objects.bulk_create(RollupReservasService._filas_modelo(filas))
+            MotorKPIService.invalidar(*fechas)
+
+    @staticmethod
+    def reconstruir(desde=None, hasta=None):
+        """
+        Reconstruye el resumen del rango (por defecto todo el historial) por lotes
+        de días. Retorna la cantidad de filas generadas.
+        """
+        if desde is None or hasta is None:
+            extremos = Reserva.objects.order_by().aggregate(primera=Min('fecha_hora'), ultima=Max('fecha_hora'))
+            if extremos['primera'] is None:
+                return 0
+            desde = desde or extremos['primera'].date()
+            hasta = hasta or extremos['ultima'].date()
+
+        total = 0
+        lote_inicio = desde
+        while lote_inicio <= hasta:
+            lote_fin = min(lote_inicio + timedelta(days=RollupReservasService.DIAS_POR_LOTE - 1), hasta)
+            with transaction.atomic():
+                ReservaDiaria.objects.filter(fecha__gte=lote_inicio, fecha__lte=lote_fin).delete()
+                filas = RollupReservasService._filas_modelo(
+                    RollupReservasService._agregado(RollupReservasService._reservas_entre(lote_inicio, lote_fin))
+                )
+                ReservaDiaria.objects.bulk_create(filas, batch_size=1000)
+                MotorKPIService.invalidar_rango(lote_inicio, lote_fin)
+            total += len(filas)
+            lote_inicio = lote_fin + timedelta(days=1)
+        return total
+
+    @staticmethod
+    def filas(fecha_inicio=None, fecha_fin=None, hoy=None, **filtros):
+        """
+        Filas del resumen (diccionarios con dimensiones y medidas) entre dos fechas
+        inclusive; sin límites abarca todo el historial. ``filtros`` se aplica por
+        igual al resumen y a las reservas de hoy (ej. ``estado``, ``servicio_id``).
+        """
+        hoy = hoy or datetime.now().date()
+        fecha_inicio = fecha_inicio or date.min
+        fecha_fin = fecha_fin or date.max
+
+        filas = []
+        if not fecha_inicio == fecha_fin == hoy:
+            filas = list(
+                ReservaDiaria.objects.filter(fecha__gte=fecha_inicio, fecha__lte=fecha_fin, **filtros)
+                .exclude(fecha=hoy)
+                .order_by()
+                .values(*RollupReservasService.DIMENSIONES, *RollupReservasService.MEDIDAS)
+            )
+        if fecha_inicio <= hoy <= fecha_fin:
+            for fila in RollupReservasService._agregado(RollupReservasService._reservas_entre(hoy, hoy).filter(**filtros)):
+                filas.append({
+                    **fila,
+                    'ingresos': fila['ingresos'] or 0,
+                    'descuentos': fila['descuentos'] or 0,
+                    'puntos': fila['puntos'] or 0,
+                    'minutos': fila['minutos'] or 0,
+                })
+        return filas
+
+    @staticmethod
+    def totales(filas):
+        """Suma las medidas de un conjunto de filas (máximo y mínimo del precio incluidos)."""
+        total = dict.fromkeys(RollupReservasService.SUMAS, 0)
+        total['precio_maximo'] = total['precio_minimo'] = None
+        for fila in filas:
+            for medida in RollupReservasService.SUMAS:
+                total[medida] += fila[medida]
+            if fila['precio_maximo'] is not None and (total['precio_maximo'] is None or fila['precio_maximo'] > total['precio_maximo']):
+                total['precio_maximo'] = fila['precio_maximo']
+            if fila['precio_minimo'] is not None and (total['precio_minimo'] is None or fila['precio_minimo'] < total['precio_minimo']):
+                total['precio_minimo'] = fila['precio_minimo']
+        return total
+
+    @staticmethod
+    def sumar(fecha_inicio=None, fecha_fin=None, hoy=None, **filtros):
+        """
+        Igual que ``totales(filas(...))`` pero sumado en la base de datos: una
+        agregación sobre el resumen y otra sobre las reservas de hoy, sin traer filas.
+        """
+        hoy = hoy or datetime.now().date()
+        fecha_inicio = fecha_inicio or date.min
+        fecha_fin = fecha_fin or date.max
+
+        total = dict.fromkeys(RollupReservasService.SUMAS, 0)
+        total['precio_maximo'] = total['precio_minimo'] = None
+        parciales = []
+        if not fecha_inicio == fecha_fin == hoy:
+            parciales.append(
+                ReservaDiaria.objects.filter(fecha__gte=fecha_inicio, fecha__lte=fecha_fin, **filtros)
+                .exclude(fecha=hoy)
+                .aggregate(
+                    **{medida: Sum(medida) for medida in RollupReservasService.SUMAS},
+                    precio_maximo=Max('precio_maximo'),
+                    precio_minimo=Min('precio_minimo'),
+                )
+            )
+        if fecha_inicio <= hoy <= fecha_fin:
+            parciales.append(
+                RollupReservasService._reservas_entre(hoy, hoy).filter(**filtros).aggregate(
+                    cantidad=Count('id'),
+                    con_precio=Count('precio_final'),
+                    ingresos=Sum('precio_final'),
+                    precio_maximo=Max('precio_final'),
+                    precio_minimo=Min('precio_final'),
+                    descuentos=Sum('descuento_aplicado'),
+                    puntos=Sum('puntos_redimidos'),
+                    minutos=Sum('servicio__duracion_minutos'),
+                )
+            )
+        for parcial in parciales:
+            for medida in RollupReservasService.SUMAS:
+                total[medida] += parcial[medida] or 0
+            if parcial['precio_maximo'] is not None and (total['precio_maximo'] is None or parcial['precio_maximo'] > total['precio_maximo']):
+                total['precio_maximo'] = parcial['precio_maximo']
+            if parcial['precio_minimo'] is not None and (total['precio_minimo'] is None or parcial['precio_minimo'] < total['precio_minimo']):
+                total['precio_minimo'] = parcial['precio_minimo']
+        return total
+
+    @staticmethod
+    def agrupar(filas, clave):
+        """Totales por grupo: {clave(fila): totales}."""
+        grupos = defaultdict(list)
+        for fila in filas:
+            grupos[clave(fila)].append(fila)
+        return {grupo: RollupReservasService.totales(filas_grupo) for grupo, filas_grupo in grupos.items()}
+
+    @staticmethod
+    def inicio_periodo(fecha, group_by='day'):
+        """Primer día del periodo (día, semana o mes) al que pertenece la fecha."""
+        if group_by in ('week', 'fortnight'):
+            return fecha - timedelta(days=fecha.weekday())
+        if group_by == 'month':
+            return fecha.replace(day=1)
+        return fecha
+
+    @staticmethod
+    def codigo_estado(valor):
+        """Acepta el código del estado ('CM') o su nombre ('completada') y retorna el código."""
+        if not valor:
+            return None
+        nombres = {str(nombre).lower(): codigo for codigo, nombre in Reserva.ESTADO_CHOICES}
+        return nombres.get(valor.strip().lower(), valor)
+
+    @staticmethod
+    def _medidas_campo(campo):
+        # Acepta 'precio_final' o 'Reserva.precio_final'
+        return RollupReservasService.CAMPOS_KPI.get((campo or '').strip().split('.')[-1])
+
+    @staticmethod
+    def soporta_kpi(metrica, campo):
+        """Indica si la métrica ('count', 'sum', 'avg', 'max', 'min') sobre el campo se puede leer del resumen."""
+        if metrica not in ('sum', 'avg', 'max', 'min'):
+            return True
+        medidas = RollupReservasService._medidas_campo(campo)
+        if medidas is None:
+            return False
+        return metrica in ('sum', 'avg') or medidas[2 if metrica == 'max' else 3] is not None
+
+
+class RollupEntidadesService:
+    """
+    Resúmenes diarios de clientes (ClienteDiario) y calificaciones
+    (CalificacionDiaria) para los KPIs de clientes y empleados. Se recalculan
+    por día, igual que el resumen de reservas.
+    """
+
+    DIAS_POR_LOTE = 31
+
+    @staticmethod
+    def _clientes_entre(fecha_inicio, fecha_fin):
+        """{fecha: (nuevos, activos)} de los días del rango con actividad."""
+        inicio = datetime.combine(fecha_inicio, datetime.min.time())
+        fin = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+        nuevos = dict(
+            Cliente.objects.filter(fecha_registro__gte=inicio, fecha_registro__lt=fin)
+            .order_by()
+            .annotate(fecha=TruncDate('fecha_registro'))
+            .values('fecha')
+            .annotate(cantidad=Count('id'))
+            .values_list('fecha', 'cantidad')
+        )
+        activos = dict(
+            RollupReservasService._reservas_entre(fecha_inicio, fecha_fin)
+            .exclude(estado=Reserva.CANCELADA)
+            .order_by()
+            .annotate(fecha=TruncDate('fecha_hora'))
+            .values('fecha')
+            .annotate(cantidad=Count('cliente_id', distinct=True))
+            .values_list('fecha', 'cantidad')
+        )
+        return {fecha: (nuevos.get(fecha, 0), activos.get(fecha, 0)) for fecha in set(nuevos) | set(activos)}
+
+    @staticmethod
+    def _calificaciones_entre(fecha_inicio, fecha_fin):
+        inicio = datetime.combine(fecha_inicio, datetime.min.time())
+        fin = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+        return [
+            CalificacionDiaria(**fila)
+            for fila in Calificacion.objects.filter(fecha_calificacion__gte=inicio, fecha_calificacion__lt=fin)
+            .order_by()
+            .annotate(fecha=TruncDate('fecha_calificacion'))
+            .values('fecha', 'empleado_id', 'servicio_id')
+            .annotate(cantidad=Count('id'), suma=Sum('puntuacion'), maxima=Max('puntuacion'), minima=Min('puntuacion'))
+        ]
+
+    @staticmethod
+    def _reemplazar(desde, hasta, fechas=None):
+        """Reemplaza ambos resúmenes en el rango (o sólo en ``fechas`` dentro de él)."""
+        en_rango = {'fecha__in': fechas} if fechas else {'fecha__gte': desde, 'fecha__lte': hasta}
+        clientes = RollupEntidadesService._clientes_entre(desde, hasta)
+        calificaciones = RollupEntidadesService._calificaciones_entre(desde, hasta)
+        if fechas:
+            clientes = {fecha: valores for fecha, valores in clientes.items() if fecha in fechas}
+            calificaciones = [fila for fila in calificaciones if fila.fecha in fechas]
+        ClienteDiario.objects.filter(**en_rango).delete()
+        CalificacionDiaria.objects.filter(**en_rango).delete()
+        ClienteDiario.objects.bulk_create(
+            [ClienteDiario(fecha=fecha, nuevos=nuevos, activos=activos) for fecha, (nuevos, activos) in clientes.items()],
+            batch_size=1000
+        )
+        CalificacionDiaria.objects.bulk_create(calificaciones, batch_size=1000)
+        return len(clientes) + len(calificaciones)
+
+    @staticmethod
+    def recalcular(*fechas):
+        """Recalcula los resúmenes de clientes y calificaciones de las fechas indicadas."""
+        fechas = {fecha for fecha in fechas if fecha}
+        if not fechas:
+            return
+        with transaction.atomic():
+            RollupEntidadesService._reemplazar(min(fechas), max(fechas), fechas)
+            MotorKPIService.invalidar(*fechas)
+
+    @staticmethod
+    def reconstruir(desde=None, hasta=None):
+        """Reconstruye ambos resúmenes por lotes de días. Retorna la cantidad de filas generadas."""
+        if desde is None or hasta is None:
+            extremos = [
+                Cliente.objects.order_by().aggregate(primera=Min('fecha_registro'), ultima=Max('fecha_registro')),
+                Reserva.objects.order_by().aggregate(primera=Min('fecha_hora'), ultima=Max('fecha_hora')),
+                Calificacion.objects.order_by().aggregate(primera=Min('fecha_calificacion'), ultima=Max('fecha_calificacion')),
+            ]
+            primeras = [extremo['primera'] for extremo in extremos if extremo['primera']]
+            if not primeras:
+                return 0
+            desde = desde or min(primeras).date()
+            hasta = hasta or max(extremo['ultima'] for extremo in extremos if extremo['ultima']).date()
+
+        total = 0
+        lote_inicio = desde
+        while lote_inicio <= hasta:
+            lote_fin = min(lote_inicio + timedelta(days=RollupEntidadesService.DIAS_POR_LOTE - 1), hasta)
+            with transaction.atomic():
+                total += RollupEntidadesService._reemplazar(lote_inicio, lote_fin)
+                MotorKPIService.invalidar_rango(lote_inicio, lote_fin)
+            lote_inicio = lote_fin + timedelta(days=1)
+        return total
+
+    @staticmethod
+    def filas_clientes(rangos):
+        """Filas de ClienteDiario dentro de los rangos de fechas."""
+        if not rangos:
+            return []
+        return list(
+            ClienteDiario.objects.filter(MotorKPIService.q_rangos('fecha', rangos))
+            .order_by()
+            .values('fecha', 'nuevos', 'activos')
+        )
+
+    @staticmethod
+    def filas_calificaciones(rangos, **filtros):
+        """Filas de CalificacionDiaria dentro de los rangos de fechas (``filtros`` ej. ``servicio_id``)."""
+        if not rangos:
+            return []
+        return list(
+            CalificacionDiaria.objects.filter(MotorKPIService.q_rangos('fecha', rangos), **filtros)
+            .order_by()
+            .values('fecha', 'empleado_id', 'servicio_id', 'cantidad', 'suma', 'maxima', 'minima')
+        )
+
+
+class MotorKPIService:
+    """
+    Evalúa todos los KPIs de un usuario en una sola pasada: cada resumen diario
+    (reservas, clientes, calificaciones) se lee una vez para el rango que une el
+    periodo actual y el previo (modo comparar) y se reparte en Python por KPI,
+    ventana y periodo. Las series se alinean sobre un eje de periodos completo,
+    con ceros donde no hubo datos. Los KPIs de reservas cuyo campo no cubre el
+    resumen se resuelven con una consulta agrupada por KPI sobre el mismo rango.
+    """
+
+    ENTIDADES_RESERVAS = ('reservas', 'ingresos')
+
+    # Campos de las entidades agregadas y la medida del resumen que los respalda;
+    # el primero es el campo por defecto
+    CAMPOS_ENTIDAD = {
+        'clientes': {'nuevos': 'nuevos', 'activos': 'activos'},
+        'servicios': {'reservas': 'cantidad', 'ingresos': 'ingresos', 'duracion_minutos': 'minutos'},
+        'empleados': {'reservas': 'cantidad', 'ingresos': 'ingresos', 'duracion_minutos': 'minutos', 'puntuacion': 'suma'},
+    }
+
+    # Elemento por el que se reparten las filas del resumen de reservas
+    ELEMENTO_ENTIDAD = {'servicios': 'servicio_id', 'empleados': 'lavador_id'}
+
+    # Métricas sobre los totales del resumen; ``medidas`` viene de RollupReservasService.CAMPOS_KPI
+    METRICAS = {
+        'count': lambda totales, medidas: totales['cantidad'],
+        'sum': lambda totales, medidas: totales[medidas[0]],
+        'avg': lambda totales, medidas: totales[medidas[0]] / totales[medidas[1]] if totales[medidas[1]] else None,
+        'max': lambda totales, medidas: totales[medidas[2]],
+        'min': lambda totales, medidas: totales[medidas[3]],
+    }
+
+    # Métricas sobre una lista de valores (por servicio, por empleado o por día)
+    METRICAS_LISTA = {
+        'count': len,
+        'sum': sum,
+        'avg': lambda valores: sum(valores) / len(valores) if valores else 0,
+        'max': lambda valores: max(valores, default=0),
+        'min': lambda valores: min(valores, default=0),
+    }
+
+    # Agregados SQL equivalentes para los campos fuera del resumen
+    AGREGADOS = {
+        'count': lambda campo: Count('id'),
+        'sum': Sum,
+        'avg': Avg,
+        'max': Max,
+        'min': Min,
+    }
+
+    TRUNCADORES = {'week': TruncWeek, 'month': TruncMonth}
+
+    # Valores de group_by que comparten el mismo inicio de periodo
+    AGRUPACIONES = {'day': ('day',), 'week': ('week', 'fortnight'), 'month': ('month',)}
+
+    @staticmethod
+    def siguiente_periodo(periodo, group_by='day'):
+        if group_by in ('week', 'fortnight'):
+            return periodo + timedelta(days=7)
+        if group_by == 'month':
+            return (periodo.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return periodo + timedelta(days=1)
+
+    @staticmethod
+    def eje(fecha_inicio, fecha_fin, group_by='day'):
+        """Periodos (primer día de cada uno) que cubren el rango de fechas."""
+        periodos = []
+        periodo = RollupReservasService.inicio_periodo(fecha_inicio, group_by)
+        while periodo <= fecha_fin:
+            periodos.append(periodo)
+            periodo = MotorKPIService.siguiente_periodo(periodo, group_by)
+        return periodos
+
+    @staticmethod
+    def q_rangos(campo, rangos):
+        """Condición OR de rangos de fechas inclusivos sobre un campo de fecha."""
+        condicion = Q()
+        for desde, hasta in rangos:
+            condicion |= Q(**{f'{campo}__gte': desde, f'{campo}__lte': hasta})
+        return condicion
+
+    @staticmethod
+    def campo_entidad(kpi):
+        """Campo del KPI para las entidades agregadas; si no es válido, el de la entidad por defecto."""
+        campos = MotorKPIService.CAMPOS_ENTIDAD[kpi.entidad]
+        campo = (kpi.campo or '').strip().split('.')[-1]
+        return campo if campo in campos else next(iter(campos))
+
+    @staticmethod
+    def fuente(kpi):
+        """Resumen del que se leen los valores del KPI, o None si la entidad no está soportada."""
+        if kpi.entidad in MotorKPIService.ENTIDADES_RESERVAS:
+            return 'resumen' if RollupReservasService.soporta_kpi(kpi.metrica, kpi.campo) else 'sql'
+        if kpi.entidad == 'clientes':
+            return 'clientes'
+        if kpi.entidad in MotorKPIService.ELEMENTO_ENTIDAD:
+            return 'calificaciones' if MotorKPIService.campo_entidad(kpi) == 'puntuacion' else 'resumen'
+        return None
+
+    @staticmethod
+    def _clave(fila, fecha_inicio, group_by):
+        return fila['fecha'] < fecha_inicio, RollupReservasService.inicio_periodo(fila['fecha'], group_by)
+
+    @staticmethod
+    def _valores_resumen(kpi, filas, fecha_inicio, group_by, estado):
+        """{(es_previo, periodo): valor} desde las filas del resumen de reservas."""
+        medidas = RollupReservasService._medidas_campo(kpi.campo)
+        metrica = MotorKPIService.METRICAS.get(kpi.metrica, MotorKPIService.METRICAS['count'])
+        if estado:
+            filas = [fila for fila in filas if fila['estado'] == estado]
+        grupos = RollupReservasService.agrupar(filas, lambda fila: MotorKPIService._clave(fila, fecha_inicio, group_by))
+        return {clave: metrica(totales, medidas) for clave, totales in grupos.items()}
+
+    @staticmethod
+    def _valores_elementos(kpi, filas, fecha_inicio, group_by, estado):
+        """
+        {(es_previo, periodo): valor} para servicios y empleados: la medida se suma
+        por elemento (servicio o lavador) y la métrica se aplica entre elementos,
+        ej. ``max`` es el servicio con más reservas del periodo.
+        """
+        elemento = MotorKPIService.ELEMENTO_ENTIDAD[kpi.entidad]
+        medida = MotorKPIService.CAMPOS_ENTIDAD[kpi.entidad][MotorKPIService.campo_entidad(kpi)]
+        metrica = MotorKPIService.METRICAS_LISTA.get(kpi.metrica, MotorKPIService.METRICAS_LISTA['count'])
+        por_elemento = defaultdict(lambda: defaultdict(int))
+        for fila in filas:
+            if fila[elemento] is None or (estado and fila['estado'] != estado):
+                continue
+            por_elemento[MotorKPIService._clave(fila, fecha_inicio, group_by)][fila[elemento]] += fila[medida]
+        return {clave: metrica(list(valores.values())) for clave, valores in por_elemento.items()}
+
+    @staticmethod
+    def _valores_calificaciones(kpi, filas, fecha_inicio, group_by):
+        """
+        {(es_previo, periodo): valor} de puntuación por empleado: ``avg`` es el
+        promedio ponderado de todas las calificaciones, ``max``/``min`` el mejor y
+        el peor promedio por empleado y ``count`` los empleados calificados.
+        """
+        por_empleado = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for fila in filas:
+            acumulado = por_empleado[MotorKPIService._clave(fila, fecha_inicio, group_by)][fila['empleado_id']]
+            acumulado[0] += fila['suma']
+            acumulado[1] += fila['cantidad']
+
+        valores = {}
+        for clave, empleados in por_empleado.items():
+            if kpi.metrica == 'sum':
+                valores[clave] = sum(suma for suma, _ in empleados.values())
+            elif kpi.metrica == 'avg':
+                cantidad = sum(cantidad for _, cantidad in empleados.values())
+                valores[clave] = sum(suma for suma, _ in empleados.values()) / cantidad if cantidad else 0
+            else:
+                metrica = MotorKPIService.METRICAS_LISTA.get(kpi.metrica, MotorKPIService.METRICAS_LISTA['count'])
+                valores[clave] = metrica([suma / cantidad for suma, cantidad in empleados.values() if cantidad])
+        return valores
+
+    @staticmethod
+    def _valores_clientes(kpi, filas, fecha_inicio, group_by, dias):
+        """
+        {(es_previo, periodo): valor} de clientes nuevos o activos por día: ``count``
+        y ``sum`` suman los días, ``avg`` es el promedio diario y ``max``/``min`` el
+        mejor y el peor día del periodo (los días sin filas cuentan como cero).
+        """
+        medida = MotorKPIService.CAMPOS_ENTIDAD['clientes'][MotorKPIService.campo_entidad(kpi)]
+        metrica = sum if kpi.metrica == 'count' else MotorKPIService.METRICAS_LISTA.get(kpi.metrica, sum)
+        por_dia = defaultdict(list)
+        for fila in filas:
+            por_dia[MotorKPIService._clave(fila, fecha_inicio, group_by)].append(fila[medida])
+        return {
+            clave: metrica(diarios + [0] * max(dias.get(clave, 0) - len(diarios), 0))
+            for clave, diarios in por_dia.items()
+        }
+
+    @staticmethod
+    def _valores_sql(kpi, rangos, fecha_inicio, group_by, estado, servicio_id):
+        """{(es_previo, periodo): valor} con una consulta agrupada sobre Reserva en los rangos de fechas."""
+        inicio = datetime.combine(fecha_inicio, datetime.min.time())
+        en_rangos = Q()
+        for desde, hasta in rangos:
+            en_rangos |= Q(
+                fecha_hora__gte=datetime.combine(desde, datetime.min.time()),
+                fecha_hora__lt=datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+            )
+        reservas = Reserva.objects.filter(en_rangos).order_by()
+        if estado:
+            reservas = reservas.filter(estado=estado)
+        if servicio_id:
+            reservas = reservas.filter(servicio_id=servicio_id)
+
+        agregado = MotorKPIService.AGREGADOS.get(kpi.metrica, MotorKPIService.AGREGADOS['count'])
+        truncador = MotorKPIService.TRUNCADORES.get(group_by, TruncDate)
+        try:
+            filas = list(
+                reservas.annotate(
+                    periodo=truncador('fecha_hora'),
+                    previo=Case(When(fecha_hora__lt=inicio, then=Value(True)), default=Value(False), output_field=BooleanField())
+                )
+                .values('previo', 'periodo')
+                .annotate(valor=agregado((kpi.campo or 'id').strip().split('.')[-1]))
+            )
+        except FieldError:
+            # Campo inexistente en la configuración del KPI: serie vacía
+            return {}
+        return {
+            (fila['previo'], fila['periodo'].date() if isinstance(fila['periodo'], datetime) else fila['periodo']): fila['valor']
+            for fila in filas
+        }
+
+    @staticmethod
+    def _rangos(claves, ventanas, group_by):
+        """Rangos de fechas contiguos que cubren los periodos (recortados a su ventana)."""
+        intervalos = []
+        for es_previo, periodo in claves:
+            desde, hasta = ventanas[es_previo]
+            intervalos.append((
+                max(periodo, desde),
+                min(MotorKPIService.siguiente_periodo(periodo, group_by) - timedelta(days=1), hasta)
+            ))
+        rangos = []
+        for desde, hasta in sorted(intervalos):
+            if rangos and desde <= rangos[-1][1] + timedelta(days=1):
+                rangos[-1] = (rangos[-1][0], max(rangos[-1][1], hasta))
+            else:
+                rangos.append((desde, hasta))
+        return rangos
+
+    @staticmethod
+    def invalidar(*fechas):
+        """Descarta los resultados guardados de los periodos que contienen las fechas."""
+        fechas = {fecha for fecha in fechas if fecha}
+        if not fechas:
+            return
+        periodos = Q()
+        for group_by, agrupaciones in MotorKPIService.AGRUPACIONES.items():
+            periodos |= Q(
+                group_by__in=agrupaciones,
+                periodo__in={RollupReservasService.inicio_periodo(fecha, group_by) for fecha in fechas}
+            )
+        ResultadoKPI.objects.filter(periodos).delete()
+
+    @staticmethod
+    def invalidar_rango(desde, hasta):
+        """Descarta los resultados guardados de los periodos que se cruzan con el rango."""
+        periodos = Q()
+        for group_by, agrupaciones in MotorKPIService.AGRUPACIONES.items():
+            periodos |= Q(
+                group_by__in=agrupaciones,
+                periodo__gte=RollupReservasService.inicio_periodo(desde, group_by),
+                periodo__lte=hasta
+            )
+        ResultadoKPI.objects.filter(periodos).delete()
+
+    @staticmethod
+    def evaluar(kpis, fecha_inicio, fecha_fin, group_by='day', estado=None, servicio_id=None, comparar=False, hoy=None, vacio=0):
+        """
+        Retorna {kpi.id: (labels, data, cmp_labels, cmp_data)}. ``estado`` y
+        ``servicio_id`` reemplazan el filtro de cada KPI; en modo comparar el
+        periodo previo tiene la misma cantidad de días y termina el día anterior.
+        Los periodos sin datos valen ``vacio``.
+
+        Los periodos cerrados y completos dentro de su ventana se leen de
+        ResultadoKPI; sólo los faltantes, los parciales y el periodo abierto se
+        calculan, y los cerrados recién calculados se guardan.
+        """
+        hoy = hoy or datetime.now().date()
+        dias = (fecha_fin - fecha_inicio).days + 1
+        fecha_desde = fecha_inicio - timedelta(days=dias) if comparar else fecha_inicio
+        estado = RollupReservasService.codigo_estado(estado)
+
+        filtros = {}
+        if estado:
+            filtros['estado'] = estado
+        if servicio_id:
+            filtros['servicio_id'] = servicio_id
+
+        # Ventanas por bandera es_previo y eje completo de cada una
+        ventanas = {False: (fecha_inicio, fecha_fin)}
+        if comparar:
+            ventanas[True] = (fecha_desde, fecha_inicio - timedelta(days=1))
+        ejes = {es_previo: MotorKPIService.eje(desde, hasta, group_by) for es_previo, (desde, hasta) in ventanas.items()}
+        claves = [(es_previo, periodo) for es_previo, eje in ejes.items() for periodo in eje]
+
+        # Días de cada periodo dentro de su ventana y periodos cerrados que la ventana
+        # cubre completos: sólo los valores de estos últimos se pueden guardar
+        abierto = RollupReservasService.inicio_periodo(hoy, group_by)
+        dias_periodo = {}
+        cerrados = set()
+        for es_previo, periodo in claves:
+            siguiente = MotorKPIService.siguiente_periodo(periodo, group_by)
+            desde, hasta = ventanas[es_previo]
+            dias_periodo[(es_previo, periodo)] = (min(siguiente - timedelta(days=1), hasta) - max(periodo, desde)).days + 1
+            if periodo >= desde and siguiente - timedelta(days=1) <= hasta and siguiente <= abierto:
+                cerrados.add((es_previo, periodo))
+
+        kpis = list(kpis)
+        fuentes = {kpi.id: MotorKPIService.fuente(kpi) for kpi in kpis}
+        soportados = [kpi for kpi in kpis if fuentes[kpi.id]]
+        estados = {kpi.id: estado or RollupReservasService.codigo_estado(kpi.estado_filtro) for kpi in soportados}
+
+        guardados = defaultdict(dict)
+        guardables = [kpi.id for kpi in soportados if kpi.pk]
+        if guardables and cerrados:
+            for kpi_id, estado_guardado, periodo, valor in ResultadoKPI.objects.filter(
+                kpi_id__in=guardables, group_by=group_by, servicio_id=servicio_id,
+                periodo__in={periodo for _, periodo in cerrados}
+            ).values_list('kpi_id', 'estado', 'periodo', 'valor'):
+                if estado_guardado == (estados[kpi_id] or ''):
+                    guardados[kpi_id][periodo] = valor
+
+        pendientes = {
+            kpi.id: [clave for clave in claves if clave not in cerrados or clave[1] not in guardados[kpi.id]]
+            for kpi in soportados
+        }
+
+        # Cada resumen se lee una vez, sobre los rangos que necesita algún KPI
+        def rangos_fuente(fuente):
+            return MotorKPIService._rangos(
+                {clave for kpi in soportados if fuentes[kpi.id] == fuente for clave in pendientes[kpi.id]},
+                ventanas, group_by
+            )
+
+        filas = []
+        for desde, hasta in rangos_fuente('resumen'):
+            filas.extend(RollupReservasService.filas(desde, hasta, hoy=hoy, **filtros))
+        filas_clientes = RollupEntidadesService.filas_clientes(rangos_fuente('clientes'))
+        filas_calificaciones = RollupEntidadesService.filas_calificaciones(
+            rangos_fuente('calificaciones'), **({'servicio_id': servicio_id} if servicio_id else {})
+        )
+
+        resultados = {}
+        nuevos = []
+        for kpi in kpis:
+            fuente = fuentes[kpi.id]
+            if fuente is None:
+                resultados[kpi.id] = ([], [], [], [])
+                continue
+
+            estado_kpi = estados[kpi.id]
+            if not pendientes[kpi.id]:
+                calculados = {}
+            elif fuente == 'sql':
+                calculados = MotorKPIService._valores_sql(
+                    kpi, MotorKPIService._rangos(pendientes[kpi.id], ventanas, group_by),
+                    fecha_inicio, group_by, estado_kpi, servicio_id
+                )
+            elif fuente == 'clientes':
+                calculados = MotorKPIService._valores_clientes(kpi, filas_clientes, fecha_inicio, group_by, dias_periodo)
+            elif fuente == 'calificaciones':
+                calculados = MotorKPIService._valores_calificaciones(kpi, filas_calificaciones, fecha_inicio, group_by)
+            elif kpi.entidad in MotorKPIService.ELEMENTO_ENTIDAD:
+                calculados = MotorKPIService._valores_elementos(kpi, filas, fecha_inicio, group_by, estado_kpi)
+            else:
+                calculados = MotorKPIService._valores_resumen(kpi, filas, fecha_inicio, group_by, estado_kpi)
+
+            valores = {}
+            for es_previo, periodo in claves:
+                if (es_previo, periodo) in cerrados and periodo in guardados[kpi.id]:
+                    valores[(es_previo, periodo)] = guardados[kpi.id][periodo]
+                else:
+                    valor = calculados.get((es_previo, periodo))
+                    valores[(es_previo, periodo)] = None if valor is None else float(valor)
+                    if kpi.pk and (es_previo, periodo) in cerrados:
+                        nuevos.append(ResultadoKPI(
+                            kpi_id=kpi.id, group_by=group_by, estado=estado_kpi or '',
+                            servicio_id=servicio_id, periodo=periodo, valor=valores[(es_previo, periodo)]
+                        ))
+
+            valores = {clave: vacio if valor is None else valor for clave, valor in valores.items()}
+            resultados[kpi.id] = (
+                [str(periodo) for periodo in ejes[False]],
+                [valores[(False, periodo)] for periodo in ejes[False]],
+                [str(periodo) for periodo in ejes.get(True, [])],
+                [valores[(True, periodo)] for periodo in ejes.get(True, [])],
+            )
+
+        if nuevos:
+            ResultadoKPI.objects.bulk_create(nuevos, ignore_conflicts=True)
+        return resultados
+
+
+class AlertasKPIService:
+    """
+    Evaluador de umbrales (``umbral_alerta``) de los KPIs activos. El valor de
+    cada KPI es el del último día cerrado; los KPIs que miden lo mismo
+    (entidad, métrica, campo y estado) se calculan una sola vez y todos se
+    evalúan en lotes a través de MotorKPIService. Sólo se avisa cuando el
+    incumplimiento es nuevo: el estado anterior queda en el KPI.
+    """
+
+    LOTE = 200
+
+    @staticmethod
+    def prefiere_bajo(kpi):
+        """Los KPIs de reservas canceladas o incumplidas empeoran al subir."""
+        return RollupReservasService.codigo_estado(kpi.estado_filtro) in (Reserva.CANCELADA, Reserva.INCUMPLIDA)
+
+    @staticmethod
+    def incumple(kpi, valor):
+        umbral = float(kpi.umbral_alerta)
+        return valor > umbral if AlertasKPIService.prefiere_bajo(kpi) else valor < umbral
+
+    @staticmethod
+    def firma(kpi):
+        """Identifica la medición de un KPI, independientemente de su dueño."""
+        return (
+            kpi.entidad,
+            kpi.metrica,
+            (kpi.campo or '').strip().split('.')[-1],
+            RollupReservasService.codigo_estado(kpi.estado_filtro) or '',
+        )
+
+    @staticmethod
+    def avisar(kpi, valor, fecha):
+        """
+        Notifica al dueño del KPI: como notificación si es empleado, si no por correo.
+        Retorna False si el correo no se pudo enviar.
+        """
+        titulo = f'Alerta KPI: {kpi.nombre}'[:100]
+        condicion = 'supera' if AlertasKPIService.prefiere_bajo(kpi) else 'está por debajo de'
+        mensaje = f'El KPI "{kpi.nombre}" {condicion} su umbral ({kpi.umbral_alerta}) el {fecha.strftime("%d/%m/%Y")}: valor {valor:.2f}.'
+
+        empleado = getattr(kpi.usuario, 'empleado', None)
+        if empleado is not None:
+            Notificacion.objects.create(empleado=empleado, tipo=Notificacion.OTRO, titulo=titulo, mensaje=mensaje)
+            return True
+        try:
+            send_mail(titulo, mensaje, settings.DEFAULT_FROM_EMAIL, [kpi.usuario.email], fail_silently=False)
+        except Exception as e:
+            logger.error(f'Error al enviar la alerta del KPI {kpi.pk}: {e}')
+            return False
+        return True
+
+    @staticmethod
+    def evaluar(fecha=None, max_segundos=None):
+        """
+        Evalúa los KPIs con umbral empezando por los evaluados hace más tiempo y se
+        detiene al agotar ``max_segundos`` (los pendientes quedan para la próxima
+        ejecución). Los KPIs sin valor ese día (promedios, máximos y mínimos sin
+        datos) no se evalúan, y una alerta que no se pudo enviar se reintenta en la
+        próxima ejecución. Retorna (evaluados, alertas).
+        """
+        fecha = fecha or datetime.now().date() - timedelta(days=1)
+        limite = time.monotonic() + max_segundos if max_segundos else None
+        kpis = list(
+            KPIConfiguracion.objects.filter(activo=True, umbral_alerta__isnull=False)
+            .select_related('usuario', 'usuario__empleado')
+            .order_by(F('evaluado_en').asc(nulls_first=True), 'id')
+        )
+
+        evaluados = alertas = 0
+        for inicio in range(0, len(kpis), AlertasKPIService.LOTE):
+            if limite and time.monotonic() > limite:
+                break
+            lote = kpis[inicio:inicio + AlertasKPIService.LOTE]
+            representantes = {}
+            for kpi in lote:
+                representantes.setdefault(AlertasKPIService.firma(kpi), kpi)
+            series = MotorKPIService.evaluar(representantes.values(), fecha, fecha, vacio=None)
+
+            ahora = datetime.now()
+            for kpi in lote:
+                kpi.evaluado_en = ahora
+                _, data, _, _ = series[representantes[AlertasKPIService.firma(kpi)].id]
+                valor = data[-1] if data else None
+                if valor is None and data and kpi.metrica in ('count', 'sum'):
+                    # Sin filas, un conteo o una suma sí valen cero
+                    valor = 0
+                if valor is None:
+                    continue
+                incumple = AlertasKPIService.incumple(kpi, valor)
+                if incumple and not kpi.alerta_activa:
+                    if AlertasKPIService.avisar(kpi, valor, fecha):
+                        alertas += 1
+                    else:
+                        incumple = False
+                kpi.alerta_activa = incumple
+                kpi.ultimo_valor = round(valor, 2)
+            KPIConfiguracion.objects.bulk_update(lote, ['alerta_activa', 'ultimo_valor', 'evaluado_en'])
+            evaluados += len(lote)
+        return evaluados, alertas
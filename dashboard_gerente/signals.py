@@ -0,0 +1,67 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from clientes.models import Cliente
+from empleados.models import Calificacion
+from reservas.models import Reserva
+
+from .services import RollupEntidadesService, RollupReservasService
+
+
+# Atributos de la reserva que forman parte del resumen diario
+CAMPOS_RESUMEN = ('fecha_hora', 'servicio_id', 'estado', 'bahia_id', 'lavador_id',
+                  'precio_final', 'descuento_aplicado', 'puntos_redimidos', 'cliente_id')
+
+
+def _estado_resumen(instance):
+    return tuple(instance.__dict__.get(atributo) for atributo in CAMPOS_RESUMEN)
+
+
+def _fecha(estado):
+    return estado[0].date() if estado[0] else None
+
+
+@receiver(post_init, sender=Reserva)
+def guardar_estado_resumen(sender, instance, **kwargs):
+    instance._resumen_original = _estado_resumen(instance)
+
+
+@receiver(post_save, sender=Reserva)
+def actualizar_resumen_diario(sender, instance, created, **kwargs):
+    """Recalcula el resumen del día anterior y del nuevo cuando cambia algo que lo afecta."""
+    original = instance._resumen_original
+    nuevo = _estado_resumen(instance)
+    instance._resumen_original = nuevo
+    if created or nuevo != original:
+        fechas = (_fecha(nuevo), None if created else _fecha(original))
+        RollupReservasService.recalcular(*fechas)
+        # Los clientes activos del día dependen de sus reservas
+        RollupEntidadesService.recalcular(*fechas)
+
+
+@receiver(post_delete, sender=Reserva)
+def descontar_resumen_diario(sender, instance, **kwargs):
+    RollupReservasService.recalcular(_fecha(instance._resumen_original))
+    RollupEntidadesService.recalcular(_fecha(instance._resumen_original))
+
+
+def _fecha_registro(cliente):
+    return cliente.fecha_registro.date() if cliente.fecha_registro else None
+
+
+@receiver(post_save, sender=Cliente)
+def registrar_cliente_nuevo(sender, instance, created, **kwargs):
+    # Los clientes nuevos del día cambian sólo al registrarse o al eliminarse
+    if created:
+        RollupEntidadesService.recalcular(_fecha_registro(instance))
+
+
+@receiver(post_delete, sender=Cliente)
+def descontar_cliente(sender, instance, **kwargs):
+    RollupEntidadesService.recalcular(_fecha_registro(instance))
+
+
+@receiver(post_save, sender=Calificacion)
+@receiver(post_delete, sender=Calificacion)
+def actualizar_resumen_calificaciones(sender, instance, **kwargs):
+    RollupEntidadesService.recalcular(instance.fecha_calificacion.date() if instance.fecha_calificacion else None)
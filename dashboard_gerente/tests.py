@@ -0,0 +1,264 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.management import call_command
+from django.core import mail
+from django.contrib.auth import get_user_model
+from clientes.models import Cliente
+from empleados.models import Empleado, Calificacion, TipoDocumento, Cargo
+from reservas.models import Servicio, Reserva, Bahia
+from .models import ReservaDiaria, KPIConfiguracion, ResultadoKPI, ClienteDiario
+from .services import MotorKPIService, RollupReservasService
+from decimal import Decimal
+from io import StringIO
+import datetime
+import json
+
+Usuario = get_user_model()
+
+
+class ReservaDiariaTest(TestCase):
+    def setUp(self):
+        usuario_cliente = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+        self.cliente = Cliente.objects.create(
+            usuario=usuario_cliente,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.servicio = Servicio.objects.create(
+            nombre='Lavado Básico',
+            descripcion='Lavado exterior del vehículo',
+            precio=30000,
+            duracion_minutos=30
+        )
+        self.bahia = Bahia.objects.create(nombre='Bahía 1')
+        self.ayer = datetime.date.today() - datetime.timedelta(days=1)
+
+    def crear_reserva(self, fecha, hora, estado, precio=None):
+        return Reserva.objects.create(
+            cliente=self.cliente,
+            servicio=self.servicio,
+            fecha_hora=datetime.datetime.combine(fecha, hora),
+            bahia=self.bahia,
+            estado=estado,
+            precio_final=precio
+        )
+
+    def test_resumen_incremental_y_reconstruccion(self):
+        reserva = self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.CONFIRMADA, Decimal('30000'))
+        self.crear_reserva(self.ayer, datetime.time(9, 0), Reserva.COMPLETADA, Decimal('50000'))
+
+        # Las señales mantienen el resumen del día
+        reserva.estado = Reserva.COMPLETADA
+        reserva.save()
+        completadas = ReservaDiaria.objects.get(fecha=self.ayer, estado=Reserva.COMPLETADA)
+        self.assertEqual((completadas.cantidad, completadas.ingresos, completadas.minutos), (2, Decimal('80000'), 60))
+        self.assertFalse(ReservaDiaria.objects.filter(estado=Reserva.CONFIRMADA).exists())
+
+        # La reconstrucción produce el mismo resultado que el mantenimiento incremental
+        antes = list(ReservaDiaria.objects.values_list('fecha', 'estado', 'cantidad', 'ingresos'))
+        ReservaDiaria.objects.all().delete()
+        call_command('reconstruir_reservas_diarias', stdout=StringIO())
+        self.assertEqual(list(ReservaDiaria.objects.values_list('fecha', 'estado', 'cantidad', 'ingresos')), antes)
+
+    def test_hoy_se_lee_en_vivo(self):
+        self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        hoy = self.crear_reserva(datetime.date.today(), datetime.time(8, 0), Reserva.COMPLETADA, Decimal('20000'))
+        # Un update() masivo no dispara señales, pero el día de hoy se agrega desde Reserva
+        Reserva.objects.filter(pk=hoy.pk).update(precio_final=Decimal('25000'))
+
+        totales = RollupReservasService.totales(RollupReservasService.filas(self.ayer, estado=Reserva.COMPLETADA))
+        self.assertEqual((totales['cantidad'], totales['ingresos']), (2, Decimal('55000')))
+        # Sumado en la base de datos da lo mismo que sumar las filas
+        self.assertEqual(RollupReservasService.sumar(self.ayer, estado=Reserva.COMPLETADA), totales)
+
+        kpi = KPIConfiguracion(entidad='ingresos', metrica='avg', campo='precio_final', estado_filtro='completada')
+        labels, data, _, _ = MotorKPIService.evaluar([kpi], self.ayer, datetime.date.today())[kpi.id]
+        self.assertEqual(data, [30000.0, 25000.0])
+
+    def test_dashboard_gerente_usa_resumen(self):
+        self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        gerente = Usuario.objects.create_user(email='gerente@test.com', password='password123', rol=Usuario.ROL_GERENTE)
+        client = Client()
+        client.force_login(gerente)
+
+        respuesta = client.get(reverse('dashboard_gerente:dashboard'), {'segment': 'last7'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['ingresos_total'], Decimal('30000'))
+        self.assertEqual(respuesta.context['completadas_segmento'], 1)
+
+        # Los indicadores también se leen del resumen (el estado se acepta por nombre)
+        KPIConfiguracion.objects.create(usuario=gerente, nombre='Ingresos', entidad='ingresos', metrica='sum',
+                                        campo='precio_final', estado_filtro='completada', periodo_dias=7)
+        respuesta = client.get(reverse('dashboard_gerente:indicadores'), {'comparar': 'on'})
+        grafico = respuesta.context['charts'][0]
+        self.assertEqual(sum(json.loads(grafico['data'])), 30000.0)
+        # Ambas ventanas comparten un eje completo de días, con ceros donde no hubo reservas
+        self.assertEqual(len(json.loads(grafico['labels'])), len(json.loads(grafico['cmp_labels'])))
+        self.assertEqual(json.loads(grafico['cmp_data']), [0.0] * len(json.loads(grafico['cmp_labels'])))
+
+    def test_motor_kpi_una_pasada(self):
+        self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        self.crear_reserva(self.ayer - datetime.timedelta(days=3), datetime.time(9, 0), Reserva.CANCELADA, Decimal('10000'))
+        gerente = Usuario.objects.create_user(email='gerente@test.com', password='password123', rol=Usuario.ROL_GERENTE)
+        kpis = [
+            KPIConfiguracion.objects.create(usuario=gerente, nombre=nombre, entidad=entidad, metrica=metrica,
+                                            campo=campo, estado_filtro=estado)
+            for nombre, entidad, metrica, campo, estado in [
+                ('Reservas', 'reservas', 'count', '', None),
+                ('Ingresos', 'ingresos', 'sum', 'precio_final', 'completada'),
+                ('Descuento máximo', 'reservas', 'max', 'descuento_aplicado', None),
+                ('Clientes', 'clientes', 'count', '', None),
+            ]
+        ]
+        inicio = self.ayer - datetime.timedelta(days=1)
+        # Resultados guardados, resumen de reservas, día de hoy en vivo, resumen de clientes,
+        # una consulta agrupada para el campo no resumido y el guardado de los días cerrados
+        with self.assertNumQueries(6):
+            series = MotorKPIService.evaluar(kpis, inicio, datetime.date.today(), comparar=True)
+        series = [series[kpi.id] for kpi in kpis]
+
+        labels, data, cmp_labels, cmp_data = series[0]
+        self.assertEqual(labels, [str(inicio + datetime.timedelta(days=i)) for i in range(3)])
+        self.assertEqual(data, [0.0, 1.0, 0.0])
+        self.assertEqual(cmp_data, [0.0, 1.0, 0.0])
+        self.assertEqual(series[1][1], [0.0, 30000.0, 0.0])
+        self.assertEqual(series[1][3], [0.0, 0.0, 0.0])
+        self.assertEqual(len(series[2][1]), 3)
+        # Sin campo válido, los clientes usan los nuevos por día
+        self.assertEqual(series[3][1], [0.0, 0.0, 1.0])
+
+    def test_resultados_de_periodos_cerrados(self):
+        hace_diez = datetime.date.today() - datetime.timedelta(days=10)
+        reserva = self.crear_reserva(hace_diez, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        gerente = Usuario.objects.create_user(email='gerente@test.com', password='password123', rol=Usuario.ROL_GERENTE)
+        kpi = KPIConfiguracion.objects.create(usuario=gerente, nombre='Ingresos', entidad='ingresos', metrica='sum',
+                                              campo='precio_final', estado_filtro='completada', periodo_dias=14)
+        inicio = datetime.date.today() - datetime.timedelta(days=13)
+
+        primera = MotorKPIService.evaluar([kpi], inicio, datetime.date.today())[kpi.id]
+        # Se guardan los días cerrados; hoy queda abierto
+        self.assertEqual(ResultadoKPI.objects.filter(kpi=kpi).count(), 13)
+
+        # Con los días cerrados guardados sólo se lee el resultado y se agrega hoy en vivo
+        with self.assertNumQueries(2):
+            segunda = MotorKPIService.evaluar([kpi], inicio, datetime.date.today())[kpi.id]
+        self.assertEqual(primera, segunda)
+        self.assertEqual(sum(segunda[1]), 30000.0)
+
+        # Una edición con fecha pasada invalida el periodo afectado
+        reserva.precio_final = Decimal('35000')
+        reserva.save()
+        self.assertFalse(ResultadoKPI.objects.filter(kpi=kpi, periodo=hace_diez).exists())
+        self.assertEqual(sum(MotorKPIService.evaluar([kpi], inicio, datetime.date.today())[kpi.id][1]), 35000.0)
+
+        # Cambiar la definición del KPI descarta sus resultados
+        client = Client()
+        client.force_login(gerente)
+        client.post(reverse('dashboard_gerente:kpi_editar', args=[kpi.pk]), {
+            'nombre': 'Ingresos', 'entidad': 'ingresos', 'metrica': 'avg', 'campo': 'precio_final',
+            'estado_filtro': 'completada', 'periodo_dias': 14, 'activo': 'on',
+        })
+        self.assertFalse(ResultadoKPI.objects.filter(kpi=kpi).exists())
+
+    def test_entidades_clientes_servicios_empleados(self):
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(codigo='CC', defaults={'nombre': 'Cédula de Ciudadanía'})
+        cargo, _ = Cargo.objects.get_or_create(codigo='LAV', defaults={'nombre': 'Lavador'})
+        lavador = Empleado.objects.create(
+            usuario=Usuario.objects.create_user(email='lavador@test.com', password='password123', rol=Usuario.ROL_LAVADOR),
+            nombre='Juan', apellido='Pérez', tipo_documento=tipo_documento, numero_documento='1234567890',
+            telefono='3001234567', direccion='Calle 123', ciudad='Bogotá', cargo=cargo,
+            fecha_contratacion=datetime.date.today()
+        )
+        otro_servicio = Servicio.objects.create(nombre='Lavado Full', descripcion='Completo', precio=50000, duracion_minutos=60)
+        primera = self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        segunda = self.crear_reserva(self.ayer, datetime.time(9, 0), Reserva.COMPLETADA, Decimal('30000'))
+        Reserva.objects.filter(pk__in=[primera.pk, segunda.pk]).update(lavador=lavador)
+        RollupReservasService.recalcular(self.ayer)
+        Reserva.objects.create(cliente=self.cliente, servicio=otro_servicio, bahia=self.bahia, estado=Reserva.COMPLETADA,
+                               fecha_hora=datetime.datetime.combine(self.ayer, datetime.time(10, 0)))
+        for reserva, puntuacion in ((primera, 4), (segunda, 5)):
+            Calificacion.objects.create(empleado=lavador, servicio=self.servicio, cliente=self.cliente,
+                                        reserva=reserva, puntuacion=puntuacion)
+
+        # Los resúmenes se mantienen con señales y coinciden con la reconstrucción
+        self.assertEqual(ClienteDiario.objects.get(fecha=self.ayer).activos, 1)
+        self.assertEqual(ClienteDiario.objects.get(fecha=datetime.date.today()).nuevos, 1)
+        call_command('reconstruir_reservas_diarias', stdout=StringIO())
+        self.assertEqual(ClienteDiario.objects.get(fecha=self.ayer).activos, 1)
+
+        gerente = Usuario.objects.create_user(email='gerente@test.com', password='password123', rol=Usuario.ROL_GERENTE)
+        definiciones = [
+            ('servicios', 'count', 'reservas'),
+            ('servicios', 'max', 'reservas'),
+            ('empleados', 'sum', 'reservas'),
+            ('empleados', 'avg', 'puntuacion'),
+            ('clientes', 'count', 'nuevos'),
+            ('clientes', 'max', 'activos'),
+        ]
+        kpis = [
+            KPIConfiguracion.objects.create(usuario=gerente, nombre=f'{entidad} {metrica}', entidad=entidad,
+                                            metrica=metrica, campo=campo)
+            for entidad, metrica, campo in definiciones
+        ]
+        series = MotorKPIService.evaluar(kpis, self.ayer, datetime.date.today(), comparar=True)
+        datos = [series[kpi.id][1] for kpi in kpis]
+        self.assertEqual(datos, [
+            [2.0, 0.0],
+            [2.0, 0.0],
+            [2.0, 0.0],
+            [0.0, 4.5],
+            [0.0, 1.0],
+            [1.0, 0.0],
+        ])
+        self.assertEqual(series[kpis[0].id][3], [0.0, 0.0])
+
+    def test_alertas_kpi_solo_nuevas(self):
+        self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        self.crear_reserva(self.ayer, datetime.time(9, 0), Reserva.CANCELADA, Decimal('30000'))
+        gerente = Usuario.objects.create_user(email='gerente@test.com', password='password123', rol=Usuario.ROL_GERENTE)
+        volumen = [
+            KPIConfiguracion.objects.create(usuario=gerente, nombre=f'Volumen {i}', entidad='reservas', metrica='count',
+                                            campo='id', umbral_alerta=Decimal('5'))
+            for i in range(2)
+        ]
+        canceladas = KPIConfiguracion.objects.create(usuario=gerente, nombre='Canceladas', entidad='reservas', metrica='count',
+                                                     campo='id', estado_filtro='cancelada', umbral_alerta=Decimal('3'))
+
+        call_command('evaluar_alertas_kpi', stdout=StringIO())
+        # Volumen por debajo de la meta en ambos KPIs; las cancelaciones no superan su tope
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertTrue(all(KPIConfiguracion.objects.get(pk=kpi.pk).alerta_activa for kpi in volumen))
+        self.assertFalse(KPIConfiguracion.objects.get(pk=canceladas.pk).alerta_activa)
+        self.assertEqual(KPIConfiguracion.objects.get(pk=canceladas.pk).ultimo_valor, Decimal('1'))
+
+        # El incumplimiento ya avisado no se repite
+        call_command('evaluar_alertas_kpi', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_alertas_kpi_reintento_y_sin_datos(self):
+        self.crear_reserva(self.ayer, datetime.time(8, 0), Reserva.COMPLETADA, Decimal('30000'))
+        gerente = Usuario.objects.create_user(email='gerente@test.com', password='password123', rol=Usuario.ROL_GERENTE)
+        volumen = KPIConfiguracion.objects.create(usuario=gerente, nombre='Volumen', entidad='reservas', metrica='count',
+                                                  campo='id', umbral_alerta=Decimal('5'))
+        # Sin reservas canceladas ayer el promedio no tiene valor: no es un 0 bajo el umbral
+        promedio = KPIConfiguracion.objects.create(usuario=gerente, nombre='Ticket cancelado', entidad='ingresos', metrica='avg',
+                                                   campo='precio_final', estado_filtro='cancelada', umbral_alerta=Decimal('10000'))
+
+        # Si el correo falla la alerta no queda activa y se reintenta en la próxima ejecución
+        with self.settings(EMAIL_BACKEND='autenticacion.tests.BackendConError'):
+            call_command('evaluar_alertas_kpi', stdout=StringIO())
+        self.assertFalse(KPIConfiguracion.objects.get(pk=volumen.pk).alerta_activa)
+
+        call_command('evaluar_alertas_kpi', stdout=StringIO())
+        self.assertEqual([correo.subject for correo in mail.outbox], ['Alerta KPI: Volumen'])
+        self.assertTrue(KPIConfiguracion.objects.get(pk=volumen.pk).alerta_activa)
+        promedio.refresh_from_db()
+        self.assertEqual((promedio.alerta_activa, promedio.ultimo_valor), (False, None))
+        self.assertIsNotNone(promedio.evaluado_en)
@@ -3,8 +3,7 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Avg, Sum, Min, Max, Q
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.db.models import Avg
 import json
 from autenticacion.mixins import GerenteRequiredMixin
 from reservas.models import Reserva, Servicio, Bahia, DisponibilidadHoraria
@@ -12,6 +11,7 @@ from clientes.models import Cliente
 from empleados.models import Empleado, Calificacion
 from .models import KPIConfiguracion
 from .forms import KPIConfiguracionForm
+from .services import AlertasKPIService, MotorKPIService, RollupReservasService
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
 
@@ -78,39 +78,32 @@ class DashboardGerenteView(LoginRequiredMixin, GerenteRequiredMixin, View):
                     start, end = end, start
                 segment_label = f"{start.date().isoformat()} — {end.date().isoformat()}"
 
+            # Resumen diario: días cerrados desde ReservaDiaria y el día de hoy en vivo
+            fecha_inicio, fecha_fin = start.date(), end.date()
+            filas_segmento = RollupReservasService.filas(fecha_inicio, fecha_fin)
+            filas_mes = RollupReservasService.filas(inicio_mes)
+            completadas_segmento_filas = [fila for fila in filas_segmento if fila['estado'] == Reserva.COMPLETADA]
+            por_estado_segmento = RollupReservasService.agrupar(filas_segmento, lambda fila: fila['estado'])
+            por_estado_mes = RollupReservasService.agrupar(filas_mes, lambda fila: fila['estado'])
+            vacio = RollupReservasService.totales([])
+
             # Ingresos
-            ingresos_total = Reserva.objects.filter(estado=Reserva.COMPLETADA).aggregate(total=Sum('precio_final'))['total'] or 0
-            ingresos_mes = Reserva.objects.filter(estado=Reserva.COMPLETADA, fecha_hora__date__gte=inicio_mes).aggregate(total=Sum('precio_final'))['total'] or 0
-            descuentos_mes = Reserva.objects.filter(fecha_hora__date__gte=inicio_mes).aggregate(total=Sum('descuento_aplicado'))['total'] or 0
-            ticket_promedio = Reserva.objects.filter(estado=Reserva.COMPLETADA).aggregate(avg=Avg('precio_final'))['avg'] or 0
+            historico = RollupReservasService.sumar(estado=Reserva.COMPLETADA)
+            ingresos_total = historico['ingresos']
+            ingresos_mes = por_estado_mes.get(Reserva.COMPLETADA, vacio)['ingresos']
+            descuentos_mes = RollupReservasService.totales(filas_mes)['descuentos']
+            ticket_promedio = historico['ingresos'] / historico['con_precio'] if historico['con_precio'] else 0
 
-            # Ingresos últimos 30 días (línea)
+            # Ingresos del periodo (línea)
             # Agrupador según group_by
-            if group_by == 'week':
-                trunc = TruncWeek('fecha_hora')
-                periodo_key = 'semana'
-            elif group_by == 'fortnight':
-                trunc = TruncWeek('fecha_hora')  # base semanal, combinaremos cada 2
-                periodo_key = 'semana'
-            elif group_by == 'month':
-                trunc = TruncMonth('fecha_hora')
-                periodo_key = 'mes'
-            else:
-                trunc = TruncDate('fecha_hora')
-                periodo_key = 'dia'
-
             group_by_label = {'day': 'Día', 'week': 'Semana', 'fortnight': 'Quincenal', 'month': 'Mes'}.get(group_by, 'Día')
 
-            ingresos_qs = (
-                Reserva.objects
-                .filter(estado=Reserva.COMPLETADA, fecha_hora__gte=start, fecha_hora__lte=end)
-                .annotate(periodo=trunc)
-                .values('periodo')
-                .annotate(total=Sum('precio_final'))
-                .order_by('periodo')
+            ingresos_periodos = RollupReservasService.agrupar(
+                completadas_segmento_filas,
+                lambda fila: RollupReservasService.inicio_periodo(fila['fecha'], group_by)
             )
-            ingresos_labels_raw = [str(item['periodo']) for item in ingresos_qs]
-            ingresos_data_raw = [float(item['total'] or 0) for item in ingresos_qs]
+            ingresos_labels_raw = [str(periodo) for periodo in sorted(ingresos_periodos)]
+            ingresos_data_raw = [float(ingresos_periodos[periodo]['ingresos']) for periodo in sorted(ingresos_periodos)]
 
             # Agrupación quincenal: combinar cada 2 semanas consecutivas
             if group_by == 'fortnight':
@@ -128,25 +121,16 @@ class DashboardGerenteView(LoginRequiredMixin, GerenteRequiredMixin, View):
                 ingresos_data = ingresos_data_raw
 
             # Reservas por estado (dona)
-            reservas_por_estado = (
-                Reserva.objects
-                .filter(fecha_hora__gte=start, fecha_hora__lte=end)
-                .values('estado')
-                .annotate(total=Count('id'))
-            )
-            estado_labels = [item['estado'] for item in reservas_por_estado]
-            estado_data = [item['total'] for item in reservas_por_estado]
+            estado_labels = list(por_estado_segmento)
+            estado_data = [por_estado_segmento[estado]['cantidad'] for estado in estado_labels]
 
             # Servicios top por cantidad y por ingresos (barras)
-            servicios_stats = (
-                Reserva.objects.filter(estado=Reserva.COMPLETADA, fecha_hora__gte=start, fecha_hora__lte=end)
-                .values('servicio__nombre')
-                .annotate(cantidad=Count('id'), ingresos=Sum('precio_final'))
-                .order_by('-cantidad')[:10]
-            )
-            servicios_labels = [item['servicio__nombre'] or 'N/A' for item in servicios_stats]
-            servicios_cantidad = [item['cantidad'] for item in servicios_stats]
-            servicios_ingresos = [float(item['ingresos'] or 0) for item in servicios_stats]
+            por_servicio = RollupReservasService.agrupar(completadas_segmento_filas, lambda fila: fila['servicio_id'])
+            nombres_servicios = dict(Servicio.objects.filter(id__in=list(por_servicio)).values_list('id', 'nombre'))
+            servicios_stats = sorted(por_servicio.items(), key=lambda item: -item[1]['cantidad'])[:10]
+            servicios_labels = [nombres_servicios.get(servicio_id) or 'N/A' for servicio_id, _ in servicios_stats]
+            servicios_cantidad = [totales['cantidad'] for _, totales in servicios_stats]
+            servicios_ingresos = [float(totales['ingresos']) for _, totales in servicios_stats]
 
             # Clientes
             total_clientes = Cliente.objects.count()
@@ -154,68 +138,40 @@ class DashboardGerenteView(LoginRequiredMixin, GerenteRequiredMixin, View):
             activos_30 = Cliente.objects.filter(reservas__estado=Reserva.COMPLETADA, reservas__fecha_hora__gte=start, reservas__fecha_hora__lte=end).distinct().count()
 
             # Empleados
-            empleados_activos = Empleado.objects.filter(activo=True, rol=Empleado.ROL_LAVADOR).count()
+            lavadores = list(Empleado.objects.filter(activo=True, rol=Empleado.ROL_LAVADOR))
+            empleados_activos = len(lavadores)
             calificacion_promedio = Calificacion.objects.aggregate(avg=Avg('puntuacion'))['avg'] or 0
-            top_lavadores = (
-                Empleado.objects
-                .filter(rol=Empleado.ROL_LAVADOR, activo=True)
-                .annotate(
-                    completadas=Count(
-                        'reservas_asignadas',
-                        filter=Q(
-                            reservas_asignadas__estado=Reserva.COMPLETADA,
-                            reservas_asignadas__fecha_hora__gte=start,
-                            reservas_asignadas__fecha_hora__lte=end
-                        )
-                    )
-                )
-                .order_by('-completadas')[:5]
-            )
+            completadas_lavador = RollupReservasService.agrupar(completadas_segmento_filas, lambda fila: fila['lavador_id'])
+            for lavador in lavadores:
+                lavador.completadas = completadas_lavador.get(lavador.id, vacio)['cantidad']
+            top_lavadores = sorted(lavadores, key=lambda e: -e.completadas)[:5]
             lavadores_labels = [e.nombre_completo() if hasattr(e, 'nombre_completo') else str(e) for e in top_lavadores]
             lavadores_data = [e.completadas or 0 for e in top_lavadores]
 
             # Ranking por valoración promedio (★) en el período
-            top_lavadores_val = (
-                Empleado.objects
-                .filter(rol=Empleado.ROL_LAVADOR, activo=True)
-                .annotate(
-                    rating=Avg(
-                        'calificaciones__puntuacion',
-                        filter=Q(
-                            calificaciones__fecha_calificacion__gte=start,
-                            calificaciones__fecha_calificacion__lte=end
-                        )
-                    ),
-                    completadas=Count(
-                        'reservas_asignadas',
-                        filter=Q(
-                            reservas_asignadas__estado=Reserva.COMPLETADA,
-                            reservas_asignadas__fecha_hora__gte=start,
-                            reservas_asignadas__fecha_hora__lte=end
-                        )
-                    )
-                )
-                .order_by('-rating', '-completadas')[:5]
+            ratings = dict(
+                Calificacion.objects
+                .filter(empleado__in=lavadores, fecha_calificacion__gte=start, fecha_calificacion__lte=end)
+                .order_by()
+                .values('empleado_id')
+                .annotate(rating=Avg('puntuacion'))
+                .values_list('empleado_id', 'rating')
             )
+            for lavador in lavadores:
+                lavador.rating = ratings.get(lavador.id)
+            # Como en SQL, los lavadores sin calificaciones quedan al final
+            top_lavadores_val = sorted(lavadores, key=lambda e: (e.rating is None, -(e.rating or 0), -e.completadas))[:5]
             lavadores_val_labels = [e.nombre_completo() if hasattr(e, 'nombre_completo') else str(e) for e in top_lavadores_val]
             lavadores_val_data = [round(float(e.rating or 0), 2) for e in top_lavadores_val]
 
             # Bahías - métricas
-            bahias_stats = (
-                Reserva.objects
-                .filter(estado=Reserva.COMPLETADA, fecha_hora__gte=start, fecha_hora__lte=end)
-                .values('bahia__nombre')
-                .annotate(
-                    servicios=Count('id'),
-                    ingresos=Sum('precio_final'),
-                    uso_minutos=Sum('servicio__duracion_minutos')
-                )
-                .order_by('-servicios')
-            )
-            bahias_labels = [item['bahia__nombre'] or 'Sin bahía' for item in bahias_stats]
-            bahias_servicios = [item['servicios'] or 0 for item in bahias_stats]
-            bahias_ingresos = [float(item['ingresos'] or 0) for item in bahias_stats]
-            bahias_uso_horas = [round((item['uso_minutos'] or 0) / 60, 2) for item in bahias_stats]
+            por_bahia = RollupReservasService.agrupar(completadas_segmento_filas, lambda fila: fila['bahia_id'])
+            nombres_bahias = dict(Bahia.objects.values_list('id', 'nombre'))
+            bahias_stats = sorted(por_bahia.items(), key=lambda item: -item[1]['cantidad'])
+            bahias_labels = [nombres_bahias.get(bahia_id) or 'Sin bahía' for bahia_id, _ in bahias_stats]
+            bahias_servicios = [totales['cantidad'] for _, totales in bahias_stats]
+            bahias_ingresos = [float(totales['ingresos']) for _, totales in bahias_stats]
+            bahias_uso_horas = [round(totales['minutos'] / 60, 2) for _, totales in bahias_stats]
 
             # Conteos de Bahías (disponibles / con cámaras / sin cámaras)
             bahias_total_qs = Bahia.objects.filter(activo=True)
@@ -234,36 +190,25 @@ class DashboardGerenteView(LoginRequiredMixin, GerenteRequiredMixin, View):
             bahias_sin_camara = bahias_total_qs.filter(tiene_camara=False).count()
 
             # Métricas adicionales
-            reservas_mes = Reserva.objects.filter(fecha_hora__date__gte=inicio_mes).count()
-            cancelaciones_mes = Reserva.objects.filter(estado=Reserva.CANCELADA, fecha_hora__date__gte=inicio_mes).count()
-            completadas_hoy = Reserva.objects.filter(estado=Reserva.COMPLETADA, fecha_hora__date=hoy).count()
-            total_periodo = Reserva.objects.filter(fecha_hora__gte=start, fecha_hora__lte=end).count()
-            cancelaciones_periodo = Reserva.objects.filter(estado=Reserva.CANCELADA, fecha_hora__gte=start, fecha_hora__lte=end).count()
+            reservas_mes = sum(totales['cantidad'] for totales in por_estado_mes.values())
+            cancelaciones_mes = por_estado_mes.get(Reserva.CANCELADA, vacio)['cantidad']
+            completadas_hoy = sum(fila['cantidad'] for fila in filas_mes if fila['fecha'] == hoy and fila['estado'] == Reserva.COMPLETADA)
+            total_periodo = sum(totales['cantidad'] for totales in por_estado_segmento.values())
+            cancelaciones_periodo = por_estado_segmento.get(Reserva.CANCELADA, vacio)['cantidad']
             tasa_cancelacion = round((cancelaciones_periodo / total_periodo) * 100, 2) if total_periodo else 0
 
             # KPI del segmento seleccionado
-            ingresos_segmento = Reserva.objects.filter(
-                estado=Reserva.COMPLETADA, fecha_hora__gte=start, fecha_hora__lte=end
-            ).aggregate(total=Sum('precio_final'))['total'] or 0
-            descuentos_segmento = Reserva.objects.filter(
-                fecha_hora__gte=start, fecha_hora__lte=end
-            ).aggregate(total=Sum('descuento_aplicado'))['total'] or 0
-            ticket_promedio_segmento = Reserva.objects.filter(
-                estado=Reserva.COMPLETADA, fecha_hora__gte=start, fecha_hora__lte=end
-            ).aggregate(avg=Avg('precio_final'))['avg'] or 0
+            completadas_totales = por_estado_segmento.get(Reserva.COMPLETADA, vacio)
+            ingresos_segmento = completadas_totales['ingresos']
+            descuentos_segmento = RollupReservasService.totales(filas_segmento)['descuentos']
+            ticket_promedio_segmento = (
+                completadas_totales['ingresos'] / completadas_totales['con_precio'] if completadas_totales['con_precio'] else 0
+            )
             ingresos_netos_segmento = (ingresos_segmento or 0) - (descuentos_segmento or 0)
-            reservas_segmento = Reserva.objects.filter(
-                fecha_hora__gte=start, fecha_hora__lte=end
-            ).count()
-            cancelaciones_segmento = Reserva.objects.filter(
-                estado=Reserva.CANCELADA, fecha_hora__gte=start, fecha_hora__lte=end
-            ).count()
-            completadas_segmento = Reserva.objects.filter(
-                estado=Reserva.COMPLETADA, fecha_hora__gte=start, fecha_hora__lte=end
-            ).count()
-            pendientes_segmento = Reserva.objects.filter(
-                estado=Reserva.PENDIENTE, fecha_hora__gte=start, fecha_hora__lte=end
-            ).count()
+            reservas_segmento = total_periodo
+            cancelaciones_segmento = cancelaciones_periodo
+            completadas_segmento = completadas_totales['cantidad']
+            pendientes_segmento = por_estado_segmento.get(Reserva.PENDIENTE, vacio)['cantidad']
 
             # Etiquetas compacta y completa para mostrar en headers con tooltip
             try:
@@ -434,7 +379,10 @@ class KPIUpdateView(LoginRequiredMixin, GerenteRequiredMixin, View):
         kpi = get_object_or_404(KPIConfiguracion, pk=pk, usuario=request.user)
         form = KPIConfiguracionForm(request.POST, instance=kpi)
         if form.is_valid():
-            form.save()
+            # La definición cambió: los resultados guardados y el estado de la alerta ya no son válidos
+            form.instance.alerta_activa = False
+            kpi = form.save()
+            kpi.resultados.all().delete()
             messages.success(request, 'KPI actualizado correctamente.')
             return redirect('dashboard_gerente:kpis')
         kpis = KPIConfiguracion.objects.filter(usuario=request.user).order_by('-creado_en')
@@ -497,17 +445,20 @@ class IndicadoresView(LoginRequiredMixin, GerenteRequiredMixin, View):
                 except Exception:
                     pass
 
+            try:
+                servicio_pk = int(servicio_id) if servicio_id else None
+            except (TypeError, ValueError):
+                servicio_pk = None
+
+            # Todas las series (y sus periodos previos) se calculan en una pasada
+            series = MotorKPIService.evaluar(
+                kpis, start.date(), end.date(), group_by=group_by,
+                estado=estado_override, servicio_id=servicio_pk, comparar=comparar
+            )
+
             charts = []
             for kpi in kpis:
-                labels, data, cmp_labels, cmp_data = self._compute_series(
-                    kpi=kpi,
-                    start=start,
-                    end=end,
-                    group_by=group_by,
-                    estado=estado_override,
-                    servicio_id=servicio_id,
-                    comparar=comparar,
-                )
+                labels, data, cmp_labels, cmp_data = series[kpi.id]
                 # Valores para medidor
                 actual = float(data[-1]) if data else 0
                 min_val = float(min(data)) if data else 0
@@ -518,12 +469,14 @@ class IndicadoresView(LoginRequiredMixin, GerenteRequiredMixin, View):
                     kpi.metrica == KPIConfiguracion.Metrica.SUMA and
                     (kpi.campo or '').strip() == 'duracion_minutos'
                 )
-                prefer_low = ((kpi.estado_filtro or '').lower() in ['cancelada', 'incumplida'])
+                prefer_low = AlertasKPIService.prefiere_bajo(kpi)
                 # Meta: si es porcentaje y no hay umbral, usar 85%
                 meta_val = (
                     float(kpi.umbral_alerta) if getattr(kpi, 'umbral_alerta', None) is not None else (85.0 if is_percent else max_val)
                 )
-                is_currency = (kpi.entidad == KPIConfiguracion.Entidad.INGRESOS) or ('precio' in (kpi.campo or '').lower())
+                is_currency = (kpi.entidad == KPIConfiguracion.Entidad.INGRESOS) or any(
+                    palabra in (kpi.campo or '').lower() for palabra in ('precio', 'ingresos')
+                )
                 charts.append({
                     'id': f'chart_{kpi.id}',
                     'nombre': kpi.nombre,
@@ -568,77 +521,3 @@ class IndicadoresView(LoginRequiredMixin, GerenteRequiredMixin, View):
             servicios = Servicio.objects.all().order_by('nombre')
             return render(request, 'dashboard_gerente/indicadores.html', {'charts': [], 'kpis': [], 'servicios': servicios, 'estado_choices': []}, status=200)
 
-    def _compute_series(self, kpi: KPIConfiguracion, start, end, group_by='day', estado=None, servicio_id=None, comparar=False):
-        # Selección de agrupador
-        if group_by == 'week':
-            trunc = TruncWeek('fecha_hora')
-        elif group_by == 'month':
-            trunc = TruncMonth('fecha_hora')
-        else:
-            trunc = TruncDate('fecha_hora')
-
-        if kpi.entidad in ['reservas', 'ingresos']:
-            qs = Reserva.objects.filter(fecha_hora__gte=start, fecha_hora__lte=end)
-            # Estado del KPI o override
-            estado_filtro = estado or kpi.estado_filtro
-            if estado_filtro:
-                qs = qs.filter(estado=estado_filtro)
-            if servicio_id:
-                try:
-                    qs = qs.filter(servicio_id=int(servicio_id))
-                except Exception:
-                    pass
-
-            # Agrupación principal
-            grouped = qs.annotate(periodo=trunc).values('periodo')
-            campo = kpi.campo or 'id'
-            metric = kpi.metrica
-            if metric == KPIConfiguracion.Metrica.CUENTA:
-                agg = grouped.annotate(valor=Count('id')).order_by('periodo')
-            elif metric == KPIConfiguracion.Metrica.SUMA:
-                agg = grouped.annotate(valor=Sum(campo)).order_by('periodo')
-            elif metric == KPIConfiguracion.Metrica.PROMEDIO:
-                agg = grouped.annotate(valor=Avg(campo)).order_by('periodo')
-            elif metric == KPIConfiguracion.Metrica.MAXIMO:
-                agg = grouped.annotate(valor=Max(campo)).order_by('periodo')
-            elif metric == KPIConfiguracion.Metrica.MINIMO:
-                agg = grouped.annotate(valor=Min(campo)).order_by('periodo')
-            else:
-                agg = grouped.annotate(valor=Count('id')).order_by('periodo')
-            labels = [str(item['periodo']) for item in agg]
-            data = [float(item['valor'] or 0) for item in agg]
-
-            cmp_labels, cmp_data = [], []
-            if comparar:
-                # periodo previo del mismo tamaño
-                delta = end - start
-                prev_start = start - delta
-                prev_end = start
-                qs_prev = Reserva.objects.filter(fecha_hora__gte=prev_start, fecha_hora__lte=prev_end)
-                if estado_filtro:
-                    qs_prev = qs_prev.filter(estado=estado_filtro)
-                if servicio_id:
-                    try:
-                        qs_prev = qs_prev.filter(servicio_id=int(servicio_id))
-                    except Exception:
-                        pass
-                grouped_prev = qs_prev.annotate(periodo=trunc).values('periodo')
-                if metric == KPIConfiguracion.Metrica.CUENTA:
-                    agg_prev = grouped_prev.annotate(valor=Count('id')).order_by('periodo')
-                elif metric == KPIConfiguracion.Metrica.SUMA:
-                    agg_prev = grouped_prev.annotate(valor=Sum(campo)).order_by('periodo')
-                elif metric == KPIConfiguracion.Metrica.PROMEDIO:
-                    agg_prev = grouped_prev.annotate(valor=Avg(campo)).order_by('periodo')
-                elif metric == KPIConfiguracion.Metrica.MAXIMO:
-                    agg_prev = grouped_prev.annotate(valor=Max(campo)).order_by('periodo')
-                elif metric == KPIConfiguracion.Metrica.MINIMO:
-                    agg_prev = grouped_prev.annotate(valor=Min(campo)).order_by('periodo')
-                else:
-                    agg_prev = grouped_prev.annotate(valor=Count('id')).order_by('periodo')
-                cmp_labels = [str(item['periodo']) for item in agg_prev]
-                cmp_data = [float(item['valor'] or 0) for item in agg_prev]
-
-            return labels, data, cmp_labels, cmp_data
-        else:
-            # Futuro: implementar soporte para clientes, servicios, empleados.
-            return [], [], [], []
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DashboardPublicoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard_publico'
+
+    def ready(self):
+        # Invalidar la foto del dashboard público al cambiar las reservas
+        from . import signals  # noqa: F401
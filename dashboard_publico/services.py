@@ -0,0 +1,96 @@
+import hashlib
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from reservas.models import Reserva
+
+
+class SnapshotDashboardService:
+    """
+    Foto del día para la pantalla pública: conteos por estado en un solo
+    aggregate condicional y el listado de reservas activas en una consulta.
+    Se guarda en caché por poco tiempo y se invalida al cambiar una reserva.
+    """
+
+    PREFIJO = 'dashboard_publico'
+    TIMEOUT = 30
+
+    @staticmethod
+    def _clave(fecha):
+        return f'{SnapshotDashboardService.PREFIJO}:{fecha.isoformat()}'
+
+    @staticmethod
+    def obtener(fecha=None):
+        fecha = fecha or datetime.now().date()
+        clave = SnapshotDashboardService._clave(fecha)
+        snapshot = cache.get(clave)
+        if snapshot is None:
+            snapshot = SnapshotDashboardService.calcular(fecha)
+            cache.set(clave, snapshot, SnapshotDashboardService.TIMEOUT)
+        return snapshot
+
+    @staticmethod
+    def calcular(fecha):
+        inicio = datetime.combine(fecha, datetime.min.time())
+        reservas_dia = Reserva.objects.filter(fecha_hora__gte=inicio, fecha_hora__lt=inicio + timedelta(days=1))
+
+        snapshot = reservas_dia.order_by().aggregate(
+            confirmados=Count('id', filter=Q(estado=Reserva.CONFIRMADA)),
+            en_proceso=Count('id', filter=Q(estado=Reserva.EN_PROCESO)),
+            completadas=Count('id', filter=Q(estado=Reserva.COMPLETADA)),
+            cancelados=Count('id', filter=Q(estado=Reserva.CANCELADA)),
+            ultima_actualizacion=Max('fecha_actualizacion'),
+        )
+        snapshot['total_servicios'] = (snapshot['confirmados'] + snapshot['en_proceso']
+                                       + snapshot['completadas'] + snapshot['cancelados'])
+
+        # Solo las reservas activas (no completadas) se muestran en la tabla
+        snapshot['reservas'] = list(
+            reservas_dia.exclude(estado=Reserva.COMPLETADA)
+            .select_related('vehiculo', 'servicio', 'bahia', 'lavador')
+            .order_by('fecha_hora')
+        )
+
+        # La versión cambia solo si cambia lo que muestra la pantalla
+        firma = [(reserva.id, reserva.estado, reserva.lavador_id, reserva.bahia_id,
+                  reserva.fecha_hora, reserva.fecha_actualizacion) for reserva in snapshot['reservas']]
+        firma.append(tuple(snapshot[campo] for campo in ('confirmados', 'en_proceso', 'completadas', 'cancelados')))
+        snapshot['version'] = hashlib.md5(repr(firma).encode()).hexdigest()[:16]
+        snapshot['fecha'] = fecha
+        return snapshot
+
+    @staticmethod
+    def invalidar():
+        """Descarta la foto de hoy ahora y de nuevo al confirmar la transacción."""
+        clave = SnapshotDashboardService._clave(datetime.now().date())
+        cache.delete(clave)
+        transaction.on_commit(lambda: cache.delete(clave))
+
+    @staticmethod
+    def serializar(snapshot):
+        """Variante JSON para actualizar la pantalla sin recargarla."""
+        return {
+            'fecha': snapshot['fecha'].isoformat(),
+            'version': snapshot['version'],
+            'total_servicios': snapshot['total_servicios'],
+            'confirmados': snapshot['confirmados'],
+            'en_proceso': snapshot['en_proceso'],
+            'completadas': snapshot['completadas'],
+            'cancelados': snapshot['cancelados'],
+            'reservas': [{
+                'id': reserva.id,
+                'fecha_hora': reserva.fecha_hora.isoformat(),
+                'hora': reserva.fecha_hora.strftime('%H:%M'),
+                'servicio': reserva.servicio.nombre,
+                'duracion_minutos': reserva.servicio.duracion_minutos,
+                'vehiculo': f'{reserva.vehiculo.marca} {reserva.vehiculo.modelo}' if reserva.vehiculo else None,
+                'placa': reserva.vehiculo.placa if reserva.vehiculo else None,
+                'lavador': reserva.lavador.nombre_completo() if reserva.lavador else None,
+                'bahia': reserva.bahia.nombre if reserva.bahia else None,
+                'estado': reserva.estado,
+                'estado_display': reserva.get_estado_display(),
+            } for reserva in snapshot['reservas']],
+        }
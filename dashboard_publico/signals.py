@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from reservas.models import Reserva
+
+from .services import SnapshotDashboardService
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+def invalidar_snapshot_dashboard(sender, instance, **kwargs):
+    """Cualquier cambio de reserva descarta la foto de la pantalla pública."""
+    SnapshotDashboardService.invalidar()
@@ -1,3 +1,77 @@
-from django.test import TestCase
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from clientes.models import Cliente
+from reservas.models import Servicio, Reserva, Bahia
+from .services import SnapshotDashboardService
+import datetime
 
-# Create your tests here.
+Usuario = get_user_model()
+
+
+class SnapshotDashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+        self.cliente = Cliente.objects.create(
+            usuario=self.usuario,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.servicio = Servicio.objects.create(
+            nombre='Lavado Básico',
+            descripcion='Lavado exterior del vehículo',
+            precio=30000,
+            duracion_minutos=30
+        )
+        self.bahia = Bahia.objects.create(nombre='Bahía 1')
+        self.client = Client()
+        self.client.force_login(self.usuario)
+
+    def crear_reserva(self, hora, estado):
+        return Reserva.objects.create(
+            cliente=self.cliente,
+            servicio=self.servicio,
+            fecha_hora=datetime.datetime.combine(datetime.date.today(), hora),
+            bahia=self.bahia,
+            estado=estado
+        )
+
+    def test_snapshot_en_cache_e_invalidacion(self):
+        reserva = self.crear_reserva(datetime.time(8, 0), Reserva.CONFIRMADA)
+        self.crear_reserva(datetime.time(9, 0), Reserva.COMPLETADA)
+
+        # Conteos y listado en dos consultas; la segunda lectura sale de la caché
+        with self.assertNumQueries(2):
+            snapshot = SnapshotDashboardService.obtener()
+        with self.assertNumQueries(0):
+            SnapshotDashboardService.obtener()
+        self.assertEqual((snapshot['confirmados'], snapshot['completadas'], snapshot['total_servicios']), (1, 1, 2))
+        self.assertEqual(snapshot['reservas'], [reserva])
+
+        # Un cambio de estado descarta la foto
+        reserva.estado = Reserva.EN_PROCESO
+        reserva.save()
+        snapshot = SnapshotDashboardService.obtener()
+        self.assertEqual((snapshot['confirmados'], snapshot['en_proceso']), (0, 1))
+
+    def test_respuesta_condicional_y_json(self):
+        self.crear_reserva(datetime.time(8, 0), Reserva.CONFIRMADA)
+        url = reverse('dashboard_publico:dashboard_publico')
+        self.assertContains(self.client.get(url), 'Tablero de Turnos')
+
+        respuesta = self.client.get(url, {'formato': 'json'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['confirmados'], 1)
+
+        # Sin cambios la pantalla recibe 304
+        respuesta = self.client.get(url, {'formato': 'json'}, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
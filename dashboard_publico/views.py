@@ -1,30 +1,37 @@
 from django.shortcuts import render
-from reservas.models import Reserva
-from django.utils import timezone
-from django.db.models import Count
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .services import SnapshotDashboardService
 
+
+def _etag_dashboard(request):
+    # La página incluye la barra del usuario, por eso la etiqueta depende de él
+    snapshot = SnapshotDashboardService.obtener()
+    return f"{snapshot['version']}-{request.user.pk or 0}-{request.GET.get('formato', 'html')}"
+
+
+def _ultima_modificacion_dashboard(request):
+    return SnapshotDashboardService.obtener()['ultima_actualizacion']
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_etag_dashboard, last_modified_func=_ultima_modificacion_dashboard)
 def dashboard_publico(request):
-    # Obtener todas las reservas del día actual para contar estadísticas
-    todas_reservas_hoy = Reserva.objects.filter(fecha_hora__date=timezone.now().date())
-    
-    # Obtener solo las reservas activas (no completadas) para mostrar en la tabla
-    reservas = todas_reservas_hoy.exclude(estado=Reserva.COMPLETADA).select_related('vehiculo', 'servicio', 'bahia', 'lavador').order_by('fecha_hora')
-    
-    # Contar reservas por estado usando las constantes correctas del modelo
-    confirmados = todas_reservas_hoy.filter(estado=Reserva.CONFIRMADA).count()
-    en_proceso = todas_reservas_hoy.filter(estado=Reserva.EN_PROCESO).count()
-    completadas = todas_reservas_hoy.filter(estado=Reserva.COMPLETADA).count()
-    cancelados = todas_reservas_hoy.filter(estado=Reserva.CANCELADA).count()
+    # Foto del día en caché: conteos por estado y reservas activas (no completadas)
+    snapshot = SnapshotDashboardService.obtener()
     
-    # Calcular el total de servicios como la suma de completados + cancelados + confirmados + en proceso
-    total_servicios = completadas + cancelados + confirmados + en_proceso
+    # Variante JSON para que la pantalla se actualice sin recargar
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(SnapshotDashboardService.serializar(snapshot))
     
     context = {
-        'reservas': reservas,
-        'confirmados': confirmados,
-        'en_proceso': en_proceso,
-        'completadas': completadas,
-        'cancelados': cancelados,
-        'total_servicios': total_servicios
+        'reservas': snapshot['reservas'],
+        'confirmados': snapshot['confirmados'],
+        'en_proceso': snapshot['en_proceso'],
+        'completadas': snapshot['completadas'],
+        'cancelados': snapshot['cancelados'],
+        'total_servicios': snapshot['total_servicios'],
+        'version': snapshot['version']
     }
     return render(request, 'dashboard_publico/dashboard.html', context)
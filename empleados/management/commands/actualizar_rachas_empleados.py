@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from empleados.services import RachasEmpleadoService
+
+
+class Command(BaseCommand):
+    help = (
+        'Incorpora a las rachas de días trabajados los registros de tiempo cerrados '
+        'de los últimos días, o las reconstruye desde todo el historial'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            type=str,
+            help='Último día a procesar (YYYY-MM-DD). Por defecto, hoy'
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=1,
+            help='Cantidad de días a procesar hasta --fecha, del más antiguo al más reciente (por defecto 1)'
+        )
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Recalcula las rachas de todos los empleados desde el historial'
+        )
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            corregidos = RachasEmpleadoService.reconstruir()
+            self.stdout.write(self.style.SUCCESS(f'Rachas reconstruidas: {corregidos} empleados corregidos'))
+            return
+
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        else:
+            fecha = timezone.now().date()
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser mayor o igual a 1')
+
+        total = 0
+        for dias_atras in range(options['dias'] - 1, -1, -1):
+            dia = fecha - timedelta(days=dias_atras)
+            actualizados = RachasEmpleadoService.registrar_dia(dia)
+            total += actualizados
+            self.stdout.write(f'{dia}: {actualizados} empleados actualizados')
+        self.stdout.write(self.style.SUCCESS(f'Rachas actualizadas: {total}'))
@@ -1,103 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
 from django.utils import timezone
-from django.db import transaction
-from empleados.models import Empleado, ConfiguracionBonificacion
-from empleados.services import BonificacionService
+from empleados.models import Bonificacion, ConfiguracionBonificacion, Empleado, PuntoControlBonificaciones
+from empleados.services import ProcesoBonificacionesService
 import logging
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 
+def evaluar_particion(argumentos):
+    """Evalúa una partición de empleados en un proceso del pool (solo lectura)."""
+    sistema, fecha, empleado_ids = argumentos
+    return ProcesoBonificacionesService.evaluar(sistema, fecha, empleado_ids)
+
+
 class Command(BaseCommand):
-    help = 'Evalúa y otorga bonificaciones automáticamente a empleados que cumplan las condiciones'
+    help = (
+        'Evalúa y otorga bonificaciones automáticamente a empleados que cumplan las condiciones. '
+        'Solo reevalúa a los empleados con cambios desde la última ejecución y, si el período avanzó '
+        '(ejecución diaria), a los que tienen datos en los días que salieron o entraron a la ventana'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Ejecuta el comando sin realizar cambios en la base de datos',
+            help='Muestra las diferencias con lo ya otorgado sin realizar cambios en la base de datos',
         )
         parser.add_argument(
             '--verbose',
             action='store_true',
             help='Muestra información detallada del procesamiento',
         )
+        parser.add_argument(
+            '--fecha',
+            type=str,
+            help='Fecha de evaluación (YYYY-MM-DD); el período son los 30 días anteriores. Por defecto, hoy',
+        )
+        parser.add_argument(
+            '--sistema',
+            choices=ProcesoBonificacionesService.SISTEMAS,
+            action='append',
+            help='Sistema de bonificaciones a procesar (se puede repetir). Por defecto, todos',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Procesos en paralelo para evaluar particiones de empleados (por defecto 1)',
+        )
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Ignora el punto de control y evalúa a todos los empleados activos',
+        )
 
     def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        if options['workers'] < 1:
+            raise CommandError('--workers debe ser mayor o igual a 1')
+
         self.stdout.write(
             self.style.SUCCESS('Iniciando evaluación automática de bonificaciones...')
         )
-        
-        # Verificar configuraciones activas
-        configuraciones_activas = ConfiguracionBonificacion.objects.filter(activo=True)
-        if not configuraciones_activas.exists():
-            self.stdout.write(
-                self.style.WARNING('No hay configuraciones de bonificación activas.')
-            )
-            return
-        
-        if options['verbose']:
-            self.stdout.write(f'Configuraciones activas encontradas: {configuraciones_activas.count()}')
-            for config in configuraciones_activas:
-                self.stdout.write(f'  - {config.nombre} ({config.get_tipo_display()})')
-        
-        # Procesar bonificaciones automáticas
+
         total_bonificaciones_otorgadas = 0
-        empleados_procesados = 0
         errores = 0
-        
-        try:
-            if options['dry_run']:
-                # Modo dry-run: solo simular
-                bonificaciones_creadas = BonificacionService.evaluar_bonificaciones_automaticas(dry_run=True)
+        for sistema in options['sistema'] or ProcesoBonificacionesService.SISTEMAS:
+            try:
+                total_bonificaciones_otorgadas += self.procesar(sistema, fecha, options)
+            except Exception as e:
+                errores += 1
+                logger.error(f'Error durante la evaluación automática ({sistema}): {str(e)}')
                 self.stdout.write(
-                    f'[DRY-RUN] Se crearían {len(bonificaciones_creadas)} bonificaciones automáticas'
+                    self.style.ERROR(f'Error durante la evaluación automática ({sistema}): {str(e)}')
                 )
-                if options['verbose']:
-                    for bonif in bonificaciones_creadas:
-                        empleado = bonif['empleado']
-                        config = bonif['configuracion']
-                        self.stdout.write(
-                            f'  - {empleado.nombre} {empleado.apellido}: {config.nombre} (${config.monto:,.0f})'
-                        )
-                total_bonificaciones_otorgadas = len(bonificaciones_creadas)
-            else:
-                # Modo real: procesar con transacción
-                with transaction.atomic():
-                    bonificaciones_creadas = BonificacionService.evaluar_bonificaciones_automaticas()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Se otorgaron {len(bonificaciones_creadas)} bonificaciones automáticas'
-                        )
-                    )
-                    if options['verbose']:
-                        for bonif in bonificaciones_creadas:
-                            self.stdout.write(
-                                f'  - {bonif.empleado.nombre} {bonif.empleado.apellido}: '
-                                f'{bonif.nombre} (${bonif.monto:,.0f})'
-                            )
-                    total_bonificaciones_otorgadas = len(bonificaciones_creadas)
-                
-        except Exception as e:
-            errores += 1
-            logger.error(f'Error durante la evaluación automática: {str(e)}')
-            self.stdout.write(
-                self.style.ERROR(f'Error durante la evaluación automática: {str(e)}')
-            )
-        
+
         # Resumen final
         self.stdout.write('\n' + '='*50)
         self.stdout.write(self.style.SUCCESS('RESUMEN DE LA EVALUACIÓN'))
         self.stdout.write('='*50)
-        self.stdout.write(f'Bonificaciones otorgadas: {total_bonificaciones_otorgadas}')
+        if options['dry_run']:
+            self.stdout.write(f'Bonificaciones que se otorgarían: {total_bonificaciones_otorgadas}')
+        else:
+            self.stdout.write(f'Bonificaciones otorgadas: {total_bonificaciones_otorgadas}')
         self.stdout.write(f'Errores: {errores}')
-        
+
         if options['dry_run']:
             self.stdout.write(
                 self.style.WARNING('MODO DRY-RUN: No se realizaron cambios en la base de datos')
             )
-        
+
         if errores > 0:
             self.stdout.write(
                 self.style.ERROR(f'Se encontraron {errores} errores durante el procesamiento')
@@ -106,10 +109,79 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS('Evaluación completada exitosamente')
             )
-        
+
         # Log del resultado
         logger.info(
             f'Evaluación automática de bonificaciones completada. '
             f'Bonificaciones otorgadas: {total_bonificaciones_otorgadas}, '
             f'Errores: {errores}'
-        )
\ No newline at end of file
+        )
+
+    def procesar(self, sistema, fecha, options):
+        """Evalúa un sistema de bonificaciones y retorna cuántas otorgó (o otorgaría)."""
+        nombre = dict(PuntoControlBonificaciones.SISTEMA_CHOICES)[sistema]
+        evaluado_en = timezone.now()
+        empleado_ids = ProcesoBonificacionesService.pendientes(sistema, fecha, options['completo'])
+        if empleado_ids == []:
+            self.stdout.write(f'{nombre}: sin cambios desde la última evaluación')
+            return 0
+
+        particiones = ProcesoBonificacionesService.particiones(empleado_ids, options['workers'])
+        evaluados = sum(len(particion) for particion in particiones)
+        alcance = 'evaluación completa' if empleado_ids is None else 'evaluación incremental'
+        self.stdout.write(f'{nombre}: {alcance} de {evaluados} empleados en {len(particiones)} particiones')
+
+        resultados = self.evaluar(sistema, fecha, particiones, options['workers'])
+        nuevas, sin_cambios, ya_no_cumplen = ProcesoBonificacionesService.diferencias(
+            sistema, fecha, empleado_ids, resultados
+        )
+
+        if options['dry_run']:
+            self.reportar_diferencias(sistema, nuevas, sin_cambios, ya_no_cumplen)
+            return len(nuevas)
+
+        with transaction.atomic():
+            otorgadas = ProcesoBonificacionesService.aplicar(sistema, fecha, resultados)
+            ProcesoBonificacionesService.guardar_punto_control(sistema, fecha, evaluado_en, evaluados)
+        self.stdout.write(self.style.SUCCESS(f'{nombre}: se otorgaron {len(otorgadas)} bonificaciones automáticas'))
+        if options['verbose']:
+            self.reportar_diferencias(sistema, nuevas, sin_cambios, ya_no_cumplen)
+        return len(otorgadas)
+
+    def evaluar(self, sistema, fecha, particiones, workers):
+        """Evalúa las particiones en este proceso o repartidas en un pool de procesos."""
+        argumentos = [(sistema, fecha, particion) for particion in particiones]
+        if workers > 1 and len(particiones) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            # Cada proceso abre sus propias conexiones; no se heredan las del padre
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                parciales = list(pool.map(evaluar_particion, argumentos))
+        else:
+            parciales = [evaluar_particion(argumento) for argumento in argumentos]
+
+        if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS:
+            return [candidato for parcial in parciales for candidato in parcial]
+        resultados = {}
+        for parcial in parciales:
+            resultados.update(parcial)
+        return resultados
+
+    def reportar_diferencias(self, sistema, nuevas, sin_cambios, ya_no_cumplen):
+        """Imprime las diferencias con lo ya otorgado: + nuevas, - ya no cumplen, = sin cambios."""
+        modelo = ConfiguracionBonificacion if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS else Bonificacion
+        pares = nuevas + ya_no_cumplen
+        empleados = Empleado.objects.in_bulk({empleado_id for empleado_id, _ in pares})
+        programas = modelo.objects.in_bulk({programa_id for _, programa_id in pares})
+
+        for signo, lista in (('+', nuevas), ('-', ya_no_cumplen)):
+            for empleado_id, programa_id in lista:
+                empleado = empleados[empleado_id]
+                programa = programas[programa_id]
+                self.stdout.write(
+                    f'  {signo} {empleado.nombre} {empleado.apellido}: {programa.nombre} '
+                    f'(${programa.monto_bonificacion:,.0f})'
+                )
+        self.stdout.write(
+            f'  {len(nuevas)} nuevas, {len(ya_no_cumplen)} otorgadas que ya no cumplen, '
+            f'{len(sin_cambios)} sin cambios'
+        )
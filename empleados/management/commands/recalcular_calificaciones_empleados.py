@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from empleados.services import CalificacionesEmpleadoService
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde Calificacion los agregados de calificaciones de los empleados '
+        '(total, suma e histograma de estrellas) y corrige los que no coincidan'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empleado',
+            type=int,
+            action='append',
+            help='ID del empleado a reparar (se puede repetir). Por defecto, todos'
+        )
+
+    def handle(self, *args, **options):
+        corregidos = CalificacionesEmpleadoService.recalcular(options['empleado'])
+        self.stdout.write(self.style.SUCCESS(f'Agregados de calificaciones corregidos: {corregidos} empleados'))
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:42
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def calcular_agregados(apps, schema_editor):
+    Empleado = apps.get_model('empleados', 'Empleado')
+    Calificacion = apps.get_model('empleados', 'Calificacion')
+    conteos = {}
+    for fila in Calificacion.objects.order_by().values('empleado_id', 'puntuacion').annotate(total=Count('id')):
+        conteos.setdefault(fila['empleado_id'], {})[fila['puntuacion']] = fila['total']
+    for empleado_id, por_puntuacion in conteos.items():
+        valores = {
+            'total_calificaciones': sum(por_puntuacion.values()),
+            'suma_calificaciones': sum(puntuacion * total for puntuacion, total in por_puntuacion.items()),
+        }
+        for estrellas in range(1, 6):
+            valores[f'calificaciones_{estrellas}'] = por_puntuacion.get(estrellas, 0)
+        Empleado.objects.filter(pk=empleado_id).update(**valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0013_alter_bonificacion_calificacion_minima_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='calificaciones_1',
+            field=models.PositiveIntegerField(default=0, verbose_name='Calificaciones de 1 estrella'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='calificaciones_2',
+            field=models.PositiveIntegerField(default=0, verbose_name='Calificaciones de 2 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='calificaciones_3',
+            field=models.PositiveIntegerField(default=0, verbose_name='Calificaciones de 3 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='calificaciones_4',
+            field=models.PositiveIntegerField(default=0, verbose_name='Calificaciones de 4 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='calificaciones_5',
+            field=models.PositiveIntegerField(default=0, verbose_name='Calificaciones de 5 estrellas'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='suma_calificaciones',
+            field=models.PositiveIntegerField(default=0, verbose_name='Suma de Calificaciones'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='total_calificaciones',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total de Calificaciones'),
+        ),
+        migrations.RunPython(calcular_agregados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:50
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def calcular_rachas(apps, schema_editor):
+    Empleado = apps.get_model('empleados', 'Empleado')
+    RegistroTiempo = apps.get_model('empleados', 'RegistroTiempo')
+    rachas = {}
+    for empleado_id, fecha in RegistroTiempo.objects.filter(hora_fin__isnull=False).annotate(
+        fecha=TruncDate('hora_inicio')
+    ).values_list('empleado_id', 'fecha').distinct().order_by('empleado_id', 'fecha'):
+        actual, maxima, ultimo = rachas.get(empleado_id, (0, 0, None))
+        actual = actual + 1 if ultimo == fecha - timedelta(days=1) else 1
+        rachas[empleado_id] = (actual, max(maxima, actual), fecha)
+    for empleado_id, (actual, maxima, ultimo) in rachas.items():
+        Empleado.objects.filter(pk=empleado_id).update(
+            racha_actual=actual, racha_maxima=maxima, ultimo_dia_trabajado=ultimo
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0014_empleado_agregados_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='racha_actual',
+            field=models.PositiveIntegerField(default=0, verbose_name='Racha Actual de Días Trabajados'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='racha_maxima',
+            field=models.PositiveIntegerField(default=0, verbose_name='Racha Máxima de Días Trabajados'),
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='ultimo_dia_trabajado',
+            field=models.DateField(blank=True, null=True, verbose_name='Último Día Trabajado'),
+        ),
+        migrations.RunPython(calcular_rachas, migrations.RunPython.noop),
+    ]
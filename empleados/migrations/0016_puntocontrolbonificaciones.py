@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0015_empleado_rachas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlBonificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sistema', models.CharField(choices=[('incentivos', 'Configuraciones de bonificación (incentivos)'), ('programas', 'Bonificaciones por criterios')], max_length=20, unique=True, verbose_name='Sistema')),
+                ('fecha_inicio_periodo', models.DateField(verbose_name='Inicio del Período')),
+                ('fecha_fin_periodo', models.DateField(verbose_name='Fin del Período')),
+                ('evaluado_en', models.DateTimeField(verbose_name='Evaluado en')),
+                ('empleados_evaluados', models.PositiveIntegerField(default=0, verbose_name='Empleados Evaluados')),
+            ],
+            options={
+                'verbose_name': 'Punto de Control de Bonificaciones',
+                'verbose_name_plural': 'Puntos de Control de Bonificaciones',
+            },
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from datetime import timedelta
 
 # Create your models here.
 
@@ -77,6 +78,20 @@ class Empleado(models.Model):
     fecha_contratacion = models.DateField(verbose_name=_('Fecha de Contratación'))
     fotografia = models.ImageField(upload_to='empleados/fotografias/', null=True, blank=True, verbose_name=_('Fotografía'))
     activo = models.BooleanField(default=True, verbose_name=_('Activo'))
+    # Agregados de calificaciones, mantenidos con F() por las señales de Calificacion
+    # (comando recalcular_calificaciones_empleados para repararlos)
+    total_calificaciones = models.PositiveIntegerField(default=0, verbose_name=_('Total de Calificaciones'))
+    suma_calificaciones = models.PositiveIntegerField(default=0, verbose_name=_('Suma de Calificaciones'))
+    calificaciones_1 = models.PositiveIntegerField(default=0, verbose_name=_('Calificaciones de 1 estrella'))
+    calificaciones_2 = models.PositiveIntegerField(default=0, verbose_name=_('Calificaciones de 2 estrellas'))
+    calificaciones_3 = models.PositiveIntegerField(default=0, verbose_name=_('Calificaciones de 3 estrellas'))
+    calificaciones_4 = models.PositiveIntegerField(default=0, verbose_name=_('Calificaciones de 4 estrellas'))
+    calificaciones_5 = models.PositiveIntegerField(default=0, verbose_name=_('Calificaciones de 5 estrellas'))
+    # Racha de días trabajados, mantenida por las señales de RegistroTiempo
+    # (comando actualizar_rachas_empleados para reconstruirla)
+    racha_actual = models.PositiveIntegerField(default=0, verbose_name=_('Racha Actual de Días Trabajados'))
+    racha_maxima = models.PositiveIntegerField(default=0, verbose_name=_('Racha Máxima de Días Trabajados'))
+    ultimo_dia_trabajado = models.DateField(null=True, blank=True, verbose_name=_('Último Día Trabajado'))
     fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name=_('Fecha de Registro'))
     fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name=_('Última Actualización'))
     
@@ -96,10 +111,25 @@ class Empleado(models.Model):
         
     def promedio_calificacion(self):
         """Retorna el promedio de calificaciones del empleado"""
-        calificaciones = self.calificaciones.all()
-        if not calificaciones:
+        return self.calificacion_promedio
+
+    @property
+    def calificacion_promedio(self):
+        """Promedio de calificaciones desde los agregados del empleado, sin consultas"""
+        if not self.total_calificaciones:
             return 0
-        return sum(c.puntuacion for c in calificaciones) / calificaciones.count()
+        return self.suma_calificaciones / self.total_calificaciones
+
+    def distribucion_calificaciones(self):
+        """Retorna [(estrellas, total), ...] de 1 a 5 estrellas"""
+        return [(estrellas, getattr(self, f'calificaciones_{estrellas}')) for estrellas in range(1, 6)]
+
+    def racha_vigente(self, fecha=None):
+        """Racha actual de días trabajados, o 0 si ya se perdió un día completo (ni hoy ni ayer)"""
+        fecha = fecha or timezone.now().date()
+        if self.ultimo_dia_trabajado and self.ultimo_dia_trabajado >= fecha - timedelta(days=1):
+            return self.racha_actual
+        return 0
 
 
 class RegistroTiempo(models.Model):
@@ -438,3 +468,30 @@ class Incentivo(models.Model):
     def puede_ser_cobrada(self):
         """Verifica si el incentivo puede ser cobrado"""
         return self.estado == self.ESTADO_PENDIENTE
+
+
+class PuntoControlBonificaciones(models.Model):
+    """
+    Último período evaluado por procesar_bonificaciones en cada sistema de
+    bonificaciones, para reevaluar solo a los empleados con cambios.
+    """
+    SISTEMA_INCENTIVOS = 'incentivos'
+    SISTEMA_PROGRAMAS = 'programas'
+
+    SISTEMA_CHOICES = [
+        (SISTEMA_INCENTIVOS, _('Configuraciones de bonificación (incentivos)')),
+        (SISTEMA_PROGRAMAS, _('Bonificaciones por criterios')),
+    ]
+
+    sistema = models.CharField(max_length=20, choices=SISTEMA_CHOICES, unique=True, verbose_name=_('Sistema'))
+    fecha_inicio_periodo = models.DateField(verbose_name=_('Inicio del Período'))
+    fecha_fin_periodo = models.DateField(verbose_name=_('Fin del Período'))
+    evaluado_en = models.DateTimeField(verbose_name=_('Evaluado en'))
+    empleados_evaluados = models.PositiveIntegerField(default=0, verbose_name=_('Empleados Evaluados'))
+
+    class Meta:
+        verbose_name = _('Punto de Control de Bonificaciones')
+        verbose_name_plural = _('Puntos de Control de Bonificaciones')
+
+    def __str__(self):
+        return f"{self.get_sistema_display()} - {self.fecha_inicio_periodo} a {self.fecha_fin_periodo}"
@@ -1,11 +1,195 @@
-from django.db.models import Avg, Count, Q, Sum
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import Empleado, Incentivo, ConfiguracionBonificacion, Calificacion, Bonificacion, BonificacionObtenida, RegistroTiempo
+from .models import (
+    Empleado, Incentivo, ConfiguracionBonificacion, Calificacion, Bonificacion, BonificacionObtenida, RegistroTiempo,
+    PuntoControlBonificaciones,
+)
 from reservas.models import Reserva
 
 
+class MetricasEmpleadoService:
+    """
+    Métricas de desempeño de los empleados en un período, calculadas para todos
+    a la vez con una consulta agrupada por métrica (las rachas de días
+    trabajados están en RachasEmpleadoService).
+    """
+
+    @staticmethod
+    def _limites(fecha_inicio, fecha_fin):
+        """Convierte un rango de fechas inclusivo en [desde, hasta) de datetimes."""
+        return (
+            datetime.combine(fecha_inicio, datetime.min.time()),
+            datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time()),
+        )
+
+    @staticmethod
+    def servicios(fecha_inicio, fecha_fin, empleado_ids=None):
+        """Retorna {empleado_id: servicios completados} en el período."""
+        desde, hasta = MetricasEmpleadoService._limites(fecha_inicio, fecha_fin)
+        reservas = Reserva.objects.filter(
+            estado=Reserva.COMPLETADA,
+            lavador_id__isnull=False,
+            fecha_hora__gte=desde,
+            fecha_hora__lt=hasta
+        )
+        if empleado_ids is not None:
+            reservas = reservas.filter(lavador_id__in=empleado_ids)
+        return dict(
+            reservas.order_by().values('lavador_id').annotate(total=Count('id')).values_list('lavador_id', 'total')
+        )
+
+    @staticmethod
+    def calificaciones(fecha_inicio, fecha_fin, empleado_ids=None, por_servicio=False):
+        """
+        Retorna {empleado_id: calificación promedio}. Por defecto promedia las
+        calificaciones recibidas en el período; con `por_servicio`, las de las
+        reservas completadas por el lavador en el período.
+        """
+        desde, hasta = MetricasEmpleadoService._limites(fecha_inicio, fecha_fin)
+        if por_servicio:
+            campo = 'reserva__lavador_id'
+            calificaciones = Calificacion.objects.filter(
+                reserva__estado=Reserva.COMPLETADA,
+                reserva__lavador_id__isnull=False,
+                reserva__fecha_hora__gte=desde,
+                reserva__fecha_hora__lt=hasta
+            )
+        else:
+            campo = 'empleado_id'
+            calificaciones = Calificacion.objects.filter(fecha_calificacion__gte=desde, fecha_calificacion__lt=hasta)
+        if empleado_ids is not None:
+            calificaciones = calificaciones.filter(**{f'{campo}__in': empleado_ids})
+        return {
+            empleado_id: float(promedio)
+            for empleado_id, promedio in calificaciones.order_by().values(campo).annotate(
+                promedio=Avg('puntuacion')
+            ).values_list(campo, 'promedio')
+        }
+
+
+class RachasEmpleadoService:
+    """
+    Rachas de días consecutivos trabajados (días con registros de tiempo cerrados).
+
+    La racha actual, la máxima y el último día trabajado se guardan en el empleado:
+    cada cierre de registro solo incorpora su día, y `reconstruir` las recalcula
+    desde el historial con un único recorrido ordenado por empleado y fecha.
+    """
+    CAMPOS = ['racha_actual', 'racha_maxima', 'ultimo_dia_trabajado']
+
+    @staticmethod
+    def calcular(hasta=None, empleado_ids=None):
+        """
+        Retorna {empleado_id: (racha_actual, racha_maxima, ultimo_dia)} hasta la fecha
+        indicada, con una consulta de (empleado, fecha) ordenada para todos los empleados.
+        """
+        registros = RegistroTiempo.objects.filter(hora_fin__isnull=False)
+        if hasta is not None:
+            registros = registros.filter(hora_inicio__lt=datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+        if empleado_ids is not None:
+            registros = registros.filter(empleado_id__in=empleado_ids)
+
+        rachas = {}
+        for empleado_id, fecha in registros.annotate(
+            fecha=TruncDate('hora_inicio')
+        ).values_list('empleado_id', 'fecha').distinct().order_by('empleado_id', 'fecha'):
+            actual, maxima, ultimo = rachas.get(empleado_id, (0, 0, None))
+            # Cada hueco entre fechas cierra una isla y empieza otra
+            actual = actual + 1 if ultimo == fecha - timedelta(days=1) else 1
+            rachas[empleado_id] = (actual, max(maxima, actual), fecha)
+        return rachas
+
+    @staticmethod
+    def reconstruir(empleado_ids=None):
+        """
+        Recalcula las rachas guardadas desde todo el historial (todos los empleados o
+        los ids indicados). Retorna la cantidad de empleados corregidos.
+        """
+        rachas = RachasEmpleadoService.calcular(empleado_ids=empleado_ids)
+        empleados = Empleado.objects.all()
+        if empleado_ids is not None:
+            empleados = empleados.filter(pk__in=empleado_ids)
+
+        corregidos = []
+        for empleado in empleados.only(*RachasEmpleadoService.CAMPOS):
+            valores = rachas.get(empleado.pk, (0, 0, None))
+            if tuple(getattr(empleado, campo) for campo in RachasEmpleadoService.CAMPOS) != valores:
+                for campo, valor in zip(RachasEmpleadoService.CAMPOS, valores):
+                    setattr(empleado, campo, valor)
+                corregidos.append(empleado)
+        Empleado.objects.bulk_update(corregidos, RachasEmpleadoService.CAMPOS, batch_size=500)
+        return len(corregidos)
+
+    @staticmethod
+    def incorporar(fecha, empleado_ids, corregir_anteriores=False):
+        """
+        Suma `fecha` a la racha de los empleados indicados, que trabajaron ese día.
+        Los días ya incorporados se ignoran; los anteriores al último día trabajado
+        solo se aplican con `corregir_anteriores`, reconstruyendo esos empleados.
+        """
+        actualizados = []
+        anteriores = []
+        for empleado in Empleado.objects.filter(pk__in=empleado_ids).only(*RachasEmpleadoService.CAMPOS):
+            ultimo = empleado.ultimo_dia_trabajado
+            if ultimo and ultimo >= fecha:
+                if ultimo > fecha:
+                    anteriores.append(empleado.pk)
+                continue
+            empleado.racha_actual = empleado.racha_actual + 1 if ultimo == fecha - timedelta(days=1) else 1
+            empleado.racha_maxima = max(empleado.racha_maxima, empleado.racha_actual)
+            empleado.ultimo_dia_trabajado = fecha
+            actualizados.append(empleado)
+        Empleado.objects.bulk_update(actualizados, RachasEmpleadoService.CAMPOS, batch_size=500)
+        if corregir_anteriores and anteriores:
+            RachasEmpleadoService.reconstruir(anteriores)
+        return len(actualizados)
+
+    @staticmethod
+    def registrar_dia(fecha):
+        """
+        Incorpora los registros cerrados de `fecha` de todos los empleados, para
+        la ejecución diaria. Es idempotente. Retorna los empleados actualizados.
+        """
+        desde, hasta = MetricasEmpleadoService._limites(fecha, fecha)
+        empleado_ids = set(RegistroTiempo.objects.filter(
+            hora_fin__isnull=False,
+            hora_inicio__gte=desde,
+            hora_inicio__lt=hasta
+        ).order_by().values_list('empleado_id', flat=True).distinct())
+        if not empleado_ids:
+            return 0
+        return RachasEmpleadoService.incorporar(fecha, empleado_ids)
+
+    @staticmethod
+    def dias_consecutivos(fecha_fin, empleado_ids=None):
+        """
+        Retorna {empleado_id: días consecutivos trabajados que terminan en fecha_fin}
+        desde las rachas guardadas. Si la racha guardada ya pasó de fecha_fin
+        (evaluación de una fecha anterior), esos empleados se calculan desde el historial.
+        """
+        empleados = Empleado.objects.filter(ultimo_dia_trabajado__gte=fecha_fin)
+        if empleado_ids is not None:
+            empleados = empleados.filter(pk__in=empleado_ids)
+
+        rachas = {}
+        historicos = []
+        for empleado_id, racha_actual, ultimo in empleados.values_list('pk', 'racha_actual', 'ultimo_dia_trabajado'):
+            if ultimo == fecha_fin:
+                rachas[empleado_id] = racha_actual
+            else:
+                historicos.append(empleado_id)
+        if historicos:
+            for empleado_id, (racha_actual, _, ultimo) in RachasEmpleadoService.calcular(fecha_fin, historicos).items():
+                if ultimo == fecha_fin:
+                    rachas[empleado_id] = racha_actual
+        return rachas
+
+
 class BonificacionService:
     """
     Servicio para evaluar automáticamente las condiciones de bonificación
@@ -13,106 +197,111 @@ class BonificacionService:
     """
     
     @staticmethod
-    def evaluar_bonificaciones_automaticas():
+    def evaluar_bonificaciones_automaticas(dry_run=False, fecha_evaluacion=None, empleado_ids=None):
         """
-        Evalúa todas las configuraciones de bonificación activas
-        y otorga bonificaciones automáticas a empleados que cumplan las condiciones.
+        Evalúa todas las configuraciones de bonificación activas y otorga
+        bonificaciones automáticas a empleados que cumplan las condiciones.
+        Con `dry_run` retorna [{'empleado', 'configuracion', 'incentivo'}, ...] sin guardar.
         """
-        configuraciones = ConfiguracionBonificacion.objects.filter(activo=True)
-        bonificaciones_otorgadas = []
-        
+        candidatos = BonificacionService.evaluar(fecha_evaluacion, empleado_ids)
+        return BonificacionService.otorgar(candidatos, fecha_evaluacion, dry_run)
+    
+    @staticmethod
+    def evaluar(fecha_evaluacion=None, empleado_ids=None):
+        """
+        Retorna [(empleado_id, configuracion_id, servicios_completados, calificacion_promedio)]
+        de los empleados activos (o de los ids indicados) que cumplen cada configuración
+        activa, sin descartar las ya otorgadas.
+
+        Las métricas de todos los empleados salen de dos consultas agrupadas y los
+        criterios se aplican en memoria.
+        """
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo(fecha_evaluacion)
+        configuraciones = list(ConfiguracionBonificacion.objects.filter(activo=True))
+        if not configuraciones:
+            return []
+        empleados = Empleado.objects.filter(activo=True)
+        if empleado_ids is not None:
+            empleados = empleados.filter(pk__in=empleado_ids)
+        ids = list(empleados.values_list('pk', flat=True))
+        servicios = MetricasEmpleadoService.servicios(fecha_inicio, fecha_fin, empleado_ids)
+        calificaciones = MetricasEmpleadoService.calificaciones(fecha_inicio, fecha_fin, empleado_ids)
+
+        candidatos = []
         for config in configuraciones:
-            empleados_elegibles = BonificacionService._obtener_empleados_elegibles(config)
-            
-            for empleado in empleados_elegibles:
-                # Verificar si ya tiene una bonificación para esta configuración en el período actual
-                if not BonificacionService._ya_tiene_bonificacion(empleado, config):
-                    bonificacion = BonificacionService._crear_bonificacion_automatica(empleado, config)
-                    bonificaciones_otorgadas.append(bonificacion)
-        
-        return bonificaciones_otorgadas
+            for empleado_id in ids:
+                servicios_completados = servicios.get(empleado_id, 0)
+                calificacion_promedio = calificaciones.get(empleado_id)
+                if BonificacionService._cumple_condiciones(config, servicios_completados, calificacion_promedio):
+                    candidatos.append((empleado_id, config.pk, servicios_completados, calificacion_promedio))
+        return candidatos
     
     @staticmethod
-    def _obtener_empleados_elegibles(configuracion):
+    def otorgar(candidatos, fecha_evaluacion=None, dry_run=False):
         """
-        Obtiene los empleados que cumplen con las condiciones de la configuración.
+        Crea con bulk_create los incentivos de los candidatos de `evaluar` que aún no
+        tienen bonificación para esa configuración en el período actual.
         """
-        empleados_elegibles = []
-        empleados_activos = Empleado.objects.filter(activo=True)
-        
-        for empleado in empleados_activos:
-            if BonificacionService._empleado_cumple_condiciones(empleado, configuracion):
-                empleados_elegibles.append(empleado)
-        
-        return empleados_elegibles
+        if not candidatos:
+            return []
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo(fecha_evaluacion)
+        configuraciones = ConfiguracionBonificacion.objects.in_bulk({config_id for _, config_id, _, _ in candidatos})
+        empleados = Empleado.objects.in_bulk({empleado_id for empleado_id, _, _, _ in candidatos})
+        ya_otorgadas = BonificacionService._otorgadas(configuraciones.values(), fecha_inicio, fecha_fin)
+
+        nuevos = [
+            BonificacionService._nueva_bonificacion_automatica(
+                empleados[empleado_id], configuraciones[config_id], servicios_completados, calificacion_promedio,
+                fecha_inicio, fecha_fin
+            )
+            for empleado_id, config_id, servicios_completados, calificacion_promedio in candidatos
+            # Solo una bonificación por configuración en el período actual
+            if (empleado_id, config_id) not in ya_otorgadas
+        ]
+
+        if dry_run:
+            return [
+                {'empleado': incentivo.empleado, 'configuracion': incentivo.configuracion_bonificacion, 'incentivo': incentivo}
+                for incentivo in nuevos
+            ]
+
+        Incentivo.objects.bulk_create(nuevos, batch_size=500)
+        # bulk_create no emite señales
+        EstadisticasLavadorService.invalidar(*{incentivo.empleado_id for incentivo in nuevos})
+        return nuevos
     
     @staticmethod
-    def _empleado_cumple_condiciones(empleado, configuracion):
+    def _cumple_condiciones(configuracion, servicios_completados, calificacion_promedio):
         """
-        Verifica si un empleado cumple con todas las condiciones de la configuración.
+        Verifica si las métricas del empleado cumplen con todas las condiciones de la configuración.
         """
-        # Calcular el período de evaluación (último mes por defecto)
-        fecha_fin = timezone.now().date()
-        fecha_inicio = fecha_fin - timedelta(days=30)
-        
-        # Condición 1: Servicios completados
-        servicios_completados = Reserva.objects.filter(
-            lavador=empleado,
-            estado='completada',
-            fecha_reserva__range=[fecha_inicio, fecha_fin]
-        ).count()
-        
         if servicios_completados < configuracion.servicios_requeridos:
             return False
-        
-        # Condición 2: Calificación promedio mínima
-        calificacion_promedio = Calificacion.objects.filter(
-            empleado=empleado,
-            fecha_calificacion__range=[fecha_inicio, fecha_fin]
-        ).aggregate(promedio=Avg('puntuacion'))['promedio']
-        
-        if calificacion_promedio is None or calificacion_promedio < configuracion.calificacion_minima:
-            return False
-        
-        return True
+        return calificacion_promedio is not None and calificacion_promedio >= configuracion.calificacion_minima
     
     @staticmethod
-    def _ya_tiene_bonificacion(empleado, configuracion):
+    def _otorgadas(configuraciones, fecha_inicio, fecha_fin, empleado=None):
         """
-        Verifica si el empleado ya tiene una bonificación para esta configuración
-        en el período actual.
+        Retorna {(empleado_id, configuracion_id)} de las bonificaciones automáticas
+        ya otorgadas en el período.
         """
-        fecha_fin = timezone.now().date()
-        fecha_inicio = fecha_fin - timedelta(days=30)
-        
-        return Incentivo.objects.filter(
-            empleado=empleado,
-            configuracion_bonificacion=configuracion,
+        incentivos = Incentivo.objects.filter(
+            configuracion_bonificacion__in=configuraciones,
             fecha_otorgado__range=[fecha_inicio, fecha_fin],
             otorgado_automaticamente=True
-        ).exists()
+        )
+        if empleado is not None:
+            incentivos = incentivos.filter(empleado=empleado)
+        return set(incentivos.values_list('empleado_id', 'configuracion_bonificacion_id'))
     
     @staticmethod
-    def _crear_bonificacion_automatica(empleado, configuracion):
+    def _nueva_bonificacion_automatica(empleado, configuracion, servicios_completados, calificacion_promedio,
+                                       fecha_inicio, fecha_fin):
         """
-        Crea una bonificación automática para el empleado basada en la configuración.
+        Construye (sin guardar) el incentivo automático del empleado según la configuración.
         """
-        fecha_fin = timezone.now().date()
-        fecha_inicio = fecha_fin - timedelta(days=30)
-        
-        # Calcular estadísticas del empleado para el período
-        servicios_completados = Reserva.objects.filter(
-            lavador=empleado,
-            estado='completada',
-            fecha_reserva__range=[fecha_inicio, fecha_fin]
-        ).count()
-        
-        calificacion_promedio = Calificacion.objects.filter(
-            empleado=empleado,
-            fecha_calificacion__range=[fecha_inicio, fecha_fin]
-        ).aggregate(promedio=Avg('puntuacion'))['promedio'] or 0
-        
-        bonificacion = Incentivo.objects.create(
+        calificacion_promedio = calificacion_promedio or 0
+        return Incentivo(
             empleado=empleado,
             configuracion_bonificacion=configuracion,
             nombre=f"Bonificación Automática - {configuracion.nombre}",
@@ -120,16 +309,14 @@ class BonificacionService:
                        f"{servicios_completados} servicios completados, "
                        f"calificación promedio de {calificacion_promedio:.2f}",
             monto=configuracion.monto_bonificacion,
-            fecha_otorgado=timezone.now().date(),
+            fecha_otorgado=fecha_fin,
             periodo_inicio=fecha_inicio,
             periodo_fin=fecha_fin,
-            promedio_calificacion=calificacion_promedio,
+            promedio_calificacion=round(Decimal(str(calificacion_promedio)), 2),
             servicios_completados=servicios_completados,
             otorgado_automaticamente=True,
             estado=Incentivo.ESTADO_PENDIENTE
         )
-        
-        return bonificacion
     
     @staticmethod
     def obtener_bonificaciones_pendientes(empleado=None):
@@ -166,33 +353,24 @@ class BonificacionService:
         """
         Obtiene el progreso del empleado hacia las próximas bonificaciones.
         """
-        configuraciones_activas = ConfiguracionBonificacion.objects.filter(activo=True)
+        configuraciones_activas = list(ConfiguracionBonificacion.objects.filter(activo=True))
         progreso = []
+        if not configuraciones_activas:
+            return progreso
         
         # Calcular el período de evaluación (último mes)
-        fecha_fin = timezone.now().date()
-        fecha_inicio = fecha_fin - timedelta(days=30)
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo()
+        
+        # Métricas del empleado y bonificaciones ya otorgadas, una sola vez para todas las configuraciones
+        servicios_completados = MetricasEmpleadoService.servicios(fecha_inicio, fecha_fin, [empleado.pk]).get(empleado.pk, 0)
+        calificacion_promedio = MetricasEmpleadoService.calificaciones(fecha_inicio, fecha_fin, [empleado.pk]).get(empleado.pk, 0)
+        ya_otorgadas = BonificacionService._otorgadas(configuraciones_activas, fecha_inicio, fecha_fin, empleado)
         
         for config in configuraciones_activas:
-            # Verificar si ya tiene bonificación para esta configuración
-            ya_tiene_bonificacion = BonificacionService._ya_tiene_bonificacion(empleado, config)
-            
-            if not ya_tiene_bonificacion:
-                # Calcular progreso actual
-                servicios_completados = Reserva.objects.filter(
-                    lavador=empleado,
-                    estado='completada',
-                    fecha_reserva__range=[fecha_inicio, fecha_fin]
-                ).count()
-                
-                calificacion_promedio = Calificacion.objects.filter(
-                    empleado=empleado,
-                    fecha_calificacion__range=[fecha_inicio, fecha_fin]
-                ).aggregate(promedio=Avg('puntuacion'))['promedio'] or 0
-                
+            if (empleado.pk, config.pk) not in ya_otorgadas:
                 # Calcular porcentajes de progreso
                 progreso_servicios = min(100, (servicios_completados / config.servicios_requeridos) * 100) if config.servicios_requeridos > 0 else 100
-                progreso_calificacion = min(100, (calificacion_promedio / config.calificacion_minima) * 100) if config.calificacion_minima > 0 else 100
+                progreso_calificacion = min(100, (calificacion_promedio / float(config.calificacion_minima)) * 100) if config.calificacion_minima > 0 else 100
                 
                 progreso_item = {
                     'configuracion': config,
@@ -215,119 +393,51 @@ class BonificacionServiceV2:
     """
     Servicio mejorado para gestionar el cálculo y otorgamiento automático de bonificaciones
     basado en los nuevos modelos Bonificacion y BonificacionObtenida.
+
+    La evaluación arma la matriz de métricas de todos los empleados con una consulta
+    agrupada por métrica y aplica en memoria los criterios de cada bonificación.
     """
+    PERIODO_DIAS = 30
     
     @staticmethod
-    def calcular_dias_consecutivos_trabajados(empleado, fecha_fin, dias_evaluar=30):
-        """
-        Calcula los días consecutivos trabajados por un empleado hasta una fecha específica.
-        """
-        fecha_inicio = fecha_fin - timedelta(days=dias_evaluar)
-        
-        # Obtener todos los días trabajados en el período
-        registros = RegistroTiempo.objects.filter(
-            empleado=empleado,
-            fecha__range=[fecha_inicio, fecha_fin],
-            hora_salida__isnull=False  # Solo días completos
-        ).values_list('fecha', flat=True).distinct().order_by('-fecha')
-        
-        if not registros:
-            return 0
-        
-        # Calcular días consecutivos desde la fecha más reciente
-        dias_consecutivos = 0
-        fecha_actual = fecha_fin
-        
-        for fecha_registro in registros:
-            if fecha_registro == fecha_actual:
-                dias_consecutivos += 1
-                fecha_actual -= timedelta(days=1)
-            else:
-                break
-        
-        return dias_consecutivos
-    
-    @staticmethod
-    def calcular_servicios_realizados(empleado, fecha_inicio, fecha_fin):
-        """
-        Calcula la cantidad de servicios realizados por un empleado en un período.
-        """
-        return Reserva.objects.filter(
-            empleado_asignado=empleado,
-            fecha_reserva__range=[fecha_inicio, fecha_fin],
-            estado='completada'
-        ).count()
+    def periodo(fecha_evaluacion=None):
+        """Retorna (fecha_inicio, fecha_fin) del período evaluado (últimos 30 días)."""
+        fecha_fin = fecha_evaluacion or timezone.now().date()
+        return fecha_fin - timedelta(days=BonificacionServiceV2.PERIODO_DIAS), fecha_fin
     
     @staticmethod
-    def calcular_calificacion_promedio(empleado, fecha_inicio, fecha_fin):
-        """
-        Calcula la calificación promedio de un empleado en un período.
-        """
-        # Obtener reservas completadas con calificación
-        reservas_calificadas = Reserva.objects.filter(
-            empleado_asignado=empleado,
-            fecha_reserva__range=[fecha_inicio, fecha_fin],
-            estado='completada',
-            calificaciones__isnull=False
-        )
-        
-        if not reservas_calificadas.exists():
-            return 0.0
-        
-        # Calcular promedio de calificaciones
-        promedio = Calificacion.objects.filter(
-            reserva__in=reservas_calificadas
-        ).aggregate(promedio=Avg('puntuacion'))['promedio']
-        
-        return float(promedio) if promedio else 0.0
+    def ventana_dias(bonificacion):
+        """Días hacia atrás en los que se buscan los días consecutivos trabajados."""
+        if bonificacion.dias_consecutivos_requeridos:
+            return bonificacion.dias_consecutivos_requeridos + 10
+        return BonificacionServiceV2.PERIODO_DIAS
     
     @staticmethod
-    def evaluar_empleado_para_bonificacion(empleado, bonificacion, fecha_evaluacion=None):
+    def aplicar_criterios(bonificacion, dias_consecutivos, servicios_realizados, calificacion_promedio,
+                          fecha_inicio, fecha_fin):
         """
-        Evalúa si un empleado cumple los criterios para una bonificación específica.
-        Ahora soporta criterios flexibles - solo evalúa criterios que están definidos (> 0).
+        Evalúa las métricas contra los criterios de la bonificación.
+        Soporta criterios flexibles - solo evalúa criterios que están definidos (> 0).
         """
-        if fecha_evaluacion is None:
-            fecha_evaluacion = timezone.now().date()
-        
-        # Definir período de evaluación (últimos 30 días por defecto)
-        fecha_fin = fecha_evaluacion
-        fecha_inicio = fecha_fin - timedelta(days=30)
-        
-        # Calcular métricas
-        dias_consecutivos = BonificacionServiceV2.calcular_dias_consecutivos_trabajados(
-            empleado, fecha_fin, dias_evaluar=bonificacion.dias_consecutivos_requeridos + 10 if bonificacion.dias_consecutivos_requeridos else 30
-        )
-        servicios_realizados = BonificacionServiceV2.calcular_servicios_realizados(
-            empleado, fecha_inicio, fecha_fin
-        )
-        calificacion_promedio = BonificacionServiceV2.calcular_calificacion_promedio(
-            empleado, fecha_inicio, fecha_fin
-        )
-        
-        # Evaluar criterios de forma flexible - solo los que están definidos
         criterios_evaluados = []
         criterios_cumplidos = []
         
         # Evaluar días consecutivos solo si está definido
         if bonificacion.dias_consecutivos_requeridos and bonificacion.dias_consecutivos_requeridos > 0:
-            cumple_dias = dias_consecutivos >= bonificacion.dias_consecutivos_requeridos
             criterios_evaluados.append('dias')
-            if cumple_dias:
+            if dias_consecutivos >= bonificacion.dias_consecutivos_requeridos:
                 criterios_cumplidos.append('dias')
         
         # Evaluar servicios solo si está definido
         if bonificacion.servicios_requeridos and bonificacion.servicios_requeridos > 0:
-            cumple_servicios = servicios_realizados >= bonificacion.servicios_requeridos
             criterios_evaluados.append('servicios')
-            if cumple_servicios:
+            if servicios_realizados >= bonificacion.servicios_requeridos:
                 criterios_cumplidos.append('servicios')
         
         # Evaluar calificación solo si está definida
         if bonificacion.calificacion_minima and bonificacion.calificacion_minima > 0:
-            cumple_calificacion = calificacion_promedio >= float(bonificacion.calificacion_minima)
             criterios_evaluados.append('calificacion')
-            if cumple_calificacion:
+            if calificacion_promedio >= float(bonificacion.calificacion_minima):
                 criterios_cumplidos.append('calificacion')
         
         # El empleado cumple si cumple TODOS los criterios que están definidos
@@ -349,6 +459,103 @@ class BonificacionServiceV2:
             }
         }
     
+    @staticmethod
+    def evaluar(fecha_evaluacion=None, bonificaciones=None, empleado_ids=None):
+        """
+        Evalúa empleados × bonificaciones y retorna {(empleado_id, bonificacion_id): metricas}.
+
+        Por defecto toma las bonificaciones activas y los empleados activos. Servicios
+        y calificaciones salen de una consulta agrupada cada uno y los días
+        consecutivos de las rachas guardadas, sin importar cuántos empleados o
+        bonificaciones haya.
+        """
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo(fecha_evaluacion)
+        if bonificaciones is None:
+            bonificaciones = list(Bonificacion.objects.filter(activo=True))
+        filtro_ids = empleado_ids
+        if empleado_ids is None:
+            empleado_ids = list(Empleado.objects.filter(activo=True).values_list('pk', flat=True))
+        if not bonificaciones or not empleado_ids:
+            return {}
+
+        ventanas = {bonificacion.pk: BonificacionServiceV2.ventana_dias(bonificacion) for bonificacion in bonificaciones}
+        rachas = RachasEmpleadoService.dias_consecutivos(fecha_fin, filtro_ids)
+        servicios = MetricasEmpleadoService.servicios(fecha_inicio, fecha_fin, filtro_ids)
+        calificaciones = MetricasEmpleadoService.calificaciones(fecha_inicio, fecha_fin, filtro_ids, por_servicio=True)
+
+        resultados = {}
+        for empleado_id in empleado_ids:
+            for bonificacion in bonificaciones:
+                # La racha se limita a la ventana de cada bonificación
+                dias_consecutivos = min(rachas.get(empleado_id, 0), ventanas[bonificacion.pk] + 1)
+                resultados[(empleado_id, bonificacion.pk)] = BonificacionServiceV2.aplicar_criterios(
+                    bonificacion,
+                    dias_consecutivos,
+                    servicios.get(empleado_id, 0),
+                    calificaciones.get(empleado_id, 0.0),
+                    fecha_inicio,
+                    fecha_fin
+                )
+        return resultados
+    
+    @staticmethod
+    def evaluar_empleado_para_bonificacion(empleado, bonificacion, fecha_evaluacion=None):
+        """
+        Evalúa si un empleado cumple los criterios para una bonificación específica.
+        """
+        return BonificacionServiceV2.evaluar(fecha_evaluacion, [bonificacion], [empleado.pk])[(empleado.pk, bonificacion.pk)]
+    
+    @staticmethod
+    def nueva_bonificacion_obtenida(empleado_id, bonificacion, metricas):
+        """Construye (sin guardar) la bonificación obtenida a partir de las métricas evaluadas."""
+        return BonificacionObtenida(
+            empleado_id=empleado_id,
+            bonificacion=bonificacion,
+            fecha_inicio_periodo=metricas['fecha_inicio_periodo'],
+            fecha_fin_periodo=metricas['fecha_fin_periodo'],
+            dias_consecutivos_trabajados=metricas['dias_consecutivos'],
+            servicios_realizados=metricas['servicios_realizados'],
+            calificacion_promedio=round(Decimal(str(metricas['calificacion_promedio'])), 2),
+            monto=bonificacion.monto_bonificacion
+        )
+    
+    @staticmethod
+    def otorgar_bonificaciones(fecha_evaluacion=None, dry_run=False, empleado_ids=None, resultados=None):
+        """
+        Evalúa las bonificaciones activas para los empleados activos (o los ids
+        indicados) y crea con bulk_create las bonificaciones obtenidas que falten en
+        el período. Acepta `resultados` ya calculados con `evaluar`.
+        Retorna la lista de BonificacionObtenida nuevas (sin guardar si `dry_run`).
+        """
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo(fecha_evaluacion)
+        bonificaciones = {bonificacion.pk: bonificacion for bonificacion in Bonificacion.objects.filter(activo=True)}
+        if resultados is None:
+            resultados = BonificacionServiceV2.evaluar(fecha_evaluacion, list(bonificaciones.values()), empleado_ids)
+        cumplen = [
+            clave for clave, metricas in resultados.items()
+            if metricas['cumple_criterios'] and clave[1] in bonificaciones
+        ]
+        if not cumplen:
+            return []
+
+        existentes = set(BonificacionObtenida.objects.filter(
+            bonificacion_id__in=bonificaciones,
+            fecha_inicio_periodo=fecha_inicio,
+            fecha_fin_periodo=fecha_fin
+        ).values_list('empleado_id', 'bonificacion_id'))
+        nuevas = [
+            BonificacionServiceV2.nueva_bonificacion_obtenida(empleado_id, bonificaciones[bonificacion_id], resultados[(empleado_id, bonificacion_id)])
+            for empleado_id, bonificacion_id in cumplen
+            if (empleado_id, bonificacion_id) not in existentes
+        ]
+        if dry_run or not nuevas:
+            return nuevas
+
+        # ignore_conflicts respeta la restricción única ante ejecuciones simultáneas
+        BonificacionObtenida.objects.bulk_create(nuevas, batch_size=500, ignore_conflicts=True)
+        EstadisticasLavadorService.invalidar(*{obtenida.empleado_id for obtenida in nuevas})
+        return nuevas
+    
     @staticmethod
     def otorgar_bonificacion(empleado, bonificacion, metricas):
         """
@@ -366,16 +573,8 @@ class BonificacionServiceV2:
             return None, "Ya existe una bonificación para este período"
         
         # Crear la bonificación obtenida
-        bonificacion_obtenida = BonificacionObtenida.objects.create(
-            empleado=empleado,
-            bonificacion=bonificacion,
-            fecha_inicio_periodo=metricas['fecha_inicio_periodo'],
-            fecha_fin_periodo=metricas['fecha_fin_periodo'],
-            dias_consecutivos_trabajados=metricas['dias_consecutivos'],
-            servicios_realizados=metricas['servicios_realizados'],
-            calificacion_promedio=metricas['calificacion_promedio'],
-            monto=bonificacion.monto_bonificacion
-        )
+        bonificacion_obtenida = BonificacionServiceV2.nueva_bonificacion_obtenida(empleado.pk, bonificacion, metricas)
+        bonificacion_obtenida.save()
         
         return bonificacion_obtenida, "Bonificación otorgada exitosamente"
     
@@ -434,4 +633,379 @@ class BonificacionServiceV2:
             'bonificaciones_redimidas': bonificaciones_redimidas,
             'monto_total_pendiente': float(monto_total_pendiente),
             'monto_total_redimido': float(monto_total_redimido)
-        }
\ No newline at end of file
+        }
+
+
+class ProcesoBonificacionesService:
+    """
+    Ejecución incremental de las bonificaciones automáticas (comando
+    procesar_bonificaciones).
+
+    Por cada sistema guarda un punto de control con el último período evaluado. Al
+    volver a evaluar solo se reevalúan los empleados cuyas reservas, calificaciones
+    o registros de tiempo cambiaron desde entonces y, si la ventana de 30 días
+    avanzó (la ejecución diaria), los que tienen datos en los días que salieron o
+    entraron a ella. Un período anterior, uno que avanzó toda la ventana o
+    programas modificados obligan a una evaluación completa.
+    """
+    SISTEMAS = [PuntoControlBonificaciones.SISTEMA_INCENTIVOS, PuntoControlBonificaciones.SISTEMA_PROGRAMAS]
+
+    @staticmethod
+    def empleados_con_cambios(desde):
+        """Ids de los empleados con datos de evaluación modificados desde `desde`."""
+        ids = set(Reserva.objects.filter(
+            fecha_actualizacion__gte=desde, lavador_id__isnull=False
+        ).order_by().values_list('lavador_id', flat=True).distinct())
+        for empleado_id, lavador_id in Calificacion.objects.filter(
+            fecha_calificacion__gte=desde
+        ).order_by().values_list('empleado_id', 'reserva__lavador_id').distinct():
+            ids.update((empleado_id, lavador_id))
+        ids.update(RegistroTiempo.objects.filter(hora_fin__gte=desde).order_by().values_list('empleado_id', flat=True).distinct())
+        ids.update(Empleado.objects.filter(fecha_actualizacion__gte=desde).values_list('pk', flat=True))
+        ids.discard(None)
+        return ids
+
+    @staticmethod
+    def empleados_en_bordes(sistema, anterior, periodo):
+        """
+        Ids de los empleados cuyo resultado puede cambiar al avanzar la ventana de
+        `anterior` a `periodo` (pares de fechas inicio, fin): los que tienen reservas
+        o calificaciones en los días que salieron o entraron, los que trabajaron
+        entre el fin anterior y el nuevo (la racha se cuenta hasta el fin del
+        período) y los que tienen bonificaciones que dejan de contar en el nuevo.
+        """
+        (inicio_anterior, fin_anterior), (inicio, fin) = anterior, periodo
+        salen = MetricasEmpleadoService._limites(inicio_anterior, inicio - timedelta(days=1))
+        entran = MetricasEmpleadoService._limites(fin_anterior + timedelta(days=1), fin)
+
+        def en_bordes(campo):
+            return (Q(**{f'{campo}__gte': salen[0], f'{campo}__lt': salen[1]})
+                    | Q(**{f'{campo}__gte': entran[0], f'{campo}__lt': entran[1]}))
+
+        ids = set(Reserva.objects.filter(
+            en_bordes('fecha_hora'), lavador_id__isnull=False
+        ).order_by().values_list('lavador_id', flat=True).distinct())
+        for empleado_id, lavador_id in Calificacion.objects.filter(
+            en_bordes('fecha_calificacion') | en_bordes('reserva__fecha_hora')
+        ).order_by().values_list('empleado_id', 'reserva__lavador_id').distinct():
+            ids.update((empleado_id, lavador_id))
+        desde, hasta = MetricasEmpleadoService._limites(fin_anterior, fin)
+        ids.update(RegistroTiempo.objects.filter(
+            hora_fin__isnull=False, hora_inicio__gte=desde, hora_inicio__lt=hasta
+        ).order_by().values_list('empleado_id', flat=True).distinct())
+
+        if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS:
+            # Un incentivo cuenta mientras su fecha esté dentro de la ventana
+            otorgadas = Incentivo.objects.filter(
+                otorgado_automaticamente=True, fecha_otorgado__gte=inicio_anterior, fecha_otorgado__lt=inicio
+            )
+        else:
+            # Las bonificaciones obtenidas son de un período exacto: las del anterior no cuentan
+            otorgadas = BonificacionObtenida.objects.filter(
+                fecha_inicio_periodo=inicio_anterior, fecha_fin_periodo=fin_anterior
+            )
+        ids.update(otorgadas.order_by().values_list('empleado_id', flat=True).distinct())
+        ids.discard(None)
+        return ids
+
+    @staticmethod
+    def programas_modificados(sistema, desde):
+        modelo = ConfiguracionBonificacion if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS else Bonificacion
+        return modelo.objects.filter(fecha_actualizacion__gte=desde).exists()
+
+    @staticmethod
+    def pendientes(sistema, fecha_evaluacion=None, completo=False):
+        """
+        Retorna los ids de los empleados activos a evaluar, o None si hay que evaluar
+        a todos: sin punto de control, con programas modificados desde entonces o si
+        el período no avanzó menos de una ventana completa.
+        """
+        periodo = BonificacionServiceV2.periodo(fecha_evaluacion)
+        punto = PuntoControlBonificaciones.objects.filter(sistema=sistema).first()
+        if (
+            completo
+            or punto is None
+            or ProcesoBonificacionesService.programas_modificados(sistema, punto.evaluado_en)
+        ):
+            return None
+        anterior = (punto.fecha_inicio_periodo, punto.fecha_fin_periodo)
+        cambios = ProcesoBonificacionesService.empleados_con_cambios(punto.evaluado_en)
+        if anterior != periodo:
+            avance = (periodo[1] - anterior[1]).days
+            if not 0 < avance < BonificacionServiceV2.PERIODO_DIAS:
+                return None
+            cambios |= ProcesoBonificacionesService.empleados_en_bordes(sistema, anterior, periodo)
+        if not cambios:
+            return []
+        return list(Empleado.objects.filter(activo=True, pk__in=cambios).values_list('pk', flat=True))
+
+    @staticmethod
+    def particiones(empleado_ids, partes):
+        """Divide los empleados a evaluar (todos los activos si es None) en `partes` listas de ids."""
+        if empleado_ids is None:
+            empleado_ids = list(Empleado.objects.filter(activo=True).values_list('pk', flat=True))
+        empleado_ids = sorted(empleado_ids)
+        tamano = max(1, -(-len(empleado_ids) // max(1, partes)))
+        return [empleado_ids[i:i + tamano] for i in range(0, len(empleado_ids), tamano)]
+
+    @staticmethod
+    def evaluar(sistema, fecha_evaluacion, empleado_ids):
+        """
+        Evalúa una partición de empleados sin escribir nada. Para incentivos retorna la
+        lista de candidatos de BonificacionService.evaluar; para programas, el
+        subconjunto de BonificacionServiceV2.evaluar que cumple los criterios.
+        """
+        if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS:
+            return BonificacionService.evaluar(fecha_evaluacion, empleado_ids)
+        return {
+            clave: metricas
+            for clave, metricas in BonificacionServiceV2.evaluar(fecha_evaluacion, None, empleado_ids).items()
+            if metricas['cumple_criterios']
+        }
+
+    @staticmethod
+    def diferencias(sistema, fecha_evaluacion, empleado_ids, resultados):
+        """
+        Compara los resultados con lo ya otorgado en el período para los empleados
+        evaluados (todos si es None). Retorna (nuevas, sin_cambios, ya_no_cumplen)
+        como listas ordenadas de pares (empleado_id, programa_id).
+        """
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo(fecha_evaluacion)
+        if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS:
+            cumplen = {(empleado_id, config_id) for empleado_id, config_id, _, _ in resultados}
+            otorgadas = Incentivo.objects.filter(
+                configuracion_bonificacion__activo=True,
+                fecha_otorgado__range=[fecha_inicio, fecha_fin],
+                otorgado_automaticamente=True
+            )
+            campos = ('empleado_id', 'configuracion_bonificacion_id')
+        else:
+            cumplen = set(resultados)
+            otorgadas = BonificacionObtenida.objects.filter(
+                bonificacion__activo=True,
+                fecha_inicio_periodo=fecha_inicio,
+                fecha_fin_periodo=fecha_fin
+            )
+            campos = ('empleado_id', 'bonificacion_id')
+        if empleado_ids is not None:
+            otorgadas = otorgadas.filter(empleado_id__in=empleado_ids)
+        existentes = set(otorgadas.values_list(*campos))
+        return sorted(cumplen - existentes), sorted(cumplen & existentes), sorted(existentes - cumplen)
+
+    @staticmethod
+    def aplicar(sistema, fecha_evaluacion, resultados):
+        """Otorga en bloque lo que falte según los resultados de `evaluar`."""
+        if sistema == PuntoControlBonificaciones.SISTEMA_INCENTIVOS:
+            return BonificacionService.otorgar(resultados, fecha_evaluacion)
+        return BonificacionServiceV2.otorgar_bonificaciones(fecha_evaluacion, resultados=resultados)
+
+    @staticmethod
+    def guardar_punto_control(sistema, fecha_evaluacion, evaluado_en, empleados_evaluados):
+        fecha_inicio, fecha_fin = BonificacionServiceV2.periodo(fecha_evaluacion)
+        PuntoControlBonificaciones.objects.update_or_create(
+            sistema=sistema,
+            defaults={
+                'fecha_inicio_periodo': fecha_inicio,
+                'fecha_fin_periodo': fecha_fin,
+                'evaluado_en': evaluado_en,
+                'empleados_evaluados': empleados_evaluados,
+            }
+        )
+
+
+class EstadisticasLavadorService:
+    """
+    Estadísticas del dashboard del lavador en pocas consultas agrupadas, guardadas
+    en caché por empleado. La instantánea se descarta al completar o reasignar
+    reservas, al recibir calificaciones y al otorgar bonificaciones, y se
+    recalcula al cambiar el día.
+    """
+    PREFIJO = 'estadisticas_lavador'
+    TIMEOUT = 3600
+    # Con una caché local por proceso (LocMem) las invalidaciones solo llegan al
+    # proceso que hizo el cambio: los demás pueden mostrar datos viejos este tiempo
+    TIMEOUT_LOCAL = 5
+    SEMANAS = 4
+    DIAS = 7
+    DIAS_ESTADOS = 30
+
+    @staticmethod
+    def _clave(empleado_id):
+        return f'{EstadisticasLavadorService.PREFIJO}_{empleado_id}'
+
+    @staticmethod
+    def timeout():
+        """Vida de la instantánea en caché: TIMEOUT si la caché es compartida, si no TIMEOUT_LOCAL."""
+        if isinstance(caches['default'], LocMemCache):
+            return EstadisticasLavadorService.TIMEOUT_LOCAL
+        return EstadisticasLavadorService.TIMEOUT
+
+    @staticmethod
+    def invalidar(*empleado_ids):
+        claves = [EstadisticasLavadorService._clave(empleado_id) for empleado_id in empleado_ids if empleado_id]
+        if claves:
+            cache.delete_many(claves)
+
+    @staticmethod
+    def obtener(empleado):
+        """Retorna la instantánea del empleado, recalculándola si no existe o es de otro día."""
+        hoy = timezone.now().date()
+        estadisticas = cache.get(EstadisticasLavadorService._clave(empleado.pk))
+        if estadisticas is None or estadisticas['fecha'] != hoy:
+            estadisticas = EstadisticasLavadorService.calcular(empleado, hoy)
+            cache.set(EstadisticasLavadorService._clave(empleado.pk), estadisticas, EstadisticasLavadorService.timeout())
+        return estadisticas
+
+    @staticmethod
+    def calcular(empleado, hoy=None):
+        """
+        Calcula las estadísticas del empleado: series de 7 días y 4 semanas desde
+        una consulta agrupada por fecha, distribución de estados desde otra,
+        incentivos y bonificaciones con un agregado cada uno; las calificaciones
+        se leen de los agregados desnormalizados del empleado.
+        """
+        ahora = timezone.now()
+        hoy = hoy or ahora.date()
+        inicio_semana = hoy - timedelta(days=hoy.weekday())
+        inicio_mes = hoy.replace(day=1)
+        inicio_semanas = inicio_semana - timedelta(weeks=EstadisticasLavadorService.SEMANAS - 1)
+        inicio_dias = hoy - timedelta(days=EstadisticasLavadorService.DIAS - 1)
+        inicio_estados = hoy - timedelta(days=EstadisticasLavadorService.DIAS_ESTADOS)
+        desde = min(inicio_mes, inicio_semanas, inicio_dias)
+
+        # Servicios completados por día
+        completados = dict(
+            Reserva.objects.filter(
+                lavador=empleado,
+                estado=Reserva.COMPLETADA,
+                fecha_hora__gte=datetime.combine(desde, datetime.min.time()),
+                fecha_hora__lt=datetime.combine(hoy + timedelta(days=1), datetime.min.time()),
+            )
+            .order_by()
+            .annotate(fecha=TruncDate('fecha_hora'))
+            .values('fecha')
+            .annotate(total=Count('id'))
+            .values_list('fecha', 'total')
+        )
+
+        def completados_entre(inicio, fin):
+            return sum(total for fecha, total in completados.items() if inicio <= fecha <= fin)
+
+        rendimiento_semanal = []
+        for i in range(EstadisticasLavadorService.SEMANAS):
+            inicio_semana_i = inicio_semana - timedelta(weeks=i)
+            rendimiento_semanal.append({
+                'semana': f"Sem {EstadisticasLavadorService.SEMANAS - i}",
+                'servicios': completados_entre(inicio_semana_i, inicio_semana_i + timedelta(days=6))
+            })
+
+        dias = [hoy - timedelta(days=EstadisticasLavadorService.DIAS - 1 - i) for i in range(EstadisticasLavadorService.DIAS)]
+
+        # Distribución de estados (últimos 30 días), pendientes futuros y activas de hoy
+        estados = list(
+            Reserva.objects.filter(
+                lavador=empleado,
+                fecha_hora__gte=datetime.combine(inicio_estados, datetime.min.time())
+            )
+            .order_by()
+            .values('estado')
+            .annotate(
+                total=Count('id'),
+                futuras=Count('id', filter=Q(fecha_hora__gt=ahora)),
+                hoy=Count('id', filter=Q(fecha_hora__date=hoy)),
+            )
+            .order_by('estado')
+        )
+        nombres_estado = dict(Reserva.ESTADO_CHOICES)
+
+        incentivos_mes = empleado.incentivos.filter(fecha_otorgado__gte=inicio_mes).aggregate(total=Sum('monto'))['total'] or Decimal('0')
+        bonificaciones = empleado.bonificaciones_obtenidas.order_by().aggregate(
+            ganadas=Sum('monto', filter=Q(estado=BonificacionObtenida.ESTADO_PENDIENTE)),
+            cobradas=Sum('monto', filter=Q(estado=BonificacionObtenida.ESTADO_REDIMIDA)),
+            mes=Sum('monto', filter=Q(fecha_obtencion__gte=inicio_mes)),
+        )
+
+        return {
+            'fecha': hoy,
+            'servicios_hoy': completados.get(hoy, 0),
+            'servicios_semana': completados_entre(inicio_semana, hoy),
+            'servicios_mes': completados_entre(inicio_mes, hoy),
+            'servicios_pendientes': sum(
+                item['futuras'] for item in estados if item['estado'] in (Reserva.PENDIENTE, Reserva.CONFIRMADA)
+            ),
+            'reservas_activas_hoy': sum(
+                item['hoy'] for item in estados
+                if item['estado'] in (Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO)
+            ),
+            'estados_data': {
+                'labels': [str(nombres_estado.get(item['estado'], item['estado'])) for item in estados],
+                'data': [item['total'] for item in estados],
+            },
+            'rendimiento_semanal': rendimiento_semanal,
+            'grafico_labels': [dia.strftime('%d/%m') for dia in dias],
+            'grafico_data': [completados.get(dia, 0) for dia in dias],
+            'promedio_calificacion': empleado.calificacion_promedio,
+            'total_calificaciones': empleado.total_calificaciones,
+            'incentivos_mes': incentivos_mes,
+            'total_bonificaciones_ganadas': bonificaciones['ganadas'] or Decimal('0'),
+            'total_bonificaciones_cobradas': bonificaciones['cobradas'] or Decimal('0'),
+            'bonificaciones_v2_mes': bonificaciones['mes'] or Decimal('0'),
+        }
+
+
+class CalificacionesEmpleadoService:
+    """
+    Mantiene los agregados de calificaciones del empleado (total, suma e
+    histograma de 1 a 5 estrellas) para leer el promedio sin consultas.
+    """
+    ESTRELLAS = range(1, 6)
+
+    @staticmethod
+    def registrar(empleado_id, puntuacion, signo=1):
+        """Suma (signo=1) o descuenta (signo=-1) una calificación con una actualización atómica."""
+        if not empleado_id or puntuacion is None:
+            return
+        cambios = {
+            'total_calificaciones': F('total_calificaciones') + signo,
+            'suma_calificaciones': F('suma_calificaciones') + signo * puntuacion,
+        }
+        if puntuacion in CalificacionesEmpleadoService.ESTRELLAS:
+            campo = f'calificaciones_{puntuacion}'
+            cambios[campo] = F(campo) + signo
+        Empleado.objects.filter(pk=empleado_id).update(**cambios)
+
+    @staticmethod
+    def recalcular(empleado_ids=None):
+        """
+        Recalcula los agregados desde Calificacion con una consulta agrupada (todos
+        los empleados o los ids indicados). Retorna la cantidad de empleados corregidos.
+        """
+        conteos = {}
+        calificaciones = Calificacion.objects.order_by()
+        empleados = Empleado.objects.all()
+        if empleado_ids is not None:
+            calificaciones = calificaciones.filter(empleado_id__in=empleado_ids)
+            empleados = empleados.filter(pk__in=empleado_ids)
+        for empleado_id, puntuacion, total in calificaciones.values('empleado_id', 'puntuacion').annotate(
+            total=Count('id')
+        ).values_list('empleado_id', 'puntuacion', 'total'):
+            conteos.setdefault(empleado_id, {})[puntuacion] = total
+
+        campos = ['total_calificaciones', 'suma_calificaciones'] + [
+            f'calificaciones_{estrellas}' for estrellas in CalificacionesEmpleadoService.ESTRELLAS
+        ]
+        corregidos = []
+        for empleado in empleados.only(*campos):
+            por_puntuacion = conteos.get(empleado.pk, {})
+            valores = {
+                'total_calificaciones': sum(por_puntuacion.values()),
+                'suma_calificaciones': sum(puntuacion * total for puntuacion, total in por_puntuacion.items()),
+            }
+            for estrellas in CalificacionesEmpleadoService.ESTRELLAS:
+                valores[f'calificaciones_{estrellas}'] = por_puntuacion.get(estrellas, 0)
+            if any(getattr(empleado, campo) != valor for campo, valor in valores.items()):
+                for campo, valor in valores.items():
+                    setattr(empleado, campo, valor)
+                corregidos.append(empleado)
+        Empleado.objects.bulk_update(corregidos, campos, batch_size=500)
+        return len(corregidos)
@@ -0,0 +1,87 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from reservas.models import Reserva
+
+from .models import BonificacionObtenida, Calificacion, Incentivo, RegistroTiempo
+from .services import CalificacionesEmpleadoService, EstadisticasLavadorService, RachasEmpleadoService
+
+
+@receiver(post_init, sender=Reserva)
+def guardar_asignacion_lavador(sender, instance, **kwargs):
+    instance._lavador_estado_original = (instance.__dict__.get('lavador_id'), instance.__dict__.get('estado'))
+
+
+@receiver(post_save, sender=Reserva)
+def refrescar_estadisticas_por_reserva(sender, instance, created, **kwargs):
+    """Descarta las estadísticas de los lavadores afectados al asignar o cambiar de estado una reserva."""
+    lavador_original, estado_original = instance._lavador_estado_original
+    instance._lavador_estado_original = (instance.lavador_id, instance.estado)
+    if created or (instance.lavador_id, instance.estado) != (lavador_original, estado_original):
+        EstadisticasLavadorService.invalidar(instance.lavador_id)
+        if lavador_original != instance.lavador_id:
+            EstadisticasLavadorService.invalidar(lavador_original)
+
+
+@receiver(post_delete, sender=Reserva)
+def refrescar_estadisticas_reserva_eliminada(sender, instance, **kwargs):
+    EstadisticasLavadorService.invalidar(instance.lavador_id)
+
+
+@receiver(post_save, sender=Calificacion)
+@receiver(post_save, sender=Incentivo)
+@receiver(post_save, sender=BonificacionObtenida)
+@receiver(post_delete, sender=Calificacion)
+@receiver(post_delete, sender=Incentivo)
+@receiver(post_delete, sender=BonificacionObtenida)
+def refrescar_estadisticas_empleado(sender, instance, **kwargs):
+    EstadisticasLavadorService.invalidar(instance.empleado_id)
+
+
+@receiver(post_init, sender=Calificacion)
+def guardar_calificacion_original(sender, instance, **kwargs):
+    instance._calificacion_original = (instance.__dict__.get('empleado_id'), instance.__dict__.get('puntuacion'))
+
+
+@receiver(post_save, sender=Calificacion)
+def sumar_calificacion(sender, instance, created, **kwargs):
+    """Actualiza los agregados del empleado al crear o modificar una calificación."""
+    original = instance._calificacion_original
+    actual = (instance.empleado_id, instance.puntuacion)
+    instance._calificacion_original = actual
+    if created:
+        CalificacionesEmpleadoService.registrar(*actual)
+    elif actual != original:
+        CalificacionesEmpleadoService.registrar(*original, signo=-1)
+        CalificacionesEmpleadoService.registrar(*actual)
+
+
+@receiver(post_delete, sender=Calificacion)
+def descontar_calificacion(sender, instance, **kwargs):
+    CalificacionesEmpleadoService.registrar(*instance._calificacion_original, signo=-1)
+
+
+@receiver(post_init, sender=RegistroTiempo)
+def guardar_registro_original(sender, instance, **kwargs):
+    instance._registro_original = (
+        instance.__dict__.get('empleado_id'), instance.__dict__.get('hora_inicio'), instance.__dict__.get('hora_fin')
+    )
+
+
+@receiver(post_save, sender=RegistroTiempo)
+def actualizar_racha(sender, instance, created, **kwargs):
+    """Incorpora el día del registro a la racha del empleado al cerrarse el registro."""
+    empleado_original, inicio_original, fin_original = instance._registro_original
+    instance._registro_original = (instance.empleado_id, instance.hora_inicio, instance.hora_fin)
+    if created or fin_original is None:
+        if instance.hora_fin:
+            RachasEmpleadoService.incorporar(instance.hora_inicio.date(), [instance.empleado_id], corregir_anteriores=True)
+    elif (empleado_original, inicio_original.date()) != (instance.empleado_id, instance.hora_inicio.date()) or not instance.hora_fin:
+        # Un registro cerrado cambió de día o de empleado, o se reabrió
+        RachasEmpleadoService.reconstruir({empleado_original, instance.empleado_id})
+
+
+@receiver(post_delete, sender=RegistroTiempo)
+def descontar_racha(sender, instance, **kwargs):
+    if instance.hora_fin:
+        RachasEmpleadoService.reconstruir([instance.empleado_id])
@@ -5,8 +5,16 @@ from django.contrib.auth import get_user_model
 from autenticacion.models import Usuario
 from reservas.models import Servicio
 from clientes.models import Cliente
-from .models import Empleado, RegistroTiempo, Calificacion, Incentivo, TipoDocumento, Cargo
+from reservas.models import Reserva
+from .models import (
+    Empleado, RegistroTiempo, Calificacion, Incentivo, TipoDocumento, Cargo, Bonificacion, BonificacionObtenida,
+    ConfiguracionBonificacion, PuntoControlBonificaciones,
+)
+from django.core.management import call_command
+from .services import BonificacionService, BonificacionServiceV2, EstadisticasLavadorService, ProcesoBonificacionesService, RachasEmpleadoService
 import datetime
+import json
+from io import StringIO
 
 Usuario = get_user_model()
 
@@ -111,7 +119,8 @@ class EmpleadoModelTest(TestCase):
             comentario='Excelente servicio'
         )
         
-        # Verificar promedio
+        # Verificar promedio (los agregados se actualizan en la base de datos)
+        self.empleado.refresh_from_db()
         self.assertEqual(self.empleado.promedio_calificacion(), 4.5)
 
 class RegistroTiempoModelTest(TestCase):
@@ -351,3 +360,364 @@ class EmpleadoAPITest(TestCase):
         # self.assertEqual(response.json()['id'], self.empleado.id)
         # self.assertEqual(response.json()['nombre'], self.empleado.nombre)
         # self.assertEqual(response.json()['apellido'], self.empleado.apellido)
+
+
+class EstadisticasLavadorTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.usuario = Usuario.objects.create_user(
+            email='lavador@test.com',
+            password='password123',
+            rol=Usuario.ROL_LAVADOR
+        )
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(codigo='CC', defaults={'nombre': 'Cédula de Ciudadanía'})
+        cargo, _ = Cargo.objects.get_or_create(codigo='LAV', defaults={'nombre': 'Lavador'})
+        self.empleado = Empleado.objects.create(
+            usuario=self.usuario,
+            nombre='Juan',
+            apellido='Pérez',
+            tipo_documento=tipo_documento,
+            numero_documento='1234567890',
+            telefono='3001234567',
+            direccion='Calle 123',
+            ciudad='Bogotá',
+            cargo=cargo,
+            fecha_contratacion=datetime.date.today()
+        )
+        cliente_usuario = Usuario.objects.create_user(email='cliente@test.com', password='password123', rol=Usuario.ROL_CLIENTE)
+        self.cliente = Cliente.objects.create(
+            usuario=cliente_usuario,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.servicio = Servicio.objects.create(nombre='Lavado Básico', descripcion='Exterior', precio=30000, duracion_minutos=30)
+        self.client.force_login(self.usuario)
+
+    def crear_reserva(self, dias_atras, hora, estado):
+        fecha = datetime.date.today() - datetime.timedelta(days=dias_atras)
+        return Reserva.objects.create(
+            cliente=self.cliente,
+            servicio=self.servicio,
+            lavador=self.empleado,
+            fecha_hora=datetime.datetime.combine(fecha, datetime.time(hora, 0)),
+            estado=estado
+        )
+
+    def test_instantanea_en_cache_y_refresco(self):
+        self.crear_reserva(0, 1, Reserva.COMPLETADA)
+        self.crear_reserva(1, 8, Reserva.COMPLETADA)
+        pendiente = self.crear_reserva(0, 2, Reserva.EN_PROCESO)
+
+        respuesta = self.client.get(reverse('empleados_dashboard:api_estadisticas'))
+        estadisticas = respuesta.json()['estadisticas']
+        self.assertEqual(estadisticas['reservas_hoy'], 1)
+        self.assertEqual(estadisticas['reservas_mes'], EstadisticasLavadorService.calcular(self.empleado)['servicios_mes'])
+
+        # La segunda lectura sale de la caché
+        with self.assertNumQueries(3):  # sesión, usuario y empleado
+            self.client.get(reverse('empleados_dashboard:api_estadisticas'))
+
+        respuesta = self.client.get(reverse('empleados_dashboard:dashboard'))
+        self.assertEqual(respuesta.context['reservas_hoy'], 1)
+        self.assertEqual(json.loads(respuesta.context['grafico_data'])[-2:], [1, 1])
+
+        # Completar una reserva y calificar refrescan la instantánea
+        pendiente.estado = Reserva.COMPLETADA
+        pendiente.save()
+        Calificacion.objects.create(empleado=self.empleado, servicio=self.servicio, cliente=self.cliente,
+                                    reserva=pendiente, puntuacion=4)
+        estadisticas = self.client.get(reverse('empleados_dashboard:api_estadisticas')).json()['estadisticas']
+        self.assertEqual(estadisticas['reservas_hoy'], 0)
+        self.assertEqual(estadisticas['calificacion_promedio'], 4)
+        self.assertEqual(EstadisticasLavadorService.obtener(self.empleado)['servicios_hoy'], 2)
+
+        # Con LocMem cada proceso tiene su propia caché: la instantánea dura segundos
+        self.assertEqual(EstadisticasLavadorService.timeout(), EstadisticasLavadorService.TIMEOUT_LOCAL)
+        compartida = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/estadisticas-lavador-test'}}
+        with self.settings(CACHES=compartida):
+            self.assertEqual(EstadisticasLavadorService.timeout(), EstadisticasLavadorService.TIMEOUT)
+
+
+class AgregadosCalificacionesTest(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user(email='lavador@test.com', password='password123', rol=Usuario.ROL_LAVADOR)
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(codigo='CC', defaults={'nombre': 'Cédula de Ciudadanía'})
+        cargo, _ = Cargo.objects.get_or_create(codigo='LAV', defaults={'nombre': 'Lavador'})
+        self.empleado = Empleado.objects.create(
+            usuario=usuario,
+            nombre='Juan',
+            apellido='Pérez',
+            tipo_documento=tipo_documento,
+            numero_documento='1234567890',
+            telefono='3001234567',
+            direccion='Calle 123',
+            ciudad='Bogotá',
+            cargo=cargo,
+            fecha_contratacion=datetime.date.today()
+        )
+        cliente_usuario = Usuario.objects.create_user(email='cliente@test.com', password='password123', rol=Usuario.ROL_CLIENTE)
+        self.cliente = Cliente.objects.create(
+            usuario=cliente_usuario,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.servicio = Servicio.objects.create(nombre='Lavado Básico', descripcion='Exterior', precio=30000, duracion_minutos=30)
+
+    def calificar(self, puntuacion):
+        return Calificacion.objects.create(empleado=self.empleado, servicio=self.servicio, cliente=self.cliente,
+                                           puntuacion=puntuacion)
+
+    def test_agregados_al_crear_editar_y_borrar(self):
+        self.calificar(5)
+        editada = self.calificar(2)
+        self.calificar(5)
+        editada.puntuacion = 3
+        editada.save()
+        self.calificar(1).delete()
+
+        self.empleado.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertAlmostEqual(self.empleado.promedio_calificacion(), 13 / 3)
+            self.assertEqual(self.empleado.distribucion_calificaciones(), [(1, 0), (2, 0), (3, 1), (4, 0), (5, 2)])
+        self.assertEqual(self.empleado.total_calificaciones, 3)
+
+    def test_comando_repara_agregados(self):
+        self.calificar(4)
+        self.calificar(5)
+        Empleado.objects.filter(pk=self.empleado.pk).update(total_calificaciones=7, suma_calificaciones=1, calificaciones_4=0)
+
+        call_command('recalcular_calificaciones_empleados', stdout=StringIO())
+
+        self.empleado.refresh_from_db()
+        self.assertEqual(self.empleado.total_calificaciones, 2)
+        self.assertEqual(self.empleado.promedio_calificacion(), 4.5)
+        self.assertEqual(self.empleado.calificaciones_4, 1)
+
+
+class EvaluacionBonificacionesTest(TestCase):
+    def setUp(self):
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(codigo='CC', defaults={'nombre': 'Cédula de Ciudadanía'})
+        cargo, _ = Cargo.objects.get_or_create(codigo='LAV', defaults={'nombre': 'Lavador'})
+        self.empleados = [
+            Empleado.objects.create(
+                usuario=Usuario.objects.create_user(email=f'lavador{i}@test.com', password='password123', rol=Usuario.ROL_LAVADOR),
+                nombre=f'Lavador {i}',
+                apellido='Test',
+                tipo_documento=tipo_documento,
+                numero_documento=f'10000{i}',
+                telefono='3001234567',
+                direccion='Calle 123',
+                ciudad='Bogotá',
+                cargo=cargo,
+                fecha_contratacion=datetime.date.today()
+            )
+            for i in range(3)
+        ]
+        cliente_usuario = Usuario.objects.create_user(email='cliente@test.com', password='password123', rol=Usuario.ROL_CLIENTE)
+        self.cliente = Cliente.objects.create(
+            usuario=cliente_usuario,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.servicio = Servicio.objects.create(nombre='Lavado Básico', descripcion='Exterior', precio=30000, duracion_minutos=30)
+        self.hoy = datetime.date.today()
+
+    def servicio_completado(self, empleado, dias_atras, puntuacion):
+        reserva = Reserva.objects.create(
+            cliente=self.cliente,
+            servicio=self.servicio,
+            lavador=empleado,
+            fecha_hora=datetime.datetime.combine(self.hoy - datetime.timedelta(days=dias_atras), datetime.time(9, 0)),
+            estado=Reserva.COMPLETADA
+        )
+        Calificacion.objects.create(empleado=empleado, servicio=self.servicio, cliente=self.cliente,
+                                    reserva=reserva, puntuacion=puntuacion)
+        inicio = reserva.fecha_hora
+        RegistroTiempo.objects.create(empleado=empleado, servicio=self.servicio, hora_inicio=inicio,
+                                      hora_fin=inicio + datetime.timedelta(minutes=30))
+
+    def test_otorga_bonificaciones_v2_en_lote(self):
+        # Lavador 0: 3 días seguidos con buena calificación; lavador 1: calificación baja
+        for dias_atras in range(3):
+            self.servicio_completado(self.empleados[0], dias_atras, 5)
+            self.servicio_completado(self.empleados[1], dias_atras, 2)
+        bonificacion = Bonificacion.objects.create(
+            nombre='Constancia', descripcion='Tres días', dias_consecutivos_requeridos=3,
+            servicios_requeridos=3, calificacion_minima=4, monto_bonificacion=50000
+        )
+
+        metricas = BonificacionServiceV2.evaluar_empleado_para_bonificacion(self.empleados[1], bonificacion)
+        self.assertEqual((metricas['dias_consecutivos'], metricas['servicios_realizados']), (3, 3))
+        self.assertFalse(metricas['cumple_criterios'])
+
+        # Empleados, bonificaciones, tres métricas, existentes e inserción
+        with self.assertNumQueries(7):
+            nuevas = BonificacionServiceV2.otorgar_bonificaciones()
+        self.assertEqual([obtenida.empleado_id for obtenida in nuevas], [self.empleados[0].pk])
+        obtenida = BonificacionObtenida.objects.get()
+        self.assertEqual(obtenida.calificacion_promedio, 5)
+        self.assertEqual(BonificacionServiceV2.otorgar_bonificaciones(), [])
+
+    def test_bonificaciones_automaticas_en_lote(self):
+        for dias_atras in range(2):
+            self.servicio_completado(self.empleados[0], dias_atras, 4)
+        self.servicio_completado(self.empleados[2], 0, 5)
+        ConfiguracionBonificacion.objects.create(
+            nombre='Dos servicios', descripcion='Mensual', tipo=ConfiguracionBonificacion.TIPO_MENSUAL,
+            servicios_requeridos=2, calificacion_minima=4, monto_bonificacion=20000
+        )
+
+        simuladas = BonificacionService.evaluar_bonificaciones_automaticas(dry_run=True)
+        self.assertEqual([item['empleado'].pk for item in simuladas], [self.empleados[0].pk])
+        self.assertFalse(Incentivo.objects.exists())
+
+        otorgadas = BonificacionService.evaluar_bonificaciones_automaticas()
+        self.assertEqual(len(otorgadas), 1)
+        incentivo = Incentivo.objects.get()
+        self.assertEqual((incentivo.empleado, incentivo.servicios_completados), (self.empleados[0], 2))
+        self.assertEqual(BonificacionService.evaluar_bonificaciones_automaticas(), [])
+
+    def test_procesar_bonificaciones_incremental(self):
+        for dias_atras in range(2):
+            self.servicio_completado(self.empleados[0], dias_atras, 4)
+        self.servicio_completado(self.empleados[1], 3, 5)
+        ConfiguracionBonificacion.objects.create(
+            nombre='Dos servicios', descripcion='Mensual', tipo=ConfiguracionBonificacion.TIPO_MENSUAL,
+            servicios_requeridos=2, calificacion_minima=4, monto_bonificacion=20000
+        )
+        opciones = {'sistema': [PuntoControlBonificaciones.SISTEMA_INCENTIVOS]}
+
+        # Dry-run: reporta la diferencia sin escribir ni guardar punto de control
+        salida = StringIO()
+        call_command('procesar_bonificaciones', dry_run=True, stdout=salida, **opciones)
+        self.assertIn('+ Lavador 0 Test: Dos servicios', salida.getvalue())
+        self.assertFalse(Incentivo.objects.exists())
+        self.assertFalse(PuntoControlBonificaciones.objects.exists())
+
+        call_command('procesar_bonificaciones', stdout=StringIO(), **opciones)
+        self.assertEqual(list(Incentivo.objects.values_list('empleado_id', flat=True)), [self.empleados[0].pk])
+
+        salida = StringIO()
+        call_command('procesar_bonificaciones', stdout=salida, **opciones)
+        self.assertIn('sin cambios', salida.getvalue())
+
+        # Solo se reevalúa al empleado con una reserva nueva
+        self.servicio_completado(self.empleados[1], 1, 4)
+        salida = StringIO()
+        call_command('procesar_bonificaciones', stdout=salida, **opciones)
+        self.assertIn('evaluación incremental de 1 empleados', salida.getvalue())
+        self.assertEqual(Incentivo.objects.filter(empleado=self.empleados[1]).count(), 1)
+
+
+    def test_procesar_bonificaciones_diario_es_incremental(self):
+        # Lavador 0 cumple ayer y hoy; lavador 1 solo con el día que entra a la ventana;
+        # lavador 2 deja de cumplir con el día que sale
+        for dias_atras in (2, 3):
+            self.servicio_completado(self.empleados[0], dias_atras, 4)
+        for dias_atras in (0, 3):
+            self.servicio_completado(self.empleados[1], dias_atras, 5)
+        for dias_atras in (5, 31):
+            self.servicio_completado(self.empleados[2], dias_atras, 5)
+        for calificacion in Calificacion.objects.select_related('reserva'):
+            Calificacion.objects.filter(pk=calificacion.pk).update(fecha_calificacion=calificacion.reserva.fecha_hora)
+        ConfiguracionBonificacion.objects.create(
+            nombre='Dos servicios', descripcion='Mensual', tipo=ConfiguracionBonificacion.TIPO_MENSUAL,
+            servicios_requeridos=2, calificacion_minima=4, monto_bonificacion=20000
+        )
+        opciones = {'sistema': [PuntoControlBonificaciones.SISTEMA_INCENTIVOS]}
+        ayer = (self.hoy - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+        call_command('procesar_bonificaciones', fecha=ayer, stdout=StringIO(), **opciones)
+        self.assertEqual(sorted(Incentivo.objects.values_list('empleado_id', flat=True)),
+                         [self.empleados[0].pk, self.empleados[2].pk])
+
+        # El período avanzó un día: solo se reevalúan los empleados con datos en los bordes
+        salida = StringIO()
+        call_command('procesar_bonificaciones', fecha=self.hoy.strftime('%Y-%m-%d'), stdout=salida, **opciones)
+        self.assertIn('evaluación incremental de 2 empleados', salida.getvalue())
+        self.assertEqual(
+            ProcesoBonificacionesService.empleados_en_bordes(
+                PuntoControlBonificaciones.SISTEMA_INCENTIVOS,
+                BonificacionServiceV2.periodo(self.hoy - datetime.timedelta(days=1)),
+                BonificacionServiceV2.periodo(self.hoy)
+            ),
+            {self.empleados[1].pk, self.empleados[2].pk}
+        )
+        self.assertEqual(Incentivo.objects.filter(empleado=self.empleados[1]).count(), 1)
+        self.assertEqual(Incentivo.objects.count(), 3)
+
+        # Una evaluación completa no encuentra nada que el incremental haya omitido
+        salida = StringIO()
+        call_command('procesar_bonificaciones', completo=True, dry_run=True, stdout=salida, **opciones)
+        self.assertIn('0 nuevas', salida.getvalue())
+
+class RachasEmpleadoTest(TestCase):
+    def setUp(self):
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(codigo='CC', defaults={'nombre': 'Cédula de Ciudadanía'})
+        cargo, _ = Cargo.objects.get_or_create(codigo='LAV', defaults={'nombre': 'Lavador'})
+        self.empleado = Empleado.objects.create(
+            usuario=Usuario.objects.create_user(email='lavador@test.com', password='password123', rol=Usuario.ROL_LAVADOR),
+            nombre='Juan',
+            apellido='Pérez',
+            tipo_documento=tipo_documento,
+            numero_documento='1234567890',
+            telefono='3001234567',
+            direccion='Calle 123',
+            ciudad='Bogotá',
+            cargo=cargo,
+            fecha_contratacion=datetime.date.today()
+        )
+        self.servicio = Servicio.objects.create(nombre='Lavado Básico', descripcion='Exterior', precio=30000, duracion_minutos=30)
+        self.hoy = datetime.date.today()
+
+    def registrar(self, dias_atras, cerrado=True):
+        inicio = datetime.datetime.combine(self.hoy - datetime.timedelta(days=dias_atras), datetime.time(9, 0))
+        return RegistroTiempo.objects.create(empleado=self.empleado, servicio=self.servicio, hora_inicio=inicio,
+                                             hora_fin=inicio + datetime.timedelta(hours=1) if cerrado else None)
+
+    def test_rachas_incrementales(self):
+        # Islas: [9, 8, 7, 6] y [2, 1]; el día 2 llega tarde y se corrige
+        for dias_atras in (9, 8, 7, 6, 1):
+            self.registrar(dias_atras)
+        abierto = self.registrar(0, cerrado=False)
+        self.registrar(2)
+
+        self.empleado.refresh_from_db()
+        self.assertEqual((self.empleado.racha_actual, self.empleado.racha_maxima), (2, 4))
+        self.assertEqual(self.empleado.racha_vigente(), 2)
+
+        abierto.hora_fin = abierto.hora_inicio + datetime.timedelta(hours=1)
+        abierto.save()
+        self.empleado.refresh_from_db()
+        self.assertEqual(self.empleado.racha_actual, 3)
+        self.assertEqual(RachasEmpleadoService.dias_consecutivos(self.hoy), {self.empleado.pk: 3})
+        # Fecha anterior a la racha guardada: se calcula desde el historial
+        self.assertEqual(RachasEmpleadoService.dias_consecutivos(self.hoy - datetime.timedelta(days=6)), {self.empleado.pk: 4})
+
+        abierto.delete()
+        self.empleado.refresh_from_db()
+        self.assertEqual((self.empleado.racha_actual, self.empleado.ultimo_dia_trabajado),
+                         (2, self.hoy - datetime.timedelta(days=1)))
+
+    def test_comando_procesa_dia_y_reconstruye(self):
+        self.registrar(1)
+        registro = self.registrar(0, cerrado=False)
+        # update() no emite señales: la ejecución diaria incorpora el día
+        RegistroTiempo.objects.filter(pk=registro.pk).update(hora_fin=registro.hora_inicio + datetime.timedelta(hours=1))
+        call_command('actualizar_rachas_empleados', stdout=StringIO())
+        self.empleado.refresh_from_db()
+        self.assertEqual(self.empleado.racha_actual, 2)
+
+        Empleado.objects.filter(pk=self.empleado.pk).update(racha_actual=0, racha_maxima=9)
+        call_command('actualizar_rachas_empleados', reconstruir=True, stdout=StringIO())
+        self.empleado.refresh_from_db()
+        self.assertEqual((self.empleado.racha_actual, self.empleado.racha_maxima), (2, 2))
@@ -14,7 +14,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from autenticacion.mixins import RolRequiredMixin, AdminAutolavadoRequiredMixin, GerenteRequiredMixin
 from autenticacion.models import Usuario
 from reservas.models import Reserva
-from .models import Empleado, RegistroTiempo, Calificacion, Incentivo, Cargo, TipoDocumento, ConfiguracionBonificacion, Bonificacion, BonificacionObtenida
+from .models import Empleado, RegistroTiempo, Incentivo, Cargo, TipoDocumento, ConfiguracionBonificacion, Bonificacion, BonificacionObtenida
 from .forms import (
     EmpleadoPerfilForm, RegistroTiempoForm, EmpleadoRegistroForm, CambiarPasswordForm, EmpleadoEditForm,
     ConfiguracionBonificacionForm, IncentivoForm, RedimirBonificacionForm, FiltrosBonificacionesForm
@@ -47,7 +47,8 @@ class EmpleadoDetailView(LoginRequiredMixin, RolRequiredMixin, DetailView):
         
         # Obtener calificaciones del empleado
         context['calificaciones'] = empleado.calificaciones.all().order_by('-fecha_calificacion')[:10]
-        context['promedio_calificacion'] = empleado.calificaciones.aggregate(promedio=Avg('puntuacion'))['promedio'] or 0
+        context['promedio_calificacion'] = empleado.calificacion_promedio
+        context['racha_actual'] = empleado.racha_vigente()
         
         # Obtener registros de tiempo recientes
         context['registros_tiempo'] = empleado.registros_tiempo.all().order_by('-hora_inicio')[:10]
@@ -355,20 +356,19 @@ def api_calificaciones_empleado(request, empleado_id):
     if request.user.rol not in [Usuario.ROL_ADMIN_SISTEMA, Usuario.ROL_ADMIN_AUTOLAVADO, Usuario.ROL_GERENTE] and (not hasattr(empleado, 'usuario') or request.user != empleado.usuario):
         return JsonResponse({'error': 'No tienes permisos para ver esta información'}, status=403)
     
-    # Obtener calificaciones agrupadas por puntuación
-    calificaciones_por_puntuacion = Calificacion.objects.filter(empleado=empleado).values('puntuacion').annotate(total=Count('puntuacion')).order_by('puntuacion')
-    
-    # Obtener promedio de calificaciones
-    promedio = Calificacion.objects.filter(empleado=empleado).aggregate(promedio=Avg('puntuacion'))['promedio'] or 0
+    # Calificaciones agrupadas por puntuación, desde los agregados del empleado
+    calificaciones_por_puntuacion = [
+        (estrellas, total) for estrellas, total in empleado.distribucion_calificaciones() if total
+    ]
     
     # Formatear datos para gráficos
-    labels = [f"{c['puntuacion']} estrellas" for c in calificaciones_por_puntuacion]
-    data = [c['total'] for c in calificaciones_por_puntuacion]
+    labels = [f"{estrellas} estrellas" for estrellas, total in calificaciones_por_puntuacion]
+    data = [total for estrellas, total in calificaciones_por_puntuacion]
     
     return JsonResponse({
         'labels': labels,
         'data': data,
-        'promedio': round(promedio, 2)
+        'promedio': round(empleado.calificacion_promedio, 2)
     })
 
 
@@ -11,6 +11,7 @@ import json
 import uuid
 from .models import Empleado, Calificacion, Incentivo, Bonificacion, BonificacionObtenida, ConfiguracionBonificacion
 from .forms import EmpleadoPerfilForm
+from .services import EstadisticasLavadorService
 from reservas.models import Reserva, Servicio
 
 
@@ -33,11 +34,7 @@ def dashboard_lavador(request):
         # Si no tiene registro de empleado, crear contexto básico
         pass
     
-    # Fechas para filtros
-    hoy = timezone.now().date()
     ahora = timezone.now()
-    inicio_semana = hoy - timedelta(days=hoy.weekday())
-    inicio_mes = hoy.replace(day=1)
     
     # Si no hay empleado asociado, mostrar dashboard básico
     if not empleado:
@@ -66,39 +63,8 @@ def dashboard_lavador(request):
         }
         return render(request, 'empleados/dashboard/dashboard.html', context)
     
-    # Servicios pendientes (asignados pero aún no es tiempo)
-    servicios_pendientes = empleado.reservas_asignadas.filter(
-        fecha_hora__gt=ahora,
-        estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA]
-    ).count()
-    
-    # Servicios completados del mes
-    servicios_completados = empleado.reservas_asignadas.filter(
-        estado=Reserva.COMPLETADA,
-        fecha_hora__date__gte=inicio_mes
-    ).count()
-    
-    # Servicios completados hoy
-    servicios_hoy = empleado.reservas_asignadas.filter(
-        fecha_hora__date=hoy,
-        estado=Reserva.COMPLETADA
-    ).count()
-    
-    # Servicios completados esta semana
-    servicios_semana = empleado.reservas_asignadas.filter(
-        fecha_hora__date__gte=inicio_semana,
-        fecha_hora__date__lte=hoy,
-        estado=Reserva.COMPLETADA
-    ).count()
-    
-    # Calificación promedio
-    promedio_calificacion = empleado.promedio_calificacion()
-    total_calificaciones = empleado.calificaciones.count()
-    
-    # Bonificaciones del mes (sistema antiguo)
-    bonificaciones_mes = empleado.incentivos.filter(
-        fecha_otorgado__gte=inicio_mes
-    ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
+    # Contadores, series y totales desde la instantánea en caché del empleado
+    stats = EstadisticasLavadorService.obtener(empleado)
     
     # ===== BONIFICACIONES V2 =====
     # Bonificaciones ganadas (pendientes de redimir)
@@ -114,25 +80,11 @@ def dashboard_lavador(request):
     # Programas de bonificaciones disponibles
     programas_bonificaciones = Bonificacion.objects.filter(activo=True)[:2]  # Mostrar solo 2 programas
     
-    # Totales de bonificaciones V2
-    total_bonificaciones_ganadas = empleado.bonificaciones_obtenidas.filter(
-        estado=BonificacionObtenida.ESTADO_PENDIENTE
-    ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-    
-    total_bonificaciones_cobradas = empleado.bonificaciones_obtenidas.filter(
-        estado=BonificacionObtenida.ESTADO_REDIMIDA
-    ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-    
-    # Bonificaciones V2 del mes
-    bonificaciones_v2_mes = empleado.bonificaciones_obtenidas.filter(
-        fecha_obtencion__gte=inicio_mes
-    ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-    
     # Próximos servicios (próximos 5 servicios programados)
-    servicios_proximos = empleado.reservas_asignadas.filter(
+    servicios_proximos = list(empleado.reservas_asignadas.filter(
         fecha_hora__gt=ahora,
         estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA]
-    ).select_related('servicio', 'vehiculo', 'bahia', 'cliente').order_by('fecha_hora')[:5]
+    ).select_related('servicio', 'vehiculo', 'bahia', 'cliente').order_by('fecha_hora')[:5])
 
     # Servicio siguiente (el más cercano) y el resto
     servicio_siguiente = servicios_proximos[0] if servicios_proximos else None
@@ -151,85 +103,44 @@ def dashboard_lavador(request):
     # Incentivos recientes
     incentivos_recientes = empleado.incentivos.all()[:3]
     
-    # Distribución de estados de reservas (últimos 30 días)
-    fecha_30_dias = hoy - timedelta(days=30)
-    estados_reservas = empleado.reservas_asignadas.filter(
-        fecha_hora__date__gte=fecha_30_dias
-    ).values('estado').annotate(
-        count=Count('id')
-    ).order_by('estado')
-    
-    # Preparar datos para gráficos
-    estados_data = {
-        'labels': [str(dict(Reserva.ESTADO_CHOICES).get(item['estado'], item['estado'])) for item in estados_reservas],
-        'data': [item['count'] for item in estados_reservas]
-    }
-    
-    # Rendimiento semanal (últimas 4 semanas)
-    rendimiento_semanal = []
-    for i in range(4):
-        inicio_semana_i = inicio_semana - timedelta(weeks=i)
-        fin_semana_i = inicio_semana_i + timedelta(days=6)
-        servicios_semana_i = empleado.reservas_asignadas.filter(
-            fecha_hora__date__gte=inicio_semana_i,
-            fecha_hora__date__lte=fin_semana_i,
-            estado=Reserva.COMPLETADA
-        ).count()
-        rendimiento_semanal.append({
-            'semana': f"Sem {4-i}",
-            'servicios': servicios_semana_i
-        })
-    
-    # Datos para el gráfico de servicios de los últimos 7 días
-    grafico_labels = []
-    grafico_data = []
-    for i in range(7):
-        fecha = hoy - timedelta(days=6-i)
-        servicios_dia = empleado.reservas_asignadas.filter(
-            fecha_hora__date=fecha,
-            estado=Reserva.COMPLETADA
-        ).count()
-        grafico_labels.append(fecha.strftime('%d/%m'))
-        grafico_data.append(servicios_dia)
-    
     # Servicios activos para tarjetas
     servicios_en_proceso = empleado.reservas_asignadas.filter(estado=Reserva.EN_PROCESO).select_related('servicio','vehiculo','bahia','cliente')
     servicios_confirmados = empleado.reservas_asignadas.filter(estado=Reserva.CONFIRMADA).select_related('servicio','vehiculo','bahia','cliente')
 
     context = {
         'empleado': empleado,
-        'reservas_hoy': servicios_hoy,
-        'reservas_semana': servicios_semana,
-        'reservas_mes': servicios_completados,
-        'promedio_calificacion': promedio_calificacion,
-        'total_calificaciones': total_calificaciones,
+        'reservas_hoy': stats['servicios_hoy'],
+        'reservas_semana': stats['servicios_semana'],
+        'reservas_mes': stats['servicios_mes'],
+        'promedio_calificacion': stats['promedio_calificacion'],
+        'total_calificaciones': stats['total_calificaciones'],
         'servicio_siguiente': servicio_siguiente,
         'proximas_reservas': servicios_proximos,
         'otros_servicios_proximos': otros_servicios_proximos,
         'servicios_recientes': servicios_recientes,
         'calificaciones_recientes': calificaciones_recientes,
         'incentivos_recientes': incentivos_recientes,
-        'total_incentivos_mes': bonificaciones_mes,
-        'estados_data': json.dumps(estados_data),
-        'rendimiento_semanal': json.dumps(rendimiento_semanal),
-        'grafico_labels': json.dumps(grafico_labels),
-        'grafico_data': json.dumps(grafico_data),
+        'total_incentivos_mes': stats['incentivos_mes'],
+        'estados_data': json.dumps(stats['estados_data']),
+        'rendimiento_semanal': json.dumps(stats['rendimiento_semanal']),
+        'grafico_labels': json.dumps(stats['grafico_labels']),
+        'grafico_data': json.dumps(stats['grafico_data']),
         'servicios_en_proceso': servicios_en_proceso,
         'servicios_confirmados': servicios_confirmados,
         # ===== BONIFICACIONES V2 =====
         'bonificaciones_ganadas': bonificaciones_ganadas,
         'bonificaciones_cobradas': bonificaciones_cobradas,
         'programas_bonificaciones': programas_bonificaciones,
-        'total_bonificaciones_ganadas': total_bonificaciones_ganadas,
-        'total_bonificaciones_cobradas': total_bonificaciones_cobradas,
-        'bonificaciones_v2_mes': bonificaciones_v2_mes,
+        'total_bonificaciones_ganadas': stats['total_bonificaciones_ganadas'],
+        'total_bonificaciones_cobradas': stats['total_bonificaciones_cobradas'],
+        'bonificaciones_v2_mes': stats['bonificaciones_v2_mes'],
         'estadisticas': {
-            'servicios_pendientes': servicios_pendientes,
-            'servicios_completados': servicios_completados,
-            'servicios_hoy': servicios_hoy,
-            'servicios_semana': servicios_semana,
-            'calificacion_promedio': promedio_calificacion,
-            'bonificaciones_mes': bonificaciones_mes + bonificaciones_v2_mes,  # Combinar ambos sistemas
+            'servicios_pendientes': stats['servicios_pendientes'],
+            'servicios_completados': stats['servicios_mes'],
+            'servicios_hoy': stats['servicios_hoy'],
+            'servicios_semana': stats['servicios_semana'],
+            'calificacion_promedio': stats['promedio_calificacion'],
+            'bonificaciones_mes': stats['incentivos_mes'] + stats['bonificaciones_v2_mes'],  # Combinar ambos sistemas
         }
     }
     
@@ -421,13 +332,14 @@ def calificaciones_empleado(request):
     calificaciones = empleado.calificaciones.all().order_by('-fecha_calificacion')
     
     # Estadísticas de calificaciones
-    total_calificaciones = calificaciones.count()
+    total_calificaciones = empleado.total_calificaciones
     promedio_calificacion = empleado.promedio_calificacion()
     
-    # Distribución por puntuación
-    distribucion = calificaciones.values('puntuacion').annotate(
-        count=Count('id')
-    ).order_by('puntuacion')
+    # Distribución por puntuación (agregados desnormalizados del empleado)
+    distribucion = [
+        {'puntuacion': estrellas, 'count': cantidad}
+        for estrellas, cantidad in empleado.distribucion_calificaciones() if cantidad
+    ]
     
     # Calificaciones por mes (últimos 6 meses)
     hoy = timezone.now().date()
@@ -685,10 +597,17 @@ def calificaciones_empleado(request):
             Q(comentario__icontains=buscar)
         )
     
+    # Sin filtros, los totales y la distribución salen de los agregados del empleado
+    filtrado = any([calificacion_filtro, fecha_desde, fecha_hasta, buscar])
+    if filtrado:
+        conteos = dict(calificaciones.order_by().values_list('puntuacion').annotate(total=Count('id')))
+    else:
+        conteos = dict(empleado.distribucion_calificaciones())
+    
     # Estadísticas
     estadisticas = {
-        'promedio': calificaciones.aggregate(Avg('puntuacion'))['puntuacion__avg'] or 0,
-        'total': calificaciones.count(),
+        'promedio': (calificaciones.aggregate(Avg('puntuacion'))['puntuacion__avg'] or 0) if filtrado else empleado.calificacion_promedio,
+        'total': sum(conteos.values()),
         'este_mes': calificaciones.filter(
             fecha_calificacion__month=timezone.now().month,
             fecha_calificacion__year=timezone.now().year
@@ -698,7 +617,7 @@ def calificaciones_empleado(request):
     # Distribución de calificaciones
     distribucion = []
     for i in range(1, 6):
-        cantidad = calificaciones.filter(puntuacion=i).count()
+        cantidad = conteos.get(i, 0)
         porcentaje = (cantidad / estadisticas['total'] * 100) if estadisticas['total'] > 0 else 0
         distribucion.append({
             'estrellas': i,
@@ -1071,38 +990,15 @@ def api_estadisticas(request):
     """
     try:
         empleado = request.user.empleado
-        hoy = timezone.now().date()
-        inicio_semana = hoy - timedelta(days=hoy.weekday())
-        inicio_mes = hoy.replace(day=1)
-        
-        # Estadísticas básicas
-        reservas_hoy = empleado.reservas_asignadas.filter(
-            fecha_hora__date=hoy,
-            estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-        ).count()
-        
-        reservas_semana = empleado.reservas_asignadas.filter(
-            fecha_hora__date__gte=inicio_semana,
-            estado=Reserva.COMPLETADA
-        ).count()
-        
-        reservas_mes = empleado.reservas_asignadas.filter(
-            fecha_hora__date__gte=inicio_mes,
-            estado=Reserva.COMPLETADA
-        ).count()
-        
-        # Calificación promedio
-        calificacion_promedio = empleado.calificaciones.aggregate(
-            promedio=Avg('puntuacion')
-        )['promedio'] or 0
+        stats = EstadisticasLavadorService.obtener(empleado)
         
         return JsonResponse({
             'success': True,
             'estadisticas': {
-                'reservas_hoy': reservas_hoy,
-                'reservas_semana': reservas_semana,
-                'reservas_mes': reservas_mes,
-                'calificacion_promedio': round(calificacion_promedio, 1),
+                'reservas_hoy': stats['reservas_activas_hoy'],
+                'reservas_semana': stats['servicios_semana'],
+                'reservas_mes': stats['servicios_mes'],
+                'calificacion_promedio': round(stats['promedio_calificacion'], 1),
                 'disponible': empleado.disponible
             }
         })
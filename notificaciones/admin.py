@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import Notificacion, ConfiguracionNotificaciones
+from .models import Notificacion, ConfiguracionNotificaciones, EnvioMasivo, NotificacionArchivada
+from .services import ContadorNotificacionesService
 
 # Register your models here.
 
@@ -36,8 +37,7 @@ class NotificacionAdmin(admin.ModelAdmin):
         """
         Acción para marcar múltiples notificaciones como leídas.
         """
-        for notificacion in queryset:
-            notificacion.marcar_como_leida()
+        ContadorNotificacionesService.marcar_leidas(queryset)
         self.message_user(request, _('Las notificaciones seleccionadas han sido marcadas como leídas.'))
     marcar_como_leidas.short_description = _('Marcar como leídas')
 
@@ -61,5 +61,44 @@ class ConfiguracionNotificacionesAdmin(admin.ModelAdmin):
         }),
     )
 
+class EnvioMasivoAdmin(admin.ModelAdmin):
+    """
+    Personalización del panel de administración para el modelo EnvioMasivo.
+    El envío lo procesa el comando procesar_envios_masivos.
+    """
+    list_display = ('titulo', 'tipo', 'estado', 'enviadas', 'total_destinatarios', 'porcentaje', 'fecha_creacion')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('titulo', 'mensaje')
+    readonly_fields = ('estado', 'total_destinatarios', 'enviadas', 'ultimo_cliente_id', 'error', 'fecha_creacion', 'fecha_inicio', 'fecha_fin')
+    
+    fieldsets = (
+        (_('Contenido'), {
+            'fields': ('tipo', 'titulo', 'mensaje')
+        }),
+        (_('Destinatarios'), {
+            'fields': ('filtros', 'tamano_lote')
+        }),
+        (_('Progreso'), {
+            'fields': ('estado', 'total_destinatarios', 'enviadas', 'ultimo_cliente_id', 'error', 'fecha_creacion', 'fecha_inicio', 'fecha_fin')
+        }),
+    )
+
+class NotificacionArchivadaAdmin(admin.ModelAdmin):
+    """
+    Consulta de las notificaciones archivadas por el comando archivar_notificaciones.
+    """
+    list_display = ('cliente', 'empleado', 'tipo', 'titulo', 'fecha_creacion', 'fecha_archivado')
+    list_filter = ('tipo',)
+    search_fields = ('titulo', 'cliente__nombre', 'cliente__apellido')
+    raw_id_fields = ('cliente', 'empleado')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 admin.site.register(Notificacion, NotificacionAdmin)
 admin.site.register(ConfiguracionNotificaciones, ConfiguracionNotificacionesAdmin)
+admin.site.register(EnvioMasivo, EnvioMasivoAdmin)
+admin.site.register(NotificacionArchivada, NotificacionArchivadaAdmin)
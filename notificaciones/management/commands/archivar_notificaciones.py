@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from notificaciones.services import ArchivoNotificacionesService
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve a NotificacionArchivada, por lotes, las notificaciones leídas más antiguas '
+        'que el período de retención'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=90,
+            help='Días de retención de las notificaciones leídas (por defecto 90)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Notificaciones por lote; cada lote es una transacción corta (por defecto 1000)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0,
+            help='Segundos de espera entre lotes para no saturar la base de datos'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta las notificaciones que se archivarían'
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] < 1:
+            raise CommandError('--dias debe ser mayor o igual a 0 y --lote mayor o igual a 1')
+
+        if options['dry_run']:
+            total = ArchivoNotificacionesService.archivables(options['dias']).count()
+            self.stdout.write(f'Se archivarían {total} notificaciones leídas de más de {options["dias"]} días')
+            return
+
+        total = 0
+        while True:
+            archivadas = ArchivoNotificacionesService.archivar_lote(options['dias'], options['lote'])
+            if not archivadas:
+                break
+            total += archivadas
+            self.stdout.write(f'  {total} notificaciones archivadas')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f'Notificaciones archivadas: {total}'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from notificaciones.models import EnvioMasivo
+from notificaciones.services import EnvioMasivoService
+
+
+class Command(BaseCommand):
+    help = (
+        'Procesa por lotes los envíos masivos de notificaciones pendientes y reanuda '
+        'los que quedaron interrumpidos desde el último cliente procesado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--envio',
+            type=int,
+            action='append',
+            help='ID del envío a procesar (se puede repetir). Por defecto, todos los pendientes'
+        )
+        parser.add_argument(
+            '--reintentar',
+            action='store_true',
+            help='Incluye los envíos que terminaron con error'
+        )
+
+    def handle(self, *args, **options):
+        estados = [EnvioMasivo.PENDIENTE, EnvioMasivo.EN_PROCESO]
+        if options['reintentar']:
+            estados.append(EnvioMasivo.ERROR)
+        envios = EnvioMasivo.objects.filter(estado__in=estados)
+        if options['envio']:
+            envios = envios.filter(pk__in=options['envio'])
+
+        errores = 0
+        for envio in envios:
+            self.stdout.write(f'Envío #{envio.pk} "{envio.titulo}": desde el cliente {envio.ultimo_cliente_id}')
+            try:
+                EnvioMasivoService.procesar(envio, progreso=self.reportar_progreso)
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.ERROR(f'Envío #{envio.pk}: error tras {envio.enviadas} notificaciones: {e}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(f'Envío #{envio.pk}: {envio.enviadas} notificaciones enviadas'))
+
+        if errores:
+            self.stdout.write(self.style.ERROR(f'{errores} envíos con errores; se reanudan con --reintentar'))
+
+    def reportar_progreso(self, envio):
+        self.stdout.write(f'  {envio.enviadas}/{envio.total_destinatarios} ({envio.porcentaje}%)')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from notificaciones.services import ContadorNotificacionesService
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde Notificacion los contadores de notificaciones (totales y no leídas '
+        'por tipo) de clientes y empleados y corrige los que no coincidan'
+    )
+
+    def handle(self, *args, **options):
+        corregidos = ContadorNotificacionesService.reconciliar()
+        self.stdout.write(self.style.SUCCESS(f'Contadores de notificaciones corregidos: {corregidos}'))
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:56
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def calcular_contadores(apps, schema_editor):
+    Notificacion = apps.get_model('notificaciones', 'Notificacion')
+    ContadorNotificaciones = apps.get_model('notificaciones', 'ContadorNotificaciones')
+    contadores = []
+    for campo in ('cliente', 'empleado'):
+        filas = Notificacion.objects.filter(**{f'{campo}__isnull': False}).order_by().values(
+            f'{campo}_id', 'tipo'
+        ).annotate(total=Count('id'), no_leidas=Count('id', filter=Q(leida=False)))
+        for fila in filas:
+            contadores.append(ContadorNotificaciones(
+                tipo=fila['tipo'], total=fila['total'], no_leidas=fila['no_leidas'],
+                **{f'{campo}_id': fila[f'{campo}_id']}
+            ))
+    ContadorNotificaciones.objects.bulk_create(contadores, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_auto_20250910_2314'),
+        ('empleados', '0016_puntocontrolbonificaciones'),
+        ('notificaciones', '0004_notificacion_empleado_alter_notificacion_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RC', 'Reserva Creada'), ('RF', 'Reserva Confirmada'), ('RA', 'Reserva Cancelada'), ('SI', 'Servicio Iniciado'), ('SF', 'Servicio Finalizado'), ('CR', 'Calificación Recibida'), ('SA', 'Servicio Asignado'), ('PR', 'Promoción'), ('PA', 'Puntos Acumulados'), ('PR', 'Puntos Redimidos'), ('OT', 'Otro')], max_length=2, verbose_name='Tipo')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('no_leidas', models.IntegerField(default=0, verbose_name='No Leídas')),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contadores_notificaciones', to='clientes.cliente', verbose_name='Cliente')),
+                ('empleado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contadores_notificaciones', to='empleados.empleado', verbose_name='Empleado')),
+            ],
+            options={
+                'verbose_name': 'Contador de Notificaciones',
+                'verbose_name_plural': 'Contadores de Notificaciones',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contadornotificaciones',
+            constraint=models.UniqueConstraint(condition=models.Q(('cliente__isnull', False)), fields=('cliente', 'tipo'), name='contador_notificaciones_cliente_tipo'),
+        ),
+        migrations.AddConstraint(
+            model_name='contadornotificaciones',
+            constraint=models.UniqueConstraint(condition=models.Q(('empleado__isnull', False)), fields=('empleado', 'tipo'), name='contador_notificaciones_empleado_tipo'),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
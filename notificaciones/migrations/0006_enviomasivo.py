@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0005_contadornotificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioMasivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RC', 'Reserva Creada'), ('RF', 'Reserva Confirmada'), ('RA', 'Reserva Cancelada'), ('SI', 'Servicio Iniciado'), ('SF', 'Servicio Finalizado'), ('CR', 'Calificación Recibida'), ('SA', 'Servicio Asignado'), ('PR', 'Promoción'), ('PA', 'Puntos Acumulados'), ('PR', 'Puntos Redimidos'), ('OT', 'Otro')], default='PR', max_length=2, verbose_name='Tipo')),
+                ('titulo', models.CharField(help_text='Admite {nombre} y {apellido} del cliente', max_length=100, verbose_name='Título')),
+                ('mensaje', models.TextField(help_text='Admite {nombre} y {apellido} del cliente', verbose_name='Mensaje')),
+                ('filtros', models.JSONField(blank=True, default=dict, help_text='Filtros de Cliente (p. ej. {"ciudad": "Bogotá"}); vacío para todos', verbose_name='Filtros de Clientes')),
+                ('tamano_lote', models.PositiveIntegerField(default=1000, verbose_name='Tamaño de Lote')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('total_destinatarios', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Destinatarios')),
+                ('enviadas', models.PositiveIntegerField(default=0, verbose_name='Notificaciones Enviadas')),
+                ('ultimo_cliente_id', models.PositiveIntegerField(default=0, verbose_name='Último Cliente Procesado')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')),
+            ],
+            options={
+                'verbose_name': 'Envío Masivo',
+                'verbose_name_plural': 'Envíos Masivos',
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+    ]
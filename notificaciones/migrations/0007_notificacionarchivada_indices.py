@@ -0,0 +1,57 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_auto_20250910_2314'),
+        ('empleados', '0016_puntocontrolbonificaciones'),
+        ('notificaciones', '0006_enviomasivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notificacion_id', models.BigIntegerField(unique=True, verbose_name='ID de la Notificación')),
+                ('reserva_id', models.IntegerField(blank=True, null=True, verbose_name='ID de la Reserva')),
+                ('tipo', models.CharField(choices=[('RC', 'Reserva Creada'), ('RF', 'Reserva Confirmada'), ('RA', 'Reserva Cancelada'), ('SI', 'Servicio Iniciado'), ('SF', 'Servicio Finalizado'), ('CR', 'Calificación Recibida'), ('SA', 'Servicio Asignado'), ('PR', 'Promoción'), ('PA', 'Puntos Acumulados'), ('PR', 'Puntos Redimidos'), ('OT', 'Otro')], max_length=2, verbose_name='Tipo')),
+                ('titulo', models.CharField(max_length=100, verbose_name='Título')),
+                ('mensaje', models.TextField(verbose_name='Mensaje')),
+                ('fecha_creacion', models.DateTimeField(verbose_name='Fecha de Creación')),
+                ('fecha_lectura', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Lectura')),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Archivado')),
+            ],
+            options={
+                'verbose_name': 'Notificación Archivada',
+                'verbose_name_plural': 'Notificaciones Archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['cliente', '-fecha_creacion', '-id'], name='notif_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['empleado', '-fecha_creacion', '-id'], name='notif_empleado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['leida', 'fecha_creacion'], name='notif_leida_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_archivadas', to='clientes.cliente', verbose_name='Cliente'),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='empleado',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_archivadas', to='empleados.empleado', verbose_name='Empleado'),
+        ),
+    ]
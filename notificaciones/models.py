@@ -49,6 +49,13 @@ class Notificacion(models.Model):
         verbose_name = _('Notificación')
         verbose_name_plural = _('Notificaciones')
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Bandejas paginadas por cursor sobre (fecha_creacion, id)
+            models.Index(fields=['cliente', '-fecha_creacion', '-id'], name='notif_cliente_fecha_idx'),
+            models.Index(fields=['empleado', '-fecha_creacion', '-id'], name='notif_empleado_fecha_idx'),
+            # Retención: leídas más antiguas que N días
+            models.Index(fields=['leida', 'fecha_creacion'], name='notif_leida_fecha_idx'),
+        ]
     
     def __str__(self):
         if self.cliente:
@@ -72,6 +79,30 @@ class Notificacion(models.Model):
         return False
 
 
+class ContadorNotificaciones(models.Model):
+    """
+    Contadores desnormalizados de notificaciones por destinatario (cliente o
+    empleado) y tipo. Los mantiene ContadorNotificacionesService con F() y se
+    reparan con el comando reconciliar_contadores_notificaciones.
+    """
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, null=True, blank=True, related_name='contadores_notificaciones', verbose_name=_('Cliente'))
+    empleado = models.ForeignKey('empleados.Empleado', on_delete=models.CASCADE, null=True, blank=True, related_name='contadores_notificaciones', verbose_name=_('Empleado'))
+    tipo = models.CharField(max_length=2, choices=Notificacion.TIPO_CHOICES, verbose_name=_('Tipo'))
+    total = models.IntegerField(default=0, verbose_name=_('Total'))
+    no_leidas = models.IntegerField(default=0, verbose_name=_('No Leídas'))
+    
+    class Meta:
+        verbose_name = _('Contador de Notificaciones')
+        verbose_name_plural = _('Contadores de Notificaciones')
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'tipo'], condition=models.Q(cliente__isnull=False), name='contador_notificaciones_cliente_tipo'),
+            models.UniqueConstraint(fields=['empleado', 'tipo'], condition=models.Q(empleado__isnull=False), name='contador_notificaciones_empleado_tipo'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cliente or self.empleado} - {self.get_tipo_display()} - {self.no_leidas}/{self.total}"
+
+
 class ConfiguracionNotificaciones(models.Model):
     """
     Modelo para almacenar las preferencias de notificaciones de los clientes.
@@ -92,19 +123,102 @@ class ConfiguracionNotificaciones(models.Model):
     def __str__(self):
         return f"Configuración de {self.cliente}"
     
-    def puede_recibir_notificacion(self, tipo_notificacion):
+    @staticmethod
+    def campo_preferencia(tipo_notificacion):
         """
-        Verifica si el cliente puede recibir un tipo específico de notificación.
+        Retorna el campo de preferencia que controla un tipo de notificación, o None
+        si el tipo no depende de ninguna preferencia.
         """
-        if not self.cliente.recibir_notificaciones:
-            return False
-            
         if tipo_notificacion in [Notificacion.RESERVA_CREADA, Notificacion.RESERVA_CONFIRMADA, Notificacion.RESERVA_CANCELADA]:
-            return self.reservas
+            return 'reservas'
         elif tipo_notificacion in [Notificacion.SERVICIO_INICIADO, Notificacion.SERVICIO_FINALIZADO]:
-            return self.servicios
+            return 'servicios'
         elif tipo_notificacion == Notificacion.PROMOCION:
-            return self.promociones
+            return 'promociones'
         elif tipo_notificacion in [Notificacion.PUNTOS_ACUMULADOS, Notificacion.PUNTOS_REDIMIDOS]:
-            return self.puntos
-        return True
+            return 'puntos'
+        return None
+    
+    def puede_recibir_notificacion(self, tipo_notificacion):
+        """
+        Verifica si el cliente puede recibir un tipo específico de notificación.
+        """
+        if not self.cliente.recibir_notificaciones:
+            return False
+        
+        campo = self.campo_preferencia(tipo_notificacion)
+        return getattr(self, campo) if campo else True
+
+
+class NotificacionArchivada(models.Model):
+    """
+    Notificaciones leídas que superaron el período de retención. Las mueve por
+    lotes el comando archivar_notificaciones para que la tabla de notificaciones
+    se mantenga pequeña; conserva el contenido sin el estado de lectura.
+    """
+    notificacion_id = models.BigIntegerField(unique=True, verbose_name=_('ID de la Notificación'))
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, null=True, blank=True, related_name='notificaciones_archivadas', verbose_name=_('Cliente'))
+    empleado = models.ForeignKey('empleados.Empleado', on_delete=models.CASCADE, null=True, blank=True, related_name='notificaciones_archivadas', verbose_name=_('Empleado'))
+    reserva_id = models.IntegerField(null=True, blank=True, verbose_name=_('ID de la Reserva'))
+    tipo = models.CharField(max_length=2, choices=Notificacion.TIPO_CHOICES, verbose_name=_('Tipo'))
+    titulo = models.CharField(max_length=100, verbose_name=_('Título'))
+    mensaje = models.TextField(verbose_name=_('Mensaje'))
+    fecha_creacion = models.DateTimeField(verbose_name=_('Fecha de Creación'))
+    fecha_lectura = models.DateTimeField(null=True, blank=True, verbose_name=_('Fecha de Lectura'))
+    fecha_archivado = models.DateTimeField(auto_now_add=True, verbose_name=_('Fecha de Archivado'))
+    
+    class Meta:
+        verbose_name = _('Notificación Archivada')
+        verbose_name_plural = _('Notificaciones Archivadas')
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.cliente or self.empleado} - {self.get_tipo_display()} - {self.fecha_creacion}"
+
+
+class EnvioMasivo(models.Model):
+    """
+    Envío de una notificación a muchos clientes, procesado por lotes en segundo
+    plano con el comando procesar_envios_masivos. Guarda el último cliente
+    procesado para poder reanudarse tras una interrupción.
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    
+    ESTADO_CHOICES = [
+        (PENDIENTE, _('Pendiente')),
+        (EN_PROCESO, _('En Proceso')),
+        (COMPLETADO, _('Completado')),
+        (ERROR, _('Error')),
+    ]
+    
+    tipo = models.CharField(max_length=2, choices=Notificacion.TIPO_CHOICES, default=Notificacion.PROMOCION, verbose_name=_('Tipo'))
+    titulo = models.CharField(max_length=100, verbose_name=_('Título'), help_text=_('Admite {nombre} y {apellido} del cliente'))
+    mensaje = models.TextField(verbose_name=_('Mensaje'), help_text=_('Admite {nombre} y {apellido} del cliente'))
+    filtros = models.JSONField(default=dict, blank=True, verbose_name=_('Filtros de Clientes'), help_text=_('Filtros de Cliente (p. ej. {"ciudad": "Bogotá"}); vacío para todos'))
+    tamano_lote = models.PositiveIntegerField(default=1000, verbose_name=_('Tamaño de Lote'))
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE, verbose_name=_('Estado'))
+    total_destinatarios = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Total de Destinatarios'))
+    enviadas = models.PositiveIntegerField(default=0, verbose_name=_('Notificaciones Enviadas'))
+    ultimo_cliente_id = models.PositiveIntegerField(default=0, verbose_name=_('Último Cliente Procesado'))
+    error = models.TextField(blank=True, verbose_name=_('Error'))
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name=_('Fecha de Creación'))
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name=_('Fecha de Inicio'))
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name=_('Fecha de Finalización'))
+    
+    class Meta:
+        verbose_name = _('Envío Masivo')
+        verbose_name_plural = _('Envíos Masivos')
+        ordering = ['fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.titulo} - {self.get_estado_display()} ({self.enviadas}/{self.total_destinatarios or 0})"
+    
+    @property
+    def porcentaje(self):
+        """Porcentaje de destinatarios ya procesados."""
+        if not self.total_destinatarios:
+            return 100 if self.estado == self.COMPLETADO else 0
+        return round(self.enviadas * 100 / self.total_destinatarios, 1)
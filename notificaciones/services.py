@@ -0,0 +1,542 @@
+import base64
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from clientes.models import Cliente
+
+from .models import ConfiguracionNotificaciones, ContadorNotificaciones, EnvioMasivo, Notificacion, NotificacionArchivada
+
+# Activo mientras una operación en lote aplica por su cuenta los deltas de contadores
+_contadores_en_lote = ContextVar('contadores_en_lote', default=False)
+
+
+class ContadorNotificacionesService:
+    """
+    Contadores de notificaciones (totales y no leídas por tipo) de cada destinatario.
+
+    Se guardan en ContadorNotificaciones y se actualizan con F() al crear, leer o
+    eliminar notificaciones; las lecturas salen de la caché y solo consultan la base
+    de datos tras un cambio (o al vencer la entrada, ver timeout()). Una notificación
+    con cliente y empleado cuenta para ambos.
+    """
+    PREFIJO = 'notificaciones'
+    TIMEOUT = 3600
+    # Con una caché local por proceso (LocMem) las invalidaciones solo llegan al
+    # proceso que hizo el cambio: los demás pueden mostrar datos viejos este tiempo
+    TIMEOUT_LOCAL = 5
+    CLIENTE = 'cliente'
+    EMPLEADO = 'empleado'
+    # Los lavadores solo ven estos tipos en su bandeja
+    TIPOS_LAVADOR = [Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO]
+
+    @staticmethod
+    def _clave(campo, destinatario_id):
+        return f'{ContadorNotificacionesService.PREFIJO}:contadores:{campo}:{destinatario_id}'
+
+    @staticmethod
+    def _clave_dropdown(campo, destinatario_id):
+        return f'{ContadorNotificacionesService.PREFIJO}:dropdown:{campo}:{destinatario_id}'
+
+    @staticmethod
+    def _clave_usuario(usuario_id):
+        return f'{ContadorNotificacionesService.PREFIJO}:destinatario:{usuario_id}'
+
+    @staticmethod
+    def destinatarios(cliente_id, empleado_id):
+        """Retorna [(campo, id), ...] de los destinatarios de una notificación."""
+        destinatarios = []
+        if cliente_id:
+            destinatarios.append((ContadorNotificacionesService.CLIENTE, cliente_id))
+        if empleado_id:
+            destinatarios.append((ContadorNotificacionesService.EMPLEADO, empleado_id))
+        return destinatarios
+
+    @staticmethod
+    def timeout():
+        """Vida de las entradas en caché: TIMEOUT si la caché es compartida, si no TIMEOUT_LOCAL."""
+        if isinstance(caches['default'], LocMemCache):
+            return ContadorNotificacionesService.TIMEOUT_LOCAL
+        return ContadorNotificacionesService.TIMEOUT
+
+    @staticmethod
+    def invalidar(*destinatarios):
+        """Descarta de la caché los contadores y el dropdown de los destinatarios (campo, id)."""
+        claves = []
+        for campo, destinatario_id in destinatarios:
+            claves.append(ContadorNotificacionesService._clave(campo, destinatario_id))
+            claves.append(ContadorNotificacionesService._clave_dropdown(campo, destinatario_id))
+        if claves:
+            cache.delete_many(claves)
+
+    @staticmethod
+    @contextmanager
+    def en_lote():
+        """
+        Suspende la actualización fila a fila desde las señales; quien lo usa aplica
+        después los deltas agrupados con registrar().
+        """
+        token = _contadores_en_lote.set(True)
+        try:
+            yield
+        finally:
+            _contadores_en_lote.reset(token)
+
+    @staticmethod
+    def suspendido():
+        return _contadores_en_lote.get()
+
+    @staticmethod
+    def invalidar_usuario(usuario_id):
+        cache.delete(ContadorNotificacionesService._clave_usuario(usuario_id))
+
+    @staticmethod
+    def registrar(cambios):
+        """
+        Aplica {(campo, id, tipo): (delta_total, delta_no_leidas)} a los contadores con
+        actualizaciones atómicas, creando las filas que falten.
+        """
+        for (campo, destinatario_id, tipo), (delta_total, delta_no_leidas) in cambios.items():
+            if not delta_total and not delta_no_leidas:
+                continue
+            filtro = {f'{campo}_id': destinatario_id, 'tipo': tipo}
+            actualizados = ContadorNotificaciones.objects.filter(**filtro).update(
+                total=F('total') + delta_total,
+                no_leidas=F('no_leidas') + delta_no_leidas
+            )
+            if not actualizados and (delta_total > 0 or delta_no_leidas > 0):
+                # Sin fila y con deltas negativos no hay nada que descontar (p. ej. el
+                # destinatario se está eliminando en cascada)
+                try:
+                    with transaction.atomic():
+                        ContadorNotificaciones.objects.create(total=delta_total, no_leidas=delta_no_leidas, **filtro)
+                except IntegrityError:
+                    # Otro proceso creó la fila entre el update y el create
+                    ContadorNotificaciones.objects.filter(**filtro).update(
+                        total=F('total') + delta_total,
+                        no_leidas=F('no_leidas') + delta_no_leidas
+                    )
+        ContadorNotificacionesService.invalidar(*{(campo, destinatario_id) for campo, destinatario_id, _ in cambios})
+
+    @staticmethod
+    def incrementar(campo, destinatario_ids, tipo):
+        """
+        Suma una notificación no leída de `tipo` por cada aparición del destinatario en
+        `destinatario_ids` con pocas consultas, sin importar cuántos sean: crea las filas
+        que falten y las incrementa en lote (un UPDATE por cada cantidad distinta).
+        """
+        if not destinatario_ids:
+            return
+        conteos = Counter(destinatario_ids)
+        filtro = {f'{campo}_id__in': list(conteos), 'tipo': tipo}
+        existentes = set(ContadorNotificaciones.objects.filter(**filtro).values_list(f'{campo}_id', flat=True))
+        ContadorNotificaciones.objects.bulk_create([
+            ContadorNotificaciones(tipo=tipo, **{f'{campo}_id': destinatario_id})
+            for destinatario_id in conteos if destinatario_id not in existentes
+        ], ignore_conflicts=True)
+        por_cantidad = defaultdict(list)
+        for destinatario_id, cantidad in conteos.items():
+            por_cantidad[cantidad].append(destinatario_id)
+        for cantidad, ids in por_cantidad.items():
+            ContadorNotificaciones.objects.filter(**{f'{campo}_id__in': ids, 'tipo': tipo}).update(
+                total=F('total') + cantidad,
+                no_leidas=F('no_leidas') + cantidad
+            )
+        ContadorNotificacionesService.invalidar(*((campo, destinatario_id) for destinatario_id in conteos))
+
+    @staticmethod
+    def cambios(notificaciones, signo=1, solo_no_leidas=False):
+        """
+        Retorna los deltas de contadores para una lista de (cliente_id, empleado_id, tipo,
+        leida, cantidad): `signo` 1 al crear y -1 al eliminar; con `solo_no_leidas`,
+        para marcar como leídas.
+        """
+        cambios = {}
+        for cliente_id, empleado_id, tipo, leida, cantidad in notificaciones:
+            for campo, destinatario_id in ContadorNotificacionesService.destinatarios(cliente_id, empleado_id):
+                total, no_leidas = cambios.get((campo, destinatario_id, tipo), (0, 0))
+                if solo_no_leidas:
+                    no_leidas -= 0 if leida else cantidad
+                else:
+                    total += signo * cantidad
+                    no_leidas += 0 if leida else signo * cantidad
+                cambios[(campo, destinatario_id, tipo)] = (total, no_leidas)
+        return cambios
+
+    @staticmethod
+    def notificaciones_creadas(notificaciones):
+        """Suma a los contadores notificaciones recién creadas (incluidas las de bulk_create)."""
+        ContadorNotificacionesService.registrar(ContadorNotificacionesService.cambios(
+            (notificacion.cliente_id, notificacion.empleado_id, notificacion.tipo, notificacion.leida, 1)
+            for notificacion in notificaciones
+        ))
+
+    @staticmethod
+    def marcar_leidas(notificaciones):
+        """
+        Marca como leídas las notificaciones del queryset con un solo UPDATE y descuenta
+        sus no leídas de los contadores. Retorna la cantidad marcada.
+        """
+        pendientes = notificaciones.filter(leida=False)
+        with transaction.atomic():
+            grupos = [
+                (fila['cliente_id'], fila['empleado_id'], fila['tipo'], False, fila['cantidad'])
+                for fila in pendientes.order_by().values('cliente_id', 'empleado_id', 'tipo').annotate(cantidad=Count('id'))
+            ]
+            marcadas = pendientes.update(leida=True, fecha_lectura=timezone.now())
+            ContadorNotificacionesService.registrar(ContadorNotificacionesService.cambios(grupos, solo_no_leidas=True))
+        return marcadas
+
+    @staticmethod
+    def destinatario(usuario):
+        """
+        Retorna (campo, id) del cliente o empleado del usuario, o None. Se guarda en caché
+        por usuario para no consultar el perfil en cada sondeo.
+        """
+        clave = ContadorNotificacionesService._clave_usuario(usuario.pk)
+        destinatario = cache.get(clave)
+        if destinatario is None:
+            if hasattr(usuario, 'cliente'):
+                destinatario = (ContadorNotificacionesService.CLIENTE, usuario.cliente.pk)
+            elif hasattr(usuario, 'empleado'):
+                destinatario = (ContadorNotificacionesService.EMPLEADO, usuario.empleado.pk)
+            else:
+                destinatario = ()
+            cache.set(clave, destinatario, ContadorNotificacionesService.timeout())
+        return tuple(destinatario) or None
+
+    @staticmethod
+    def contadores(campo, destinatario_id):
+        """Retorna {tipo: (total, no_leidas)} del destinatario, desde la caché o con una consulta."""
+        clave = ContadorNotificacionesService._clave(campo, destinatario_id)
+        contadores = cache.get(clave)
+        if contadores is None:
+            contadores = {
+                tipo: (total, no_leidas)
+                for tipo, total, no_leidas in ContadorNotificaciones.objects.filter(
+                    **{f'{campo}_id': destinatario_id}
+                ).values_list('tipo', 'total', 'no_leidas')
+            }
+            cache.set(clave, contadores, ContadorNotificacionesService.timeout())
+        return contadores
+
+    @staticmethod
+    def resumen(campo, destinatario_id):
+        """
+        Retorna {'total', 'no_leidas', 'por_tipo': {tipo: {'total', 'no_leidas'}}} de la
+        bandeja del destinatario (para lavadores, solo los tipos que ven).
+        """
+        contadores = ContadorNotificacionesService.contadores(campo, destinatario_id)
+        if campo == ContadorNotificacionesService.EMPLEADO:
+            contadores = {tipo: valores for tipo, valores in contadores.items() if tipo in ContadorNotificacionesService.TIPOS_LAVADOR}
+        return {
+            'total': sum(total for total, _ in contadores.values()),
+            'no_leidas': sum(no_leidas for _, no_leidas in contadores.values()),
+            'por_tipo': {tipo: {'total': total, 'no_leidas': no_leidas} for tipo, (total, no_leidas) in contadores.items()},
+        }
+
+    @staticmethod
+    def dropdown(campo, destinatario_id, construir):
+        """Retorna los datos del dropdown desde la caché, o los construye con `construir()`."""
+        clave = ContadorNotificacionesService._clave_dropdown(campo, destinatario_id)
+        datos = cache.get(clave)
+        if datos is None:
+            datos = construir()
+            cache.set(clave, datos, ContadorNotificacionesService.timeout())
+        return datos
+
+    @staticmethod
+    def reconciliar():
+        """
+        Recalcula todos los contadores desde Notificacion con dos consultas agrupadas y
+        corrige, crea o elimina las filas que no coincidan. Retorna las filas corregidas.
+        """
+        esperados = {}
+        for campo in (ContadorNotificacionesService.CLIENTE, ContadorNotificacionesService.EMPLEADO):
+            for destinatario_id, tipo, total, no_leidas in Notificacion.objects.filter(
+                **{f'{campo}__isnull': False}
+            ).order_by().values(f'{campo}_id', 'tipo').annotate(
+                total=Count('id'), no_leidas=Count('id', filter=Q(leida=False))
+            ).values_list(f'{campo}_id', 'tipo', 'total', 'no_leidas'):
+                esperados[(campo, destinatario_id, tipo)] = (total, no_leidas)
+
+        corregidos, sobrantes, afectados = [], [], set()
+        for contador in ContadorNotificaciones.objects.all():
+            campo = ContadorNotificacionesService.CLIENTE if contador.cliente_id else ContadorNotificacionesService.EMPLEADO
+            destinatario_id = contador.cliente_id or contador.empleado_id
+            valores = esperados.pop((campo, destinatario_id, contador.tipo), None)
+            if valores is None:
+                sobrantes.append(contador.pk)
+            elif (contador.total, contador.no_leidas) != valores:
+                contador.total, contador.no_leidas = valores
+                corregidos.append(contador)
+            else:
+                continue
+            afectados.add((campo, destinatario_id))
+
+        nuevos = [
+            ContadorNotificaciones(total=total, no_leidas=no_leidas, tipo=tipo, **{f'{campo}_id': destinatario_id})
+            for (campo, destinatario_id, tipo), (total, no_leidas) in esperados.items()
+        ]
+        afectados.update((campo, destinatario_id) for campo, destinatario_id, _ in esperados)
+
+        with transaction.atomic():
+            ContadorNotificaciones.objects.filter(pk__in=sobrantes).delete()
+            ContadorNotificaciones.objects.bulk_update(corregidos, ['total', 'no_leidas'], batch_size=500)
+            ContadorNotificaciones.objects.bulk_create(nuevos, batch_size=500)
+        ContadorNotificacionesService.invalidar(*afectados)
+        return len(sobrantes) + len(corregidos) + len(nuevos)
+
+
+class EnvioMasivoService:
+    """
+    Envío de una notificación a muchos clientes. Las preferencias se filtran en SQL
+    y las notificaciones se insertan con bulk_create por lotes de clientes ordenados
+    por id; cada lote guarda su avance en el EnvioMasivo, así que un envío
+    interrumpido se reanuda desde el último cliente procesado.
+    """
+
+    @staticmethod
+    def destinatarios(clientes, tipo):
+        """Filtra los clientes que aceptan notificaciones de `tipo` según sus preferencias."""
+        clientes = clientes.filter(recibir_notificaciones=True)
+        campo = ConfiguracionNotificaciones.campo_preferencia(tipo)
+        if campo:
+            # Sin configuración se aplican los valores por defecto, que aceptan todo
+            clientes = clientes.filter(
+                Q(configuracion_notificaciones__isnull=True) | Q(**{f'configuracion_notificaciones__{campo}': True})
+            )
+        return clientes
+
+    @staticmethod
+    def renderizar(plantilla, nombre, apellido):
+        """Reemplaza {nombre} y {apellido} en la plantilla."""
+        return plantilla.format(nombre=nombre, apellido=apellido)
+
+    @staticmethod
+    def programar(titulo, mensaje, tipo=Notificacion.PROMOCION, filtros=None, tamano_lote=1000):
+        """
+        Crea un envío pendiente para los clientes que cumplan `filtros` (búsquedas
+        sobre Cliente, p. ej. {'ciudad': 'Bogotá'}). Lanza ValueError si las plantillas
+        usan campos distintos de {nombre} y {apellido} o los filtros no son válidos.
+        """
+        try:
+            for plantilla in (titulo, mensaje):
+                EnvioMasivoService.renderizar(plantilla, '', '')
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f'Plantilla inválida: {e}')
+        try:
+            Cliente.objects.filter(**(filtros or {})).exists()
+        except Exception as e:
+            raise ValueError(f'Filtros inválidos: {e}')
+        if tamano_lote < 1:
+            raise ValueError('El tamaño de lote debe ser mayor o igual a 1')
+        return EnvioMasivo.objects.create(
+            titulo=titulo,
+            mensaje=mensaje,
+            tipo=tipo,
+            filtros=filtros or {},
+            tamano_lote=tamano_lote
+        )
+
+    @staticmethod
+    def clientes(envio, clientes=None):
+        """Destinatarios del envío: `clientes` o los que cumplan sus filtros, según preferencias."""
+        if clientes is None:
+            clientes = Cliente.objects.filter(**envio.filtros)
+        return EnvioMasivoService.destinatarios(clientes, envio.tipo)
+
+    @staticmethod
+    def procesar_lote(envio, clientes=None):
+        """
+        Crea las notificaciones del siguiente lote de clientes y guarda el avance en la
+        misma transacción. Retorna cuántas creó (0 cuando ya no quedan clientes).
+        """
+        lote = list(
+            EnvioMasivoService.clientes(envio, clientes).filter(
+                pk__gt=envio.ultimo_cliente_id
+            ).order_by('pk').values_list('pk', 'nombre', 'apellido')[:envio.tamano_lote]
+        )
+        if not lote:
+            return 0
+
+        with transaction.atomic():
+            Notificacion.objects.bulk_create([
+                Notificacion(
+                    cliente_id=cliente_id,
+                    tipo=envio.tipo,
+                    titulo=EnvioMasivoService.renderizar(envio.titulo, nombre, apellido)[:100],
+                    mensaje=EnvioMasivoService.renderizar(envio.mensaje, nombre, apellido)
+                )
+                for cliente_id, nombre, apellido in lote
+            ], batch_size=envio.tamano_lote)
+            cliente_ids = [cliente_id for cliente_id, _, _ in lote]
+            ContadorNotificacionesService.incrementar(ContadorNotificacionesService.CLIENTE, cliente_ids, envio.tipo)
+            envio.ultimo_cliente_id = cliente_ids[-1]
+            envio.enviadas += len(lote)
+            envio.save(update_fields=['ultimo_cliente_id', 'enviadas'])
+        return len(lote)
+
+    @staticmethod
+    def procesar(envio, clientes=None, progreso=None):
+        """
+        Procesa el envío lote a lote desde donde quedó, llamando a `progreso(envio)`
+        tras cada lote. Si falla, queda en estado ERROR con el avance guardado.
+        """
+        if envio.estado == EnvioMasivo.COMPLETADO:
+            return envio
+        if envio.total_destinatarios is None:
+            envio.total_destinatarios = EnvioMasivoService.clientes(envio, clientes).count()
+        envio.estado = EnvioMasivo.EN_PROCESO
+        envio.fecha_inicio = envio.fecha_inicio or timezone.now()
+        envio.error = ''
+        envio.save(update_fields=['total_destinatarios', 'estado', 'fecha_inicio', 'error'])
+
+        try:
+            while EnvioMasivoService.procesar_lote(envio, clientes):
+                if progreso:
+                    progreso(envio)
+        except Exception as e:
+            envio.estado = EnvioMasivo.ERROR
+            envio.error = str(e)
+            envio.save(update_fields=['estado', 'error'])
+            raise
+
+        envio.estado = EnvioMasivo.COMPLETADO
+        envio.fecha_fin = timezone.now()
+        envio.save(update_fields=['estado', 'fecha_fin'])
+        return envio
+
+
+class PaginaCursor:
+    """
+    Página de una paginación por cursor. Expone la misma interfaz que usan las
+    plantillas con page_obj (object_list, has_next, has_previous) más los cursores.
+    """
+
+    def __init__(self, object_list, cursor_siguiente=None, cursor_anterior=None):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class PaginacionCursorService:
+    """
+    Paginación por cursor sobre (fecha_creacion, id) descendente. Cada página es un
+    rango del índice de la bandeja, sin OFFSET, así que cuesta lo mismo al final
+    de una tabla grande que al principio.
+    """
+    SIGUIENTE = 'siguiente'
+    ANTERIOR = 'anterior'
+
+    @staticmethod
+    def codificar(notificacion):
+        valor = f'{notificacion.fecha_creacion.isoformat()}|{notificacion.pk}'
+        return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decodificar(cursor):
+        """Retorna (fecha_creacion, id) del cursor, o None si no es válido."""
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            fecha, pk = base64.urlsafe_b64decode((cursor + relleno).encode()).decode().split('|')
+            return datetime.fromisoformat(fecha), int(pk)
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def pagina(queryset, cursor=None, direccion=SIGUIENTE, tamano=20):
+        """
+        Retorna la PaginaCursor de `tamano` elementos más antiguos (SIGUIENTE) o más
+        recientes (ANTERIOR) que el cursor. Un cursor inválido lleva a la primera página.
+        """
+        posicion = PaginacionCursorService.decodificar(cursor) if cursor else None
+        if posicion is None:
+            direccion = PaginacionCursorService.SIGUIENTE
+            elementos = list(queryset.order_by('-fecha_creacion', '-id')[:tamano + 1])
+        else:
+            fecha, pk = posicion
+            if direccion == PaginacionCursorService.ANTERIOR:
+                elementos = list(queryset.filter(
+                    Q(fecha_creacion__gt=fecha) | Q(fecha_creacion=fecha, id__gt=pk)
+                ).order_by('fecha_creacion', 'id')[:tamano + 1])
+            else:
+                direccion = PaginacionCursorService.SIGUIENTE
+                elementos = list(queryset.filter(
+                    Q(fecha_creacion__lt=fecha) | Q(fecha_creacion=fecha, id__lt=pk)
+                ).order_by('-fecha_creacion', '-id')[:tamano + 1])
+
+        hay_mas = len(elementos) > tamano
+        elementos = elementos[:tamano]
+        if direccion == PaginacionCursorService.ANTERIOR:
+            elementos.reverse()
+            hay_siguiente, hay_anterior = bool(elementos), hay_mas
+        else:
+            hay_siguiente, hay_anterior = hay_mas, posicion is not None
+
+        return PaginaCursor(
+            elementos,
+            cursor_siguiente=PaginacionCursorService.codificar(elementos[-1]) if hay_siguiente and elementos else None,
+            cursor_anterior=PaginacionCursorService.codificar(elementos[0]) if hay_anterior and elementos else None,
+        )
+
+
+class ArchivoNotificacionesService:
+    """
+    Retención de notificaciones: las leídas más antiguas que N días pasan a
+    NotificacionArchivada por lotes, cada uno en su propia transacción corta.
+    """
+
+    @staticmethod
+    def archivables(dias, fecha=None):
+        corte = (fecha or timezone.now()) - timedelta(days=dias)
+        return Notificacion.objects.filter(leida=True, fecha_creacion__lt=corte)
+
+    @staticmethod
+    def archivar_lote(dias, tamano_lote=1000, fecha=None):
+        """Archiva el siguiente lote de notificaciones. Retorna cuántas movió (0 al terminar)."""
+        ids = list(
+            ArchivoNotificacionesService.archivables(dias, fecha).order_by('pk').values_list('pk', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            return 0
+
+        with transaction.atomic():
+            notificaciones = list(Notificacion.objects.filter(pk__in=ids).values(
+                'pk', 'cliente_id', 'empleado_id', 'reserva_id', 'tipo', 'titulo', 'mensaje', 'fecha_creacion', 'fecha_lectura'
+            ))
+            # ignore_conflicts: un lote reintentado no duplica lo ya archivado
+            NotificacionArchivada.objects.bulk_create([
+                NotificacionArchivada(notificacion_id=notificacion.pop('pk'), **notificacion)
+                for notificacion in notificaciones
+            ], ignore_conflicts=True)
+            with ContadorNotificacionesService.en_lote():
+                Notificacion.objects.filter(pk__in=ids).delete()
+            archivadas = [
+                (notificacion['cliente_id'], notificacion['empleado_id'], notificacion['tipo'], True, 1)
+                for notificacion in notificaciones
+            ]
+            ContadorNotificacionesService.registrar(ContadorNotificacionesService.cambios(archivadas, signo=-1))
+        return len(ids)
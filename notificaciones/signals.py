@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from clientes.models import Cliente
+from empleados.models import Empleado
+from reservas.services import EventosTiempoReal
+
+from .models import Notificacion
+from .services import ContadorNotificacionesService
+
+
+@receiver(post_save, sender=Notificacion)
+def publicar_notificacion(sender, instance, created, **kwargs):
+    """Las notificaciones nuevas actualizan el contador del destinatario por WebSocket."""
+    if created:
+        EventosTiempoReal.notificacion_creada(instance)
+
+
+@receiver(post_init, sender=Notificacion)
+def recordar_estado_notificacion(sender, instance, **kwargs):
+    """Guarda el estado con el que se cargó la notificación para calcular los deltas al guardar."""
+    instance._estado_original = (instance.cliente_id, instance.empleado_id, instance.tipo, instance.leida)
+
+
+@receiver(post_save, sender=Notificacion)
+def actualizar_contadores_notificacion(sender, instance, created, raw=False, **kwargs):
+    """Suma la notificación nueva a los contadores, o mueve sus conteos si cambió al editarla."""
+    if raw:
+        return
+    actual = (instance.cliente_id, instance.empleado_id, instance.tipo, instance.leida)
+    if created:
+        ContadorNotificacionesService.notificaciones_creadas([instance])
+    elif actual != instance._estado_original:
+        cambios = ContadorNotificacionesService.cambios([instance._estado_original + (1,)], signo=-1)
+        for clave, (total, no_leidas) in ContadorNotificacionesService.cambios([actual + (1,)]).items():
+            total_previo, no_leidas_previo = cambios.get(clave, (0, 0))
+            cambios[clave] = (total_previo + total, no_leidas_previo + no_leidas)
+        ContadorNotificacionesService.registrar(cambios)
+    instance._estado_original = actual
+
+
+@receiver(post_delete, sender=Notificacion)
+def descontar_notificacion(sender, instance, **kwargs):
+    """Descuenta la notificación eliminada de los contadores de sus destinatarios."""
+    if ContadorNotificacionesService.suspendido():
+        return
+    ContadorNotificacionesService.registrar(ContadorNotificacionesService.cambios(
+        [instance._estado_original + (1,)], signo=-1
+    ))
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+def invalidar_destinatario(sender, instance, **kwargs):
+    """El destinatario en caché de un usuario cambia al crear o eliminar su cliente o empleado."""
+    if instance.usuario_id:
+        ContadorNotificacionesService.invalidar_usuario(instance.usuario_id)
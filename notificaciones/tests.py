@@ -1,3 +1,208 @@
+import datetime
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from autenticacion.models import Usuario
+from clientes.models import Cliente
+from .models import ConfiguracionNotificaciones, ContadorNotificaciones, EnvioMasivo, Notificacion, NotificacionArchivada
+from .services import ContadorNotificacionesService, EnvioMasivoService, PaginacionCursorService
+from io import StringIO
+
+
+class ContadorNotificacionesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+        self.cliente = Cliente.objects.create(
+            usuario=self.usuario,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.client.force_login(self.usuario)
+
+    def notificar(self, tipo=Notificacion.RESERVA_CREADA):
+        return Notificacion.objects.create(cliente=self.cliente, tipo=tipo, titulo='Aviso', mensaje='Mensaje')
+
+    def resumen(self):
+        return ContadorNotificacionesService.resumen(ContadorNotificacionesService.CLIENTE, self.cliente.pk)
+
+    def test_contadores_siguen_las_notificaciones(self):
+        primera = self.notificar()
+        self.notificar()
+        self.notificar(Notificacion.PROMOCION)
+        self.assertEqual(self.resumen()['no_leidas'], 3)
+        self.assertEqual(self.resumen()['por_tipo'][Notificacion.RESERVA_CREADA], {'total': 2, 'no_leidas': 2})
+
+        primera.marcar_como_leida()
+        self.assertEqual(self.resumen()['no_leidas'], 2)
+        self.assertEqual(self.resumen()['total'], 3)
+
+        respuesta = self.client.post(reverse('notificaciones:marcar_todas_leidas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.resumen()['no_leidas'], 0)
+        self.assertEqual(Notificacion.objects.filter(leida=False).count(), 0)
+
+        primera.delete()
+        self.assertEqual(self.resumen()['total'], 2)
+
+    def test_contador_api_no_consulta_en_estado_estable(self):
+        self.notificar()
+        self.notificar()
+        url = reverse('notificaciones:contador_api')
+        self.assertEqual(self.client.get(url).json(), {'count': 2})
+
+        # Solo la sesión y el usuario autenticado
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).json(), {'count': 2})
+
+        self.notificar()
+        self.assertEqual(self.client.get(url).json(), {'count': 3})
+
+        # Con LocMem cada proceso tiene su propia caché: las entradas duran segundos
+        self.assertEqual(ContadorNotificacionesService.timeout(), ContadorNotificacionesService.TIMEOUT_LOCAL)
+        compartida = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/notificaciones-test'}}
+        with self.settings(CACHES=compartida):
+            self.assertEqual(ContadorNotificacionesService.timeout(), ContadorNotificacionesService.TIMEOUT)
+
+    def test_reconciliar_corrige_desviaciones(self):
+        self.notificar()
+        self.notificar(Notificacion.PROMOCION)
+        Notificacion.objects.update(leida=True)
+        ContadorNotificaciones.objects.filter(tipo=Notificacion.PROMOCION).delete()
+        self.assertEqual(self.resumen()['no_leidas'], 1)
+
+        call_command('reconciliar_contadores_notificaciones', stdout=StringIO())
+
+        self.assertEqual(self.resumen(), {
+            'total': 2,
+            'no_leidas': 0,
+            'por_tipo': {
+                Notificacion.RESERVA_CREADA: {'total': 1, 'no_leidas': 0},
+                Notificacion.PROMOCION: {'total': 1, 'no_leidas': 0},
+            },
+        })
+        self.assertEqual(ContadorNotificacionesService.reconciliar(), 0)
+
+
+class EnvioMasivoTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clientes = []
+        for numero in range(5):
+            usuario = Usuario.objects.create_user(
+                email=f'cliente{numero}@test.com',
+                password='password123',
+                rol=Usuario.ROL_CLIENTE
+            )
+            self.clientes.append(Cliente.objects.create(
+                usuario=usuario,
+                nombre=f'Cliente{numero}',
+                apellido='Test',
+                tipo_documento='CC',
+                numero_documento=f'10000{numero}',
+                email=f'cliente{numero}@test.com'
+            ))
+        # Uno no recibe notificaciones y otro no acepta promociones
+        Cliente.objects.filter(pk=self.clientes[1].pk).update(recibir_notificaciones=False)
+        ConfiguracionNotificaciones.objects.create(cliente=self.clientes[2], promociones=False)
+        ConfiguracionNotificaciones.objects.create(cliente=self.clientes[3], reservas=False)
+
+    def test_envio_por_lotes_respeta_preferencias_y_se_reanuda(self):
+        envio = EnvioMasivoService.programar('Hola {nombre}', 'Promoción para {nombre} {apellido}', tamano_lote=2)
+
+        # Primer lote y luego una interrupción
+        self.assertEqual(EnvioMasivoService.procesar_lote(envio), 2)
+        envio.refresh_from_db()
+        self.assertEqual(envio.enviadas, 2)
+
+        call_command('procesar_envios_masivos', stdout=StringIO())
+
+        envio.refresh_from_db()
+        self.assertEqual(envio.estado, EnvioMasivo.COMPLETADO)
+        self.assertEqual(envio.enviadas, 3)
+        destinatarios = set(Notificacion.objects.values_list('cliente_id', flat=True))
+        self.assertEqual(destinatarios, {self.clientes[0].pk, self.clientes[3].pk, self.clientes[4].pk})
+        self.assertEqual(Notificacion.objects.get(cliente=self.clientes[0]).titulo, 'Hola Cliente0')
+
+        resumen = ContadorNotificacionesService.resumen(ContadorNotificacionesService.CLIENTE, self.clientes[3].pk)
+        self.assertEqual(resumen['no_leidas'], 1)
+        self.assertEqual(ContadorNotificacionesService.reconciliar(), 0)
+
+    def test_programar_valida_la_plantilla(self):
+        with self.assertRaises(ValueError):
+            EnvioMasivoService.programar('Hola {usuario}', 'Mensaje')
+
+
+class BandejaNotificacionesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+        self.cliente = Cliente.objects.create(
+            usuario=self.usuario,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.notificaciones = [
+            Notificacion.objects.create(cliente=self.cliente, tipo=Notificacion.PROMOCION, titulo=f'Aviso {numero}', mensaje='Mensaje')
+            for numero in range(25)
+        ]
+        # Fechas repetidas: el id desempata el orden
+        Notificacion.objects.filter(pk__in=[n.pk for n in self.notificaciones[:12]]).update(
+            fecha_creacion=timezone.now() - datetime.timedelta(days=200)
+        )
+
+    def test_paginacion_por_cursor_recorre_sin_repetir(self):
+        esperado = list(Notificacion.objects.order_by('-fecha_creacion', '-id').values_list('pk', flat=True))
+        queryset = Notificacion.objects.filter(cliente=self.cliente)
+
+        recorridas, paginas, cursor = [], [], None
+        while True:
+            pagina = PaginacionCursorService.pagina(queryset, cursor=cursor, tamano=10)
+            paginas.append(pagina)
+            recorridas += [n.pk for n in pagina]
+            if not pagina.has_next():
+                break
+            cursor = pagina.cursor_siguiente
+        self.assertEqual(recorridas, esperado)
+        self.assertEqual([len(pagina) for pagina in paginas], [10, 10, 5])
+        self.assertFalse(paginas[0].has_previous())
+
+        anterior = PaginacionCursorService.pagina(
+            queryset, cursor=paginas[2].cursor_anterior, direccion=PaginacionCursorService.ANTERIOR, tamano=10
+        )
+        self.assertEqual([n.pk for n in anterior], esperado[10:20])
+        self.assertTrue(anterior.has_previous())
+
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('notificaciones:cliente_notificaciones'), {'cursor': paginas[0].cursor_siguiente})
+        self.assertEqual([n.pk for n in respuesta.context['notificaciones']], esperado[10:25])
+        self.assertTrue(respuesta.context['page_obj'].has_previous())
+
+    def test_archivar_notificaciones_leidas_antiguas(self):
+        antiguas = [n.pk for n in self.notificaciones[:12]]
+        ContadorNotificacionesService.marcar_leidas(Notificacion.objects.filter(pk__in=antiguas[:10]))
+
+        call_command('archivar_notificaciones', '--dias', '90', '--lote', '4', stdout=StringIO())
 
-# Create your tests here.
+        self.assertEqual(set(NotificacionArchivada.objects.values_list('notificacion_id', flat=True)), set(antiguas[:10]))
+        self.assertEqual(Notificacion.objects.count(), 15)
+        resumen = ContadorNotificacionesService.resumen(ContadorNotificacionesService.CLIENTE, self.cliente.pk)
+        self.assertEqual((resumen['total'], resumen['no_leidas']), (15, 15))
+        self.assertEqual(ContadorNotificacionesService.reconciliar(), 0)
@@ -7,22 +7,47 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from rest_framework import status, viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from .models import Notificacion
 from .serializers import NotificacionSerializer
+from .services import ContadorNotificacionesService, PaginacionCursorService
 from clientes.models import Cliente
 from empleados.models import Empleado
 
 # Create your views here.
 
+class NotificacionCursorPagination(CursorPagination):
+    """Paginación por cursor sobre (fecha_creacion, id), sin OFFSET"""
+    ordering = ('-fecha_creacion', '-id')
+    page_size = 10
+
+
+class PaginacionCursorMixin:
+    """
+    Reemplaza la paginación por OFFSET de ListView por cursores sobre
+    (fecha_creacion, id). Las plantillas reciben page_obj con has_next/has_previous
+    y los cursores cursor_siguiente/cursor_anterior.
+    """
+    def paginate_queryset(self, queryset, page_size):
+        pagina = PaginacionCursorService.pagina(
+            queryset,
+            cursor=self.request.GET.get('cursor'),
+            direccion=self.request.GET.get('direccion', PaginacionCursorService.SIGUIENTE),
+            tamano=page_size
+        )
+        return (None, pagina, pagina.object_list, pagina.has_other_pages())
+
+
 class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para el modelo Notificacion (solo lectura)"""
     serializer_class = NotificacionSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['titulo', 'mensaje', 'tipo']
-    ordering_fields = ['fecha_creacion', 'leida']
+    pagination_class = NotificacionCursorPagination
+    # La búsqueda se limita al título: buscar en el mensaje recorre toda la bandeja
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['titulo']
     
     def get_queryset(self):
         """Filtrar notificaciones según el usuario"""
@@ -35,7 +60,7 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
         # Si es cliente, mostrar solo sus notificaciones
         try:
             cliente = Cliente.objects.get(usuario=usuario)
-            return Notificacion.objects.filter(cliente=cliente).order_by('-fecha_creacion')
+            return Notificacion.objects.filter(cliente=cliente).order_by('-fecha_creacion', '-id')
         except Cliente.DoesNotExist:
             return Notificacion.objects.none()
     
@@ -44,15 +69,8 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
         """Marcar todas las notificaciones del cliente como leídas"""
         try:
             cliente = request.user.cliente
-            notificaciones_no_leidas = Notificacion.objects.filter(
-                cliente=cliente,
-                leida=False
-            )
-            
-            count = notificaciones_no_leidas.count()
-            notificaciones_no_leidas.update(
-                leida=True,
-                fecha_lectura=timezone.now()
+            count = ContadorNotificacionesService.marcar_leidas(
+                Notificacion.objects.filter(cliente=cliente)
             )
             
             return Response({
@@ -74,26 +92,13 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
         try:
             cliente = Cliente.objects.get(usuario=usuario)
             
-            # Obtener notificaciones no leídas
-            notificaciones = Notificacion.objects.filter(
-                cliente=cliente,
-                leida=False
-            )
-            
-            # Marcar todas como leídas
-            ahora = timezone.now()
-            for notificacion in notificaciones:
-                notificacion.leida = True
-                notificacion.fecha_lectura = ahora
-            
-            # Actualizar en lote
-            Notificacion.objects.bulk_update(
-                notificaciones,
-                ['leida', 'fecha_lectura']
+            # Marcar todas como leídas en lote, actualizando los contadores
+            marcadas = ContadorNotificacionesService.marcar_leidas(
+                Notificacion.objects.filter(cliente=cliente)
             )
             
             return Response({
-                'mensaje': f'Se han marcado {notificaciones.count()} notificaciones como leídas'
+                'mensaje': f'Se han marcado {marcadas} notificaciones como leídas'
             }, status=status.HTTP_200_OK)
             
         except Cliente.DoesNotExist:
@@ -104,7 +109,7 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
 
 # Vistas adicionales para el sistema de notificaciones
 
-class NotificacionesClienteView(LoginRequiredMixin, ListView):
+class NotificacionesClienteView(LoginRequiredMixin, PaginacionCursorMixin, ListView):
     """Vista para mostrar las notificaciones del cliente"""
     model = Notificacion
     template_name = 'notificaciones/cliente.html'
@@ -122,22 +127,18 @@ class NotificacionesClienteView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if hasattr(self.request.user, 'cliente'):
-            notificaciones_no_leidas = Notificacion.objects.filter(
-                cliente=self.request.user.cliente,
-                leida=False
-            ).count()
-            total_notificaciones = Notificacion.objects.filter(
-                cliente=self.request.user.cliente
-            ).count()
+            resumen = ContadorNotificacionesService.resumen(
+                ContadorNotificacionesService.CLIENTE, self.request.user.cliente.pk
+            )
             
             context.update({
-                'notificaciones_no_leidas': notificaciones_no_leidas,
-                'total_notificaciones': total_notificaciones,
+                'notificaciones_no_leidas': resumen['no_leidas'],
+                'total_notificaciones': resumen['total'],
             })
         return context
 
 
-class NotificacionesLavadorView(LoginRequiredMixin, ListView):
+class NotificacionesLavadorView(LoginRequiredMixin, PaginacionCursorMixin, ListView):
     """Vista para mostrar las notificaciones del lavador"""
     model = Notificacion
     template_name = 'notificaciones/lavador.html'
@@ -150,36 +151,23 @@ class NotificacionesLavadorView(LoginRequiredMixin, ListView):
             # Mostrar notificaciones específicas para el empleado
             return Notificacion.objects.filter(
                 empleado=self.request.user.empleado,
-                tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO]
+                tipo__in=ContadorNotificacionesService.TIPOS_LAVADOR
             ).order_by('-fecha_creacion')
         return Notificacion.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if hasattr(self.request.user, 'empleado'):
-            notificaciones_no_leidas = Notificacion.objects.filter(
-                empleado=self.request.user.empleado,
-                tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO],
-                leida=False
-            ).count()
-            total_notificaciones = Notificacion.objects.filter(
-                empleado=self.request.user.empleado,
-                tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO]
-            ).count()
-            calificaciones_recibidas = Notificacion.objects.filter(
-                empleado=self.request.user.empleado,
-                tipo=Notificacion.CALIFICACION_RECIBIDA
-            ).count()
-            servicios_asignados = Notificacion.objects.filter(
-                empleado=self.request.user.empleado,
-                tipo=Notificacion.SERVICIO_ASIGNADO
-            ).count()
+            resumen = ContadorNotificacionesService.resumen(
+                ContadorNotificacionesService.EMPLEADO, self.request.user.empleado.pk
+            )
+            por_tipo = resumen['por_tipo']
             
             context.update({
-                'notificaciones_no_leidas': notificaciones_no_leidas,
-                'total_notificaciones': total_notificaciones,
-                'calificaciones_recibidas': calificaciones_recibidas,
-                'servicios_asignados': servicios_asignados,
+                'notificaciones_no_leidas': resumen['no_leidas'],
+                'total_notificaciones': resumen['total'],
+                'calificaciones_recibidas': por_tipo.get(Notificacion.CALIFICACION_RECIBIDA, {}).get('total', 0),
+                'servicios_asignados': por_tipo.get(Notificacion.SERVICIO_ASIGNADO, {}).get('total', 0),
             })
         return context
 
@@ -187,20 +175,15 @@ class NotificacionesLavadorView(LoginRequiredMixin, ListView):
 @login_required
 @require_http_methods(["GET"])
 def contador_notificaciones_api(request):
-    """API para obtener el contador de notificaciones no leídas"""
+    """
+    API para obtener el contador de notificaciones no leídas. Se sirve desde los
+    contadores en caché, sin consultar las notificaciones.
+    """
     count = 0
     
-    if hasattr(request.user, 'cliente'):
-        count = Notificacion.objects.filter(
-            cliente=request.user.cliente,
-            leida=False
-        ).count()
-    elif hasattr(request.user, 'empleado'):
-        count = Notificacion.objects.filter(
-            empleado=request.user.empleado,
-            tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO],
-            leida=False
-        ).count()
+    destinatario = ContadorNotificacionesService.destinatario(request.user)
+    if destinatario:
+        count = ContadorNotificacionesService.resumen(*destinatario)['no_leidas']
     
     return JsonResponse({'count': count})
 
@@ -218,17 +201,13 @@ def marcar_todas_leidas(request):
         elif hasattr(request.user, 'empleado'):
             notificaciones = Notificacion.objects.filter(
                 empleado=request.user.empleado,
-                tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO],
+                tipo__in=ContadorNotificacionesService.TIPOS_LAVADOR,
                 leida=False
             )
         else:
             return JsonResponse({'success': False, 'error': 'Usuario no válido'})
         
-        count = notificaciones.count()
-        notificaciones.update(
-            leida=True,
-            fecha_lectura=timezone.now()
-        )
+        count = ContadorNotificacionesService.marcar_leidas(notificaciones)
         
         return JsonResponse({
             'success': True, 
@@ -254,7 +233,7 @@ def marcar_notificacion_leida(request, notificacion_id):
                 Notificacion, 
                 id=notificacion_id, 
                 empleado=request.user.empleado,
-                tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO]
+                tipo__in=ContadorNotificacionesService.TIPOS_LAVADOR
             )
         else:
             return JsonResponse({'success': False, 'error': 'Usuario no válido'})
@@ -270,26 +249,38 @@ def marcar_notificacion_leida(request, notificacion_id):
 
 @login_required
 def notificaciones_dropdown_api(request):
-    """API para obtener solo las notificaciones no leídas para el dropdown"""
+    """
+    API para obtener solo las notificaciones no leídas para el dropdown, de 5 en 5
+    con el cursor `siguiente`. Sin no leídas no consulta las notificaciones, y la
+    primera página se guarda en caché hasta el siguiente cambio de los contadores
+    del destinatario.
+    """
+    destinatario = ContadorNotificacionesService.destinatario(request.user)
+    if not destinatario or not ContadorNotificacionesService.resumen(*destinatario)['no_leidas']:
+        return JsonResponse({'notificaciones': [], 'siguiente': None})
+    
+    campo, destinatario_id = destinatario
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return JsonResponse(_notificaciones_dropdown(campo, destinatario_id, cursor))
+    return JsonResponse(ContadorNotificacionesService.dropdown(
+        campo, destinatario_id, lambda: _notificaciones_dropdown(campo, destinatario_id)
+    ))
+
+
+def _notificaciones_dropdown(campo, destinatario_id, cursor=None):
+    """Página de 5 notificaciones no leídas del destinatario, serializadas para el dropdown."""
     notificaciones_data = []
     
-    if hasattr(request.user, 'cliente'):
-        # Solo mostrar notificaciones no leídas del cliente
-        notificaciones = Notificacion.objects.filter(
-            cliente=request.user.cliente,
-            leida=False
-        ).order_by('-fecha_creacion')[:5]
-    elif hasattr(request.user, 'empleado'):
-        # Solo mostrar notificaciones no leídas del empleado
-        notificaciones = Notificacion.objects.filter(
-            empleado=request.user.empleado,
-            tipo__in=[Notificacion.CALIFICACION_RECIBIDA, Notificacion.SERVICIO_ASIGNADO],
-            leida=False
-        ).order_by('-fecha_creacion')[:5]
-    else:
-        notificaciones = []
+    notificaciones = Notificacion.objects.filter(
+        **{f'{campo}_id': destinatario_id}, leida=False
+    ).select_related('empleado')
+    if campo == ContadorNotificacionesService.EMPLEADO:
+        # Solo mostrar las notificaciones que ve el lavador
+        notificaciones = notificaciones.filter(tipo__in=ContadorNotificacionesService.TIPOS_LAVADOR)
+    pagina = PaginacionCursorService.pagina(notificaciones, cursor=cursor, tamano=5)
     
-    for notif in notificaciones:
+    for notif in pagina:
         # Obtener información del empleado si existe
         empleado_info = None
         if notif.empleado:
@@ -305,11 +296,11 @@ def notificaciones_dropdown_api(request):
             'fecha': notif.fecha_creacion.strftime('%d/%m/%Y %H:%M'),
             'leida': notif.leida,
             'tipo': notif.tipo,
-            'reserva_id': notif.reserva.id if notif.reserva else None,
+            'reserva_id': notif.reserva_id,
             'empleado': empleado_info
         })
     
-    return JsonResponse({'notificaciones': notificaciones_data})
+    return {'notificaciones': notificaciones_data, 'siguiente': pagina.cursor_siguiente}
     
     @action(detail=False, methods=['get'])
     def no_leidas(self, request):
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReservasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservas'
+
+    def ready(self):
+        # Registrar señales que mantienen los mapas de ocupación de las bahías
+        from . import signals  # noqa: F401
@@ -0,0 +1,75 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from clientes.models import Cliente
+from empleados.models import Empleado
+
+from .services import EventosTiempoReal
+
+
+class EventosConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Une la conexión a los grupos que corresponden al usuario y reenvía los
+    eventos publicados por EventosTiempoReal. Si el usuario no tiene grupos
+    la conexión se rechaza.
+    """
+
+    async def connect(self):
+        self.grupos = await self.obtener_grupos(self.scope.get('user'))
+        if not self.grupos:
+            await self.close()
+            return
+
+        for grupo in self.grupos:
+            await self.channel_layer.group_add(grupo, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for grupo in getattr(self, 'grupos', None) or []:
+            await self.channel_layer.group_discard(grupo, self.channel_name)
+
+    async def evento(self, mensaje):
+        await self.send_json(mensaje['datos'])
+
+    async def obtener_grupos(self, usuario):
+        return []
+
+
+class TableroBahiasConsumer(EventosConsumer):
+    """Tablero de bahías del dashboard del administrador."""
+
+    async def obtener_grupos(self, usuario):
+        if usuario and usuario.is_authenticated and usuario.is_staff:
+            return [EventosTiempoReal.GRUPO_TABLERO]
+        return []
+
+
+class LavadorConsumer(EventosConsumer):
+    """Servicios asignados y notificaciones del lavador autenticado."""
+
+    async def obtener_grupos(self, usuario):
+        if not (usuario and usuario.is_authenticated):
+            return []
+        empleado_id = await database_sync_to_async(
+            lambda: Empleado.objects.filter(usuario_id=usuario.id).values_list('id', flat=True).first()
+        )()
+        return [EventosTiempoReal.grupo_lavador(empleado_id)] if empleado_id else []
+
+
+class ClienteConsumer(EventosConsumer):
+    """Reservas y notificaciones del cliente autenticado."""
+
+    async def obtener_grupos(self, usuario):
+        if not (usuario and usuario.is_authenticated):
+            return []
+        cliente_id = await database_sync_to_async(
+            lambda: Cliente.objects.filter(usuario_id=usuario.id).values_list('id', flat=True).first()
+        )()
+        return [EventosTiempoReal.grupo_cliente(cliente_id)] if cliente_id else []
+
+
+class PublicoConsumer(EventosConsumer):
+    """Pantalla pública del autolavado; no requiere autenticación."""
+
+    async def obtener_grupos(self, usuario):
+        return [EventosTiempoReal.GRUPO_PUBLICO]
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import datetime
+from reservas.services import AsignacionLavadoresService
+
+
+class Command(BaseCommand):
+    help = 'Asigna lavador a todas las reservas sin lavador de un día (despacho de la mañana)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            type=str,
+            help='Fecha de las reservas (YYYY-MM-DD). Por defecto, hoy'
+        )
+        parser.add_argument(
+            '--estrategia',
+            choices=list(AsignacionLavadoresService.ESTRATEGIAS),
+            default=AsignacionLavadoresService.MENOR_CARGA,
+            help='Criterio para elegir lavador (por defecto: menor_carga)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra las asignaciones sin guardarlas',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date() if options['fecha'] else timezone.now().date()
+        except ValueError:
+            raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        
+        dry_run = options['dry_run']
+        asignadas, sin_lavador = AsignacionLavadoresService.asignar_dia(
+            fecha, options['estrategia'], guardar=not dry_run
+        )
+        
+        prefijo = '[SIMULACIÓN] ' if dry_run else ''
+        for reserva in asignadas:
+            self.stdout.write(f'{prefijo}Reserva {reserva.id} ({reserva.fecha_hora:%H:%M}) asignada a {reserva.lavador.nombre_completo()}')
+        for reserva in sin_lavador:
+            self.stdout.write(self.style.WARNING(f'Reserva {reserva.id} ({reserva.fecha_hora:%H:%M}) sin lavador disponible'))
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefijo}Se asignaron {len(asignadas)} reservas del {fecha}; {len(sin_lavador)} quedaron sin lavador'
+        ))
@@ -15,8 +15,8 @@ Opciones:
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime, timedelta
 from reservas.models import Reserva
+from reservas.services import VencimientoReservasService
 
 class Command(BaseCommand):
     """Comando para cancelar reservas pendientes sin pago.
@@ -45,6 +45,12 @@ class Command(BaseCommand):
             default=5,
             help='Tiempo en minutos para cancelar reservas pendientes (por defecto: 5)',
         )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=VencimientoReservasService.TAMANO_LOTE,
+            help=f'Reservas por lote; cada lote se actualiza con un solo UPDATE (por defecto: {VencimientoReservasService.TAMANO_LOTE})',
+        )
 
     def handle(self, *args, **options):
         """Ejecuta el comando para cancelar reservas sin pago.
@@ -60,57 +66,37 @@ class Command(BaseCommand):
         minutos = options.get('minutos', 5)
         now = timezone.now()
         
-        # Calcular el tiempo límite (ahora menos los minutos configurados)
-        tiempo_limite = now - timedelta(minutes=minutos)
+        # Reservas pendientes creadas antes del tiempo límite
+        reservas_sin_pago = VencimientoReservasService.sin_pago(now, minutos)
         
-        # Buscar reservas pendientes creadas antes del tiempo límite
-        reservas_sin_pago = Reserva.objects.filter(
-            estado=Reserva.PENDIENTE,
-            fecha_creacion__lt=tiempo_limite
+        def reportar(filas):
+            for fila in filas:
+                if dry_run:
+                    self.stdout.write(f'[SIMULACIÓN] Cancelando la reserva {fila["id"]} - {fila["servicio"]} creada hace más de {minutos} minutos')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'Reserva {fila["id"]} - {fila["servicio"]} cancelada por falta de pago'))
+        
+        resumen = VencimientoReservasService.procesar(
+            reservas_sin_pago,
+            Reserva.CANCELADA,
+            nota=lambda estado: f'\nReserva cancelada automáticamente por falta de pago después de {minutos} minutos.',
+            titulo='Reserva Cancelada',
+            mensaje=lambda fila: f'Su reserva para {fila["servicio"]} programada para {fila["fecha_hora"].strftime("%d/%m/%Y a las %H:%M")} ha sido cancelada automáticamente por falta de pago.',
+            liberar_horarios=True,
+            tamano_lote=options['lote'],
+            dry_run=dry_run,
+            ahora=now,
+            por_lote=reportar
         )
         
-        # Contar cuántas reservas sin pago se encontraron
-        count = reservas_sin_pago.count()
-        self.stdout.write(self.style.SUCCESS(f'Se encontraron {count} reservas pendientes con más de {minutos} minutos sin pago'))
+        self.stdout.write(self.style.SUCCESS(f'Se encontraron {resumen["procesadas"]} reservas pendientes con más de {minutos} minutos sin pago'))
         
         # Si no hay reservas sin pago, terminar
-        if count == 0:
+        if resumen['procesadas'] == 0:
             return
-        
-        # Procesar cada reserva sin pago
-        for reserva in reservas_sin_pago:
-            if dry_run:
-                self.stdout.write(f'[SIMULACIÓN] Cancelando la reserva {reserva.id} de {reserva.cliente} - {reserva.servicio} creada hace más de {minutos} minutos')
-            else:
-                # Cancelar la reserva
-                reserva.estado = Reserva.CANCELADA
-                reserva.notas += f'\nReserva cancelada automáticamente por falta de pago después de {minutos} minutos.'
-                reserva.fecha_actualizacion = timezone.now()
-                reserva.save(update_fields=['estado', 'notas', 'fecha_actualizacion'])
-                
-                self.stdout.write(self.style.SUCCESS(f'Reserva {reserva.id} de {reserva.cliente} - {reserva.servicio} cancelada por falta de pago'))
-                
-                # Decrementar contador de reservas en el horario si existe
-                from reservas.models import HorarioDisponible
-                horarios = HorarioDisponible.objects.filter(
-                    fecha=reserva.fecha_hora.date(),
-                    hora_inicio__lte=reserva.fecha_hora.time(),
-                    hora_fin__gt=reserva.fecha_hora.time()
-                )
-                
-                for horario in horarios:
-                    horario.decrementar_reservas()
-                
-                # Crear notificación para el cliente
-                from notificaciones.models import Notificacion
-                Notificacion.objects.create(
-                    cliente=reserva.cliente,
-                    tipo=Notificacion.RESERVA_CANCELADA,
-                    titulo='Reserva Cancelada',
-                    mensaje=f'Su reserva para {reserva.servicio.nombre} programada para {reserva.fecha_hora.strftime("%d/%m/%Y a las %H:%M")} ha sido cancelada automáticamente por falta de pago.',
-                )
+        self.stdout.write(VencimientoReservasService.describir(resumen))
         
         if not dry_run:
-            self.stdout.write(self.style.SUCCESS(f'Proceso completado. Se cancelaron {count} reservas por falta de pago.'))
+            self.stdout.write(self.style.SUCCESS(f'Proceso completado. Se cancelaron {resumen["procesadas"]} reservas por falta de pago.'))
         else:
-            self.stdout.write(self.style.SUCCESS(f'Simulación completada. No se realizaron cambios.'))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS('Simulación completada. No se realizaron cambios.'))
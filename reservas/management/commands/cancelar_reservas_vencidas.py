@@ -15,9 +15,8 @@ Opciones:
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime, timedelta
 from reservas.models import Reserva
-from notificaciones.models import Notificacion
+from reservas.services import VencimientoReservasService
 
 class Command(BaseCommand):
     """Comando para cancelar reservas vencidas.
@@ -46,6 +45,12 @@ class Command(BaseCommand):
             default=2,
             help='Tiempo en horas de gracia después de la fecha programada (por defecto: 2)',
         )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=VencimientoReservasService.TAMANO_LOTE,
+            help=f'Reservas por lote; cada lote se actualiza con un solo UPDATE (por defecto: {VencimientoReservasService.TAMANO_LOTE})',
+        )
 
     def handle(self, *args, **options):
         """Ejecuta el comando para cancelar reservas vencidas.
@@ -61,65 +66,41 @@ class Command(BaseCommand):
         horas_gracia = options.get('horas', 2)
         now = timezone.now()
         
-        # Calcular el tiempo límite (ahora menos las horas de gracia)
-        tiempo_limite = now - timedelta(hours=horas_gracia)
+        # Reservas pendientes o confirmadas cuya fecha programada pasó hace más del tiempo de gracia
+        reservas_vencidas = VencimientoReservasService.vencidas(now, horas_gracia)
         
-        # Buscar reservas pendientes o confirmadas cuya fecha programada ya pasó
-        reservas_vencidas = Reserva.objects.filter(
-            estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA],
-            fecha_hora__lt=tiempo_limite
+        def motivo(estado):
+            return "No pago" if estado == Reserva.PENDIENTE else "Incumplimiento"
+        
+        def reportar(filas):
+            for fila in filas:
+                if dry_run:
+                    self.stdout.write(f'[SIMULACIÓN] Cancelando la reserva {fila["id"]} - {fila["servicio"]} programada para {fila["fecha_hora"]}')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'Reserva {fila["id"]} - {fila["servicio"]} cancelada por {motivo(fila["estado"]).lower()}'))
+        
+        resumen = VencimientoReservasService.procesar(
+            reservas_vencidas,
+            Reserva.CANCELADA,
+            nota=lambda estado: f'\nReserva cancelada automáticamente por {motivo(estado).lower()} después de {horas_gracia} horas de la fecha programada.',
+            titulo='Reserva Cancelada',
+            mensaje=lambda fila: f'Su reserva para {fila["servicio"]} programada para {fila["fecha_hora"].strftime("%d/%m/%Y a las %H:%M")} ha sido cancelada automáticamente por {motivo(fila["estado"]).lower()}.',
+            liberar_horarios=True,
+            tamano_lote=options['lote'],
+            dry_run=dry_run,
+            ahora=now,
+            por_lote=reportar
         )
         
-        # Contar cuántas reservas vencidas se encontraron
-        count = reservas_vencidas.count()
-        self.stdout.write(self.style.SUCCESS(f'Se encontraron {count} reservas vencidas con más de {horas_gracia} horas desde su fecha programada'))
+        self.stdout.write(self.style.SUCCESS(f'Se encontraron {resumen["procesadas"]} reservas vencidas con más de {horas_gracia} horas desde su fecha programada'))
         
         # Si no hay reservas vencidas, terminar
-        if count == 0:
+        if resumen['procesadas'] == 0:
             self.stdout.write(self.style.SUCCESS('No se encontraron reservas vencidas para cancelar.'))
             return
-        
-        # Procesar cada reserva vencida
-        canceladas = 0
-        for reserva in reservas_vencidas:
-            if dry_run:
-                self.stdout.write(f'[SIMULACIÓN] Cancelando la reserva {reserva.id} de {reserva.cliente} - {reserva.servicio} programada para {reserva.fecha_hora}')
-            else:
-                # Determinar el motivo de cancelación
-                motivo = "No pago" if reserva.estado == Reserva.PENDIENTE else "Incumplimiento"
-                
-                # Cancelar la reserva
-                reserva.estado = Reserva.CANCELADA
-                reserva.notas += f'\nReserva cancelada automáticamente por {motivo.lower()} después de {horas_gracia} horas de la fecha programada.'
-                reserva.fecha_actualizacion = timezone.now()
-                reserva.save(update_fields=['estado', 'notas', 'fecha_actualizacion'])
-                
-                self.stdout.write(self.style.SUCCESS(f'Reserva {reserva.id} de {reserva.cliente} - {reserva.servicio} cancelada por {motivo.lower()}'))
-                
-                # Decrementar contador de reservas en el horario si existe
-                from reservas.models import HorarioDisponible
-                horarios = HorarioDisponible.objects.filter(
-                    fecha=reserva.fecha_hora.date(),
-                    hora_inicio__lte=reserva.fecha_hora.time(),
-                    hora_fin__gt=reserva.fecha_hora.time()
-                )
-                
-                for horario in horarios:
-                    horario.decrementar_reservas()
-                
-                # Crear notificación para el cliente
-                mensaje = f'Su reserva para {reserva.servicio.nombre} programada para {reserva.fecha_hora.strftime("%d/%m/%Y a las %H:%M")} ha sido cancelada automáticamente por {motivo.lower()}.'
-                
-                Notificacion.objects.create(
-                    cliente=reserva.cliente,
-                    tipo=Notificacion.RESERVA_CANCELADA,
-                    titulo='Reserva Cancelada',
-                    mensaje=mensaje,
-                )
-                
-                canceladas += 1
+        self.stdout.write(VencimientoReservasService.describir(resumen))
         
         if not dry_run:
-            self.stdout.write(self.style.SUCCESS(f'Proceso completado. Se cancelaron {canceladas} reservas vencidas.'))
+            self.stdout.write(self.style.SUCCESS(f'Proceso completado. Se cancelaron {resumen["procesadas"]} reservas vencidas.'))
         else:
-            self.stdout.write(self.style.SUCCESS(f'Simulación completada. No se realizaron cambios.'))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS('Simulación completada. No se realizaron cambios.'))
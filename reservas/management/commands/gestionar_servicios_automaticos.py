@@ -17,6 +17,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import datetime, timedelta
 from reservas.models import Reserva
+from reservas.services import AsignacionLavadoresService
 
 class Command(BaseCommand):
     """Comando para gestionar automáticamente servicios.
@@ -98,6 +99,12 @@ class Command(BaseCommand):
         if count_inicio == 0:
             return
         
+        # Asignar en un solo paso lavador a las que no lo tienen, en vez de uno por reserva
+        if not dry_run:
+            AsignacionLavadoresService.asignar_lote(
+                reservas_por_iniciar.filter(lavador__isnull=True).select_related('servicio')
+            )
+        
         # Procesar cada reserva por iniciar
         for reserva in reservas_por_iniciar:
             if dry_run:
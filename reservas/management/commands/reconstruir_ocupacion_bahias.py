@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import datetime
+from reservas.models import Reserva
+from reservas.services import OcupacionService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los mapas de ocupación de las bahías a partir de la tabla de reservas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Fecha inicial (YYYY-MM-DD). Por defecto, hoy'
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Fecha final (YYYY-MM-DD). Por defecto, la fecha de la última reserva'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else timezone.now().date()
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else None
+        except ValueError:
+            raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        
+        if hasta is None:
+            ultima = Reserva.objects.order_by('-fecha_hora').values_list('fecha_hora', flat=True).first()
+            hasta = max(desde, ultima.date()) if ultima else desde
+        
+        if hasta < desde:
+            raise CommandError('La fecha final no puede ser anterior a la inicial')
+        
+        mapas = OcupacionService.reconstruir(desde, hasta)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Se reconstruyeron {mapas} mapas de ocupación entre {desde} y {hasta}'
+        ))
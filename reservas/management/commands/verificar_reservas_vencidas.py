@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime, timedelta
 from reservas.models import Reserva
+from reservas.services import VencimientoReservasService
 
 """
 Comando Django para verificar y marcar como incumplidas las reservas vencidas.
@@ -46,6 +46,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Ejecuta en modo simulación sin realizar cambios',
         )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=VencimientoReservasService.TAMANO_LOTE,
+            help=f'Reservas por lote; cada lote se actualiza con un solo UPDATE (por defecto: {VencimientoReservasService.TAMANO_LOTE})',
+        )
 
     def handle(self, *args, **options):
         """
@@ -68,50 +74,31 @@ class Command(BaseCommand):
         dry_run = options.get('dry_run', False)
         now = timezone.now()
         
-        # Buscar reservas pendientes o confirmadas cuya fecha y hora + duración del servicio ya haya pasado
-        reservas_vencidas = Reserva.objects.filter(
-            estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA],
-            fecha_hora__lt=now
-        )
+        # Reservas pendientes o confirmadas cuya fecha y hora + duración del servicio ya pasó (en SQL)
+        reservas_vencidas = VencimientoReservasService.incumplidas(now)
         
-        # Contar cuántas reservas vencidas se encontraron
-        count = reservas_vencidas.count()
-        self.stdout.write(self.style.SUCCESS(f'Se encontraron {count} reservas vencidas'))
+        def reportar(filas):
+            for fila in filas:
+                prefijo = '[SIMULACIÓN] Marcando' if dry_run else 'Marcada'
+                self.stdout.write(f'{prefijo} como INCUMPLIDA la reserva {fila["id"]} - {fila["servicio"]} programada para {fila["fecha_hora"]}')
         
-        # Si no hay reservas vencidas, terminar
-        if count == 0:
-            return
+        resumen = VencimientoReservasService.procesar(
+            reservas_vencidas,
+            Reserva.INCUMPLIDA,
+            nota=lambda estado: '\nReserva marcada como INCUMPLIDA automáticamente por sistema.',
+            titulo='Reserva incumplida',
+            mensaje=lambda fila: f'Su reserva para {fila["servicio"]} programada para {fila["fecha_hora"]} ha sido marcada como incumplida por el sistema.',
+            tamano_lote=options['lote'],
+            dry_run=dry_run,
+            ahora=now,
+            por_lote=reportar
+        )
         
-        # Procesar cada reserva vencida
-        for reserva in reservas_vencidas:
-            # Calcular si el tiempo del servicio ya pasó
-            tiempo_servicio = reserva.fecha_hora + timedelta(minutes=reserva.servicio.duracion_minutos)
-            
-            if tiempo_servicio < now:
-                # La reserva está vencida y el tiempo del servicio ya pasó
-                if dry_run:
-                    self.stdout.write(f'[SIMULACIÓN] Marcando como INCUMPLIDA la reserva {reserva.id} de {reserva.cliente} - {reserva.servicio} programada para {reserva.fecha_hora}')
-                else:
-                    # Marcar como INCUMPLIDA usando el nuevo estado
-                    reserva.estado = Reserva.INCUMPLIDA
-                    reserva.notas += '\nReserva marcada como INCUMPLIDA automáticamente por sistema.'
-                    reserva.fecha_actualizacion = timezone.now()
-                    reserva.save(update_fields=['estado', 'notas', 'fecha_actualizacion'])
-                    
-                    self.stdout.write(self.style.SUCCESS(f'Reserva {reserva.id} de {reserva.cliente} - {reserva.servicio} marcada como INCUMPLIDA'))
-                    
-                    # Crear notificación para el cliente
-                    from notificaciones.models import Notificacion
-                    Notificacion.objects.create(
-                        cliente=reserva.cliente,
-                        titulo='Reserva incumplida',
-                        mensaje=f'Su reserva para {reserva.servicio.nombre} programada para {reserva.fecha_hora} ha sido marcada como incumplida por el sistema.',
-                        tipo=Notificacion.RESERVA_CANCELADA
-                    )
-            else:
-                self.stdout.write(f'La reserva {reserva.id} está pendiente pero aún no ha pasado el tiempo del servicio')
+        self.stdout.write(self.style.SUCCESS(f'Se encontraron {resumen["procesadas"]} reservas vencidas'))
+        if resumen['procesadas']:
+            self.stdout.write(VencimientoReservasService.describir(resumen))
         
         if not dry_run:
-            self.stdout.write(self.style.SUCCESS(f'Proceso completado. Se marcaron reservas incumplidas.'))
+            self.stdout.write(self.style.SUCCESS(f'Proceso completado. Se marcaron {resumen["procesadas"]} reservas incumplidas.'))
         else:
-            self.stdout.write(self.style.SUCCESS(f'Simulación completada. No se realizaron cambios.'))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS(f'Simulación completada. No se realizaron cambios.'))
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def poblar_ocupacion(apps, schema_editor):
+    """Construye los mapas de ocupación a partir de las reservas activas existentes."""
+    Reserva = apps.get_model('reservas', 'Reserva')
+    OcupacionBahia = apps.get_model('reservas', 'OcupacionBahia')
+
+    mapas = {}
+    reservas = Reserva.objects.filter(
+        estado__in=['PE', 'CO', 'PR'],
+        bahia__isnull=False
+    ).values_list('fecha_hora', 'servicio__duracion_minutos', 'bahia_id')
+
+    for fecha_hora, duracion, bahia_id in reservas:
+        inicio = fecha_hora.hour * 60 + fecha_hora.minute
+        fin = inicio + (duracion or 0)
+        primera = inicio // 15
+        ultima = min(95, max(primera, (fin + 14) // 15 - 1))
+        clave = (fecha_hora.date(), bahia_id)
+        mapas[clave] = mapas.get(clave, 0) | (((1 << (ultima - primera + 1)) - 1) << primera)
+
+    OcupacionBahia.objects.bulk_create([
+        OcupacionBahia(fecha=fecha, bahia_id=bahia_id, mapa=format(mascara, 'x'))
+        for (fecha, bahia_id), mascara in mapas.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0028_alter_reserva_empleado_finalizacion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacionBahia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('mapa', models.CharField(default='0', max_length=24, verbose_name='Mapa de Ocupación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('bahia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupaciones', to='reservas.bahia', verbose_name='Bahía')),
+            ],
+            options={
+                'verbose_name': 'Ocupación de Bahía',
+                'verbose_name_plural': 'Ocupaciones de Bahías',
+                'ordering': ['fecha', 'bahia'],
+                'unique_together': {('fecha', 'bahia')},
+            },
+        ),
+        migrations.RunPython(poblar_ocupacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_auto_20250910_2314'),
+        ('empleados', '0013_alter_bonificacion_calificacion_minima_and_more'),
+        ('reservas', '0029_ocupacionbahia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueoHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Token')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('inicio', models.DateTimeField(verbose_name='Inicio')),
+                ('fin', models.DateTimeField(verbose_name='Fin')),
+                ('expira', models.DateTimeField(verbose_name='Expira')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('bahia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bloqueos', to='reservas.bahia', verbose_name='Bahía')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bloqueos_horario', to='clientes.cliente', verbose_name='Cliente')),
+                ('lavador', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bloqueos_horario', to='empleados.empleado', verbose_name='Lavador')),
+            ],
+            options={
+                'verbose_name': 'Bloqueo de Horario',
+                'verbose_name_plural': 'Bloqueos de Horario',
+                'ordering': ['inicio'],
+                'indexes': [models.Index(fields=['fecha', 'expira'], name='reservas_bl_fecha_620040_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0030_bloqueohorario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionDisponibilidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=10, unique=True, verbose_name='Clave')),
+                ('generacion', models.BigIntegerField(default=0, verbose_name='Generación')),
+            ],
+            options={
+                'verbose_name': 'Generación de Disponibilidad',
+                'verbose_name_plural': 'Generaciones de Disponibilidad',
+            },
+        ),
+    ]
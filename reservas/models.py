@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -268,75 +269,25 @@ class Reserva(models.Model):
             return True
         return False
     
-    def asignar_lavador(self, lavador=None, automatico=True):
+    def asignar_lavador(self, lavador=None, automatico=True, estrategia='menor_carga'):
         """
         Asigna un lavador a la reserva. Si no se especifica un lavador,
-        se asigna automáticamente uno disponible que no tenga conflictos de horario.
+        se asigna automáticamente uno disponible que no tenga conflictos de horario,
+        elegido según la estrategia (menor_carga, mejor_calificado o menos_cambios_bahia).
         """
-        from empleados.models import Empleado
-        from datetime import datetime, timedelta
+        from .services import AsignacionLavadoresService
         
         if lavador:
             self.lavador = lavador
             self.asignacion_automatica = False
         else:
-            # Buscar lavadores disponibles
-            lavadores_base = Empleado.objects.filter(
-                rol=Empleado.ROL_LAVADOR,
-                disponible=True,
-                activo=True
-            )
-            
-            # Filtrar lavadores que no tengan conflictos de horario
-            lavadores_sin_conflicto = []
-            
-            for lavador_candidato in lavadores_base:
-                # Calcular duración del servicio actual
-                duracion_servicio = 1  # Por defecto 1 hora
-                if self.servicio:
-                    duracion_servicio = (self.servicio.duracion_minutos + 59) // 60
-                
-                # Calcular hora de fin de la nueva reserva
-                hora_fin_nueva = self.fecha_hora + timedelta(hours=duracion_servicio)
-                
-                # Verificar si el lavador tiene conflictos
-                reservas_conflicto = Reserva.objects.filter(
-                    lavador=lavador_candidato,
-                    fecha_hora__date=self.fecha_hora.date(),
-                    estado__in=[self.PENDIENTE, self.CONFIRMADA, self.EN_PROCESO]
-                ).exclude(id=self.id)  # Excluir la reserva actual
-                
-                tiene_conflicto = False
-                for reserva_existente in reservas_conflicto:
-                    # Calcular hora de fin de la reserva existente
-                    duracion_existente = 1  # Por defecto 1 hora
-                    if reserva_existente.servicio:
-                        duracion_existente = (reserva_existente.servicio.duracion_minutos + 59) // 60
-                    
-                    hora_fin_existente = reserva_existente.fecha_hora + timedelta(hours=duracion_existente)
-                    
-                    # Verificar solapamiento
-                    if (self.fecha_hora < hora_fin_existente and hora_fin_nueva > reserva_existente.fecha_hora):
-                        tiene_conflicto = True
-                        break
-                
-                if not tiene_conflicto:
-                    lavadores_sin_conflicto.append(lavador_candidato)
-            
-            if lavadores_sin_conflicto:
-                # Asignar el lavador con menos reservas pendientes
-                lavador_asignado = sorted(
-                    lavadores_sin_conflicto,
-                    key=lambda l: l.reservas_asignadas.filter(
-                        estado__in=[self.PENDIENTE, self.CONFIRMADA, self.EN_PROCESO]
-                    ).count()
-                )[0]
-                
-                self.lavador = lavador_asignado
-                self.asignacion_automatica = True
-            else:
+            lavador_asignado = AsignacionLavadoresService.asignar(self, estrategia)
+            if lavador_asignado is None:
                 # No hay lavadores disponibles sin conflictos
                 raise ValueError("No hay lavadores disponibles para este horario")
+            
+            self.lavador = lavador_asignado
+            self.asignacion_automatica = True
         
         self.save(update_fields=['lavador', 'asignacion_automatica'])
         return self.lavador
@@ -823,6 +774,82 @@ class HorarioDisponible(models.Model):
         return False
 
 
+class OcupacionBahia(models.Model):
+    """
+    Mapa de ocupación diario de una bahía.
+
+    El mapa es un arreglo de bits de celdas de 15 minutos (96 celdas por día),
+    guardado en hexadecimal. El bit i está encendido si alguna reserva activa
+    de la bahía ocupa la celda que empieza en el minuto i * 15 del día.
+    Se mantiene de forma incremental desde las señales de Reserva y puede
+    reconstruirse con el comando reconstruir_ocupacion_bahias.
+    """
+    fecha = models.DateField(verbose_name=_('Fecha'))
+    bahia = models.ForeignKey(Bahia, on_delete=models.CASCADE, related_name='ocupaciones', verbose_name=_('Bahía'))
+    mapa = models.CharField(max_length=24, default='0', verbose_name=_('Mapa de Ocupación'))
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name=_('Última Actualización'))
+
+    class Meta:
+        verbose_name = _('Ocupación de Bahía')
+        verbose_name_plural = _('Ocupaciones de Bahías')
+        ordering = ['fecha', 'bahia']
+        unique_together = ['fecha', 'bahia']
+
+    def __str__(self):
+        return f"{self.bahia} - {self.fecha.strftime('%d/%m/%Y')}"
+
+    @property
+    def mascara(self):
+        return int(self.mapa or '0', 16)
+
+
+class BloqueoHorario(models.Model):
+    """
+    Bloqueo temporal de un horario (bahía, lavador e intervalo) mientras el
+    cliente completa la reserva. Los bloqueos vigentes cuentan como ocupación
+    en las consultas de disponibilidad y dejan de hacerlo al expirar.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name=_('Token'))
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='bloqueos_horario', verbose_name=_('Cliente'))
+    bahia = models.ForeignKey(Bahia, on_delete=models.CASCADE, related_name='bloqueos', verbose_name=_('Bahía'))
+    lavador = models.ForeignKey('empleados.Empleado', on_delete=models.CASCADE, null=True, blank=True, related_name='bloqueos_horario', verbose_name=_('Lavador'))
+    fecha = models.DateField(verbose_name=_('Fecha'))
+    inicio = models.DateTimeField(verbose_name=_('Inicio'))
+    fin = models.DateTimeField(verbose_name=_('Fin'))
+    expira = models.DateTimeField(verbose_name=_('Expira'))
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name=_('Fecha de Creación'))
+
+    class Meta:
+        verbose_name = _('Bloqueo de Horario')
+        verbose_name_plural = _('Bloqueos de Horario')
+        ordering = ['inicio']
+        indexes = [models.Index(fields=['fecha', 'expira'])]
+
+    def __str__(self):
+        return f"{self.bahia} - {self.inicio.strftime('%d/%m/%Y %H:%M')} ({self.cliente})"
+
+    @property
+    def vigente(self):
+        return self.expira > datetime.now()
+
+
+class GeneracionDisponibilidad(models.Model):
+    """
+    Generación del cache de horarios disponibles de una fecha ('global' para las
+    que afectan a todas). Vive en la base de datos para que todos los procesos
+    vean la misma aunque cada uno tenga su propio cache local.
+    """
+    clave = models.CharField(max_length=10, unique=True, verbose_name=_('Clave'))
+    generacion = models.BigIntegerField(default=0, verbose_name=_('Generación'))
+
+    class Meta:
+        verbose_name = _('Generación de Disponibilidad')
+        verbose_name_plural = _('Generaciones de Disponibilidad')
+
+    def __str__(self):
+        return f"{self.clave}: {self.generacion}"
+
+
 class Recompensa(models.Model):
     """
     Modelo de recompensas vinculadas a un Servicio.
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/tablero-bahias/', consumers.TableroBahiasConsumer.as_asgi()),
+    path('ws/lavador/', consumers.LavadorConsumer.as_asgi()),
+    path('ws/cliente/', consumers.ClienteConsumer.as_asgi()),
+    path('ws/publico/', consumers.PublicoConsumer.as_asgi()),
+]
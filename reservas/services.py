@@ -0,0 +1,1178 @@
+import hashlib
+import logging
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q, Value, Window
+from django.db.models.functions import Concat, Greatest, RowNumber
+
+from empleados.models import Empleado
+
+from .models import Bahia, Reserva, OcupacionBahia, HorarioDisponible, DisponibilidadHoraria, BloqueoHorario, Servicio, GeneracionDisponibilidad
+
+logger = logging.getLogger(__name__)
+
+
+class HorarioNoDisponible(Exception):
+    """El horario pedido se cruza con reservas activas o con bloqueos de otros clientes."""
+
+
+class DisponibilidadService:
+    """
+    Servicio para calcular la disponibilidad de bloques horarios de un día
+    a partir de los mapas de ocupación de las bahías.
+    """
+
+    # Estados que ocupan una bahía
+    ESTADOS_ACTIVOS = [Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
+
+    # Duración de cada bloque de la grilla de horarios
+    MINUTOS_BLOQUE = 15
+
+    # Límite de seguridad de bloques por rango (18 horas * 4 bloques)
+    MAX_BLOQUES_RANGO = 72
+
+    # Máximo de días que se pueden consultar en el calendario
+    MAX_DIAS_CALENDARIO = 31
+
+    @staticmethod
+    def reservas_activas(fecha_inicio, fecha_fin=None):
+        """
+        Retorna una consulta con las reservas activas entre dos fechas (incluidas),
+        con la duración del servicio ya resuelta en la misma consulta.
+        """
+        fecha_fin = fecha_fin or fecha_inicio
+        desde = datetime.combine(fecha_inicio, datetime.min.time())
+        hasta = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+
+        return Reserva.objects.filter(
+            fecha_hora__gte=desde,
+            fecha_hora__lt=hasta,
+            estado__in=DisponibilidadService.ESTADOS_ACTIVOS
+        ).values_list('id', 'fecha_hora', 'servicio__duracion_minutos', 'bahia_id', 'lavador_id')
+
+    @staticmethod
+    def generar_bloques(fecha, hora_inicio, hora_fin):
+        """
+        Genera los bloques de 15 minutos (inicio, fin) de un rango horario.
+        El último bloque se recorta al fin del rango.
+        """
+        bloques = []
+        paso = timedelta(minutes=DisponibilidadService.MINUTOS_BLOQUE)
+        actual = datetime.combine(fecha, hora_inicio)
+        limite = datetime.combine(fecha, hora_fin)
+
+        while actual < limite and len(bloques) < DisponibilidadService.MAX_BLOQUES_RANGO:
+            bloques.append((actual, min(actual + paso, limite)))
+            actual += paso
+
+        return bloques
+
+    @staticmethod
+    def horarios_por_bloques(fecha, rangos, bahia_ids, mapas, ahora=None, duracion_minutos=None):
+        """
+        Construye la lista de horarios de 15 minutos para los rangos indicados,
+        omitiendo los bloques que ya pasaron y calculando las bahías libres de cada uno
+        a partir de los mapas de ocupación del día.
+
+        Sin `duracion_minutos` la ocupación se mide sobre el bloque; con ella una
+        bahía solo cuenta como libre si tiene libres todas las celdas consecutivas
+        del servicio, y el servicio tiene que terminar dentro del rango.
+        """
+        ahora = ahora or datetime.now()
+        total_bahias = len(bahia_ids)
+        mascaras = [mapas.get(bahia_id, 0) for bahia_id in bahia_ids]
+        duracion = duracion_minutos or DisponibilidadService.MINUTOS_BLOQUE
+
+        horarios = []
+        for hora_inicio, hora_fin in rangos:
+            limite = datetime.combine(fecha, hora_fin)
+            for inicio, fin in DisponibilidadService.generar_bloques(fecha, hora_inicio, hora_fin):
+                # Verificar si el horario ya pasó (solo para hoy)
+                if fecha == ahora.date() and inicio.time() <= ahora.time():
+                    continue
+
+                if duracion_minutos and inicio + timedelta(minutes=duracion_minutos) > limite:
+                    bahias_disponibles = 0
+                else:
+                    celdas = OcupacionService.mascara(inicio, duracion)
+                    ocupadas = sum(1 for mascara in mascaras if mascara & celdas)
+                    bahias_disponibles = max(0, total_bahias - ocupadas)
+
+                horarios.append({
+                    'hora_inicio': inicio.strftime('%H:%M'),
+                    'hora_fin': fin.strftime('%H:%M'),
+                    'disponible': bahias_disponibles > 0,
+                    'bahias_disponibles': bahias_disponibles,
+                    'bahias_totales': total_bahias
+                })
+
+        return horarios
+
+    @staticmethod
+    def calendario(fecha_inicio, fecha_fin, bahia_ids, incluir_detalle=False, duracion_minutos=None):
+        """
+        Calcula el resumen de disponibilidad de cada día entre dos fechas (incluidas)
+        cargando horarios específicos, disponibilidad general y mapas de ocupación
+        de toda la ventana en una consulta cada uno. Con `duracion_minutos` un
+        horario solo cuenta como libre si el servicio completo cabe en una bahía.
+        """
+        # Horarios específicos por fecha; tienen prioridad sobre la disponibilidad general
+        especificos = defaultdict(list)
+        for fecha, hora_inicio, hora_fin in HorarioDisponible.objects.filter(
+            fecha__range=(fecha_inicio, fecha_fin),
+            disponible=True
+        ).order_by('fecha', 'hora_inicio').values_list('fecha', 'hora_inicio', 'hora_fin'):
+            especificos[fecha].append((hora_inicio, hora_fin))
+
+        generales = defaultdict(list)
+        for dia_semana, hora_inicio, hora_fin in DisponibilidadHoraria.objects.filter(
+            activo=True
+        ).order_by('hora_inicio').values_list('dia_semana', 'hora_inicio', 'hora_fin'):
+            generales[dia_semana].append((hora_inicio, hora_fin))
+
+        mapas = OcupacionService.mapas_rango(fecha_inicio, fecha_fin)
+        ahora = datetime.now()
+
+        dias = []
+        fecha = fecha_inicio
+        while fecha <= fecha_fin:
+            rangos = especificos.get(fecha) or generales.get(fecha.weekday(), [])
+            horarios = DisponibilidadService.horarios_por_bloques(
+                fecha, rangos, bahia_ids, mapas.get(fecha, {}), ahora, duracion_minutos
+            )
+            libres = [horario for horario in horarios if horario['disponible']]
+
+            # Porcentaje de bahías-bloque ocupadas, para pintar el mapa de calor
+            capacidad = len(horarios) * len(bahia_ids)
+            disponibles = sum(horario['bahias_disponibles'] for horario in horarios)
+            ocupacion = round(100 * (capacidad - disponibles) / capacidad) if capacidad else 0
+
+            dia = {
+                'fecha': fecha.strftime('%Y-%m-%d'),
+                'dia_semana': fecha.weekday(),
+                'total_horarios': len(horarios),
+                'horarios_libres': len(libres),
+                'primer_horario_libre': libres[0]['hora_inicio'] if libres else None,
+                'porcentaje_ocupacion': ocupacion,
+            }
+            if incluir_detalle:
+                dia['horarios'] = horarios
+
+            dias.append(dia)
+            fecha += timedelta(days=1)
+
+        return dias
+
+
+class LavadoresDisponiblesService:
+    """
+    Servicio para saber qué lavadores están libres en un intervalo de un día.
+    Carga las reservas del día en una sola consulta, agrupadas por lavador, y
+    los lavadores con su calificación promedio en otra, sin importar cuántos haya.
+    """
+
+    # Las reservas bloquean al lavador en horas completas (redondeando hacia arriba)
+    MINUTOS_BLOQUEO = 60
+
+    @staticmethod
+    def duracion_bloqueo(duracion_minutos):
+        """Redondea la duración de un servicio a horas completas (mínimo una hora)."""
+        bloque = LavadoresDisponiblesService.MINUTOS_BLOQUEO
+        if not duracion_minutos:
+            return timedelta(minutes=bloque)
+        return timedelta(minutes=(duracion_minutos + bloque - 1) // bloque * bloque)
+
+    @staticmethod
+    def agenda_del_dia(fecha, excluir_cliente_id=None):
+        """
+        Retorna {lavador_id: (inicios, fines_maximos)} con los intervalos ocupados
+        de cada lavador (reservas y bloqueos vigentes) ordenados por inicio.
+        `fines_maximos[i]` es el mayor fin entre los primeros i+1 intervalos, lo que
+        permite detectar un cruce con una búsqueda binaria aunque se solapen.
+        """
+        intervalos = defaultdict(list)
+        for _, fecha_hora, duracion, _, lavador_id in DisponibilidadService.reservas_activas(fecha).filter(
+            lavador_id__isnull=False
+        ):
+            intervalos[lavador_id].append(
+                (fecha_hora, fecha_hora + LavadoresDisponiblesService.duracion_bloqueo(duracion))
+            )
+        for lavador_id, inicio, fin, _ in BloqueoService.intervalos_lavadores(fecha, excluir_cliente_id):
+            intervalos[lavador_id].append((inicio, fin))
+
+        agenda = {}
+        for lavador_id, lista in intervalos.items():
+            lista.sort()
+            fines_maximos = []
+            for _, fin in lista:
+                fines_maximos.append(max(fin, fines_maximos[-1]) if fines_maximos else fin)
+            agenda[lavador_id] = ([inicio for inicio, _ in lista], fines_maximos)
+        return agenda
+
+    @staticmethod
+    def tiene_conflicto(agenda_lavador, inicio, fin):
+        """Indica si algún intervalo de la agenda se cruza con [inicio, fin)."""
+        if not agenda_lavador:
+            return False
+        inicios, fines_maximos = agenda_lavador
+        # Intervalos que empiezan antes del fin solicitado
+        candidatos = bisect_left(inicios, fin)
+        return candidatos > 0 and fines_maximos[candidatos - 1] > inicio
+
+    @staticmethod
+    def lavadores_disponibles(inicio, fin, solo_disponibles=True):
+        """
+        Retorna los lavadores activos sin reservas que se crucen con [inicio, fin),
+        con el cargo cargado; la calificación promedio está desnormalizada en el empleado.
+        """
+        agenda = LavadoresDisponiblesService.agenda_del_dia(inicio.date())
+
+        lavadores = Empleado.objects.filter(
+            rol=Empleado.ROL_LAVADOR,
+            activo=True
+        ).select_related('cargo')
+        if solo_disponibles:
+            lavadores = lavadores.filter(disponible=True)
+
+        return [
+            lavador for lavador in lavadores
+            if not LavadoresDisponiblesService.tiene_conflicto(agenda.get(lavador.id), inicio, fin)
+        ]
+
+
+class AsignacionLavadoresService:
+    """
+    Motor de asignación automática de lavadores.
+
+    Carga en una consulta los candidatos con su carga de trabajo y calificación, y
+    en otra la agenda del día de todos ellos; con eso resuelve conflictos y puntajes
+    en memoria, tanto para una reserva como para todas las de un día.
+    """
+
+    MENOR_CARGA = 'menor_carga'
+    MEJOR_CALIFICADO = 'mejor_calificado'
+    MENOS_CAMBIOS_BAHIA = 'menos_cambios_bahia'
+
+    # Cada estrategia ordena candidatos: el menor puntaje gana
+    ESTRATEGIAS = {
+        MENOR_CARGA: lambda candidato, cambios: (candidato.carga, -(candidato.calificacion_promedio or 0)),
+        MEJOR_CALIFICADO: lambda candidato, cambios: (-(candidato.calificacion_promedio or 0), candidato.carga),
+        MENOS_CAMBIOS_BAHIA: lambda candidato, cambios: (cambios, candidato.carga),
+    }
+
+    @staticmethod
+    def candidatos():
+        """
+        Lavadores activos y disponibles con su número de reservas activas asignadas
+        (`carga`), en una sola consulta; la calificación promedio se lee de los
+        agregados desnormalizados del empleado.
+        """
+        return list(Empleado.objects.filter(
+            rol=Empleado.ROL_LAVADOR,
+            disponible=True,
+            activo=True
+        ).annotate(
+            carga=Count('reservas_asignadas', filter=Q(reservas_asignadas__estado__in=DisponibilidadService.ESTADOS_ACTIVOS))
+        ))
+
+    @staticmethod
+    def agenda(fechas, excluir_ids=()):
+        """
+        Retorna {(fecha, lavador_id): [(inicio, fin, bahia_id), ...]} ordenado por inicio
+        con las reservas activas ya asignadas en las fechas indicadas.
+        """
+        agenda = defaultdict(list)
+        for fecha in sorted(set(fechas)):
+            for reserva_id, fecha_hora, duracion, bahia_id, lavador_id in DisponibilidadService.reservas_activas(
+                fecha
+            ).filter(lavador_id__isnull=False).exclude(id__in=excluir_ids):
+                fin = fecha_hora + LavadoresDisponiblesService.duracion_bloqueo(duracion)
+                agenda[(fecha, lavador_id)].append((fecha_hora, fin, bahia_id))
+            # Los lavadores con un bloqueo vigente tampoco se asignan en ese intervalo
+            for lavador_id, inicio, fin, bahia_id in BloqueoService.intervalos_lavadores(fecha):
+                agenda[(fecha, lavador_id)].append((inicio, fin, bahia_id))
+
+        for intervalos in agenda.values():
+            intervalos.sort(key=lambda intervalo: intervalo[0])
+        return agenda
+
+    @staticmethod
+    def _evaluar(intervalos, inicio, fin, bahia_id):
+        """
+        Retorna None si el intervalo se cruza con la agenda del lavador, o el número
+        de reservas vecinas (anterior y siguiente) que están en otra bahía.
+        """
+        posicion = bisect_left(intervalos, (inicio,))
+        for existente_inicio, existente_fin, _ in intervalos:
+            if existente_inicio >= fin:
+                break
+            if existente_fin > inicio:
+                return None
+
+        vecinos = intervalos[max(0, posicion - 1):posicion + 1]
+        return sum(1 for _, _, otra_bahia in vecinos if bahia_id and otra_bahia and otra_bahia != bahia_id)
+
+    @staticmethod
+    def _elegir(candidatos, agenda, reserva, puntaje):
+        inicio = reserva.fecha_hora
+        fin = inicio + LavadoresDisponiblesService.duracion_bloqueo(reserva.servicio.duracion_minutos)
+        fecha = inicio.date()
+
+        mejor = None
+        for candidato in candidatos:
+            cambios = AsignacionLavadoresService._evaluar(
+                agenda.get((fecha, candidato.id), []), inicio, fin, reserva.bahia_id
+            )
+            if cambios is None:
+                continue
+            valor = puntaje(candidato, cambios)
+            if mejor is None or valor < mejor[0]:
+                mejor = (valor, candidato)
+
+        if mejor is None:
+            return None
+
+        # Reflejar la asignación para las siguientes reservas del lote
+        lavador = mejor[1]
+        lavador.carga += 1
+        intervalos = agenda.setdefault((fecha, lavador.id), [])
+        intervalos.insert(bisect_left(intervalos, (inicio,)), (inicio, fin, reserva.bahia_id))
+        return lavador
+
+    @staticmethod
+    def asignar(reserva, estrategia=MENOR_CARGA):
+        """
+        Elige el mejor lavador sin conflictos para la reserva según la estrategia.
+        No guarda la reserva. Retorna el lavador o None si no hay ninguno libre.
+        """
+        puntaje = AsignacionLavadoresService.ESTRATEGIAS[estrategia]
+        candidatos = AsignacionLavadoresService.candidatos()
+        if not candidatos:
+            return None
+        agenda = AsignacionLavadoresService.agenda([reserva.fecha_hora.date()], excluir_ids=[reserva.id])
+        return AsignacionLavadoresService._elegir(candidatos, agenda, reserva, puntaje)
+
+    @staticmethod
+    def asignar_lote(reservas, estrategia=MENOR_CARGA, guardar=True):
+        """
+        Asigna lavador a un conjunto de reservas en orden cronológico, con los
+        candidatos y las agendas cargados una sola vez. Guarda todas las asignaciones
+        con un único bulk_update y refresca después los datos derivados con
+        publicar_asignaciones(). Retorna (asignadas, sin_lavador).
+        """
+        puntaje = AsignacionLavadoresService.ESTRATEGIAS[estrategia]
+        reservas = sorted(reservas, key=lambda reserva: reserva.fecha_hora)
+        if not reservas:
+            return [], []
+
+        candidatos = AsignacionLavadoresService.candidatos()
+        agenda = AsignacionLavadoresService.agenda(
+            [reserva.fecha_hora.date() for reserva in reservas],
+            excluir_ids=[reserva.id for reserva in reservas]
+        )
+
+        asignadas, sin_lavador = [], []
+        anteriores = {}
+        for reserva in reservas:
+            lavador = AsignacionLavadoresService._elegir(candidatos, agenda, reserva, puntaje)
+            if lavador is None:
+                sin_lavador.append(reserva)
+                continue
+            anteriores[reserva.id] = reserva.lavador_id
+            reserva.lavador = lavador
+            reserva.asignacion_automatica = True
+            asignadas.append(reserva)
+
+        if guardar and asignadas:
+            Reserva.objects.bulk_update(asignadas, ['lavador', 'asignacion_automatica'], batch_size=500)
+            AsignacionLavadoresService.publicar_asignaciones(asignadas, anteriores)
+
+        return asignadas, sin_lavador
+
+    @staticmethod
+    def publicar_asignaciones(asignadas, anteriores):
+        """
+        bulk_update no dispara las señales de Reserva: refresca por lote lo que se
+        deriva del lavador (resúmenes diarios, estadísticas, disponibilidad) y publica
+        un evento por reserva por WebSocket (tablero, cliente y lavadores).
+        """
+        from dashboard_publico.services import SnapshotDashboardService
+
+        filas = [
+            {'fecha_hora': reserva.fecha_hora, 'bahia_id': reserva.bahia_id, 'estado': reserva.estado, 'lavador_id': lavador_id}
+            for reserva in asignadas
+            for lavador_id in {reserva.lavador_id, anteriores.get(reserva.id)}
+        ]
+        VencimientoReservasService.actualizar_derivados(filas)
+        SnapshotDashboardService.invalidar()
+        for reserva in asignadas:
+            EventosTiempoReal.reserva_cambiada(
+                reserva, estado_anterior=reserva.estado, lavador_anterior_id=anteriores.get(reserva.id)
+            )
+
+    @staticmethod
+    def asignar_dia(fecha, estrategia=MENOR_CARGA, guardar=True):
+        """Asigna lavador a todas las reservas activas sin lavador de la fecha."""
+        desde = datetime.combine(fecha, datetime.min.time())
+        reservas = Reserva.objects.filter(
+            fecha_hora__gte=desde,
+            fecha_hora__lt=desde + timedelta(days=1),
+            estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA],
+            lavador__isnull=True
+        ).select_related('servicio')
+        return AsignacionLavadoresService.asignar_lote(reservas, estrategia, guardar)
+
+
+class OcupacionService:
+    """
+    Servicio para mantener y consultar los mapas de ocupación por bahía y día
+    (OcupacionBahia). Cada mapa es un entero cuyos bits son celdas de 15 minutos.
+    """
+
+    MINUTOS_CELDA = 15
+    CELDAS_DIA = 24 * 60 // MINUTOS_CELDA
+
+    @staticmethod
+    def mascara(inicio, duracion_minutos):
+        """
+        Retorna la máscara de celdas ocupadas por un intervalo que empieza en `inicio`
+        y dura `duracion_minutos`. Un intervalo sin duración ocupa la celda en la que
+        empieza y lo que pase de la medianoche se recorta al día de inicio.
+        """
+        minuto_inicio = inicio.hour * 60 + inicio.minute
+        minuto_fin = minuto_inicio + max(duracion_minutos or 0, 0)
+
+        primera = minuto_inicio // OcupacionService.MINUTOS_CELDA
+        ultima = (minuto_fin + OcupacionService.MINUTOS_CELDA - 1) // OcupacionService.MINUTOS_CELDA - 1
+        ultima = min(OcupacionService.CELDAS_DIA - 1, max(primera, ultima))
+
+        return ((1 << (ultima - primera + 1)) - 1) << primera
+
+    @staticmethod
+    def mapas_del_dia(fecha):
+        """
+        Retorna los mapas de ocupación de la fecha, incluidos los bloqueos
+        vigentes, como diccionario {bahia_id: mascara}.
+        """
+        mapas = {
+            bahia_id: int(mapa or '0', 16)
+            for bahia_id, mapa in OcupacionBahia.objects.filter(fecha=fecha).order_by().values_list('bahia_id', 'mapa')
+        }
+        for bahia_id, mascara in BloqueoService.mascaras_rango(fecha, fecha).get(fecha, {}).items():
+            mapas[bahia_id] = mapas.get(bahia_id, 0) | mascara
+        return mapas
+
+    @staticmethod
+    def mapas_rango(fecha_inicio, fecha_fin):
+        """
+        Retorna los mapas de ocupación entre dos fechas (incluidas), con los
+        bloqueos vigentes, como diccionario {fecha: {bahia_id: mascara}}.
+        """
+        mapas = defaultdict(dict)
+        for fecha, bahia_id, mapa in OcupacionBahia.objects.filter(
+            fecha__range=(fecha_inicio, fecha_fin)
+        ).order_by().values_list('fecha', 'bahia_id', 'mapa'):
+            mapas[fecha][bahia_id] = int(mapa or '0', 16)
+        for fecha, mascaras in BloqueoService.mascaras_rango(fecha_inicio, fecha_fin).items():
+            for bahia_id, mascara in mascaras.items():
+                mapas[fecha][bahia_id] = mapas[fecha].get(bahia_id, 0) | mascara
+        return mapas
+
+    @staticmethod
+    def bahias_libres(bahias, mapas, mascara):
+        """
+        Filtra las bahías cuyo mapa no tiene ninguna celda ocupada en la máscara.
+        """
+        return [bahia for bahia in bahias if not mapas.get(bahia.id, 0) & mascara]
+
+    @staticmethod
+    def marcar(fecha, bahia_id, mascara):
+        """
+        Enciende en el mapa de la bahía las celdas de la máscara (alta incremental).
+        """
+        with transaction.atomic():
+            ocupacion, _ = OcupacionBahia.objects.select_for_update().get_or_create(
+                fecha=fecha,
+                bahia_id=bahia_id
+            )
+            nuevo = ocupacion.mascara | mascara
+            if nuevo != ocupacion.mascara:
+                ocupacion.mapa = format(nuevo, 'x')
+                ocupacion.save(update_fields=['mapa', 'fecha_actualizacion'])
+
+    @staticmethod
+    def recalcular(fecha, bahia_id):
+        """
+        Recalcula desde la tabla de reservas el mapa de una bahía en una fecha.
+        Se usa al liberar celdas, ya que otra reserva podría seguir ocupándolas.
+        """
+        with transaction.atomic():
+            ocupacion, _ = OcupacionBahia.objects.select_for_update().get_or_create(
+                fecha=fecha,
+                bahia_id=bahia_id
+            )
+
+            mascara = 0
+            reservas = DisponibilidadService.reservas_activas(fecha).filter(bahia_id=bahia_id)
+            for _, fecha_hora, duracion, _, _ in reservas:
+                mascara |= OcupacionService.mascara(fecha_hora, duracion)
+
+            ocupacion.mapa = format(mascara, 'x')
+            ocupacion.save(update_fields=['mapa', 'fecha_actualizacion'])
+
+        return mascara
+
+    @staticmethod
+    def reconstruir(fecha_inicio, fecha_fin):
+        """
+        Reconstruye todos los mapas de ocupación entre dos fechas (incluidas)
+        desde la tabla de reservas. Retorna el número de mapas creados.
+        """
+        mapas = {}
+        for _, fecha_hora, duracion, bahia_id, _ in DisponibilidadService.reservas_activas(fecha_inicio, fecha_fin):
+            if bahia_id is None:
+                continue
+            clave = (fecha_hora.date(), bahia_id)
+            mapas[clave] = mapas.get(clave, 0) | OcupacionService.mascara(fecha_hora, duracion)
+
+        with transaction.atomic():
+            OcupacionBahia.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).delete()
+            OcupacionBahia.objects.bulk_create([
+                OcupacionBahia(fecha=fecha, bahia_id=bahia_id, mapa=format(mascara, 'x'))
+                for (fecha, bahia_id), mascara in mapas.items()
+            ], batch_size=500)
+
+        # bulk_create no dispara señales: invalidar todas las respuestas cacheadas
+        CacheDisponibilidad.invalidar()
+
+        return len(mapas)
+
+
+class CacheDisponibilidad:
+    """
+    Cache versionado de las respuestas de horarios disponibles.
+
+    Cada clave incluye la generación de la fecha consultada y una generación
+    global. Las señales de Reserva y HorarioDisponible cambian la generación de
+    la fecha afectada; las de DisponibilidadHoraria, Bahia y Servicio cambian la
+    global. Las generaciones se guardan en GeneracionDisponibilidad, así un
+    cambio hecho en un proceso invalida el cache de todos aunque sea LocMem; las
+    entradas viejas nunca se borran: simplemente dejan de leerse y expiran solas.
+    """
+
+    PREFIJO = 'disponibilidad'
+
+    # Vida máxima de una respuesta en segundos
+    TIMEOUT = 600
+
+    # Clave de la generación que afecta a todas las fechas
+    GLOBAL = 'global'
+
+    @staticmethod
+    def _clave_generacion(fecha=None):
+        return fecha.isoformat() if fecha else CacheDisponibilidad.GLOBAL
+
+    @staticmethod
+    def _generaciones(fecha):
+        """Retorna las generaciones (fecha, global) en una sola consulta; 0 si aún no existen."""
+        claves = [CacheDisponibilidad._clave_generacion(fecha), CacheDisponibilidad._clave_generacion()]
+        valores = dict(GeneracionDisponibilidad.objects.filter(clave__in=claves).values_list('clave', 'generacion'))
+        return [valores.get(clave, 0) for clave in claves]
+
+    @staticmethod
+    def _clave(vista, fecha, servicio_id):
+        generacion_fecha, generacion_global = CacheDisponibilidad._generaciones(fecha)
+        return (f'{CacheDisponibilidad.PREFIJO}:{vista}:{fecha.isoformat()}:{servicio_id}'
+                f':{generacion_fecha}:{generacion_global}')
+
+    @staticmethod
+    def _segundos_vigencia(fecha, ahora=None, consultar_bloqueos=True):
+        """
+        Para el día actual la respuesta vence en el próximo límite de bloque de
+        15 minutos, para que los horarios que ya pasaron salgan de la lista, y
+        nunca después de que expire un bloqueo de la fecha.
+        """
+        ahora = ahora or datetime.now()
+        vence = ahora + timedelta(seconds=CacheDisponibilidad.TIMEOUT)
+
+        if fecha == ahora.date():
+            minutos = DisponibilidadService.MINUTOS_BLOQUE
+            inicio_bloque = ahora.replace(minute=ahora.minute - ahora.minute % minutos, second=0, microsecond=0)
+            vence = min(vence, inicio_bloque + timedelta(minutes=minutos))
+
+        # Al expirar un bloqueo el horario vuelve a quedar libre
+        if consultar_bloqueos:
+            expiracion = BloqueoService.proxima_expiracion(fecha, ahora)
+            if expiracion:
+                vence = min(vence, expiracion)
+
+        return max(1, int((vence - ahora).total_seconds()))
+
+    @staticmethod
+    def obtener(vista, fecha, servicio_id, calcular):
+        """
+        Retorna la respuesta cacheada de la vista para (fecha, servicio_id) o la
+        calcula con `calcular()`, que retorna (datos, status), y la guarda. Solo
+        se cachean las respuestas 200: un error (servicio inexistente, sin
+        bahías) puede dejar de serlo sin que cambie ninguna generación.
+        """
+        clave = CacheDisponibilidad._clave(vista, fecha, servicio_id)
+        respuesta = cache.get(clave)
+        if respuesta is None:
+            respuesta = calcular()
+            if respuesta[1] == 200:
+                cache.set(clave, respuesta, CacheDisponibilidad._segundos_vigencia(fecha))
+        return respuesta
+
+    @staticmethod
+    def invalidar(*fechas):
+        """
+        Cambia la generación de las fechas indicadas o, sin fechas, la global, con
+        un solo upsert. Dentro de una transacción el cambio se hace visible para
+        los demás procesos al mismo tiempo que los datos que lo causaron.
+
+        MySQL no acepta indicar las columnas del conflicto (ON DUPLICATE KEY
+        UPDATE usa cualquier clave única), así que solo se pasan si el motor
+        las soporta.
+        """
+        if fechas:
+            claves = {CacheDisponibilidad._clave_generacion(fecha) for fecha in fechas if fecha}
+        else:
+            claves = {CacheDisponibilidad._clave_generacion()}
+        if not claves:
+            return
+
+        conflicto = {'update_conflicts': True, 'update_fields': ['generacion']}
+        if connection.features.supports_update_conflicts_with_target:
+            conflicto['unique_fields'] = ['clave']
+
+        generacion = time.time_ns()
+        GeneracionDisponibilidad.objects.bulk_create(
+            [GeneracionDisponibilidad(clave=clave, generacion=generacion) for clave in sorted(claves)],
+            **conflicto
+        )
+
+
+class BloqueoService:
+    """
+    Servicio de bloqueos temporales de horarios (BloqueoHorario).
+
+    Cuando el cliente elige bahía y lavador se toma un bloqueo de pocos minutos
+    que las consultas de disponibilidad cuentan como ocupación. Tomar un bloqueo
+    y confirmar la reserva se hacen con la fila de ocupación de la bahía en el día
+    y la del lavador bloqueadas, así dos clientes no pueden quedarse con el mismo
+    horario y crear la reserva se reduce a confirmar el bloqueo.
+    """
+
+    # Vigencia de un bloqueo
+    MINUTOS_VIGENCIA = 5
+
+    @staticmethod
+    def vigentes(ahora=None):
+        return BloqueoHorario.objects.filter(expira__gt=ahora or datetime.now())
+
+    @staticmethod
+    def mascaras_rango(fecha_inicio, fecha_fin, excluir_cliente_id=None):
+        """
+        Retorna en una sola consulta las celdas bloqueadas entre dos fechas (incluidas)
+        como {fecha: {bahia_id: mascara}}.
+        """
+        bloqueos = BloqueoService.vigentes().filter(fecha__range=(fecha_inicio, fecha_fin))
+        if excluir_cliente_id:
+            bloqueos = bloqueos.exclude(cliente_id=excluir_cliente_id)
+
+        mascaras = defaultdict(dict)
+        for fecha, bahia_id, inicio, fin in bloqueos.order_by().values_list('fecha', 'bahia_id', 'inicio', 'fin'):
+            mascara = OcupacionService.mascara(inicio, int((fin - inicio).total_seconds() // 60))
+            mascaras[fecha][bahia_id] = mascaras[fecha].get(bahia_id, 0) | mascara
+        return mascaras
+
+    @staticmethod
+    def intervalos_lavadores(fecha, excluir_cliente_id=None):
+        """
+        Retorna [(lavador_id, inicio, fin, bahia_id)] de los bloqueos vigentes de la
+        fecha, con el fin redondeado a horas completas como las reservas.
+        """
+        bloqueos = BloqueoService.vigentes().filter(fecha=fecha, lavador_id__isnull=False)
+        if excluir_cliente_id:
+            bloqueos = bloqueos.exclude(cliente_id=excluir_cliente_id)
+
+        intervalos = []
+        for lavador_id, inicio, fin, bahia_id in bloqueos.order_by().values_list('lavador_id', 'inicio', 'fin', 'bahia_id'):
+            duracion = int((fin - inicio).total_seconds() // 60)
+            intervalos.append((lavador_id, inicio, inicio + LavadoresDisponiblesService.duracion_bloqueo(duracion), bahia_id))
+        return intervalos
+
+    @staticmethod
+    def proxima_expiracion(fecha, ahora=None):
+        """Retorna cuándo expira el próximo bloqueo vigente de la fecha, o None."""
+        return BloqueoService.vigentes(ahora).filter(fecha=fecha).aggregate(proxima=Min('expira'))['proxima']
+
+    @staticmethod
+    def _verificar(cliente, bahia_id, inicio, duracion_minutos, lavador_id=None):
+        """
+        Bloquea las filas de la bahía en el día y del lavador, y lanza HorarioNoDisponible
+        si el intervalo se cruza con reservas activas o con bloqueos vigentes de otros clientes.
+        Debe llamarse dentro de una transacción.
+        """
+        fecha = inicio.date()
+        ocupacion, _ = OcupacionBahia.objects.select_for_update().get_or_create(fecha=fecha, bahia_id=bahia_id)
+
+        mascara = OcupacionService.mascara(inicio, duracion_minutos)
+        bloqueadas = BloqueoService.mascaras_rango(fecha, fecha, cliente.id).get(fecha, {}).get(bahia_id, 0)
+        if (ocupacion.mascara | bloqueadas) & mascara:
+            raise HorarioNoDisponible('La bahía ya no está disponible para el horario seleccionado')
+
+        if lavador_id:
+            list(Empleado.objects.select_for_update().filter(id=lavador_id).values_list('id', flat=True))
+            agenda = LavadoresDisponiblesService.agenda_del_dia(fecha, cliente.id)
+            fin = inicio + LavadoresDisponiblesService.duracion_bloqueo(duracion_minutos)
+            if LavadoresDisponiblesService.tiene_conflicto(agenda.get(int(lavador_id)), inicio, fin):
+                raise HorarioNoDisponible('El lavador ya no está disponible para el horario seleccionado')
+
+    @staticmethod
+    def adquirir(cliente, bahia_id, inicio, duracion_minutos, lavador_id=None):
+        """
+        Toma un bloqueo del horario para el cliente, reemplazando el que tuviera.
+        Lanza HorarioNoDisponible si el horario ya está ocupado o bloqueado por otro cliente.
+        """
+        ahora = datetime.now()
+        with transaction.atomic():
+            # Limpieza perezosa de bloqueos vencidos y del bloqueo anterior del cliente
+            BloqueoHorario.objects.filter(expira__lte=ahora).delete()
+            anteriores = set(BloqueoHorario.objects.filter(cliente=cliente).values_list('fecha', flat=True))
+            BloqueoHorario.objects.filter(cliente=cliente).delete()
+
+            BloqueoService._verificar(cliente, bahia_id, inicio, duracion_minutos, lavador_id)
+            bloqueo = BloqueoHorario.objects.create(
+                cliente=cliente,
+                bahia_id=bahia_id,
+                lavador_id=lavador_id or None,
+                fecha=inicio.date(),
+                inicio=inicio,
+                fin=inicio + timedelta(minutes=duracion_minutos),
+                expira=ahora + timedelta(minutes=BloqueoService.MINUTOS_VIGENCIA)
+            )
+
+        CacheDisponibilidad.invalidar(bloqueo.fecha, *anteriores)
+        return bloqueo
+
+    @staticmethod
+    def liberar(cliente, token=None):
+        """Libera los bloqueos del cliente (o solo el del token). Retorna cuántos se liberaron."""
+        bloqueos = BloqueoHorario.objects.filter(cliente=cliente)
+        if token:
+            bloqueos = bloqueos.filter(token=token)
+        fechas = set(bloqueos.values_list('fecha', flat=True))
+        liberados, _ = bloqueos.delete()
+        if fechas:
+            CacheDisponibilidad.invalidar(*fechas)
+        return liberados
+
+    @staticmethod
+    @contextmanager
+    def confirmar(cliente, bahia_id, inicio, duracion_minutos, lavador_id=None):
+        """
+        Verifica con las filas bloqueadas que el horario siga libre para el cliente
+        (sus propios bloqueos no cuentan), ejecuta el bloque, donde se crea la reserva,
+        y consume los bloqueos del cliente. Lanza HorarioNoDisponible si el horario se
+        perdió; las excepciones del bloque se propagan sin cambios.
+        """
+        with transaction.atomic():
+            BloqueoService._verificar(cliente, bahia_id, inicio, duracion_minutos, lavador_id)
+            yield
+            bloqueos = BloqueoHorario.objects.filter(cliente=cliente)
+            fechas = set(bloqueos.values_list('fecha', flat=True))
+            bloqueos.delete()
+
+        if fechas:
+            CacheDisponibilidad.invalidar(*fechas)
+
+
+
+class TableroBahiasService:
+    """
+    Estado de las bahías para el dashboard del administrador. El tablero se arma
+    con dos consultas (bahías y última reserva activa por bahía) y cada bahía
+    tiene una huella; la versión del tablero resume todas las huellas, de modo
+    que los clientes solo reciben las bahías cuya huella cambió.
+    """
+
+    PREFIJO = 'tablero_bahias'
+    TIMEOUT = 3600
+
+    @staticmethod
+    def _clave_version(version):
+        return f'{TableroBahiasService.PREFIJO}:version:{version}'
+
+    @staticmethod
+    def reservas_activas(ahora=None):
+        """Última reserva confirmada o en proceso ya iniciada de cada bahía: {bahia_id: reserva}."""
+        ahora = ahora or datetime.now()
+        reservas = Reserva.objects.filter(
+            bahia__isnull=False,
+            fecha_hora__lte=ahora,
+            estado__in=[Reserva.CONFIRMADA, Reserva.EN_PROCESO]
+        ).annotate(
+            posicion=Window(RowNumber(), partition_by=[F('bahia_id')], order_by=F('fecha_hora').desc())
+        ).filter(posicion=1).select_related('cliente', 'vehiculo', 'servicio', 'lavador').order_by()
+        return {reserva.bahia_id: reserva for reserva in reservas}
+
+    @staticmethod
+    def tablero(ahora=None):
+        """Lista de diccionarios por bahía con el formato que usan las plantillas del dashboard."""
+        activas = TableroBahiasService.reservas_activas(ahora)
+
+        bahias_info = []
+        for bahia in Bahia.objects.all():
+            reserva = activas.get(bahia.id)
+            if reserva:
+                reserva.bahia = bahia
+                estado = 'en_proceso' if reserva.estado == Reserva.EN_PROCESO else 'ocupada'
+
+                # Las bahías con cámara necesitan un token para la transmisión
+                if bahia.tiene_camara and bahia.ip_camara and not reserva.stream_token:
+                    reserva.stream_token = f"{reserva.id}-{uuid.uuid4()}"
+                    Reserva.objects.filter(pk=reserva.pk).update(stream_token=reserva.stream_token)
+            else:
+                estado = 'disponible'
+
+            bahias_info.append({
+                'bahia': bahia,
+                'estado': estado,
+                'cliente': reserva.cliente if reserva else None,
+                'vehiculo': reserva.vehiculo if reserva else None,
+                'servicio': reserva.servicio if reserva else None,
+                'reserva': reserva
+            })
+        return bahias_info
+
+    @staticmethod
+    def huella(info):
+        """Resume lo que muestra la tarjeta de una bahía."""
+        bahia, reserva = info['bahia'], info['reserva']
+        datos = (bahia.nombre, bahia.tiene_camara, info['estado'])
+        if reserva:
+            datos += (reserva.id, reserva.estado, reserva.lavador_id, reserva.stream_token,
+                      reserva.fecha_inicio_servicio, reserva.fecha_actualizacion)
+        return hashlib.md5(repr(datos).encode()).hexdigest()[:12]
+
+    @staticmethod
+    def estado(ahora=None):
+        """
+        Retorna (bahias_info, version). Las huellas de cada versión se guardan en
+        caché para poder calcular después qué bahías cambiaron desde ella.
+        """
+        bahias_info = TableroBahiasService.tablero(ahora)
+        huellas = {info['bahia'].id: TableroBahiasService.huella(info) for info in bahias_info}
+        version = hashlib.md5(repr(sorted(huellas.items())).encode()).hexdigest()[:16]
+        cache.set(TableroBahiasService._clave_version(version), huellas, TableroBahiasService.TIMEOUT)
+        return bahias_info, version
+
+    @staticmethod
+    def cambios(version_cliente=None):
+        """
+        Retorna (bahias_info, cambiadas, version). ``cambiadas`` son las bahías cuya
+        huella difiere de la versión del cliente, o None si hay que enviar el tablero
+        completo (sin versión, versión desconocida o bahías agregadas/eliminadas).
+        Responde de inmediato: los avisos de cambios llegan por WebSocket.
+        """
+        bahias_info, version = TableroBahiasService.estado()
+        previas = cache.get(TableroBahiasService._clave_version(version_cliente)) if version_cliente else None
+        if previas is None or set(previas) != {info['bahia'].id for info in bahias_info}:
+            return bahias_info, None, version
+
+        cambiadas = [info for info in bahias_info
+                     if previas[info['bahia'].id] != TableroBahiasService.huella(info)]
+        return bahias_info, cambiadas, version
+
+    @staticmethod
+    def resumen(bahias_info, ahora=None):
+        """Contadores de las tarjetas del dashboard."""
+        ahora = ahora or datetime.now()
+        inicio_dia = datetime.combine(ahora.date(), datetime.min.time())
+
+        bahias_en_proceso = sum(1 for info in bahias_info if info['estado'] == 'en_proceso')
+        bahias_ocupadas = sum(1 for info in bahias_info if info['estado'] == 'ocupada')
+
+        return {
+            'bahias_disponibles': sum(1 for info in bahias_info if info['estado'] == 'disponible'),
+            # Las bahías en proceso también cuentan como ocupadas
+            'bahias_ocupadas': bahias_ocupadas + bahias_en_proceso,
+            'bahias_en_proceso': bahias_en_proceso,
+            # Reservas confirmadas de hoy que aún no se han atendido
+            'reservas_pendientes': Reserva.objects.filter(
+                fecha_hora__gte=inicio_dia,
+                fecha_hora__lt=inicio_dia + timedelta(days=1),
+                estado=Reserva.CONFIRMADA
+            ).count(),
+        }
+
+
+class EventosTiempoReal:
+    """
+    Publica eventos en los grupos de WebSocket: tablero de bahías (administradores),
+    un grupo por lavador, uno por cliente y la pantalla pública. Los eventos salen
+    al confirmar la transacción y un fallo de la capa de canales no interrumpe la
+    operación; las pantallas conservan el sondeo HTTP como respaldo.
+    """
+
+    GRUPO_TABLERO = 'tablero_bahias'
+    GRUPO_PUBLICO = 'publico'
+
+    @staticmethod
+    def grupo_lavador(empleado_id):
+        return f'lavador_{empleado_id}'
+
+    @staticmethod
+    def grupo_cliente(cliente_id):
+        return f'cliente_{cliente_id}'
+
+    @staticmethod
+    def publicar(grupos, tipo, **datos):
+        capa = get_channel_layer()
+        if capa is None:
+            return
+        mensaje = {'type': 'evento', 'datos': {'tipo': tipo, **datos}}
+
+        def enviar():
+            for grupo in grupos:
+                try:
+                    async_to_sync(capa.group_send)(grupo, mensaje)
+                except Exception:
+                    logger.exception('No se pudo publicar el evento %s en el grupo %s', tipo, grupo)
+
+        transaction.on_commit(enviar)
+
+    @staticmethod
+    def tablero_cambiado():
+        """Avisa al tablero y a la pantalla pública de cambios hechos en lote, sin detalle por reserva."""
+        EventosTiempoReal.publicar([EventosTiempoReal.GRUPO_TABLERO, EventosTiempoReal.GRUPO_PUBLICO], 'tablero')
+
+    @staticmethod
+    def reserva_cambiada(reserva, estado_anterior=None, lavador_anterior_id=None, eliminada=False):
+        """Publica el cambio de estado (o de lavador) de una reserva a todos los grupos interesados."""
+        grupos = [EventosTiempoReal.GRUPO_TABLERO, EventosTiempoReal.GRUPO_PUBLICO]
+        if reserva.cliente_id:
+            grupos.append(EventosTiempoReal.grupo_cliente(reserva.cliente_id))
+        for lavador_id in {reserva.lavador_id, lavador_anterior_id} - {None}:
+            grupos.append(EventosTiempoReal.grupo_lavador(lavador_id))
+
+        EventosTiempoReal.publicar(
+            grupos,
+            'reserva_eliminada' if eliminada else 'reserva',
+            reserva_id=reserva.id,
+            estado=reserva.estado,
+            estado_anterior=estado_anterior,
+            bahia_id=reserva.bahia_id,
+            lavador_id=reserva.lavador_id,
+            fecha_hora=reserva.fecha_hora.isoformat() if reserva.fecha_hora else None
+        )
+
+    @staticmethod
+    def notificacion_creada(notificacion):
+        """Avisa al cliente o al lavador destinatario para que actualice su contador."""
+        if notificacion.cliente_id:
+            grupo = EventosTiempoReal.grupo_cliente(notificacion.cliente_id)
+        elif notificacion.empleado_id:
+            grupo = EventosTiempoReal.grupo_lavador(notificacion.empleado_id)
+        else:
+            return
+        EventosTiempoReal.publicar(
+            [grupo],
+            'notificacion',
+            notificacion_id=notificacion.id,
+            tipo_notificacion=notificacion.tipo,
+            titulo=notificacion.titulo
+        )
+
+
+class VencimientoReservasService:
+    """
+    Motor común de los comandos que vencen reservas (verificar_reservas_vencidas,
+    cancelar_reservas_vencidas y cancelar_reservas_sin_pago). Selecciona las
+    candidatas en SQL y las procesa por lotes: un UPDATE por lote y estado de
+    origen, notificaciones con bulk_create y la actualización explícita de los
+    datos derivados que normalmente mantienen las señales de Reserva.
+    """
+    TAMANO_LOTE = 500
+    ESTADOS_VENCIBLES = [Reserva.PENDIENTE, Reserva.CONFIRMADA]
+
+    @staticmethod
+    def incumplidas(ahora):
+        """
+        Pendientes o confirmadas cuyo fin (fecha_hora + duración del servicio) ya pasó.
+        La comparación se hace en SQL con una condición por cada duración de servicio
+        distinta, sin aritmética de fechas que dependa del motor de base de datos.
+        """
+        duraciones = Servicio.objects.order_by().values_list('duracion_minutos', flat=True).distinct()
+        fin_pasado = Q(pk__in=[])
+        for duracion in duraciones:
+            fin_pasado |= Q(servicio__duracion_minutos=duracion, fecha_hora__lt=ahora - timedelta(minutes=duracion))
+        return Reserva.objects.filter(
+            fin_pasado,
+            estado__in=VencimientoReservasService.ESTADOS_VENCIBLES,
+            fecha_hora__lt=ahora
+        )
+
+    @staticmethod
+    def vencidas(ahora, horas_gracia):
+        """Pendientes o confirmadas programadas hace más de `horas_gracia` horas."""
+        return Reserva.objects.filter(
+            estado__in=VencimientoReservasService.ESTADOS_VENCIBLES,
+            fecha_hora__lt=ahora - timedelta(hours=horas_gracia)
+        )
+
+    @staticmethod
+    def sin_pago(ahora, minutos):
+        """Pendientes creadas hace más de `minutos` minutos."""
+        return Reserva.objects.filter(estado=Reserva.PENDIENTE, fecha_creacion__lt=ahora - timedelta(minutes=minutos))
+
+    @staticmethod
+    def procesar(candidatas, estado_nuevo, nota, titulo, mensaje, liberar_horarios=False,
+                 tamano_lote=None, dry_run=False, ahora=None, por_lote=None):
+        """
+        Pasa las reservas candidatas a `estado_nuevo` por lotes de `tamano_lote`.
+
+        `nota(estado)` es el texto que se agrega a las notas según el estado de origen
+        y `mensaje(fila)` el de la notificación al cliente, donde fila tiene id,
+        estado, fecha_hora y servicio (nombre). Con `liberar_horarios` se descuentan
+        las reservas de los HorarioDisponible. `por_lote(filas)` se llama tras cada
+        lote. Retorna un resumen con las cantidades procesadas.
+        """
+        from notificaciones.models import Notificacion
+        from notificaciones.services import ContadorNotificacionesService
+
+        tamano_lote = tamano_lote or VencimientoReservasService.TAMANO_LOTE
+        ahora = ahora or datetime.now()
+        inicio = time.monotonic()
+        resumen = {'procesadas': 0, 'notificaciones': 0, 'lotes': 0, 'fechas': set(), 'por_estado': defaultdict(int)}
+
+        ultimo_id = 0
+        while True:
+            with transaction.atomic():
+                filas = list(
+                    candidatas.filter(pk__gt=ultimo_id).order_by('pk').values(
+                        'id', 'estado', 'fecha_hora', 'cliente_id', 'servicio_id', 'bahia_id', 'lavador_id'
+                    )[:tamano_lote]
+                )
+                if not filas:
+                    break
+                ultimo_id = filas[-1]['id']
+                servicios = Servicio.objects.in_bulk({fila['servicio_id'] for fila in filas})
+                for fila in filas:
+                    fila['servicio'] = servicios[fila['servicio_id']].nombre
+
+                if not dry_run:
+                    por_estado = defaultdict(list)
+                    for fila in filas:
+                        por_estado[fila['estado']].append(fila['id'])
+                    actualizadas = 0
+                    for estado, ids in por_estado.items():
+                        # El filtro por estado descarta las que otro proceso cambió desde la lectura
+                        actualizadas += Reserva.objects.filter(pk__in=ids, estado=estado).update(
+                            estado=estado_nuevo,
+                            notas=Concat(F('notas'), Value(nota(estado))),
+                            fecha_actualizacion=ahora
+                        )
+                    if actualizadas < len(filas):
+                        transicionadas = set(Reserva.objects.filter(
+                            pk__in=[fila['id'] for fila in filas], estado=estado_nuevo, fecha_actualizacion=ahora
+                        ).values_list('pk', flat=True))
+                        filas = [fila for fila in filas if fila['id'] in transicionadas]
+
+                    notificaciones = Notificacion.objects.bulk_create([
+                        Notificacion(
+                            cliente_id=fila['cliente_id'],
+                            reserva_id=fila['id'],
+                            tipo=Notificacion.RESERVA_CANCELADA,
+                            titulo=titulo,
+                            mensaje=mensaje(fila)
+                        )
+                        for fila in filas
+                    ])
+                    ContadorNotificacionesService.incrementar(
+                        ContadorNotificacionesService.CLIENTE,
+                        [fila['cliente_id'] for fila in filas],
+                        Notificacion.RESERVA_CANCELADA
+                    )
+                    resumen['notificaciones'] += len(notificaciones)
+
+                    if liberar_horarios:
+                        VencimientoReservasService.liberar_horarios(filas)
+                    VencimientoReservasService.actualizar_derivados(filas)
+
+            resumen['procesadas'] += len(filas)
+            resumen['lotes'] += 1
+            resumen['fechas'].update(fila['fecha_hora'].date() for fila in filas)
+            for fila in filas:
+                resumen['por_estado'][fila['estado']] += 1
+            if por_lote:
+                por_lote(filas)
+
+        if resumen['procesadas'] and not dry_run:
+            from dashboard_publico.services import SnapshotDashboardService
+            SnapshotDashboardService.invalidar()
+            EventosTiempoReal.tablero_cambiado()
+
+        resumen['fechas'] = sorted(resumen['fechas'])
+        resumen['por_estado'] = dict(resumen['por_estado'])
+        resumen['segundos'] = round(time.monotonic() - inicio, 2)
+        logger.info(
+            f'Vencimiento de reservas ({estado_nuevo}): {resumen["procesadas"]} reservas en '
+            f'{resumen["lotes"]} lotes, {resumen["notificaciones"]} notificaciones, {resumen["segundos"]}s'
+            + (' [simulación]' if dry_run else '')
+        )
+        return resumen
+
+    @staticmethod
+    def describir(resumen):
+        """Texto de una línea con el resumen retornado por procesar()."""
+        fechas = ', '.join(fecha.strftime('%d/%m/%Y') for fecha in resumen['fechas']) or '-'
+        return (
+            f'{resumen["procesadas"]} reservas en {resumen["lotes"]} lotes, '
+            f'{resumen["notificaciones"]} notificaciones, fechas: {fechas} ({resumen["segundos"]}s)'
+        )
+
+    @staticmethod
+    def liberar_horarios(filas):
+        """Descuenta las reservas de sus HorarioDisponible: un UPDATE por franja distinta."""
+        por_franja = defaultdict(int)
+        for fila in filas:
+            por_franja[(fila['fecha_hora'].date(), fila['fecha_hora'].time())] += 1
+        for (fecha, hora), cantidad in por_franja.items():
+            HorarioDisponible.objects.filter(
+                fecha=fecha, hora_inicio__lte=hora, hora_fin__gt=hora
+            ).update(reservas_actuales=Greatest(F('reservas_actuales') - cantidad, 0))
+
+    @staticmethod
+    def actualizar_derivados(filas):
+        """
+        Hace por lote lo que las señales de Reserva harían por reserva: mapas de
+        ocupación, caché de disponibilidad, resúmenes diarios y estadísticas de lavadores.
+        """
+        from dashboard_gerente.services import RollupEntidadesService, RollupReservasService
+        from empleados.services import EstadisticasLavadorService
+
+        if not filas:
+            return
+        fechas = {fila['fecha_hora'].date() for fila in filas}
+        ocupaciones = {
+            (fila['fecha_hora'].date(), fila['bahia_id'])
+            for fila in filas if fila['bahia_id'] and fila['estado'] in DisponibilidadService.ESTADOS_ACTIVOS
+        }
+        for fecha, bahia_id in ocupaciones:
+            OcupacionService.recalcular(fecha, bahia_id)
+        CacheDisponibilidad.invalidar(*fechas)
+        RollupReservasService.recalcular(*fechas)
+        RollupEntidadesService.recalcular(*fechas)
+        EstadisticasLavadorService.invalidar(*{fila['lavador_id'] for fila in filas if fila['lavador_id']})
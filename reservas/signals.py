@@ -0,0 +1,131 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Reserva, HorarioDisponible, DisponibilidadHoraria, Bahia, Servicio
+from .services import DisponibilidadService, OcupacionService, CacheDisponibilidad, EventosTiempoReal
+
+
+# Campos de la reserva que afectan la ocupación de las bahías (nombre: atributo)
+CAMPOS_OCUPACION = {
+    'fecha_hora': 'fecha_hora',
+    'bahia': 'bahia_id',
+    'servicio': 'servicio_id',
+    'estado': 'estado',
+}
+
+
+def _estado_ocupacion(instance):
+    """Toma una foto de los campos de ocupación sin disparar consultas de campos diferidos."""
+    return {atributo: instance.__dict__.get(atributo) for atributo in CAMPOS_OCUPACION.values()}
+
+
+def _clave_ocupacion(estado):
+    """Retorna (fecha, bahia_id) si el estado ocupa una bahía, o None."""
+    if estado['fecha_hora'] and estado['bahia_id'] and estado['estado'] in DisponibilidadService.ESTADOS_ACTIVOS:
+        return estado['fecha_hora'].date(), estado['bahia_id']
+    return None
+
+
+@receiver(post_init, sender=Reserva)
+def guardar_estado_ocupacion(sender, instance, **kwargs):
+    instance._ocupacion_original = _estado_ocupacion(instance)
+
+
+@receiver(post_save, sender=Reserva)
+def actualizar_ocupacion(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Mantiene los mapas de ocupación al crear, cancelar, reprogramar o cambiar
+    de estado una reserva. Las altas encienden bits; las bajas recalculan solo
+    el mapa de la bahía y el día afectados.
+    """
+    original = None if created else instance._ocupacion_original
+    nuevo = _estado_ocupacion(instance)
+
+    # Con update_fields, los campos no guardados conservan su valor original
+    if original and update_fields is not None:
+        guardados = {CAMPOS_OCUPACION.get(campo, campo) for campo in update_fields}
+        nuevo = {atributo: nuevo[atributo] if atributo in guardados else original[atributo] for atributo in nuevo}
+
+    instance._ocupacion_original = nuevo
+    if nuevo == original:
+        return
+
+    clave_original = _clave_ocupacion(original) if original else None
+    clave_nueva = _clave_ocupacion(nuevo)
+
+    if clave_original:
+        OcupacionService.recalcular(*clave_original)
+
+    # Si la clave no cambió, el recálculo ya incluye la reserva guardada
+    if clave_nueva and clave_nueva != clave_original:
+        OcupacionService.marcar(
+            *clave_nueva,
+            OcupacionService.mascara(nuevo['fecha_hora'], instance.servicio.duracion_minutos)
+        )
+
+    fechas = {clave[0] for clave in (clave_original, clave_nueva) if clave}
+    if fechas:
+        CacheDisponibilidad.invalidar(*fechas)
+
+
+@receiver(post_delete, sender=Reserva)
+def liberar_ocupacion(sender, instance, **kwargs):
+    clave = _clave_ocupacion(instance._ocupacion_original)
+    if clave:
+        OcupacionService.recalcular(*clave)
+        CacheDisponibilidad.invalidar(clave[0])
+
+
+@receiver(post_init, sender=HorarioDisponible)
+def guardar_fecha_horario(sender, instance, **kwargs):
+    instance._fecha_original = instance.__dict__.get('fecha')
+
+
+@receiver(post_save, sender=HorarioDisponible)
+@receiver(post_delete, sender=HorarioDisponible)
+def invalidar_horarios_fecha(sender, instance, **kwargs):
+    """Los horarios específicos solo afectan su fecha (la anterior y la nueva)."""
+    CacheDisponibilidad.invalidar(instance._fecha_original, instance.fecha)
+    instance._fecha_original = instance.fecha
+
+
+@receiver(post_save, sender=DisponibilidadHoraria)
+@receiver(post_delete, sender=DisponibilidadHoraria)
+@receiver(post_save, sender=Bahia)
+@receiver(post_delete, sender=Bahia)
+@receiver(post_save, sender=Servicio)
+@receiver(post_delete, sender=Servicio)
+def invalidar_horarios_global(sender, instance, **kwargs):
+    """La disponibilidad general, las bahías y los servicios afectan a todas las fechas."""
+    CacheDisponibilidad.invalidar()
+
+
+@receiver(post_save, sender=Bahia)
+@receiver(post_delete, sender=Bahia)
+def publicar_cambio_bahia(sender, instance, **kwargs):
+    """Agregar, editar o eliminar una bahía cambia el tablero de los administradores."""
+    EventosTiempoReal.tablero_cambiado()
+
+
+@receiver(post_init, sender=Reserva)
+def guardar_estado_publicacion(sender, instance, **kwargs):
+    instance._publicacion_original = (instance.__dict__.get('estado'), instance.__dict__.get('lavador_id'))
+
+
+@receiver(post_save, sender=Reserva)
+def publicar_cambio_reserva(sender, instance, created, **kwargs):
+    """Las transiciones de estado y los cambios de lavador se envían por WebSocket."""
+    estado_anterior, lavador_anterior_id = instance._publicacion_original
+    actual = (instance.estado, instance.lavador_id)
+    instance._publicacion_original = actual
+    if created or actual != (estado_anterior, lavador_anterior_id):
+        EventosTiempoReal.reserva_cambiada(
+            instance,
+            estado_anterior=None if created else estado_anterior,
+            lavador_anterior_id=None if created else lavador_anterior_id
+        )
+
+
+@receiver(post_delete, sender=Reserva)
+def publicar_reserva_eliminada(sender, instance, **kwargs):
+    EventosTiempoReal.reserva_cambiada(instance, estado_anterior=instance.estado, eliminada=True)
@@ -1,3 +1,560 @@
-from django.test import TestCase
+from django.test import TestCase, Client
+from django.db import connection
+from django.urls import reverse
+from django.core.management import call_command
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from asgiref.testing import ApplicationCommunicator
+from clientes.models import Cliente
+from .models import Servicio, Reserva, Bahia, DisponibilidadHoraria, OcupacionBahia, BloqueoHorario
+from empleados.models import Empleado, Calificacion, TipoDocumento, Cargo
+from dashboard_gerente.models import ReservaDiaria
+from .services import OcupacionService, CacheDisponibilidad, LavadoresDisponiblesService, AsignacionLavadoresService, BloqueoService, HorarioNoDisponible, TableroBahiasService, EventosTiempoReal, VencimientoReservasService
+from .consumers import PublicoConsumer, TableroBahiasConsumer
+from io import StringIO
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+Usuario = get_user_model()
+
+
+class DisponibilidadServiceTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+        # Crear cliente
+        usuario_cliente = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+        self.cliente = Cliente.objects.create(
+            usuario=usuario_cliente,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+
+        # Crear servicio de 30 minutos y dos bahías
+        self.servicio = Servicio.objects.create(
+            nombre='Lavado Básico',
+            descripcion='Lavado exterior del vehículo',
+            precio=30000,
+            duracion_minutos=30
+        )
+        self.bahia1 = Bahia.objects.create(nombre='Bahía 1')
+        self.bahia2 = Bahia.objects.create(nombre='Bahía 2')
+
+        # Día de mañana de 8:00 a 10:00
+        self.fecha = datetime.date.today() + datetime.timedelta(days=1)
+        DisponibilidadHoraria.objects.create(
+            dia_semana=self.fecha.weekday(),
+            hora_inicio=datetime.time(8, 0),
+            hora_fin=datetime.time(10, 0)
+        )
+
+    def crear_reserva(self, hora, bahia, estado=Reserva.CONFIRMADA):
+        return Reserva.objects.create(
+            cliente=self.cliente,
+            servicio=self.servicio,
+            fecha_hora=datetime.datetime.combine(self.fecha, hora),
+            bahia=bahia,
+            estado=estado
+        )
+
+    def crear_lavador(self, nombre, documento):
+        tipo_documento, _ = TipoDocumento.objects.get_or_create(codigo='CC', defaults={'nombre': 'Cédula de Ciudadanía'})
+        cargo, _ = Cargo.objects.get_or_create(codigo='LAV', defaults={'nombre': 'Lavador'})
+        return Empleado.objects.create(
+            usuario=Usuario.objects.create_user(email=f'{documento}@test.com', password='password123', rol=Usuario.ROL_LAVADOR),
+            nombre=nombre,
+            apellido='Test',
+            tipo_documento=tipo_documento,
+            numero_documento=documento,
+            telefono='3001234567',
+            direccion='Calle 123',
+            ciudad='Bogotá',
+            cargo=cargo,
+            rol=Empleado.ROL_LAVADOR,
+            disponible=True,
+            fecha_contratacion=datetime.date.today()
+        )
+
+    def test_mascara(self):
+        inicio = datetime.datetime(2030, 1, 1, 8, 10)
+
+        # 8:10 a 8:40 ocupa las celdas de 8:00, 8:15 y 8:30 (celdas 32 a 34)
+        self.assertEqual(OcupacionService.mascara(inicio, 30), 0b111 << 32)
+        # Sin duración ocupa la celda en la que empieza
+        self.assertEqual(OcupacionService.mascara(inicio, 0), 1 << 32)
+        # Lo que pasa de la medianoche se recorta
+        self.assertEqual(OcupacionService.mascara(datetime.datetime(2030, 1, 1, 23, 50), 60), 1 << 95)
+
+    def test_mapa_incremental(self):
+        reserva = self.crear_reserva(datetime.time(8, 0), self.bahia1)
+        self.crear_reserva(datetime.time(8, 30), self.bahia1)
+        mapas = OcupacionService.mapas_del_dia(self.fecha)
+        self.assertEqual(mapas[self.bahia1.id], 0b1111 << 32)
+
+        # Reprogramar a otra bahía libera las celdas en la original
+        reserva.bahia = self.bahia2
+        reserva.save()
+        mapas = OcupacionService.mapas_del_dia(self.fecha)
+        self.assertEqual(mapas[self.bahia1.id], 0b11 << 34)
+        self.assertEqual(mapas[self.bahia2.id], 0b11 << 32)
+
+        # Cancelar libera la bahía
+        reserva.cancelar()
+        self.assertEqual(OcupacionService.mapas_del_dia(self.fecha)[self.bahia2.id], 0)
+
+    def test_reconstruir_ocupacion(self):
+        self.crear_reserva(datetime.time(9, 0), self.bahia2)
+        OcupacionBahia.objects.all().delete()
+
+        call_command('reconstruir_ocupacion_bahias', stdout=StringIO())
+
+        self.assertEqual(OcupacionService.mapas_del_dia(self.fecha), {self.bahia2.id: 0b11 << 36})
+
+    def test_horarios_disponibles_descuentan_reservas(self):
+        self.crear_reserva(datetime.time(8, 0), self.bahia1)
+        self.crear_reserva(datetime.time(8, 15), self.bahia2)
+        self.crear_reserva(datetime.time(9, 0), self.bahia1, estado=Reserva.CANCELADA)
+
+        response = self.client.get(reverse('reservas:obtener_horarios_disponibles'), {
+            'fecha': self.fecha.strftime('%Y-%m-%d'),
+            'servicio_id': self.servicio.id
+        })
+
+        self.assertEqual(response.status_code, 200)
+        horarios = {h['hora_inicio']: h for h in response.json()['horarios']}
+        self.assertEqual(len(horarios), 8)
+        self.assertEqual(horarios['08:00']['bahias_disponibles'], 1)
+        self.assertFalse(horarios['08:15']['disponible'])
+        self.assertEqual(horarios['08:30']['bahias_disponibles'], 1)
+        self.assertEqual(horarios['09:00']['bahias_disponibles'], 2)
+
+    def test_horarios_disponibles_consultas_constantes(self):
+        for i in range(6):
+            self.crear_reserva(datetime.time(8 + i // 4, (i % 4) * 15), self.bahia1 if i % 2 else self.bahia2)
+
+        # Generaciones del cache, servicio, bahías, horarios específicos, disponibilidad
+        # general, mapas, bloqueos y vencimiento del próximo bloqueo (para la vigencia del cache)
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('reservas:obtener_horarios_disponibles'), {
+                'fecha': self.fecha.strftime('%Y-%m-%d'),
+                'servicio_id': self.servicio.id
+            })
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_calendario_disponibilidad(self):
+        self.crear_reserva(datetime.time(8, 0), self.bahia1)
+        self.crear_reserva(datetime.time(8, 0), self.bahia2)
+
+        # Servicio, bahías, horarios específicos, disponibilidad general, mapas y bloqueos de la ventana
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('reservas:obtener_calendario_disponibilidad'), {
+                'desde': self.fecha.strftime('%Y-%m-%d'),
+                'hasta': (self.fecha + datetime.timedelta(days=13)).strftime('%Y-%m-%d'),
+                'servicio_id': self.servicio.id
+            })
+
+        self.assertEqual(response.status_code, 200)
+        dias = response.json()['dias']
+        self.assertEqual(len(dias), 14)
+        self.assertEqual(dias[0]['total_horarios'], 8)
+        # El servicio de 30 minutos no cabe a las 9:45 (el día termina a las 10:00)
+        self.assertEqual(dias[0]['horarios_libres'], 5)
+        self.assertEqual(dias[0]['primer_horario_libre'], '08:30')
+        self.assertNotIn('horarios', dias[0])
+        # Una semana después el mismo día de la semana está libre
+        self.assertEqual(dias[7]['horarios_libres'], 7)
+        self.assertEqual(dias[1]['total_horarios'], 0)
+
+    def test_calendario_requiere_duracion_completa_en_una_bahia(self):
+        # Bahía 1 ocupada de 8:30 a 9:00 y bahía 2 de 9:00 a 9:30
+        self.crear_reserva(datetime.time(8, 30), self.bahia1)
+        self.crear_reserva(datetime.time(9, 0), self.bahia2)
+        servicio_largo = Servicio.objects.create(
+            nombre='Lavado Completo', descripcion='Interior y exterior', precio=60000, duracion_minutos=60
+        )
+        fecha = self.fecha.strftime('%Y-%m-%d')
+
+        response = self.client.get(reverse('reservas:obtener_calendario_disponibilidad'), {
+            'desde': fecha, 'hasta': fecha, 'servicio_id': servicio_largo.id, 'detalle': '1'
+        })
+        dia = response.json()['dias'][0]
+        # A las 8:15 cada bloque tiene alguna bahía libre, pero ninguna tiene la hora completa
+        libres = [horario['hora_inicio'] for horario in dia['horarios'] if horario['disponible']]
+        self.assertEqual(libres, ['08:00', '09:00'])
+        self.assertEqual(dia['horarios_libres'], 2)
+        self.assertEqual(dia['primer_horario_libre'], '08:00')
+
+        # El resultado depende del servicio consultado
+        response = self.client.get(reverse('reservas:obtener_calendario_disponibilidad'), {
+            'desde': fecha, 'hasta': fecha, 'servicio_id': self.servicio.id
+        })
+        self.assertEqual(response.json()['dias'][0]['horarios_libres'], 6)
+
+    def test_cache_horarios_invalidado_por_reservas(self):
+        url = reverse('reservas:obtener_horarios_disponibles')
+        params = {'fecha': self.fecha.strftime('%Y-%m-%d'), 'servicio_id': self.servicio.id}
+        self.client.get(url, params)
+
+        # La segunda consulta sale del cache; solo se leen las generaciones, que están en
+        # la base de datos para que las invalidaciones lleguen a todos los procesos
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertEqual(response.json()['horarios'][0]['bahias_disponibles'], 2)
+
+        # Los errores no se cachean
+        params_error = {'fecha': self.fecha.strftime('%Y-%m-%d'), 'servicio_id': self.servicio.id + 100}
+        self.assertEqual(self.client.get(url, params_error).status_code, 404)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url, params_error).status_code, 404)
+
+        # Una reserva nueva en la fecha cambia la generación y se recalcula
+        self.crear_reserva(datetime.time(8, 0), self.bahia1)
+        horarios = self.client.get(url, params).json()['horarios']
+        self.assertEqual(horarios[0]['bahias_disponibles'], 1)
+
+        # Cambiar la disponibilidad general invalida todas las fechas
+        DisponibilidadHoraria.objects.update(hora_fin=datetime.time(9, 0))
+        DisponibilidadHoraria.objects.first().save()
+        self.assertEqual(len(self.client.get(url, params).json()['horarios']), 4)
+
+    def test_invalidar_sin_columnas_de_conflicto_en_mysql(self):
+        fecha = self.fecha
+        CacheDisponibilidad.invalidar(fecha)
+        generacion = CacheDisponibilidad._generaciones(fecha)[0]
+        CacheDisponibilidad.invalidar(fecha)
+        self.assertGreater(CacheDisponibilidad._generaciones(fecha)[0], generacion)
+
+        # En MySQL no se puede indicar el objetivo del conflicto: el upsert va sin unique_fields
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch('reservas.services.GeneracionDisponibilidad.objects.bulk_create') as bulk_create:
+            CacheDisponibilidad.invalidar(fecha)
+        opciones = bulk_create.call_args.kwargs
+        self.assertTrue(opciones['update_conflicts'])
+        self.assertEqual(opciones['update_fields'], ['generacion'])
+        self.assertNotIn('unique_fields', opciones)
+
+    def test_cache_vence_en_limite_de_bloque(self):
+        ahora = datetime.datetime(2030, 1, 1, 8, 10, 30)
+        self.assertEqual(CacheDisponibilidad._segundos_vigencia(ahora.date(), ahora), 270)
+        self.assertEqual(
+            CacheDisponibilidad._segundos_vigencia(ahora.date() + datetime.timedelta(days=1), ahora),
+            CacheDisponibilidad.TIMEOUT
+        )
+
+    def test_lavadores_disponibles_consultas_constantes(self):
+        lavadores = [self.crear_lavador(f'Lavador {i}', f'10{i}') for i in range(4)]
+        # Lavador 0 ocupado de 8:00 a 9:00 (30 minutos bloquean la hora completa)
+        reserva = self.crear_reserva(datetime.time(8, 0), self.bahia1)
+        reserva.lavador = lavadores[0]
+        reserva.save()
+        # Lavador 1 ocupado de 9:00 a 10:00
+        reserva = self.crear_reserva(datetime.time(9, 0), self.bahia1)
+        reserva.lavador = lavadores[1]
+        reserva.save()
+        Calificacion.objects.create(empleado=lavadores[2], servicio=self.servicio, cliente=self.cliente, puntuacion=4)
+        Calificacion.objects.create(empleado=lavadores[2], servicio=self.servicio, cliente=self.cliente, puntuacion=5)
+
+        # Servicio, reservas y bloqueos del día, y lavadores con su calificación
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('reservas:obtener_lavadores_disponibles'), {
+                'fecha': self.fecha.strftime('%Y-%m-%d'),
+                'hora': '08:30',
+                'servicio_id': self.servicio.id
+            })
+
+        datos = response.json()
+        self.assertEqual(datos['total_disponibles'], 2)
+        calificaciones = {lavador['id']: lavador['calificacion'] for lavador in datos['lavadores']}
+        self.assertEqual(calificaciones, {lavadores[2].id: 4.5, lavadores[3].id: 0})
+
+    def test_tiene_conflicto_con_reservas_solapadas(self):
+        base = datetime.datetime.combine(self.fecha, datetime.time(8, 0))
+        agenda = (
+            [base, base + datetime.timedelta(minutes=30)],
+            [base + datetime.timedelta(hours=3), base + datetime.timedelta(hours=3)]
+        )
+        hora = lambda h, m=0: datetime.datetime.combine(self.fecha, datetime.time(h, m))
+        self.assertTrue(LavadoresDisponiblesService.tiene_conflicto(agenda, hora(10), hora(11)))
+        self.assertFalse(LavadoresDisponiblesService.tiene_conflicto(agenda, hora(11), hora(12)))
+        self.assertFalse(LavadoresDisponiblesService.tiene_conflicto(agenda, hora(7), hora(8)))
+
+    def test_asignar_lavador_sin_conflictos(self):
+        ocupado, libre = self.crear_lavador('Ocupado', '201'), self.crear_lavador('Libre', '202')
+        existente = self.crear_reserva(datetime.time(8, 0), self.bahia1)
+        existente.asignar_lavador(ocupado, automatico=False)
+
+        reserva = self.crear_reserva(datetime.time(8, 30), self.bahia2)
+        # Candidatos con carga y calificación, y agenda del día (reservas y bloqueos)
+        with self.assertNumQueries(3):
+            self.assertEqual(AsignacionLavadoresService.asignar(reserva), libre)
+
+        otra = self.crear_reserva(datetime.time(8, 45), self.bahia1)
+        otra.lavador = libre
+        otra.save()
+        with self.assertRaises(ValueError):
+            self.crear_reserva(datetime.time(8, 15), self.bahia2).asignar_lavador()
+
+    def test_asignar_dia_en_lote(self):
+        lavadores = [self.crear_lavador(f'Lavador {i}', f'30{i}') for i in range(2)]
+        bahia3 = Bahia.objects.create(nombre='Bahía 3')
+        for hora, bahia in ((8, self.bahia1), (8, self.bahia2), (9, self.bahia1), (9, self.bahia2), (9, bahia3)):
+            self.crear_reserva(datetime.time(hora, 0), bahia)
+
+        out = StringIO()
+        call_command('asignar_lavadores', fecha=self.fecha.strftime('%Y-%m-%d'), stdout=out)
+
+        self.assertIn('Se asignaron 4 reservas', out.getvalue())
+        asignadas = Reserva.objects.filter(lavador__isnull=False)
+        self.assertEqual(asignadas.count(), 4)
+        self.assertTrue(all(reserva.asignacion_automatica for reserva in asignadas))
+        # Cada lavador queda con una reserva a las 8:00 y otra a las 9:00
+        for lavador in lavadores:
+            self.assertEqual(
+                sorted(r.fecha_hora.hour for r in asignadas.filter(lavador=lavador)), [8, 9]
+            )
+        # El resumen diario por lavador se refresca aunque bulk_update no dispare señales
+        por_lavador = {}
+        for lavador_id, cantidad in ReservaDiaria.objects.filter(fecha=self.fecha).values_list('lavador_id', 'cantidad'):
+            por_lavador[lavador_id] = por_lavador.get(lavador_id, 0) + cantidad
+        self.assertEqual(por_lavador, {lavadores[0].id: 2, lavadores[1].id: 2, None: 1})
+
+    def test_asignar_menos_cambios_bahia(self):
+        en_bahia1, en_bahia2 = self.crear_lavador('Bahía uno', '401'), self.crear_lavador('Bahía dos', '402')
+        self.crear_reserva(datetime.time(8, 0), self.bahia1).asignar_lavador(en_bahia1, automatico=False)
+        for hora in (datetime.time(8, 0), datetime.time(10, 0)):
+            self.crear_reserva(hora, self.bahia2).asignar_lavador(en_bahia2, automatico=False)
+
+        reserva = self.crear_reserva(datetime.time(9, 0), self.bahia1)
+        # Por carga gana quien tiene menos reservas; por bahía, quien ya está en la bahía 1
+        self.assertEqual(AsignacionLavadoresService.asignar(reserva), en_bahia1)
+        reserva.bahia = self.bahia2
+        self.assertEqual(
+            AsignacionLavadoresService.asignar(reserva, AsignacionLavadoresService.MENOS_CAMBIOS_BAHIA), en_bahia2
+        )
+
+    def test_bloqueo_visible_y_exclusivo(self):
+        lavador = self.crear_lavador('Lavador', '501')
+        otro_cliente = Cliente.objects.create(
+            usuario=Usuario.objects.create_user(email='otro@test.com', password='password123', rol=Usuario.ROL_CLIENTE),
+            nombre='Otro', apellido='Cliente', tipo_documento='CC', numero_documento='555', email='otro@test.com'
+        )
+        inicio = datetime.datetime.combine(self.fecha, datetime.time(8, 0))
+
+        bloqueo = BloqueoService.adquirir(self.cliente, self.bahia1.id, inicio, 30, lavador.id)
+        # La bahía aparece ocupada y el lavador no disponible para los demás
+        self.assertEqual(OcupacionService.mapas_del_dia(self.fecha)[self.bahia1.id], 0b11 << 32)
+        self.assertEqual(LavadoresDisponiblesService.lavadores_disponibles(inicio, inicio + datetime.timedelta(hours=1)), [])
+        with self.assertRaisesMessage(HorarioNoDisponible, 'bahía'):
+            BloqueoService.adquirir(otro_cliente, self.bahia1.id, inicio, 30)
+        with self.assertRaisesMessage(HorarioNoDisponible, 'lavador'):
+            BloqueoService.adquirir(otro_cliente, self.bahia2.id, inicio, 30, lavador.id)
+
+        # Al expirar el horario vuelve a estar libre
+        BloqueoHorario.objects.filter(pk=bloqueo.pk).update(expira=datetime.datetime.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(OcupacionService.mapas_del_dia(self.fecha).get(self.bahia1.id, 0), 0)
+        BloqueoService.adquirir(otro_cliente, self.bahia1.id, inicio, 30, lavador.id)
+        self.assertEqual(BloqueoHorario.objects.get().cliente, otro_cliente)
+
+    def test_confirmar_consume_bloqueo(self):
+        inicio = datetime.datetime.combine(self.fecha, datetime.time(9, 0))
+        BloqueoService.adquirir(self.cliente, self.bahia1.id, inicio, 30)
+
+        # El propio bloqueo no impide confirmar y se consume al crear la reserva
+        with BloqueoService.confirmar(self.cliente, self.bahia1.id, inicio, 30):
+            self.crear_reserva(datetime.time(9, 0), self.bahia1)
+        self.assertFalse(BloqueoHorario.objects.exists())
+
+        # Un intervalo que se cruza con la reserva ya no se puede confirmar
+        with self.assertRaises(HorarioNoDisponible):
+            with BloqueoService.confirmar(self.cliente, self.bahia1.id, inicio + datetime.timedelta(minutes=15), 30):
+                self.fail('No debería ejecutarse el bloque')
+
+        # Los errores del bloque no se confunden con un conflicto de horario
+        with self.assertRaisesMessage(ValueError, 'precio'):
+            with BloqueoService.confirmar(self.cliente, self.bahia2.id, inicio, 30):
+                raise ValueError('precio inválido')
+
+    def test_bloquear_horario_valida_lavador_y_horario(self):
+        url = reverse('reservas:api_bloquear_horario')
+        lavador = self.crear_lavador('Lavador', '502')
+        no_disponible = self.crear_lavador('Ocupado', '503')
+        Empleado.objects.filter(pk=no_disponible.pk).update(disponible=False)
+        self.client.force_login(self.cliente.usuario)
+        datos = {'fecha': self.fecha.strftime('%Y-%m-%d'), 'hora': '08:00',
+                 'servicio_id': self.servicio.id, 'bahia_id': self.bahia1.id}
+
+        self.assertEqual(self.client.post(url, {**datos, 'lavador_id': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {**datos, 'lavador_id': lavador.id + 100}).status_code, 404)
+        self.assertEqual(self.client.post(url, {**datos, 'lavador_id': no_disponible.id}).status_code, 404)
+        ayer = datetime.date.today() - datetime.timedelta(days=1)
+        self.assertEqual(self.client.post(url, {**datos, 'fecha': ayer.strftime('%Y-%m-%d')}).status_code, 400)
+        self.assertFalse(BloqueoHorario.objects.exists())
+
+        respuesta = self.client.post(url, {**datos, 'lavador_id': lavador.id})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(BloqueoHorario.objects.get().lavador, lavador)
+
+    def test_tablero_bahias_incremental(self):
+        ahora = datetime.datetime.now().replace(microsecond=0)
+        Reserva.objects.create(cliente=self.cliente, servicio=self.servicio, bahia=self.bahia1,
+                               fecha_hora=ahora - datetime.timedelta(hours=2), estado=Reserva.CONFIRMADA)
+        reciente = Reserva.objects.create(cliente=self.cliente, servicio=self.servicio, bahia=self.bahia1,
+                                          fecha_hora=ahora - datetime.timedelta(minutes=10), estado=Reserva.CONFIRMADA)
+
+        # Bahías y última reserva activa por bahía en dos consultas
+        with self.assertNumQueries(2):
+            bahias_info = TableroBahiasService.tablero()
+        estados = {info['bahia'].id: (info['estado'], info['reserva']) for info in bahias_info}
+        self.assertEqual(estados[self.bahia1.id], ('ocupada', reciente))
+        self.assertEqual(estados[self.bahia2.id], ('disponible', None))
+
+        # Sin cambios no se envía ninguna bahía
+        _, version = TableroBahiasService.estado()
+        _, cambiadas, nueva_version = TableroBahiasService.cambios(version)
+        self.assertEqual((cambiadas, nueva_version), ([], version))
+
+        # Solo se envía la bahía cuyo estado cambió
+        reciente.estado = Reserva.EN_PROCESO
+        reciente.save()
+        _, cambiadas, nueva_version = TableroBahiasService.cambios(version)
+        self.assertEqual([(info['bahia'], info['estado']) for info in cambiadas], [(self.bahia1, 'en_proceso')])
+        self.assertNotEqual(nueva_version, version)
+
+        # Una versión desconocida recibe el tablero completo
+        self.assertIsNone(TableroBahiasService.cambios('desconocida')[1])
+
+    def test_transiciones_publican_eventos(self):
+        capa = get_channel_layer()
+        async_to_sync(capa.flush)()
+        async_to_sync(capa.group_add)(EventosTiempoReal.GRUPO_PUBLICO, 'pantalla-test')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = self.crear_reserva(datetime.time(9, 0), self.bahia1)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.estado = Reserva.EN_PROCESO
+            reserva.save()
+
+        # Los cambios de bahías avisan sin detalle de reserva
+        with self.captureOnCommitCallbacks(execute=True):
+            Bahia.objects.create(nombre='Bahía 3')
+
+        eventos = [async_to_sync(capa.receive)('pantalla-test')['datos'] for _ in range(3)]
+        self.assertEqual([(evento['estado'], evento['estado_anterior']) for evento in eventos[:2]],
+                         [(Reserva.CONFIRMADA, None), (Reserva.EN_PROCESO, Reserva.CONFIRMADA)])
+        self.assertEqual(eventos[2], {'tipo': 'tablero'})
+        async_to_sync(capa.flush)()
+
+    def test_consumidores_por_rol(self):
+        async def conectar(consumer):
+            scope = {'type': 'websocket', 'path': '/ws/', 'headers': [], 'subprotocols': [], 'user': AnonymousUser()}
+            comunicador = ApplicationCommunicator(consumer.as_asgi(), scope)
+            await comunicador.send_input({'type': 'websocket.connect'})
+            respuesta = await comunicador.receive_output()
+            evento = None
+            if respuesta['type'] == 'websocket.accept':
+                await get_channel_layer().group_send(
+                    EventosTiempoReal.GRUPO_PUBLICO, {'type': 'evento', 'datos': {'tipo': 'reserva'}}
+                )
+                evento = json.loads((await comunicador.receive_output())['text'])
+                await comunicador.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await comunicador.wait()
+            return respuesta['type'], evento
+
+        # La pantalla pública no requiere sesión y recibe los eventos de su grupo
+        self.assertEqual(async_to_sync(conectar)(PublicoConsumer), ('websocket.accept', {'tipo': 'reserva'}))
+        # El tablero de bahías es solo para administradores
+        self.assertEqual(async_to_sync(conectar)(TableroBahiasConsumer), ('websocket.close', None))
+
+
+class VencimientoReservasTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        usuario_cliente = Usuario.objects.create_user(
+            email='cliente@test.com',
+            password='password123',
+            rol=Usuario.ROL_CLIENTE
+        )
+        self.cliente = Cliente.objects.create(
+            usuario=usuario_cliente,
+            nombre='Cliente',
+            apellido='Test',
+            tipo_documento='CC',
+            numero_documento='0987654321',
+            email='cliente@test.com'
+        )
+        self.servicio = Servicio.objects.create(
+            nombre='Lavado Básico',
+            descripcion='Lavado exterior del vehículo',
+            precio=30000,
+            duracion_minutos=30
+        )
+        self.bahia = Bahia.objects.create(nombre='Bahía 1')
+        self.ayer = datetime.date.today() - datetime.timedelta(days=1)
+
+    def crear_reserva(self, fecha_hora, estado=Reserva.CONFIRMADA):
+        return Reserva.objects.create(
+            cliente=self.cliente,
+            servicio=self.servicio,
+            fecha_hora=fecha_hora,
+            bahia=self.bahia,
+            estado=estado
+        )
+
+    def test_marca_incumplidas_por_lotes_comparando_la_duracion_en_sql(self):
+        vencidas = [
+            self.crear_reserva(datetime.datetime.combine(self.ayer, datetime.time(8, 0))),
+            self.crear_reserva(datetime.datetime.combine(self.ayer, datetime.time(9, 0)), estado=Reserva.PENDIENTE),
+        ]
+        # Empezó hace 10 minutos y el servicio dura 30: aún no vence
+        en_curso = self.crear_reserva(datetime.datetime.now() - datetime.timedelta(minutes=10))
+        completada = self.crear_reserva(datetime.datetime.combine(self.ayer, datetime.time(10, 0)), estado=Reserva.COMPLETADA)
+        self.assertNotEqual(OcupacionService.mapas_del_dia(self.ayer).get(self.bahia.id, 0), 0)
+
+        salida = StringIO()
+        call_command('verificar_reservas_vencidas', '--lote', '1', stdout=salida)
+
+        estados = dict(Reserva.objects.values_list('id', 'estado'))
+        self.assertEqual([estados[r.id] for r in vencidas], [Reserva.INCUMPLIDA, Reserva.INCUMPLIDA])
+        self.assertEqual(estados[en_curso.id], Reserva.CONFIRMADA)
+        self.assertEqual(estados[completada.id], Reserva.COMPLETADA)
+        self.assertIn('INCUMPLIDA automáticamente', Reserva.objects.get(id=vencidas[0].id).notas)
+        self.assertIn('2 reservas en 2 lotes', salida.getvalue())
+
+        from notificaciones.models import Notificacion
+        from notificaciones.services import ContadorNotificacionesService
+        self.assertEqual(
+            set(Notificacion.objects.values_list('reserva_id', flat=True)), {r.id for r in vencidas}
+        )
+        self.assertEqual(ContadorNotificacionesService.reconciliar(), 0)
+        # Los mapas de ocupación se recalculan sin las reservas vencidas
+        self.assertEqual(OcupacionService.mapas_del_dia(self.ayer).get(self.bahia.id, 0), 0)
+
+    def test_cancelar_sin_pago_y_simulacion(self):
+        reserva = self.crear_reserva(datetime.datetime.now() + datetime.timedelta(days=1), estado=Reserva.PENDIENTE)
+        Reserva.objects.filter(id=reserva.id).update(fecha_creacion=datetime.datetime.now() - datetime.timedelta(minutes=10))
+
+        resumen = VencimientoReservasService.procesar(
+            VencimientoReservasService.sin_pago(datetime.datetime.now(), 5), Reserva.CANCELADA,
+            nota=lambda estado: '', titulo='', mensaje=lambda fila: '', dry_run=True
+        )
+        self.assertEqual(resumen['procesadas'], 1)
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.estado, Reserva.PENDIENTE)
+
+        call_command('cancelar_reservas_sin_pago', stdout=StringIO())
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.estado, Reserva.CANCELADA)
+        self.assertIn('falta de pago', reserva.notas)
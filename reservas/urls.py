@@ -16,9 +16,12 @@ urlpatterns = [
     
     # Rutas para AJAX
     path('obtener_horarios_disponibles/', views.ObtenerHorariosDisponiblesView.as_view(), name='obtener_horarios_disponibles'),
+    path('obtener_calendario_disponibilidad/', views.ObtenerCalendarioDisponibilidadView.as_view(), name='obtener_calendario_disponibilidad'),
     path('obtener_bahias_disponibles/', views.ObtenerBahiasDisponiblesView.as_view(), name='obtener_bahias_disponibles'),
     path('api/bahias-disponibles/', views_api.BahiasDisponiblesView.as_view(), name='api_bahias_disponibles'),
     path('obtener_lavadores_disponibles/', views.ObtenerLavadoresDisponiblesView.as_view(), name='obtener_lavadores_disponibles'),
+    path('api/bloquear-horario/', views_api.BloquearHorarioView.as_view(), name='api_bloquear_horario'),
+    path('api/liberar-bloqueo/', views_api.LiberarBloqueoView.as_view(), name='api_liberar_bloqueo'),
     path('seleccionar_lavador/<int:reserva_id>/<int:lavador_id>/', views.SeleccionarLavadorView.as_view(), name='seleccionar_lavador'),
     path('obtener_medios_pago/', views.ObtenerMediosPagoView.as_view(), name='obtener_medios_pago'),
     # Calificaciones
@@ -17,6 +17,7 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.views import APIView
 from .models import Servicio, Reserva, Vehiculo, HorarioDisponible, Bahia, DisponibilidadHoraria, MedioPago, Recompensa
 from .serializers import ServicioSerializer, ReservaSerializer, ReservaUpdateSerializer, BahiaSerializer
+from .services import DisponibilidadService, OcupacionService, CacheDisponibilidad, LavadoresDisponiblesService, BloqueoService, HorarioNoDisponible
 from .nequi_views import NequiCallbackView, NequiStatusView, NequiReturnView
 from notificaciones.models import Notificacion
 from clientes.models import Cliente, HistorialServicio
@@ -27,8 +28,11 @@ import requests
 import hashlib
 import hmac
 import base64
+import logging
 from datetime import datetime, timedelta, time
 
+logger = logging.getLogger(__name__)
+
 # Create your views here.
 
 class ProcesarPagoView(LoginRequiredMixin, View):
@@ -1087,110 +1091,50 @@ class ReservarTurnoView(LoginRequiredMixin, TemplateView):
                     messages.error(request, 'No tiene suficientes puntos para aplicar esta recompensa.')
                     return redirect('reservas:reservar_turno')
             
-            # Crear la reserva con el precio final
+            # Lavador elegido; si no es válido se asigna uno automáticamente después
             try:
-                reserva = Reserva.objects.create(
-                    cliente=request.user.cliente,
-                    servicio=servicio,
-                    fecha_hora=fecha_hora,
-                    bahia=bahia,
-                    vehiculo=vehiculo,  # Asociar el vehículo a la reserva
-                    notas=notas,
-                    estado=Reserva.PENDIENTE,
-                    # Pago deshabilitado: no se asigna medio_pago
-                    precio_final=precio_final,  # Guardar el precio con descuento
-                    descuento_aplicado=descuento_aplicado if usar_puntos else 0,
-                    puntos_redimidos=puntos_a_redimir if usar_puntos else 0,
-                    recompensa_aplicada=recompensa_seleccionada if usar_puntos else ''
-                )
-            except IntegrityError:
-                # La bahía ya está reservada para esa fecha y hora
+                lavador = Empleado.objects.get(id=lavador_id, rol=Empleado.ROL_LAVADOR, disponible=True, activo=True)
+            except (Empleado.DoesNotExist, ValueError):
+                lavador = None
+            
+            # Crear la reserva con el precio final, confirmando el horario con las filas de
+            # bahía y lavador bloqueadas (el bloqueo temporal del propio cliente no cuenta)
+            try:
+                with BloqueoService.confirmar(cliente, bahia.id, fecha_hora, servicio.duracion_minutos, lavador.id if lavador else None):
+                    reserva = Reserva.objects.create(
+                        cliente=request.user.cliente,
+                        servicio=servicio,
+                        fecha_hora=fecha_hora,
+                        bahia=bahia,
+                        lavador=lavador,
+                        asignacion_automatica=False,
+                        vehiculo=vehiculo,  # Asociar el vehículo a la reserva
+                        notas=notas,
+                        estado=Reserva.PENDIENTE,
+                        # Pago deshabilitado: no se asigna medio_pago
+                        precio_final=precio_final,  # Guardar el precio con descuento
+                        descuento_aplicado=descuento_aplicado if usar_puntos else 0,
+                        puntos_redimidos=puntos_a_redimir if usar_puntos else 0,
+                        recompensa_aplicada=recompensa_seleccionada if usar_puntos else ''
+                    )
+            except HorarioNoDisponible as e:
+                # Otro cliente tomó la bahía o el lavador en este horario
                 if is_ajax:
-                    response = JsonResponse({'success': False, 'error': 'Esta bahía ya está reservada para la fecha y hora seleccionada. Por favor, selecciona otra bahía u horario.'}, status=400)
+                    response = JsonResponse({'success': False, 'error': f'{e}. Por favor, selecciona otro horario.'}, status=400)
                     response['Content-Type'] = 'application/json'
                     return response
-                messages.error(request, 'Esta bahía ya está reservada para la fecha y hora seleccionada. Por favor, selecciona otra bahía u horario.')
+                messages.error(request, f'{e}. Por favor, selecciona otro horario.')
                 return redirect('reservas:reservar_turno')
-            
-            # Verificar si se seleccionó un lavador específico
-            # Ya obtuvimos lavador_id anteriormente en la validación
-            
-            # VALIDACIÓN: Requerir que se seleccione un lavador (ya validado arriba)
-            # Esta validación es redundante ahora, pero la mantenemos por seguridad
-            if not lavador_id:
+            except IntegrityError:
+                # La bahía ya está reservada para esa fecha y hora
                 if is_ajax:
-                    response = JsonResponse({'success': False, 'error': 'Debe seleccionar un lavador para continuar con la reserva.'}, status=400)
+                    response = JsonResponse({'success': False, 'error': 'Esta bahía ya está reservada para la fecha y hora seleccionada. Por favor, selecciona otra bahía u horario.'}, status=400)
                     response['Content-Type'] = 'application/json'
                     return response
-                messages.error(request, 'Debe seleccionar un lavador para continuar con la reserva.')
+                messages.error(request, 'Esta bahía ya está reservada para la fecha y hora seleccionada. Por favor, selecciona otra bahía u horario.')
                 return redirect('reservas:reservar_turno')
             
-            if lavador_id:
-                try:
-                    lavador = Empleado.objects.get(id=lavador_id, rol=Empleado.ROL_LAVADOR, disponible=True, activo=True)
-                    
-                    # VALIDACIÓN ADICIONAL: Verificar que el lavador no tenga conflictos de horario
-                    # Calcular hora de fin de la nueva reserva
-                    duracion_servicio = (servicio.duracion_minutos + 59) // 60  # Redondear hacia arriba
-                    hora_fin_nueva = (fecha_hora + timedelta(hours=duracion_servicio)).time()
-                    
-                    # Buscar reservas del lavador que se solapen con la nueva reserva
-                    reservas_conflicto = Reserva.objects.filter(
-                        lavador=lavador,
-                        fecha_hora__date=fecha_hora.date(),
-                        estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-                    )
-                    
-                    tiene_conflicto = False
-                    for reserva_existente in reservas_conflicto:
-                        # Calcular hora de fin de la reserva existente
-                        duracion_existente = 1  # Por defecto 1 hora
-                        if reserva_existente.servicio:
-                            duracion_existente = (reserva_existente.servicio.duracion_minutos + 59) // 60
-                        
-                        hora_fin_existente = (reserva_existente.fecha_hora + timedelta(hours=duracion_existente)).time()
-                        
-                        # Verificar solapamiento
-                        if (fecha_hora.time() < hora_fin_existente and hora_fin_nueva > reserva_existente.fecha_hora.time()):
-                            tiene_conflicto = True
-                            break
-                    
-                    if tiene_conflicto:
-                        # El lavador ya no está disponible, eliminar la reserva creada y mostrar error
-                        reserva.delete()
-                        if is_ajax:
-                            response = JsonResponse({'success': False, 'error': f'El lavador {lavador.nombre_completo()} ya no está disponible para este horario. Por favor, selecciona otro lavador.'}, status=400)
-                            response['Content-Type'] = 'application/json'
-                            return response
-                        messages.error(request, f'El lavador {lavador.nombre_completo()} ya no está disponible para este horario. Por favor, selecciona otro lavador.')
-                        return redirect('reservas:reservar_turno')
-                    
-                    # Si no hay conflictos, asignar el lavador
-                    try:
-                        reserva.asignar_lavador(lavador, automatico=False)
-                    except ValueError as e:
-                        # Eliminar la reserva si no se puede asignar el lavador
-                        reserva.delete()
-                        if is_ajax:
-                            response = JsonResponse({'success': False, 'error': str(e)}, status=400)
-                            response['Content-Type'] = 'application/json'
-                            return response
-                        messages.error(request, str(e))
-                        return redirect('reservas:reservar_turno')
-                except (Empleado.DoesNotExist, ValueError):
-                    # Si no se encuentra el lavador o hay un error, asignar automáticamente
-                    try:
-                        reserva.asignar_lavador()
-                    except ValueError as e:
-                        # Eliminar la reserva si no hay lavadores disponibles
-                        reserva.delete()
-                        if is_ajax:
-                            response = JsonResponse({'success': False, 'error': str(e)}, status=400)
-                            response['Content-Type'] = 'application/json'
-                            return response
-                        messages.error(request, str(e))
-                        return redirect('reservas:reservar_turno')
-            else:
+            if not lavador:
                 # Asignar automáticamente un lavador disponible
                 try:
                     reserva.asignar_lavador()
@@ -1562,57 +1506,15 @@ class ObtenerLavadoresDisponiblesView(View):
             except ValueError:
                 return JsonResponse({'error': 'Formato de fecha u hora inválido'}, status=400)
             
-            # Obtener todos los lavadores activos y disponibles
-            lavadores_base = Empleado.objects.filter(
-                rol=Empleado.ROL_LAVADOR,
-                disponible=True,
-                activo=True
-            )
-            
-            lavadores_disponibles = []
-            
-            for lavador in lavadores_base:
-                # Verificar si el lavador tiene reservas que se solapen con el horario solicitado
-                reservas_solapadas = Reserva.objects.filter(
-                    lavador=lavador,
-                    fecha_hora__date=fecha,
-                    estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-                )
-                
-                # Verificar solapamiento de horarios más preciso
-                tiene_conflicto = False
-                for reserva in reservas_solapadas:
-                    # Obtener hora de inicio de la reserva existente
-                    hora_reserva_inicio = reserva.fecha_hora.time()
-                    
-                    # Calcular hora de fin de la reserva existente
-                    duracion_reserva = 1  # Por defecto 1 hora
-                    if reserva.servicio:
-                        duracion_reserva = (reserva.servicio.duracion_minutos + 59) // 60
-                    
-                    reserva_inicio_dt = datetime.combine(fecha, hora_reserva_inicio)
-                    reserva_fin_dt = reserva_inicio_dt + timedelta(hours=duracion_reserva)
-                    hora_reserva_fin = reserva_fin_dt.time()
-                    
-                    # Verificar si hay solapamiento usando datetime completos para mejor precisión
-                    nueva_inicio_dt = datetime.combine(fecha, hora_inicio)
-                    nueva_fin_dt = datetime.combine(fecha, hora_fin)
-                    
-                    # Verificar si hay solapamiento
-                    if (nueva_inicio_dt < reserva_fin_dt and nueva_fin_dt > reserva_inicio_dt):
-                        tiene_conflicto = True
-                        break
-                
-                # Si no hay conflictos, el lavador está disponible
-                if not tiene_conflicto:
-                    lavadores_disponibles.append(lavador)
+            # Lavadores activos y disponibles sin reservas que se crucen con el horario
+            lavadores_disponibles = LavadoresDisponiblesService.lavadores_disponibles(hora_inicio_dt, hora_fin_dt)
             
             # Formatear los datos para la respuesta JSON
             lavadores_data = [{
                 'id': lavador.id,
                 'nombre': lavador.nombre_completo(),
                 'foto_url': lavador.fotografia.url if lavador.fotografia else None,
-                'calificacion': lavador.promedio_calificacion(),
+                'calificacion': lavador.calificacion_promedio or 0,
                 'cargo': lavador.cargo.nombre if lavador.cargo else 'Lavador',
             } for lavador in lavadores_disponibles]
             
@@ -1693,32 +1595,16 @@ class ObtenerHorariosDisponiblesView(View):
                 response['Content-Type'] = 'application/json'
                 return response
             
-            # Obtener servicio
-            try:
-                servicio = Servicio.objects.get(id=servicio_id, activo=True)
-                duracion_servicio = servicio.duracion_minutos
-                print(f"[DEBUG] Servicio encontrado: {servicio.nombre}, duración: {duracion_servicio}")
-            except Servicio.DoesNotExist:
-                response = JsonResponse({'error': 'Servicio no encontrado'}, status=404)
-                response['Content-Type'] = 'application/json'
-                return response
-            
-            # Verificar si hay bahías activas
-            total_bahias = Bahia.objects.filter(activo=True).count()
-            print(f"[DEBUG] Total bahías activas: {total_bahias}")
-            if total_bahias == 0:
-                response = JsonResponse({'error': 'No hay bahías disponibles'}, status=404)
-                response['Content-Type'] = 'application/json'
-                return response
-            
-            # Obtener horarios reales basados en disponibilidad horaria y reservas existentes
-            horarios = self._obtener_horarios_reales(fecha, duracion_servicio, total_bahias)
-            print(f"[DEBUG] Horarios generados: {len(horarios)}")
+            # Respuesta cacheada por fecha y servicio; se invalida con las señales de reservas y horarios
+            datos, status = CacheDisponibilidad.obtener(
+                'horarios', fecha, servicio_id,
+                lambda: self._calcular_respuesta(fecha, servicio_id)
+            )
             
             elapsed_time = time.time() - start_time
             print(f"[DEBUG] Tiempo total de procesamiento: {elapsed_time:.2f} segundos")
             
-            response = JsonResponse({'horarios': horarios}, status=200)
+            response = JsonResponse(datos, status=status)
             response['Content-Type'] = 'application/json'
             return response
             
@@ -1730,197 +1616,67 @@ class ObtenerHorariosDisponiblesView(View):
             response['Content-Type'] = 'application/json'
             return response
     
-    def _obtener_horarios_reales(self, fecha, duracion_servicio, total_bahias):
-        """Obtener horarios reales basados en disponibilidad horaria y reservas existentes - intervalos de 15 minutos"""
-        horarios = []
-        now_local = datetime.now()
-        dia_semana = fecha.weekday()  # 0=Lunes, 6=Domingo
+    def _calcular_respuesta(self, fecha, servicio_id):
+        """Calcular el contenido y el código de estado de la respuesta para una fecha y servicio"""
+        # Obtener servicio
+        try:
+            servicio = Servicio.objects.get(id=servicio_id, activo=True)
+            duracion_servicio = servicio.duracion_minutos
+            print(f"[DEBUG] Servicio encontrado: {servicio.nombre}, duración: {duracion_servicio}")
+        except Servicio.DoesNotExist:
+            return {'error': 'Servicio no encontrado'}, 404
         
-        # Obtener bahías activas reales
-        bahias_activas = Bahia.objects.filter(activo=True)
-        total_bahias_activas = bahias_activas.count()
+        # Verificar si hay bahías activas
+        bahia_ids = list(Bahia.objects.filter(activo=True).values_list('id', flat=True))
+        print(f"[DEBUG] Total bahías activas: {len(bahia_ids)}")
+        if not bahia_ids:
+            return {'error': 'No hay bahías disponibles'}, 404
         
-        print(f"[DEBUG] Total bahías activas: {total_bahias_activas}")
+        # Obtener horarios reales basados en disponibilidad horaria y reservas existentes
+        horarios = self._obtener_horarios_reales(fecha, duracion_servicio, bahia_ids)
+        print(f"[DEBUG] Horarios generados: {len(horarios)}")
+        
+        return {'horarios': horarios}, 200
+    
+    def _obtener_horarios_reales(self, fecha, duracion_servicio, bahia_ids):
+        """Obtener horarios reales basados en disponibilidad horaria y reservas existentes - intervalos de 15 minutos"""
+        dia_semana = fecha.weekday()  # 0=Lunes, 6=Domingo
         
         # Primero verificar si hay horarios específicos para esta fecha
-        horarios_especificos = HorarioDisponible.objects.filter(
+        horarios_especificos = list(HorarioDisponible.objects.filter(
             fecha=fecha,
             disponible=True
-        ).order_by('hora_inicio')
+        ).order_by('hora_inicio').values_list('hora_inicio', 'hora_fin'))
         
-        print(f"[DEBUG] Horarios específicos encontrados: {horarios_especificos.count()}")
+        print(f"[DEBUG] Horarios específicos encontrados: {len(horarios_especificos)}")
         
-        if horarios_especificos.exists():
+        if horarios_especificos:
             print(f"[DEBUG] Usando horarios específicos para {fecha}")
-            # Usar horarios específicos, pero dividirlos en bloques de 15 minutos
-            for horario in horarios_especificos:
-                print(f"[DEBUG] Procesando horario específico: {horario.hora_inicio} - {horario.hora_fin}")
-                # Dividir el horario específico en bloques de 15 minutos
-                hora_actual = horario.hora_inicio
-                bloque_count = 0
-                while hora_actual < horario.hora_fin and bloque_count < 72:  # Límite de seguridad (18 horas * 4 bloques)
-                    # Calcular hora de fin (15 minutos después o hasta el fin del horario específico)
-                    hora_fin_bloque = (datetime.combine(fecha, hora_actual) + timedelta(minutes=15)).time()
-                    if hora_fin_bloque > horario.hora_fin:
-                        hora_fin_bloque = horario.hora_fin
-                    
-                    # Verificar si el horario ya pasó (solo para hoy)
-                    horario_ya_paso = False
-                    if fecha == now_local.date():
-                        horario_ya_paso = hora_actual <= now_local.time()
-                    
-                    print(f"[DEBUG] Bloque {bloque_count}: {hora_actual} - ya pasó: {horario_ya_paso}")
-                    
-                    # Solo agregar horarios que no hayan pasado
-                    if not horario_ya_paso:
-                        # Calcular reservas existentes para este horario
-                        reservas_en_horario = self._contar_reservas_en_horario(fecha, hora_actual, duracion_servicio)
-                        bahias_disponibles = max(0, total_bahias_activas - reservas_en_horario)
-                        
-                        horarios.append({
-                            'hora_inicio': hora_actual.strftime('%H:%M'),
-                            'hora_fin': hora_fin_bloque.strftime('%H:%M'),
-                            'disponible': bahias_disponibles > 0,
-                            'bahias_disponibles': bahias_disponibles,
-                            'bahias_totales': total_bahias_activas
-                        })
-                    
-                    # Avanzar 15 minutos
-                    hora_actual = (datetime.combine(fecha, hora_actual) + timedelta(minutes=15)).time()
-                    bloque_count += 1
-                    if hora_actual >= horario.hora_fin:
-                        break
+            rangos = horarios_especificos
         else:
             print(f"[DEBUG] Usando disponibilidad general para día {dia_semana}")
             # Usar disponibilidad general del día de la semana
-            disponibilidad_general = DisponibilidadHoraria.objects.filter(
+            rangos = list(DisponibilidadHoraria.objects.filter(
                 dia_semana=dia_semana,
                 activo=True
-            ).order_by('hora_inicio')
-            
-            if disponibilidad_general.exists():
-                for disp in disponibilidad_general:
-                    # Generar horarios cada 15 minutos dentro del rango
-                    hora_actual = disp.hora_inicio
-                    bloque_count = 0
-                    while hora_actual < disp.hora_fin and bloque_count < 72:  # Límite de seguridad
-                        # Calcular hora de fin (15 minutos después o hasta el fin del rango)
-                        hora_fin = (datetime.combine(fecha, hora_actual) + timedelta(minutes=15)).time()
-                        if hora_fin > disp.hora_fin:
-                            hora_fin = disp.hora_fin
-                        
-                        # Verificar si el horario ya pasó (solo para hoy)
-                        horario_ya_paso = False
-                        if fecha == now_local.date():
-                            horario_ya_paso = hora_actual <= now_local.time()
-                        
-                        # Solo agregar horarios que no hayan pasado
-                        if not horario_ya_paso:
-                            # Calcular reservas existentes para este horario
-                            reservas_en_horario = self._contar_reservas_en_horario(fecha, hora_actual, duracion_servicio)
-                            bahias_disponibles = max(0, total_bahias_activas - reservas_en_horario)
-                            
-                            horarios.append({
-                                'hora_inicio': hora_actual.strftime('%H:%M'),
-                                'hora_fin': hora_fin.strftime('%H:%M'),
-                                'disponible': bahias_disponibles > 0,
-                                'bahias_disponibles': bahias_disponibles,
-                                'bahias_totales': total_bahias_activas
-                            })
-                        
-                        # Avanzar 15 minutos
-                        hora_actual = (datetime.combine(fecha, hora_actual) + timedelta(minutes=15)).time()
-                        bloque_count += 1
-                        if hora_actual >= disp.hora_fin:
-                            break
-            else:
+            ).order_by('hora_inicio').values_list('hora_inicio', 'hora_fin'))
+            
+            if not rangos:
                 print(f"[DEBUG] No hay disponibilidad configurada activa para el día {dia_semana}")
                 # Si no hay disponibilidad configurada activa, no mostrar horarios
                 # El frontend mostrará el mensaje "Para la fecha escogida no hay horarios disponibles"
-                horarios = []
+                return []
         
-        return horarios
+        # Resolver la ocupación de cada bloque con los mapas de bits de las bahías
+        mapas = OcupacionService.mapas_del_dia(fecha)
+        return DisponibilidadService.horarios_por_bloques(fecha, rangos, bahia_ids, mapas)
     
-    def _contar_reservas_en_horario(self, fecha, hora_inicio, duracion_servicio):
-        """Contar cuántas reservas existen en un horario específico - versión optimizada para intervalos de 15 minutos"""
-        try:
-            # Crear datetime para el inicio del horario
-            inicio_horario = datetime.combine(fecha, hora_inicio)
-            fin_horario = inicio_horario + timedelta(minutes=15)  # Bloques de 15 minutos
-            
-            # Contar reservas que se superponen con este horario de 15 minutos
-            # Consideramos reservas que:
-            # 1. Empiezan durante nuestro bloque de 15 minutos
-            # 2. Están en curso durante nuestro bloque (empezaron antes pero no han terminado)
-            reservas_count = Reserva.objects.filter(
-                fecha_hora__date=fecha,
-                estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            ).filter(
-                # Reservas que se superponen con nuestro bloque de 15 minutos
-                fecha_hora__lt=fin_horario,
-                fecha_hora__gte=inicio_horario
-            ).count()
-            
-            # También contar reservas que empezaron antes pero siguen activas durante nuestro bloque
-            reservas_anteriores = Reserva.objects.filter(
-                fecha_hora__date=fecha,
-                fecha_hora__lt=inicio_horario,
-                estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            )
-            
-            for reserva in reservas_anteriores:
-                # Calcular cuándo termina esta reserva
-                fin_reserva = reserva.fecha_hora + timedelta(minutes=reserva.servicio.duracion_minutos)
-                # Si la reserva termina después del inicio de nuestro bloque, cuenta como ocupada
-                if fin_reserva > inicio_horario:
-                    reservas_count += 1
-            
-            print(f"[DEBUG] Reservas en horario {hora_inicio} (15 min): {reservas_count}")
-            return reservas_count
-        except Exception as e:
-            print(f"[ERROR] Error contando reservas: {e}")
-            return 0  # En caso de error, asumir 0 reservas
-    
-    def _crear_horarios_default_con_reservas(self, fecha, duracion_servicio, total_bahias):
+    def _crear_horarios_default_con_reservas(self, fecha, duracion_servicio, bahia_ids):
         """Crear horarios por defecto de 8:00 a 18:00 considerando reservas existentes - intervalos de 15 minutos"""
-        horarios = []
-        now_local = datetime.now()
-        
-        # Obtener bahías activas reales
-        bahias_activas = Bahia.objects.filter(activo=True)
-        total_bahias_activas = bahias_activas.count()
-        
-        # Generar horarios cada 15 minutos de 8:00 a 18:00
-        hora_actual = time(hour=8, minute=0)
-        hora_limite = time(hour=18, minute=0)
-        
-        while hora_actual < hora_limite:
-            # Calcular hora de fin (15 minutos después)
-            hora_fin = (datetime.combine(fecha, hora_actual) + timedelta(minutes=15)).time()
-            
-            # Verificar si el horario ya pasó (solo para hoy)
-            horario_ya_paso = False
-            if fecha == now_local.date():
-                horario_ya_paso = hora_actual <= now_local.time()
-            
-            # Solo agregar horarios que no hayan pasado
-            if not horario_ya_paso:
-                # Calcular reservas existentes para este horario
-                reservas_en_horario = self._contar_reservas_en_horario(fecha, hora_actual, duracion_servicio)
-                bahias_disponibles = max(0, total_bahias_activas - reservas_en_horario)
-                
-                horarios.append({
-                    'hora_inicio': hora_actual.strftime('%H:%M'),
-                    'hora_fin': hora_fin.strftime('%H:%M'),
-                    'disponible': bahias_disponibles > 0,
-                    'bahias_disponibles': bahias_disponibles,
-                    'bahias_totales': total_bahias_activas
-                })
-            
-            # Avanzar 15 minutos
-            hora_actual = (datetime.combine(fecha, hora_actual) + timedelta(minutes=15)).time()
-        
-        return horarios
+        mapas = OcupacionService.mapas_del_dia(fecha)
+        return DisponibilidadService.horarios_por_bloques(
+            fecha, [(time(hour=8, minute=0), time(hour=18, minute=0))], bahia_ids, mapas
+        )
     
     def _crear_horarios_desde_disponibilidad(self, disponibilidad_general, fecha, duracion_servicio, total_bahias, horarios_ocupados):
         """Crear horarios desde disponibilidad general optimizada"""
@@ -2001,6 +1757,80 @@ class ObtenerHorariosDisponiblesView(View):
         
         return horarios
 
+class ObtenerCalendarioDisponibilidadView(View):
+    """
+    Resumen de disponibilidad por día para un rango de fechas, en una sola solicitud.
+    Parámetros: desde, hasta (opcional, por defecto 14 días), servicio_id y detalle (opcional).
+    Un horario es libre si alguna bahía tiene libre la duración completa del servicio.
+    """
+    def get(self, request, *args, **kwargs):
+        try:
+            desde_str = request.GET.get('desde')
+            hasta_str = request.GET.get('hasta')
+            servicio_id = request.GET.get('servicio_id')
+            incluir_detalle = request.GET.get('detalle', '').lower() in ['1', 'true', 'si']
+            
+            if not desde_str or not servicio_id:
+                response = JsonResponse({'error': 'Fecha inicial y servicio son requeridos'}, status=400)
+                response['Content-Type'] = 'application/json'
+                return response
+            
+            # Convertir fechas
+            try:
+                desde = datetime.strptime(desde_str, '%Y-%m-%d').date()
+                hasta = datetime.strptime(hasta_str, '%Y-%m-%d').date() if hasta_str else desde + timedelta(days=13)
+            except ValueError:
+                response = JsonResponse({'error': 'Formato de fecha inválido'}, status=400)
+                response['Content-Type'] = 'application/json'
+                return response
+            
+            # No calcular días pasados
+            desde = max(desde, datetime.now().date())
+            if hasta < desde:
+                response = JsonResponse({'error': 'La fecha final no puede ser anterior a la inicial'}, status=400)
+                response['Content-Type'] = 'application/json'
+                return response
+            
+            if (hasta - desde).days >= DisponibilidadService.MAX_DIAS_CALENDARIO:
+                response = JsonResponse({'error': f'El rango no puede superar {DisponibilidadService.MAX_DIAS_CALENDARIO} días'}, status=400)
+                response['Content-Type'] = 'application/json'
+                return response
+            
+            # Obtener servicio
+            try:
+                servicio = Servicio.objects.get(id=servicio_id, activo=True)
+            except Servicio.DoesNotExist:
+                response = JsonResponse({'error': 'Servicio no encontrado'}, status=404)
+                response['Content-Type'] = 'application/json'
+                return response
+            
+            # Verificar si hay bahías activas
+            bahia_ids = list(Bahia.objects.filter(activo=True).values_list('id', flat=True))
+            if not bahia_ids:
+                response = JsonResponse({'error': 'No hay bahías disponibles'}, status=404)
+                response['Content-Type'] = 'application/json'
+                return response
+            
+            dias = DisponibilidadService.calendario(desde, hasta, bahia_ids, incluir_detalle, servicio.duracion_minutos)
+            
+            response = JsonResponse({
+                'desde': desde.strftime('%Y-%m-%d'),
+                'hasta': hasta.strftime('%Y-%m-%d'),
+                'servicio': servicio.nombre,
+                'duracion_minutos': servicio.duracion_minutos,
+                'bahias_totales': len(bahia_ids),
+                'dias': dias
+            }, status=200)
+            response['Content-Type'] = 'application/json'
+            return response
+            
+        except Exception:
+            logger.exception('Error al cargar calendario de disponibilidad')
+            response = JsonResponse({'error': 'Error al cargar la disponibilidad. Por favor, inténtalo de nuevo.'}, status=500)
+            response['Content-Type'] = 'application/json'
+            return response
+
+
 class ServicioViewSet(viewsets.ModelViewSet):
     """ViewSet para el modelo Servicio"""
     queryset = Servicio.objects.filter(activo=True)
@@ -2139,36 +1969,13 @@ class ObtenerBahiasDisponiblesView(View):
             servicio = get_object_or_404(Servicio, id=servicio_id)
             duracion_servicio = servicio.duracion_minutos
             
-            # Calcular hora de fin del servicio
-            hora_fin = fecha_hora + timedelta(minutes=duracion_servicio)
+            # Celdas de 15 minutos que ocuparía el servicio
+            mascara = OcupacionService.mascara(fecha_hora, duracion_servicio)
             
-            # Obtener todas las bahías activas
+            # Filtrar las bahías activas cuyo mapa de ocupación no tenga esas celdas ocupadas
             bahias_activas = Bahia.objects.filter(activo=True)
-            
-            # Obtener las reservas que se solapan con este horario
-            reservas_solapadas = Reserva.objects.filter(
-                fecha_hora__lt=hora_fin,
-                fecha_hora__gte=fecha_hora,
-                estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            )
-            
-            # También considerar reservas que empezaron antes pero terminan durante nuestro horario
-            otras_reservas = Reserva.objects.filter(
-                fecha_hora__lt=fecha_hora,
-                estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            )
-            
-            # Filtrar aquellas que se solapan con nuestro horario
-            for reserva in otras_reservas:
-                fin_reserva = reserva.fecha_hora + timedelta(minutes=reserva.servicio.duracion_minutos)
-                if fin_reserva > fecha_hora:
-                    reservas_solapadas = reservas_solapadas | Reserva.objects.filter(id=reserva.id)
-            
-            # Obtener las bahías ocupadas
-            bahias_ocupadas = reservas_solapadas.values_list('bahia', flat=True).distinct()
-            
-            # Filtrar las bahías disponibles
-            bahias_disponibles = bahias_activas.exclude(id__in=bahias_ocupadas)
+            mapas = OcupacionService.mapas_del_dia(fecha_hora.date())
+            bahias_disponibles = OcupacionService.bahias_libres(bahias_activas, mapas, mascara)
             
             # Preparar respuesta
             bahias_data = [{
@@ -2183,7 +1990,7 @@ class ObtenerBahiasDisponiblesView(View):
                 'servicio': servicio.nombre,
                 'duracion_minutos': duracion_servicio,
                 'bahias_disponibles': bahias_data,
-                'total_disponibles': bahias_disponibles.count()
+                'total_disponibles': len(bahias_disponibles)
             }, status=200)
             response['Content-Type'] = 'application/json'
             return response
@@ -2251,36 +2058,13 @@ class BahiaViewSet(viewsets.ModelViewSet):
             servicio = get_object_or_404(Servicio, id=servicio_id)
             duracion_servicio = servicio.duracion_minutos
             
-            # Calcular hora de fin del servicio
-            hora_fin = fecha_hora + timedelta(minutes=duracion_servicio)
+            # Celdas de 15 minutos que ocuparía el servicio
+            mascara = OcupacionService.mascara(fecha_hora, duracion_servicio)
             
-            # Obtener todas las bahías activas
+            # Filtrar las bahías activas cuyo mapa de ocupación no tenga esas celdas ocupadas
             bahias_activas = Bahia.objects.filter(activo=True)
-            
-            # Obtener las reservas que se solapan con este horario
-            reservas_solapadas = Reserva.objects.filter(
-                fecha_hora__lt=hora_fin,
-                fecha_hora__gte=fecha_hora,
-                estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            )
-            
-            # También considerar reservas que empezaron antes pero terminan durante nuestro horario
-            otras_reservas = Reserva.objects.filter(
-                fecha_hora__lt=fecha_hora,
-                estado__in=[Reserva.PENDIENTE, Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            )
-            
-            # Filtrar aquellas que se solapan con nuestro horario
-            for reserva in otras_reservas:
-                fin_reserva = reserva.fecha_hora + timedelta(minutes=reserva.servicio.duracion_minutos)
-                if fin_reserva > fecha_hora:
-                    reservas_solapadas = reservas_solapadas | Reserva.objects.filter(id=reserva.id)
-            
-            # Obtener las bahías ocupadas
-            bahias_ocupadas = reservas_solapadas.values_list('bahia', flat=True).distinct()
-            
-            # Filtrar las bahías disponibles
-            bahias_disponibles = bahias_activas.exclude(id__in=bahias_ocupadas)
+            mapas = OcupacionService.mapas_del_dia(fecha_hora.date())
+            bahias_disponibles = OcupacionService.bahias_libres(bahias_activas, mapas, mascara)
             
             # Serializar las bahías disponibles
             serializer = self.get_serializer(bahias_disponibles, many=True)
@@ -2290,7 +2074,7 @@ class BahiaViewSet(viewsets.ModelViewSet):
                 'servicio': servicio.nombre,
                 'duracion_minutos': duracion_servicio,
                 'bahias_disponibles': serializer.data,
-                'total_disponibles': bahias_disponibles.count()
+                'total_disponibles': len(bahias_disponibles)
             })
             
         except Exception as e:
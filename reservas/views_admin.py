@@ -6,6 +6,7 @@ from django.urls import reverse
 from django.http import JsonResponse
 from django.template.loader import render_to_string
 from .models import Bahia, Reserva, Servicio, MedioPago, DisponibilidadHoraria, HorarioDisponible, Recompensa
+from .services import TableroBahiasService
 from .forms import BahiaForm, ServicioForm, MedioPagoForm, DisponibilidadHorariaForm, ReservaForm, ClienteForm, HorarioDisponibleForm, RecompensaForm
 from django.utils import timezone
 from clientes.models import Cliente
@@ -25,159 +26,55 @@ class DashboardAdminView(LoginRequiredMixin, AdminRequiredMixin, View):
     template_name = 'reservas/dashboard_admin.html'
     
     def get_bahias_info(self):
-        # Obtener todas las bahías
-        bahias = Bahia.objects.all()
-        
-        # Para cada bahía, verificar si está ocupada actualmente
-        bahias_info = []
-        for bahia in bahias:
-            # Buscar reservas activas para esta bahía
-            reserva_activa = Reserva.objects.filter(
-                bahia=bahia,
-                fecha_hora__lte=timezone.now(),
-                estado__in=[Reserva.CONFIRMADA, Reserva.EN_PROCESO]
-            ).order_by('-fecha_hora').first()
-            
-            # Determinar el estado de la bahía
-            if reserva_activa:
-                # Asegurarse de que la comparación de estados sea correcta
-                # EN_PROCESO = 'PR', CONFIRMADA = 'CO'
-                if reserva_activa.estado == Reserva.EN_PROCESO:  # Usar la constante en lugar del valor directo
-                    estado = 'en_proceso'
-                    print(f"DEBUG - Bahía {bahia.nombre}: Reserva ID {reserva_activa.id}, Estado {reserva_activa.estado}, Clasificada como {estado} (EN PROCESO)")
-                else:
-                    estado = 'ocupada'
-                    print(f"DEBUG - Bahía {bahia.nombre}: Reserva ID {reserva_activa.id}, Estado {reserva_activa.estado}, Clasificada como {estado} (OCUPADA)")
-                # Obtener información del cliente y vehículo
-                cliente = reserva_activa.cliente
-                vehiculo = reserva_activa.vehiculo
-                servicio = reserva_activa.servicio
-            else:
-                estado = 'disponible'
-                cliente = None
-                vehiculo = None
-                servicio = None
-                print(f"DEBUG - Bahía {bahia.nombre}: Sin reserva activa, Clasificada como {estado} (DISPONIBLE)")
-                
-            print(f"DEBUG - Estado final de bahía {bahia.nombre}: {estado}")
-
-            
-            # Si hay una reserva activa y la bahía tiene cámara, verificar que tenga stream_token
-            if reserva_activa and bahia.tiene_camara and bahia.ip_camara:
-                if not reserva_activa.stream_token:
-                    # Generar stream_token faltante
-                    import uuid
-                    reserva_activa.stream_token = f"{reserva_activa.id}-{uuid.uuid4()}"
-                    reserva_activa.save()
-                    print(f"DEBUG - Stream token generado para reserva {reserva_activa.id}: {reserva_activa.stream_token}")
-            
-            # Agregar información de la bahía al listado
-            bahias_info.append({
-                'bahia': bahia,
-                'estado': estado,
-                'cliente': cliente,
-                'vehiculo': vehiculo,
-                'servicio': servicio,
-                'reserva': reserva_activa
-            })
-        
-        return bahias_info
+        return TableroBahiasService.tablero()
     
     def get(self, request):
-        # Obtener información de bahías
-        bahias_info = self.get_bahias_info()
-        
-        # Estadísticas rápidas
-        bahias_disponibles = sum(1 for info in bahias_info if info['estado'] == 'disponible')
-        bahias_ocupadas = sum(1 for info in bahias_info if info['estado'] == 'ocupada')
-        bahias_en_proceso = sum(1 for info in bahias_info if info['estado'] == 'en_proceso')
-        
-        # Corregir el conteo: si hay bahías en proceso, también están ocupadas
-        # Esto asegura que el contador de bahías ocupadas incluya tanto las ocupadas como las en proceso
-        bahias_ocupadas_total = bahias_ocupadas + bahias_en_proceso
-        
-        # Imprimir para depuración
-        print(f"DEBUG - Bahías ocupadas (original): {bahias_ocupadas}, Bahías en proceso: {bahias_en_proceso}")
-        print(f"DEBUG - Bahías ocupadas (corregido): {bahias_ocupadas_total}")
-        print(f"DEBUG - Estados de bahías: {[info['estado'] for info in bahias_info]}")
-        
-        # Reservas pendientes para hoy (son las confirmadas que aún no se han atendido)
-        hoy = timezone.now().date()
-        manana = hoy + timezone.timedelta(days=1)
-        
-        # Crear objetos datetime sin zona horaria ya que USE_TZ=False
-        inicio_dia = timezone.datetime.combine(hoy, timezone.datetime.min.time())
-        fin_dia = timezone.datetime.combine(manana, timezone.datetime.min.time())
-        
-        reservas_pendientes = Reserva.objects.filter(
-            fecha_hora__gte=inicio_dia,
-            fecha_hora__lt=fin_dia,
-            estado=Reserva.CONFIRMADA
-        ).count()
+        # Obtener información de bahías y la versión del tablero para las actualizaciones incrementales
+        bahias_info, tablero_version = TableroBahiasService.estado()
         
         # Conteos totales para las tarjetas del dashboard
         total_reservas = Reserva.objects.count()
         total_clientes = Cliente.objects.count()
-        total_bahias = Bahia.objects.count()
+        total_bahias = len(bahias_info)
         
         context = {
             'bahias_info': bahias_info,
-            'bahias_disponibles': bahias_disponibles,
-            'bahias_ocupadas': bahias_ocupadas + bahias_en_proceso,  # Usar el total corregido
-            'bahias_en_proceso': bahias_en_proceso,
-            'reservas_pendientes': reservas_pendientes,
+            'tablero_version': tablero_version,
             'total_reservas': total_reservas,
             'total_clientes': total_clientes,
             'total_bahias': total_bahias,
             'user_rol': request.user.rol  # Agregar el rol del usuario al contexto
         }
+        context.update(TableroBahiasService.resumen(bahias_info))
         
         return render(request, self.template_name, context)
 
 
 class ObtenerBahiasInfoView(LoginRequiredMixin, AdminRequiredMixin, View):
-    """Vista para obtener la información actualizada de las bahías en formato JSON"""
+    """
+    Vista para obtener la información actualizada de las bahías en formato JSON.
+    
+    Con el parámetro ``version`` solo se devuelven las tarjetas de las bahías que
+    cambiaron desde esa versión.
+    """
     
     def get(self, request):
-        # Reutilizar el método de DashboardAdminView para obtener la información de bahías
-        dashboard_view = DashboardAdminView()
-        bahias_info = dashboard_view.get_bahias_info()
-        
-        # Renderizar solo el HTML de las tarjetas de bahías
-        html_bahias = render_to_string('reservas/partials/bahias_cards.html', {'bahias_info': bahias_info})
-        
-        # Estadísticas rápidas
-        bahias_disponibles = sum(1 for info in bahias_info if info['estado'] == 'disponible')
-        bahias_ocupadas = sum(1 for info in bahias_info if info['estado'] == 'ocupada')
-        bahias_en_proceso = sum(1 for info in bahias_info if info['estado'] == 'en_proceso')
+        version = request.GET.get('version', '')
+        bahias_info, cambiadas, version_actual = TableroBahiasService.cambios(version)
         
-        # Calcular reservas pendientes para hoy (son las confirmadas que aún no se han atendido)
-        hoy = timezone.now().date()
-        manana = hoy + timezone.timedelta(days=1)
-        
-        # Crear objetos datetime sin zona horaria ya que USE_TZ=False
-        inicio_dia = timezone.datetime.combine(hoy, timezone.datetime.min.time())
-        fin_dia = timezone.datetime.combine(manana, timezone.datetime.min.time())
-        
-        reservas_pendientes = Reserva.objects.filter(
-            fecha_hora__gte=inicio_dia,
-            fecha_hora__lt=fin_dia,
-            estado=Reserva.CONFIRMADA
-        ).count()
-        
-        # Imprimir para depuración
-        print(f"DEBUG AJAX - Bahías ocupadas: {bahias_ocupadas}, Bahías en proceso: {bahias_en_proceso}")
-        print(f"DEBUG AJAX - Estados de bahías: {[info['estado'] for info in bahias_info]}")
-        print(f"DEBUG AJAX - Reservas pendientes: {reservas_pendientes}")
+        datos = {'version': version_actual, 'completo': cambiadas is None}
+        if cambiadas is None:
+            # Renderizar el HTML de todas las tarjetas de bahías
+            datos['html_bahias'] = render_to_string('reservas/partials/bahias_cards.html', {'bahias_info': bahias_info}, request=request)
+        else:
+            datos['bahias'] = {
+                str(info['bahia'].id): render_to_string('reservas/partials/bahia_card.html', {'info': info}, request=request)
+                for info in cambiadas
+            }
+        datos.update(TableroBahiasService.resumen(bahias_info))
         
         # Devolver los datos en formato JSON
-        return JsonResponse({
-            'html_bahias': html_bahias,
-            'bahias_disponibles': bahias_disponibles,
-            'bahias_ocupadas': bahias_ocupadas + bahias_en_proceso,  # Usar el total corregido
-            'bahias_en_proceso': bahias_en_proceso,
-            'reservas_pendientes': reservas_pendientes
-        })
+        return JsonResponse(datos)
 
 
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
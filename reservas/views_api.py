@@ -11,11 +11,11 @@ from rest_framework.permissions import IsAuthenticated
 from django.http import JsonResponse
 from django.views import View
 from django.utils import timezone
-from django.db.models import Q, Avg
 from django.db import IntegrityError
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 from .models import Servicio, Bahia, Vehiculo, MedioPago, Reserva, Recompensa
+from .services import OcupacionService, CacheDisponibilidad, LavadoresDisponiblesService, BloqueoService, HorarioNoDisponible
 from empleados.models import Empleado
 from notificaciones.models import Notificacion
 
@@ -38,48 +38,12 @@ class HorariosDisponiblesView(LoginRequiredMixin, View):
             if fecha < timezone.now().date():
                 return JsonResponse({'success': False, 'error': 'No se pueden hacer reservas para fechas pasadas'}, status=400)
             
-            # Obtener el servicio
-            try:
-                servicio = Servicio.objects.get(id=servicio_id)
-            except Servicio.DoesNotExist:
-                return JsonResponse({'success': False, 'error': 'Servicio no encontrado'}, status=404)
-            
-            # Obtener horarios disponibles para la fecha
-            horarios_disponibles = []
-            
-            # Horario de operación (ejemplo: 8:00 AM a 6:00 PM)
-            hora_inicio = datetime.time(8, 0)  # 8:00 AM
-            hora_fin = datetime.time(18, 0)    # 6:00 PM
-            
-            # Duración del servicio en minutos
-            duracion_servicio = servicio.duracion_minutos
-            
-            # Generar intervalos de tiempo (cada 30 minutos)
-            intervalo_minutos = 30
-            hora_actual = datetime.datetime.combine(fecha, hora_inicio)
-            hora_limite = datetime.datetime.combine(fecha, hora_fin)
-            
-            while hora_actual < hora_limite:
-                hora_fin_servicio = hora_actual + datetime.timedelta(minutes=duracion_servicio)
-                
-                # Verificar si el servicio termina antes del cierre
-                if hora_fin_servicio.time() <= hora_fin:
-                    # Contar bahías disponibles para este horario
-                    bahias_disponibles = self.contar_bahias_disponibles(fecha, hora_actual.time(), hora_fin_servicio.time())
-                    
-                    if bahias_disponibles > 0:
-                        horarios_disponibles.append({
-                            'id': hora_actual.strftime('%H:%M'),
-                            'hora': hora_actual.strftime('%H:%M'),
-                            'hora_inicio': hora_actual.strftime('%H:%M'),
-                            'hora_fin': hora_fin_servicio.strftime('%H:%M'),
-                            'hora_formateada': f"{hora_actual.strftime('%I:%M %p')} - {hora_fin_servicio.strftime('%I:%M %p')}",
-                            'bahias_disponibles': bahias_disponibles
-                        })
-                
-                hora_actual += datetime.timedelta(minutes=intervalo_minutos)
-            
-            return JsonResponse({'success': True, 'horarios': horarios_disponibles})
+            # Respuesta cacheada por fecha y servicio; se invalida con las señales de reservas y horarios
+            datos, status = CacheDisponibilidad.obtener(
+                'api_horarios', fecha, servicio_id,
+                lambda: self.calcular_horarios(fecha, servicio_id)
+            )
+            return JsonResponse(datos, status=status)
             
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -87,32 +51,58 @@ class HorariosDisponiblesView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         return self.get(request, *args, **kwargs)
     
-    def contar_bahias_disponibles(self, fecha, hora_inicio, hora_fin):
-        # Obtener todas las bahías activas
-        bahias = Bahia.objects.filter(activa=True)
+    def calcular_horarios(self, fecha, servicio_id):
+        # Obtener el servicio
+        try:
+            servicio = Servicio.objects.get(id=servicio_id)
+        except Servicio.DoesNotExist:
+            return {'success': False, 'error': 'Servicio no encontrado'}, 404
+        
+        # Obtener horarios disponibles para la fecha
+        horarios_disponibles = []
+        
+        # Horario de operación (ejemplo: 8:00 AM a 6:00 PM)
+        hora_inicio = datetime.time(8, 0)  # 8:00 AM
+        hora_fin = datetime.time(18, 0)    # 6:00 PM
         
-        # Contar bahías disponibles (no reservadas en ese horario)
-        bahias_disponibles = 0
+        # Duración del servicio en minutos
+        duracion_servicio = servicio.duracion_minutos
         
-        for bahia in bahias:
-            # Verificar si la bahía está reservada en ese horario
-            reservada = Reserva.objects.filter(
-                Q(bahia=bahia) & 
-                Q(fecha=fecha) & 
-                (
-                    # La reserva existente comienza durante nuestro servicio
-                    (Q(hora_inicio__gte=hora_inicio) & Q(hora_inicio__lt=hora_fin)) |
-                    # La reserva existente termina durante nuestro servicio
-                    (Q(hora_fin__gt=hora_inicio) & Q(hora_fin__lte=hora_fin)) |
-                    # La reserva existente abarca completamente nuestro servicio
-                    (Q(hora_inicio__lte=hora_inicio) & Q(hora_fin__gte=hora_fin))
-                )
-            ).exists()
-            
-            if not reservada:
-                bahias_disponibles += 1
+        # Generar intervalos de tiempo (cada 30 minutos)
+        intervalo_minutos = 30
+        hora_actual = datetime.datetime.combine(fecha, hora_inicio)
+        hora_limite = datetime.datetime.combine(fecha, hora_fin)
         
-        return bahias_disponibles
+        # Mapas de ocupación de las bahías activas para la fecha (una sola consulta cada uno)
+        bahia_ids = list(Bahia.objects.filter(activo=True).values_list('id', flat=True))
+        mapas = OcupacionService.mapas_del_dia(fecha)
+        
+        while hora_actual < hora_limite:
+            hora_fin_servicio = hora_actual + datetime.timedelta(minutes=duracion_servicio)
+            
+            # Verificar si el servicio termina antes del cierre
+            if hora_fin_servicio.time() <= hora_fin:
+                # Contar bahías disponibles para este horario
+                bahias_disponibles = self.contar_bahias_disponibles(bahia_ids, mapas, hora_actual, duracion_servicio)
+                
+                if bahias_disponibles > 0:
+                    horarios_disponibles.append({
+                        'id': hora_actual.strftime('%H:%M'),
+                        'hora': hora_actual.strftime('%H:%M'),
+                        'hora_inicio': hora_actual.strftime('%H:%M'),
+                        'hora_fin': hora_fin_servicio.strftime('%H:%M'),
+                        'hora_formateada': f"{hora_actual.strftime('%I:%M %p')} - {hora_fin_servicio.strftime('%I:%M %p')}",
+                        'bahias_disponibles': bahias_disponibles
+                    })
+            
+            hora_actual += datetime.timedelta(minutes=intervalo_minutos)
+        
+        return {'success': True, 'horarios': horarios_disponibles}, 200
+    
+    def contar_bahias_disponibles(self, bahia_ids, mapas, inicio, duracion_minutos):
+        # Contar bahías cuyo mapa no tiene ocupadas las celdas del servicio
+        mascara = OcupacionService.mascara(inicio, duracion_minutos)
+        return sum(1 for bahia_id in bahia_ids if not mapas.get(bahia_id, 0) & mascara)
 
 
 class BahiasDisponiblesView(LoginRequiredMixin, View):
@@ -138,38 +128,19 @@ class BahiasDisponiblesView(LoginRequiredMixin, View):
             except Servicio.DoesNotExist:
                 return JsonResponse({'success': False, 'error': 'Servicio no encontrado'}, status=404)
             
-            # Calcular hora de fin del servicio
+            # Celdas de 15 minutos que ocuparía el servicio
             hora_inicio_dt = datetime.datetime.combine(fecha, hora_inicio)
-            hora_fin_dt = hora_inicio_dt + datetime.timedelta(minutes=servicio.duracion_minutos)
-            hora_fin = hora_fin_dt.time()
+            mascara = OcupacionService.mascara(hora_inicio_dt, servicio.duracion_minutos)
             
-            # Obtener bahías disponibles
-            bahias_disponibles = []
-            
-            # Obtener todas las bahías activas
-            bahias = Bahia.objects.filter(activa=True)
-            
-            for bahia in bahias:
-                # Verificar si la bahía está reservada en ese horario
-                reservada = Reserva.objects.filter(
-                    Q(bahia=bahia) & 
-                    Q(fecha=fecha) & 
-                    (
-                        # La reserva existente comienza durante nuestro servicio
-                        (Q(hora_inicio__gte=hora_inicio) & Q(hora_inicio__lt=hora_fin)) |
-                        # La reserva existente termina durante nuestro servicio
-                        (Q(hora_fin__gt=hora_inicio) & Q(hora_fin__lte=hora_fin)) |
-                        # La reserva existente abarca completamente nuestro servicio
-                        (Q(hora_inicio__lte=hora_inicio) & Q(hora_fin__gte=hora_fin))
-                    )
-                ).exists()
-                
-                if not reservada:
-                    bahias_disponibles.append({
-                        'id': bahia.id,
-                        'nombre': bahia.nombre,
-                        'descripcion': bahia.descripcion
-                    })
+            # Obtener bahías activas sin conflicto según su mapa de ocupación
+            bahias = Bahia.objects.filter(activo=True)
+            mapas = OcupacionService.mapas_del_dia(fecha)
+            
+            bahias_disponibles = [{
+                'id': bahia.id,
+                'nombre': bahia.nombre,
+                'descripcion': bahia.descripcion
+            } for bahia in OcupacionService.bahias_libres(bahias, mapas, mascara)]
             
             return JsonResponse({'success': True, 'bahias': bahias_disponibles})
             
@@ -203,58 +174,19 @@ class LavadoresDisponiblesView(LoginRequiredMixin, View):
             except Bahia.DoesNotExist:
                 return JsonResponse({'success': False, 'error': 'Bahía no encontrada'}, status=404)
             
-            # Obtener lavadores disponibles
-            lavadores_disponibles = []
-            
-            # Obtener todos los lavadores activos
-            lavadores = Empleado.objects.filter(activo=True, rol='lavador')
-            
             # Calcular hora de fin (asumiendo 1 hora de servicio por defecto)
             hora_inicio_dt = datetime.datetime.combine(fecha, hora_inicio)
             hora_fin_dt = hora_inicio_dt + datetime.timedelta(hours=1)  # Asumimos 1 hora por defecto
-            hora_fin = hora_fin_dt.time()
             
-            # Día de la semana (0: lunes, 6: domingo)
-            dia_semana = fecha.weekday()
-            
-            for lavador in lavadores:
-                # Verificar disponibilidad horaria del lavador
-                disponible_horario = DisponibilidadHoraria.objects.filter(
-                    empleado=lavador,
-                    dia_semana=dia_semana,
-                    hora_inicio__lte=hora_inicio,
-                    hora_fin__gte=hora_inicio
-                ).exists()
-                
-                if not disponible_horario:
-                    continue
-                
-                # Verificar si el lavador está ocupado en otra reserva
-                ocupado = Reserva.objects.filter(
-                    Q(lavador=lavador) & 
-                    Q(fecha=fecha) & 
-                    (
-                        # La reserva existente comienza durante nuestro servicio
-                        (Q(hora_inicio__gte=hora_inicio) & Q(hora_inicio__lt=hora_fin)) |
-                        # La reserva existente termina durante nuestro servicio
-                        (Q(hora_fin__gt=hora_inicio) & Q(hora_fin__lte=hora_fin)) |
-                        # La reserva existente abarca completamente nuestro servicio
-                        (Q(hora_inicio__lte=hora_inicio) & Q(hora_fin__gte=hora_fin))
-                    )
-                ).exists()
-                
-                if not ocupado:
-                    # Calcular calificación promedio
-                    calificaciones = Calificacion.objects.filter(lavador=lavador)
-                    calificacion_promedio = calificaciones.aggregate(Avg('puntuacion'))['puntuacion__avg'] or 0
-                    
-                    lavadores_disponibles.append({
-                        'id': lavador.id,
-                        'nombre': f"{lavador.user.first_name} {lavador.user.last_name}",
-                        'calificacion': round(calificacion_promedio, 1),
-                        'experiencia': lavador.experiencia_anios,
-                        'foto_url': lavador.foto.url if lavador.foto else None
-                    })
+            # Lavadores activos sin reservas que se crucen con el horario (consultas constantes)
+            lavadores_disponibles = [{
+                'id': lavador.id,
+                'nombre': lavador.nombre,
+                'apellido': lavador.apellido,
+                'calificacion': round(lavador.calificacion_promedio or 0, 1),
+                'cargo': lavador.cargo.nombre,
+                'foto_url': lavador.fotografia.url if lavador.fotografia else None
+            } for lavador in LavadoresDisponiblesService.lavadores_disponibles(hora_inicio_dt, hora_fin_dt, solo_disponibles=False)]
             
             return JsonResponse({'success': True, 'lavadores': lavadores_disponibles})
             
@@ -268,18 +200,14 @@ class LavadoresDisponiblesView(LoginRequiredMixin, View):
 class LavadorDetalleView(LoginRequiredMixin, View):
     def get(self, request, lavador_id, *args, **kwargs):
         try:
-            lavador = Empleado.objects.get(id=lavador_id, activo=True, rol='lavador')
+            lavador = Empleado.objects.get(id=lavador_id, activo=True, rol=Empleado.ROL_LAVADOR)
             
-            # Calcular calificación promedio
-            calificaciones = Calificacion.objects.filter(lavador=lavador)
-            calificacion_promedio = calificaciones.aggregate(Avg('puntuacion'))['puntuacion__avg'] or 0
-            
-            # Obtener comentarios recientes (últimos 5)
+            # Obtener comentarios recientes (últimos 5); el promedio ya está en el empleado
             comentarios_recientes = []
-            for calificacion in calificaciones.order_by('-fecha')[:5]:
+            for calificacion in lavador.calificaciones.select_related('cliente').order_by('-fecha_calificacion')[:5]:
                 comentarios_recientes.append({
-                    'usuario': calificacion.usuario.username,
-                    'fecha': calificacion.fecha.strftime('%d/%m/%Y'),
+                    'usuario': calificacion.cliente.nombre,
+                    'fecha': calificacion.fecha_calificacion.strftime('%d/%m/%Y'),
                     'puntuacion': calificacion.puntuacion,
                     'comentario': calificacion.comentario
                 })
@@ -287,11 +215,10 @@ class LavadorDetalleView(LoginRequiredMixin, View):
             # Construir respuesta
             lavador_detalle = {
                 'id': lavador.id,
-                'nombre': f"{lavador.user.first_name} {lavador.user.last_name}",
-                'calificacion': round(calificacion_promedio, 1),
-                'experiencia': lavador.experiencia_anios,
-                'especialidades': lavador.especialidades,
-                'foto_url': lavador.foto.url if lavador.foto else None,
+                'nombre': lavador.nombre_completo(),
+                'calificacion': round(lavador.calificacion_promedio, 1),
+                'total_calificaciones': lavador.total_calificaciones,
+                'foto_url': lavador.fotografia.url if lavador.fotografia else None,
                 'comentarios': comentarios_recientes
             }
             
@@ -397,34 +324,23 @@ class CrearReservaView(LoginRequiredMixin, View):
             hora_fin_dt = hora_inicio_dt + datetime.timedelta(minutes=servicio.duracion_minutos)
             hora_fin = hora_fin_dt.time()
             
-            # Verificar disponibilidad nuevamente
-            # (Bahía disponible)
-            bahia_ocupada = Reserva.objects.filter(
-                bahia=bahia,
-                fecha_hora=fecha_hora_dt
-            ).exists()
-            if bahia_ocupada:
-                return JsonResponse({'success': False, 'error': 'La bahía ya no está disponible'}, status=400)
-            # (Lavador disponible)
-            lavador_ocupado = Reserva.objects.filter(
-                lavador=lavador,
-                fecha_hora=fecha_hora_dt
-            ).exists()
-            if lavador_ocupado:
-                return JsonResponse({'success': False, 'error': 'El lavador ya no está disponible'}, status=400)
-            # Crear la reserva
+            # Confirmar el horario con las filas de bahía y lavador bloqueadas; si el cliente
+            # tomó un bloqueo al elegirlo, la verificación no cuenta su propio bloqueo
             try:
-                reserva = Reserva.objects.create(
-                    cliente=request.user.cliente,
-                    servicio=servicio,
-                    bahia=bahia,
-                    lavador=lavador,
-                    vehiculo=vehiculo,
-                    fecha_hora=fecha_hora_dt,
-                    precio_final=servicio.precio,
-                    medio_pago=medio_pago,
-                    estado=Reserva.PENDIENTE
-                )
+                with BloqueoService.confirmar(request.user.cliente, bahia.id, fecha_hora_dt, servicio.duracion_minutos, lavador.id):
+                    reserva = Reserva.objects.create(
+                        cliente=request.user.cliente,
+                        servicio=servicio,
+                        bahia=bahia,
+                        lavador=lavador,
+                        vehiculo=vehiculo,
+                        fecha_hora=fecha_hora_dt,
+                        precio_final=servicio.precio,
+                        medio_pago=medio_pago,
+                        estado=Reserva.PENDIENTE
+                    )
+            except HorarioNoDisponible as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
             except IntegrityError:
                 return JsonResponse({'success': False, 'error': 'Esta bahía ya está reservada para la fecha y hora seleccionada. Por favor, selecciona otra bahía u horario.'}, status=400)
             
@@ -487,6 +403,68 @@ class CrearReservaView(LoginRequiredMixin, View):
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+class BloquearHorarioView(LoginRequiredMixin, View):
+    """Toma un bloqueo temporal del horario elegido (bahía, lavador e intervalo)."""
+    def post(self, request, *args, **kwargs):
+        try:
+            fecha_str = request.POST.get('fecha')
+            hora_str = request.POST.get('hora')
+            servicio_id = request.POST.get('servicio_id')
+            bahia_id = request.POST.get('bahia_id')
+            lavador_id = request.POST.get('lavador_id') or None
+            
+            if not all([fecha_str, hora_str, servicio_id, bahia_id]):
+                return JsonResponse({'success': False, 'error': 'Fecha, hora, servicio y bahía son requeridos'}, status=400)
+            
+            try:
+                fecha_hora = datetime.datetime.strptime(f'{fecha_str} {hora_str}', '%Y-%m-%d %H:%M')
+                lavador_id = int(lavador_id) if lavador_id else None
+            except ValueError:
+                return JsonResponse({'success': False, 'error': 'Formato de fecha, hora o lavador inválido'}, status=400)
+            
+            # Un horario que ya empezó no se puede reservar
+            if fecha_hora <= datetime.datetime.now():
+                return JsonResponse({'success': False, 'error': 'El horario seleccionado ya pasó'}, status=400)
+            
+            try:
+                cliente = request.user.cliente
+                servicio = Servicio.objects.get(id=servicio_id)
+                bahia = Bahia.objects.get(id=bahia_id, activo=True)
+            except (AttributeError, ValueError, Servicio.DoesNotExist, Bahia.DoesNotExist):
+                return JsonResponse({'success': False, 'error': 'Cliente, servicio o bahía no encontrados'}, status=404)
+            
+            if lavador_id and not Empleado.objects.filter(
+                id=lavador_id, rol=Empleado.ROL_LAVADOR, activo=True, disponible=True
+            ).exists():
+                return JsonResponse({'success': False, 'error': 'Lavador no encontrado o no disponible'}, status=404)
+            
+            try:
+                bloqueo = BloqueoService.adquirir(cliente, bahia.id, fecha_hora, servicio.duracion_minutos, lavador_id)
+            except HorarioNoDisponible as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=409)
+            
+            return JsonResponse({
+                'success': True,
+                'token': str(bloqueo.token),
+                'expira': bloqueo.expira.strftime('%Y-%m-%dT%H:%M:%S'),
+                'segundos_restantes': BloqueoService.MINUTOS_VIGENCIA * 60
+            })
+            
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+class LiberarBloqueoView(LoginRequiredMixin, View):
+    """Libera el bloqueo temporal del cliente (por ejemplo, al cambiar de horario)."""
+    def post(self, request, *args, **kwargs):
+        try:
+            cliente = request.user.cliente
+        except AttributeError:
+            return JsonResponse({'success': False, 'error': 'Cliente no encontrado'}, status=404)
+        
+        liberados = BloqueoService.liberar(cliente, request.POST.get('token') or None)
+        return JsonResponse({'success': True, 'liberados': liberados})
+
 class GenerarQRView(LoginRequiredMixin, View):
     def get(self, request, reserva_id, *args, **kwargs):
         try:
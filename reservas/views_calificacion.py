@@ -151,7 +151,7 @@ def ver_calificaciones_lavador(request, lavador_id):
     
     calificaciones = Calificacion.objects.filter(empleado=lavador).order_by('-fecha_calificacion')
     promedio = lavador.promedio_calificacion()
-    total_calificaciones = calificaciones.count()
+    total_calificaciones = lavador.total_calificaciones
     
     context = {
         'lavador': lavador,
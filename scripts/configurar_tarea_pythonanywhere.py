@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 """
-Script para configurar automáticamente la tarea programada de cancelación de reservas sin pago en PythonAnywhere.
+Script para configurar automáticamente las tareas programadas de la plataforma en PythonAnywhere.
 
-Este script utiliza la API de PythonAnywhere para crear o actualizar una tarea programada
-que ejecuta periódicamente el comando de cancelación de reservas sin pago. Esto mantiene
-el sistema limpio y libera horarios que no han sido pagados en el tiempo establecido.
+Este script utiliza la API de PythonAnywhere para crear una tarea programada que ejecuta
+periódicamente uno de los comandos de mantenimiento:
+   - cancelacion_reservas: cancela las reservas sin pago y libera sus horarios
+   - envio_correos: envía los correos de verificación y recuperación de contraseña que
+     las vistas dejan en la bandeja de salida (sin esta tarea no se envía ningún correo)
 
 Para usar este script:
 1. Obtén un token de API de PythonAnywhere:
@@ -17,6 +19,7 @@ Para usar este script:
    python configurar_tarea_pythonanywhere.py --username TU_USUARIO --token TU_TOKEN_API
 
 3. Opciones adicionales:
+   --tarea=TAREA    : cancelacion_reservas (por defecto) o envio_correos
    --intervalo=N    : Configura la ejecución cada N minutos (por defecto: 5)
    --dry-run        : Simula la configuración sin realizar cambios
    --comando=COMANDO: Especifica un comando personalizado (opcional)
@@ -33,9 +36,15 @@ import requests
 import json
 import sys
 
-def configurar_tarea_programada(username, api_token, intervalo=5, dry_run=False, comando=None):
+# Tareas predefinidas: (comando de Django, descripción)
+TAREAS = {
+    'cancelacion_reservas': ('cancelar_reservas_sin_pago', 'Cancelar reservas sin pago automáticamente'),
+    'envio_correos': ('enviar_correos_pendientes', 'Enviar los correos pendientes de la bandeja de salida'),
+}
+
+def configurar_tarea_programada(username, api_token, intervalo=5, dry_run=False, comando=None, tarea='cancelacion_reservas'):
     """
-    Configura una tarea programada en PythonAnywhere para ejecutar el comando de cancelación de reservas.
+    Configura una tarea programada en PythonAnywhere para ejecutar uno de los comandos de TAREAS.
     
     Args:
         username (str): Nombre de usuario de PythonAnywhere
@@ -43,6 +52,7 @@ def configurar_tarea_programada(username, api_token, intervalo=5, dry_run=False,
         intervalo (int): Intervalo en minutos para la ejecución (por defecto: 5)
         dry_run (bool): Si es True, simula la configuración sin realizar cambios
         comando (str): Comando personalizado a ejecutar (opcional)
+        tarea (str): Tarea predefinida a configurar (por defecto: cancelacion_reservas)
         
     Returns:
         bool: True si la operación fue exitosa, False en caso contrario
@@ -51,8 +61,9 @@ def configurar_tarea_programada(username, api_token, intervalo=5, dry_run=False,
     api_url = f"https://www.pythonanywhere.com/api/v0/user/{username}/schedule/"
     
     # Comando a ejecutar (usar el personalizado si se proporciona)
+    comando_django, descripcion = TAREAS[tarea]
     if comando is None:
-        comando = "cd ~/autolavados-plataforma && python manage.py cancelar_reservas_sin_pago"
+        comando = f"cd ~/autolavados-plataforma && python manage.py {comando_django}"
     
     # Datos de la tarea programada
     task_data = {
@@ -61,7 +72,7 @@ def configurar_tarea_programada(username, api_token, intervalo=5, dry_run=False,
         "interval": "every_{}mins".format(intervalo),
         "hour": "*",
         "minute": "*/{}".format(intervalo),
-        "description": "Cancelar reservas sin pago automáticamente"
+        "description": descripcion
     }
     
     # Cabeceras de la solicitud
@@ -130,6 +141,9 @@ def main():
   Configuración básica:
     python configurar_tarea_pythonanywhere.py --username MiUsuario --token a1b2c3d4e5f6
   
+  Envío de correos pendientes cada minuto:
+    python configurar_tarea_pythonanywhere.py --username MiUsuario --token a1b2c3d4e5f6 --tarea envio_correos --intervalo 1
+  
   Configuración con intervalo personalizado:
     python configurar_tarea_pythonanywhere.py --username MiUsuario --token a1b2c3d4e5f6 --intervalo 10
   
@@ -147,6 +161,8 @@ def main():
     parser.add_argument("--token", required=True, help="Token de API de PythonAnywhere")
     
     # Argumentos opcionales
+    parser.add_argument("--tarea", choices=sorted(TAREAS), default="cancelacion_reservas",
+                        help="Tarea predefinida a configurar (por defecto: cancelacion_reservas)")
     parser.add_argument("--intervalo", type=int, default=5, help="Intervalo en minutos (por defecto: 5)")
     parser.add_argument("--dry-run", action="store_true", help="Simular la configuración sin realizar cambios")
     parser.add_argument("--comando", help="Comando personalizado a ejecutar (opcional)")
@@ -170,7 +186,8 @@ def main():
         api_token=args.token,
         intervalo=args.intervalo,
         dry_run=args.dry_run,
-        comando=args.comando
+        comando=args.comando,
+        tarea=args.tarea
     )
     
     # Mensaje final
@@ -0,0 +1,37 @@
+#!/bin/bash
+# Script para enviar los correos pendientes de la bandeja de salida en entornos Linux/Unix
+# Este script debe ser programado para ejecutarse cada minuto mediante cron
+
+# Registrar inicio de ejecución
+echo "Ejecutando envío de correos pendientes - $(date)"
+
+# Determinar la ruta del script y cambiar al directorio del proyecto
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+PROJECT_DIR="${SCRIPT_DIR}/.."
+cd "${PROJECT_DIR}"
+
+# Crear directorio de logs si no existe
+mkdir -p "${SCRIPT_DIR}/logs"
+
+# Definir archivo de log
+LOG_FILE="${SCRIPT_DIR}/logs/envio_correos_$(date +%Y%m%d).log"
+
+# Activar el entorno virtual si existe
+if [ -f "${PROJECT_DIR}/venv/bin/activate" ]; then
+    source "${PROJECT_DIR}/venv/bin/activate"
+elif [ -f "${PROJECT_DIR}/env/bin/activate" ]; then
+    source "${PROJECT_DIR}/env/bin/activate"
+elif [ -f "${PROJECT_DIR}/.venv/bin/activate" ]; then
+    source "${PROJECT_DIR}/.venv/bin/activate"
+fi
+
+# Ejecutar el comando de Django que vacía la bandeja de salida
+python manage.py enviar_correos_pendientes
+
+# Registrar finalización
+echo "Envío de correos completado - $(date)"
+
+# Desactivar el entorno virtual si fue activado
+if [ -n "${VIRTUAL_ENV}" ]; then
+    deactivate
+fi
\ No newline at end of file
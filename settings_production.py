@@ -69,6 +69,7 @@ THIRD_PARTY_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
+    'channels',
     'django_extensions',  # Para PythonAnywhere
 ]
 
@@ -80,7 +81,8 @@ LOCAL_APPS = [
     'empleados',
 ]
 
-INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
+# daphne va primero para que runserver sirva la aplicación ASGI (HTTP y WebSocket)
+INSTALLED_APPS = ['daphne'] + DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 # ========================================
 # CONFIGURACIÓN DE MIDDLEWARE
@@ -124,6 +126,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'autolavados_plataforma.wsgi.application'
+ASGI_APPLICATION = 'autolavados_plataforma.asgi.application'
 
 # ========================================
 # CONFIGURACIÓN DE BASE DE DATOS
@@ -171,6 +174,23 @@ CACHES = {
     }
 }
 
+# ========================================
+# CONFIGURACIÓN DE CANALES (WEBSOCKET)
+# ========================================
+# Con varios procesos los eventos deben pasar por Redis (requiere channels-redis)
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.getenv('REDIS_URL')],
+        },
+    }
+} if os.getenv('REDIS_URL') else {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
+
 # ========================================
 # CONFIGURACIÓN DE ARCHIVOS ESTÁTICOS
 # ========================================
@@ -112,21 +112,51 @@ if (typeof $ !== 'undefined' && typeof $.fn !== 'undefined') {
         }
     });
 
+    // Disponibilidad de los próximos 30 días del servicio, pedida en una sola solicitud
+    // y reutilizada al cambiar de fecha; se vuelve a pedir al cambiar de servicio o al minuto
+    const VIGENCIA_CALENDARIO_MS = 60000;
+    let calendario = {servicio: null, cargado: 0, dias: {}};
+
+    function mostrarHorariosDelDia(fecha) {
+        const dia = calendario.dias[fecha];
+        const horarios = dia && dia.horarios ? dia.horarios.filter(horario => horario.disponible) : [];
+        if (horarios.length > 0) {
+            mostrarHorariosDisponibles(horarios);
+        } else {
+            $('#horarios-container').html('<div class="alert alert-warning">No hay horarios disponibles para esta fecha.</div>');
+        }
+    }
+
     // Función para cargar horarios disponibles según la fecha
     function cargarHorariosDisponibles(fecha) {
+        const vigente = calendario.servicio === reservaData.servicio
+            && Date.now() - calendario.cargado < VIGENCIA_CALENDARIO_MS;
+        if (vigente && calendario.dias[fecha]) {
+            mostrarHorariosDelDia(fecha);
+            return;
+        }
+
+        // Fechas locales (toISOString usa UTC y puede cambiar el día)
+        const fechaLocal = fecha => fecha.getFullYear() + '-' + String(fecha.getMonth() + 1).padStart(2, '0')
+            + '-' + String(fecha.getDate()).padStart(2, '0');
+        const hoy = new Date();
+        const limite = new Date(hoy);
+        limite.setDate(limite.getDate() + 30);
         $.ajax({
-            url: '/reservas/api/horarios-disponibles/',
-            type: 'POST',
+            url: '/reservas/obtener_calendario_disponibilidad/',
+            type: 'GET',
             data: {
-                fecha: fecha,
-                servicio_id: reservaData.servicio
+                desde: fechaLocal(hoy),
+                hasta: fechaLocal(limite),
+                servicio_id: reservaData.servicio,
+                detalle: 1
             },
             success: function(response) {
-                if (response.horarios && response.horarios.length > 0) {
-                    mostrarHorariosDisponibles(response.horarios);
-                } else {
-                    $('#horarios-container').html('<div class="alert alert-warning">No hay horarios disponibles para esta fecha.</div>');
-                }
+                calendario = {servicio: reservaData.servicio, cargado: Date.now(), dias: {}};
+                response.dias.forEach(function(dia) {
+                    calendario.dias[dia.fecha] = dia;
+                });
+                mostrarHorariosDelDia(fecha);
             },
             error: function(error) {
                 mostrarError('Error al cargar los horarios disponibles. Por favor, intente nuevamente.');
@@ -143,9 +173,9 @@ if (typeof $ !== 'undefined' && typeof $.fn !== 'undefined') {
         horarios.forEach(function(horario) {
             html += `
                 <div class="col">
-                    <div class="card h-100 horario-card" data-hora="${horario.hora}">
+                    <div class="card h-100 horario-card" data-hora="${horario.hora_inicio}">
                         <div class="card-body text-center">
-                            <h5 class="card-title">${horario.hora_formateada}</h5>
+                            <h5 class="card-title">${horario.hora_inicio}</h5>
                             <p class="card-text">${horario.bahias_disponibles} bahías disponibles</p>
                         </div>
                         <div class="card-footer">
@@ -0,0 +1,35 @@
+// Actualizaciones en tiempo real por WebSocket
+
+// Abre una conexión WebSocket con reconexión automática y entrega cada evento
+// (objeto JSON) a alRecibirEvento. Si el servidor no acepta WebSockets las
+// pantallas siguen actualizándose con su sondeo HTTP.
+function conectarTiempoReal(ruta, alRecibirEvento) {
+    if (!('WebSocket' in window)) return;
+    
+    const protocolo = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+    let espera = 1000;
+    
+    function conectar() {
+        const socket = new WebSocket(protocolo + window.location.host + ruta);
+        
+        socket.onopen = function() {
+            espera = 1000;
+        };
+        
+        socket.onmessage = function(mensaje) {
+            try {
+                alRecibirEvento(JSON.parse(mensaje.data));
+            } catch (error) {
+                console.error('Error al procesar evento en tiempo real:', error);
+            }
+        };
+        
+        // Reintentar con espera creciente (máximo 1 minuto)
+        socket.onclose = function() {
+            setTimeout(conectar, espera);
+            espera = Math.min(espera * 2, 60000);
+        };
+    }
+    
+    conectar();
+}